@@ -18,6 +18,19 @@ def main():
     else:
         password = getpass.getpass("Digite a senha do usuário postgres: ")
         
+    # Snapshot Parquet da v2: sem download, descompactação nem reparse dos CSVs
+    if page.PARQUET_DIR:
+        page.criar_banco_se_nao_existir(password)
+        page.recriar_tabelas(password)
+        if page.importar_parquet(password, page.PARQUET_DIR):
+            print("\n[ERRO] Contagens divergentes entre o snapshot e o banco.")
+            sys.exit(1)
+        page.converter_e_indexar(password)
+        print("\n" + "="*80)
+        print("PROCESSO FINALIZADO COM SUCESSO!")
+        print("="*80)
+        return
+
     # 0. Baixar Arquivos (Mês Atual)
     page.baixar_arquivos_mes_atual()
 
@@ -31,10 +44,10 @@ def main():
     page.recriar_tabelas(password)
     
     # 4. Importar (Inicial) - sempre normalizar para compatibilidade com tipos otimizados
-    page.executar_importacao(password, normalize_empty=True)
+    nao_ativadas = page.executar_importacao(password, normalize_empty=True)
     
     # 5. Verificar e Corrigir (Loop) - sempre normalizar
-    page.verificar_e_corrigir_importacao(password, normalize_empty=True)
+    page.verificar_e_corrigir_importacao(password, normalize_empty=True, nao_ativadas=nao_ativadas)
     
     # 6. Converter e Indexar
     page.converter_e_indexar(password)
@@ -1,6 +1,8 @@
+import io
 import os
 import sys
 import csv
+import json
 import time
 import zipfile
 import shutil
@@ -8,7 +10,6 @@ import psycopg2
 import concurrent.futures
 import getpass
 from pathlib import Path
-import tempfile
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 import requests
 from bs4 import BeautifulSoup
@@ -29,6 +30,21 @@ DB_PORT = os.environ.get('DB_PORT', "5432")
 DB_USER = os.environ.get('DB_USER', "cnpj_user")
 DB_NAME = os.environ.get('DB_NAME', "cnpjdb")
 
+# Snapshot Parquet de uma release gerado pela v2 (v2/importacao/gerar_snapshot.py),
+# ex.: /var/www/cnpj_api/v2/downloads/parquet/2026_10. Se definido, a importação
+# lê as partes Parquet (já normalizadas) em vez de baixar e reprocessar os CSVs.
+PARQUET_DIR = os.environ.get('CNPJ_PARQUET_DIR')
+
+# Arquivos importados ao mesmo tempo, cada um num processo com sua própria conexão.
+# Ajuste aos núcleos e ao disco do servidor PostgreSQL (1 = um arquivo por vez).
+IMPORT_WORKERS = max(1, int(os.environ.get('CNPJ_IMPORT_WORKERS', min(4, os.cpu_count() or 1))))
+
+# Tamanho (caracteres) dos blocos que o COPY recebe do CSV normalizado em streaming
+COPY_BUFFER = 1024 * 1024
+
+# Sufixo das tabelas de carga (UNLOGGED, sem índices) que substituem as definitivas no fim da importação
+SUFIXO_CARGA = "__carga"
+
 # Mapeamento de arquivos para tabelas e colunas
 # Nota: Usamos tipos TEXT para todas as colunas inicialmente para garantir a importação.
 # A conversão para tipos reais (Numeric, Date) é feita na etapa de Pós-Processamento.
@@ -150,18 +166,16 @@ def normalizar_data(data_str):
     return ""
 
 
-def criar_csv_temporario_normalizado(filepath, table_info):
+def normalizar_linhas_csv(src, table_info):
     """
-    Gera um arquivo temporário normalizado com:
+    Gera as linhas normalizadas de um CSV da Receita:
     - Campos vazios convertidos para string vazia (será NULL no banco)
     - Datas convertidas de YYYYMMDD para DD/MM/YYYY ou vazio se inválidas
-    
-    :param filepath: Caminho do arquivo CSV original
+
+    :param src: Arquivo CSV original aberto em modo texto (newline='')
     :param table_info: Dicionário com informações da tabela (table, columns)
-    :return: Caminho do arquivo temporário normalizado
+    :return: Gerador de listas de campos
     """
-    temp_file = tempfile.NamedTemporaryFile(delete=False, mode='w', encoding='utf-8', newline='')
-    
     # Mapear índices das colunas de data
     columns = table_info["columns"]
     date_columns = {
@@ -169,35 +183,75 @@ def criar_csv_temporario_normalizado(filepath, table_info):
         "socios": ["data_entrada_sociedade"],
         "simples": ["data_opcao_simples", "data_exclusao_simples", "data_opcao_mei", "data_exclusao_mei"]
     }
-    
+
     table_name = table_info["table"]
     date_column_indices = []
     if table_name in date_columns:
         for date_col in date_columns[table_name]:
             if date_col in columns:
                 date_column_indices.append(columns.index(date_col))
-    
-    try:
-        writer = csv.writer(temp_file, delimiter=';', quotechar='"', lineterminator='\n')
-        with open(filepath, 'r', encoding='utf-8', errors='replace', newline='') as src:
-            reader = csv.reader(NullByteStripper(src), delimiter=';', quotechar='"')
-            for row in reader:
-                sanitized_row = []
-                for idx, value in enumerate(row):
-                    # Se for coluna de data, normalizar
-                    if idx in date_column_indices:
-                        normalized_date = normalizar_data(value)
-                        sanitized_row.append(normalized_date)
-                    else:
-                        # Tratar campos vazios ou só espaços
-                        if not value or value.strip() == "":
-                            sanitized_row.append("")
-                        else:
-                            sanitized_row.append(value)
-                writer.writerow(sanitized_row)
-    finally:
-        temp_file.close()
-    return temp_file.name
+
+    reader = csv.reader(NullByteStripper(src), delimiter=';', quotechar='"')
+    for row in reader:
+        sanitized_row = []
+        for idx, value in enumerate(row):
+            # Se for coluna de data, normalizar
+            if idx in date_column_indices:
+                sanitized_row.append(normalizar_data(value))
+            # Tratar campos vazios ou só espaços
+            elif not value or value.strip() == "":
+                sanitized_row.append("")
+            else:
+                sanitized_row.append(value)
+        yield sanitized_row
+
+
+class CSVNormalizadoStream:
+    """
+    Arquivo somente leitura para o copy_expert: lê o CSV original e entrega as
+    linhas já normalizadas (normalizar_linhas_csv) à medida que o COPY pede,
+    sem arquivo temporário no disco. A memória fica limitada a um bloco de
+    COPY_BUFFER caracteres, qualquer que seja o tamanho do arquivo.
+    """
+    def __init__(self, filepath, table_info, bloco=None):
+        self.bloco = bloco or COPY_BUFFER
+        self.src = open(filepath, 'r', encoding='utf-8', errors='replace', newline='')
+        self.linhas = normalizar_linhas_csv(self.src, table_info)
+        self.saida = io.StringIO()
+        self.writer = csv.writer(self.saida, delimiter=';', quotechar='"', lineterminator='\n')
+        self.pendente = ""
+        self.fim = False
+
+    def _encher(self):
+        """Serializa linhas até juntar um bloco (ou acabar o arquivo)"""
+        self.saida.seek(0)
+        self.saida.truncate()
+        for row in self.linhas:
+            self.writer.writerow(row)
+            if self.saida.tell() >= self.bloco:
+                break
+        else:
+            self.fim = True
+        self.pendente += self.saida.getvalue()
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            while not self.fim:
+                self._encher()
+            size = len(self.pendente)
+        while len(self.pendente) < size and not self.fim:
+            self._encher()
+        data, self.pendente = self.pendente[:size], self.pendente[size:]
+        return data
+
+    def close(self):
+        self.src.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 
 
@@ -344,27 +398,19 @@ def recriar_tabelas(password):
         cur.execute("CREATE TABLE qualificacoes (codigo char(2) PRIMARY KEY, descricao varchar(200));")
 
         conn.commit()
-    # Criar índices básicos imediatamente (antes da importação para melhor performance)
-    print("Criando índices básicos...")
-    try:
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_estab_cnpj_basico_temp ON estabelecimentos (cnpj_basico);")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_socios_cnpj_basico_temp ON socios (cnpj_basico);")
-    except Exception as e:
-        print(f"  Aviso ao criar índices básicos: {e}")
-    
-    conn.commit()
-    # Criar índices básicos imediatamente (antes da importação para melhor performance)
-    print("Criando índices básicos iniciais...")
-    try:
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_estab_cnpj_basico_temp ON estabelecimentos (cnpj_basico);")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_socios_cnpj_basico_temp ON socios (cnpj_basico);")
-    except Exception as e:
-        print(f"  Aviso ao criar índices básicos: {e}")
-    
-    conn.commit()
-    cur.close()
-    conn.close()
-    print("Tabelas recriadas com sucesso.")
+
+        # Criar índices básicos imediatamente (antes da importação para melhor performance)
+        print("Criando índices básicos...")
+        try:
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_estab_cnpj_basico_temp ON estabelecimentos (cnpj_basico);")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_socios_cnpj_basico_temp ON socios (cnpj_basico);")
+        except Exception as e:
+            print(f"  Aviso ao criar índices básicos: {e}")
+
+        conn.commit()
+        cur.close()
+        conn.close()
+        print("Tabelas recriadas com sucesso.")
     except Exception as e:
         print(f"Erro ao recriar tabelas: {e}")
         sys.exit(1)
@@ -482,22 +528,24 @@ def descompactar_arquivos():
     
     print(f"Descompactação concluída. {sum(results)} arquivos processados.")
 
-def importar_arquivo_individual(password, filepath, table_info, normalize_empty=False):
-    """Importa um único arquivo CSV para o banco."""
+def importar_arquivo_individual(password, filepath, table_info, normalize_empty=False, target_table=None):
+    """
+    Importa um único arquivo CSV para o banco.
+    :param target_table: Tabela que recebe o COPY (ex.: a tabela de carga). Se None, table_info["table"].
+    """
     table_name = table_info["table"]
+    destino = target_table or table_name
     columns = table_info["columns"]
     
     start_time = time.time()
-    temp_path = None
-    
+
     try:
         conn = get_db_connection(password)
         cur = conn.cursor()
         cols_str = ", ".join(columns)
         
-        # Sempre normalizar para garantir conversão correta de datas
-        temp_path = criar_csv_temporario_normalizado(filepath, table_info)
-        source_path = temp_path
+        # Sempre normalizar para garantir conversão correta de datas: o COPY lê
+        # o CSV normalizado em streaming (CSVNormalizadoStream), sem arquivo temporário
         
         # Mapear colunas de data para conversão durante importação
         date_columns_map = {
@@ -517,22 +565,21 @@ def importar_arquivo_individual(password, filepath, table_info, normalize_empty=
                 WHERE table_schema = 'public' 
                 AND table_name = %s 
                 AND column_name = ANY(%s)
-            """, (table_name, date_cols))
+            """, (destino, date_cols))
             
             date_cols_in_db = {row[0]: row[1] for row in cur.fetchall()}
             has_date_type = any(dt == 'date' for dt in date_cols_in_db.values())
             
             if has_date_type:
                 # Usar tabela temporária para conversão DD/MM/YYYY -> DATE
-                temp_table = f"{table_name}_temp_import"
+                temp_table = f"{destino}_temp_import"
                 temp_cols_def = ", ".join([f"{col} text" for col in columns])
                 cur.execute(f"CREATE TEMP TABLE {temp_table} ({temp_cols_def});")
                 
                 # Importar para tabela temporária
-                with open(source_path, 'r', encoding='utf-8', errors='replace') as f:
-                    clean_f = NullByteStripper(f)
+                with CSVNormalizadoStream(filepath, table_info) as stream:
                     sql = f"COPY {temp_table} ({cols_str}) FROM STDIN WITH (FORMAT csv, DELIMITER ';', NULL '', QUOTE '\"', ENCODING 'UTF8')"
-                    cur.copy_expert(sql, clean_f)
+                    cur.copy_expert(sql, stream, size=COPY_BUFFER)
                 
                 # Converter e inserir na tabela final
                 insert_cols = []
@@ -550,20 +597,18 @@ def importar_arquivo_individual(password, filepath, table_info, normalize_empty=
                         insert_cols.append(f"{temp_table}.{col}")
                 
                 insert_cols_str = ", ".join(insert_cols)
-                cur.execute(f"INSERT INTO {table_name} ({cols_str}) SELECT {insert_cols_str} FROM {temp_table};")
+                cur.execute(f"INSERT INTO {destino} ({cols_str}) SELECT {insert_cols_str} FROM {temp_table};")
                 cur.execute(f"DROP TABLE {temp_table};")
             else:
                 # Importar diretamente (datas ainda são TEXT)
-                with open(source_path, 'r', encoding='utf-8', errors='replace') as f:
-                    clean_f = NullByteStripper(f)
-                    sql = f"COPY {table_name} ({cols_str}) FROM STDIN WITH (FORMAT csv, DELIMITER ';', NULL '', QUOTE '\"', ENCODING 'UTF8')"
-                    cur.copy_expert(sql, clean_f)
+                with CSVNormalizadoStream(filepath, table_info) as stream:
+                    sql = f"COPY {destino} ({cols_str}) FROM STDIN WITH (FORMAT csv, DELIMITER ';', NULL '', QUOTE '\"', ENCODING 'UTF8')"
+                    cur.copy_expert(sql, stream, size=COPY_BUFFER)
         else:
             # Sem colunas de data, importar diretamente
-            with open(source_path, 'r', encoding='utf-8', errors='replace') as f:
-                clean_f = NullByteStripper(f)
-                sql = f"COPY {table_name} ({cols_str}) FROM STDIN WITH (FORMAT csv, DELIMITER ';', NULL '', QUOTE '\"', ENCODING 'UTF8')"
-                cur.copy_expert(sql, clean_f)
+            with CSVNormalizadoStream(filepath, table_info) as stream:
+                sql = f"COPY {destino} ({cols_str}) FROM STDIN WITH (FORMAT csv, DELIMITER ';', NULL '', QUOTE '\"', ENCODING 'UTF8')"
+                cur.copy_expert(sql, stream, size=COPY_BUFFER)
             
         conn.commit()
         cur.close()
@@ -576,30 +621,105 @@ def importar_arquivo_individual(password, filepath, table_info, normalize_empty=
         elapsed = time.time() - start_time
         print(f"  -> ERRO ao importar {filepath.name} (tempo: {elapsed:.2f}s): {e}")
         return False
-    finally:
-        if temp_path:
-            try:
-                os.remove(temp_path)
-            except OSError:
-                pass
+
+def criar_tabelas_carga(password, tabelas):
+    """
+    Cria <tabela>__carga para cada tabela: UNLOGGED (o COPY não passa pelo WAL)
+    e sem chave primária nem índices, com as mesmas colunas, tipos e coluna
+    gerada da definitiva.
+    """
+    conn = get_db_connection(password)
+    cur = conn.cursor()
+    for table_name in tabelas:
+        carga = table_name + SUFIXO_CARGA
+        cur.execute(f"DROP TABLE IF EXISTS {carga};")
+        cur.execute(f"CREATE UNLOGGED TABLE {carga} (LIKE {table_name} INCLUDING DEFAULTS INCLUDING GENERATED);")
+    conn.commit()
+    cur.close()
+    conn.close()
+
+def ativar_tabelas_carga(password, tabelas):
+    """
+    Troca cada tabela definitiva pela sua tabela de carga, numa transação por
+    tabela: a carga passa a LOGGED, a definitiva é removida, a carga assume o
+    nome dela e recebe as constraints e índices que a definitiva tinha
+    (construídos de uma vez, em vez de atualizados a cada linha do COPY).
+    Se a troca falhar (ex.: chave primária duplicada, ou uma view/FK que depende
+    da definitiva e impede o DROP) a definitiva fica como estava.
+    :return: Lista de tabelas que não puderam ser trocadas
+    """
+    print("\n  Ativando tabelas de carga (SET LOGGED + troca)...")
+    falhas = []
+    conn = get_db_connection(password)
+    cur = conn.cursor()
+    for table_name in tabelas:
+        carga = table_name + SUFIXO_CARGA
+        inicio = time.time()
+        try:
+            cur.execute("""
+                SELECT conname, pg_get_constraintdef(oid)
+                FROM pg_constraint
+                WHERE conrelid = %s::regclass AND contype IN ('p', 'u', 'c', 'f')
+            """, (table_name,))
+            constraints = cur.fetchall()
+            cur.execute("""
+                SELECT indexdef FROM pg_indexes
+                WHERE schemaname = 'public' AND tablename = %s
+                AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass)
+            """, (table_name, table_name))
+            indices = [row[0] for row in cur.fetchall()]
+
+            cur.execute(f"ALTER TABLE {carga} SET LOGGED;")
+            cur.execute(f"DROP TABLE {table_name};")
+            cur.execute(f"ALTER TABLE {carga} RENAME TO {table_name};")
+            for nome, definicao in constraints:
+                cur.execute(f"ALTER TABLE {table_name} ADD CONSTRAINT {nome} {definicao};")
+            for definicao in indices:
+                cur.execute(definicao)
+            conn.commit()
+            print(f"  -> {table_name}: ativada ({time.time() - inicio:.2f}s)")
+        except Exception as e:
+            conn.rollback()
+            print(f"  -> ERRO ao ativar {table_name} (mantida a tabela anterior): {e}")
+            cur.execute(f"DROP TABLE IF EXISTS {carga};")
+            conn.commit()
+            falhas.append(table_name)
+    cur.close()
+    conn.close()
+    return falhas
+
+def descartar_tabelas_carga(password, tabelas):
+    """Remove as tabelas de carga que não serão ativadas (a definitiva fica como estava)."""
+    conn = get_db_connection(password)
+    cur = conn.cursor()
+    for table_name in tabelas:
+        cur.execute(f"DROP TABLE IF EXISTS {table_name + SUFIXO_CARGA};")
+    conn.commit()
+    cur.close()
+    conn.close()
 
 def executar_importacao(password, tables_filter=None, normalize_empty=True):
     """
     Gerencia a importação de todos os arquivos CSV.
     Normaliza datas de YYYYMMDD para DD/MM/YYYY antes da inserção.
+    Os arquivos são importados em paralelo (CNPJ_IMPORT_WORKERS processos, cada
+    um com sua conexão) para tabelas de carga UNLOGGED, que substituem as
+    definitivas no fim (ver ativar_tabelas_carga).
     :param tables_filter: Lista de nomes de tabelas (str) para importar. Se None, importa tudo.
     :param normalize_empty: Se True, normaliza campos vazios e datas antes do COPY para gerar NULL no banco.
+    :return: Dict {tabela: motivo} das tabelas que não foram ativadas (a definitiva ficou como estava)
     """
     print("\n[4/6] Importando Dados para o PostgreSQL...")
     print("  Normalizando datas de YYYYMMDD para DD/MM/YYYY antes da inserção...")
     if tables_filter:
         print(f"  Modo de Correção: Importando apenas tabelas {tables_filter}")
-    
+
     start_time = time.time()
-    
+
     files = list(DATA_DIR.rglob("*"))
     files = [f for f in files if f.is_file() and not f.name.startswith('.')]
-    files.sort(key=lambda x: x.stat().st_size) # Menores primeiro para feedback rápido
+    # Maiores primeiro: com vários workers, um arquivo grande não fica sozinho no fim da fila
+    files.sort(key=lambda x: x.stat().st_size, reverse=True)
     
     import_targets = []
     
@@ -630,16 +750,146 @@ def executar_importacao(password, tables_filter=None, normalize_empty=True):
 
     if not import_targets:
         print("Nenhum arquivo para importar.")
-        return
+        return {}
 
     total_targets = len(import_targets)
-    print(f"  Total de arquivos para importar: {total_targets}\n")
-    
-    for idx, (filepath, table_info) in enumerate(import_targets, start=1):
-        importar_arquivo_individual(password, filepath, table_info, normalize_empty=normalize_empty)
-    
+    print(f"  Total de arquivos para importar: {total_targets} ({IMPORT_WORKERS} workers)\n")
+
+    tabelas = sorted({table_info["table"] for _, table_info in import_targets})
+    criar_tabelas_carga(password, tabelas)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=IMPORT_WORKERS) as executor:
+        futures = {
+            executor.submit(
+                importar_arquivo_individual, password, filepath, table_info,
+                normalize_empty=normalize_empty, target_table=table_info["table"] + SUFIXO_CARGA,
+            ): (filepath, table_info["table"])
+            for filepath, table_info in import_targets
+        }
+        falhas_arquivo = {}
+        for future in concurrent.futures.as_completed(futures):
+            if not future.result():
+                filepath, table_name = futures[future]
+                falhas_arquivo.setdefault(table_name, []).append(filepath.name)
+    concluidos = total_targets - sum(len(arquivos) for arquivos in falhas_arquivo.values())
+    print(f"\n  Arquivos importados: {concluidos}/{total_targets}")
+
+    # Tabela com arquivo que falhou não é ativada: a carga está incompleta
+    nao_ativadas = {
+        table_name: f"falha ao importar {', '.join(sorted(arquivos))}"
+        for table_name, arquivos in falhas_arquivo.items()
+    }
+    if nao_ativadas:
+        print(f"  Tabelas com arquivos que falharam (mantidas as anteriores): {sorted(nao_ativadas)}")
+        descartar_tabelas_carga(password, sorted(nao_ativadas))
+
+    for table_name in ativar_tabelas_carga(password, [t for t in tabelas if t not in nao_ativadas]):
+        nao_ativadas[table_name] = "falha ao ativar a tabela de carga"
+
     elapsed = time.time() - start_time
     print(f"\n  Importação concluída em {elapsed:.2f}s")
+    return nao_ativadas
+
+def preparar_parquet_postgres(df, table_info):
+    """
+    Adapta uma parte do snapshot Parquet da v2 ao schema do PostgreSQL:
+    - datas 1970-01-01 (data vazia ou inválida na v2) ou fora de 1900-2100 viram NULL;
+    - capital_social vem em centavos (inteiro) e vira texto com 2 casas decimais;
+    - textos vazios viram NULL (como no COPY com NULL '');
+    - cnpj fica de fora (é coluna gerada no PostgreSQL).
+
+    :param df: DataFrame Polars lido do Parquet
+    :param table_info: Dicionário com informações da tabela (table, columns)
+    :return: DataFrame com as colunas de table_info["columns"], nessa ordem
+    """
+    import polars as pl
+
+    expressoes = []
+    for col in table_info["columns"]:
+        tipo = df.schema[col]
+        if tipo == pl.Date:
+            valida = pl.col(col).dt.year().is_between(1900, 2100) & (pl.col(col) != datetime(1970, 1, 1).date())
+            expressoes.append(pl.when(valida).then(pl.col(col)).alias(col))
+        elif col == "capital_social" and tipo.is_integer():
+            centavos = pl.col(col)
+            expressoes.append(
+                ((centavos // 100).cast(pl.Utf8) + "." + (centavos % 100).cast(pl.Utf8).str.zfill(2)).alias(col)
+            )
+        elif tipo == pl.Utf8:
+            expressoes.append(pl.when(pl.col(col) != "").then(pl.col(col)).alias(col))
+        else:
+            expressoes.append(pl.col(col))
+    return df.select(expressoes)
+
+
+def importar_parquet(password, pasta, tables_filter=None):
+    """
+    Importa o snapshot Parquet da v2 (partes listadas em _snapshot.json) em vez
+    dos CSVs: os dados já vêm normalizados e tipados, então não há CSV
+    temporário, tabela temporária de datas nem reparse do latin-1. Cada parte
+    vai para o COPY em fatias, e as linhas do banco são conferidas com as do
+    snapshot no fim de cada tabela.
+    :param pasta: Pasta do snapshot de uma release (contém _snapshot.json)
+    :param tables_filter: Lista de nomes de tabelas (str) para importar. Se None, importa tudo.
+    :return: Lista de tabelas com contagem divergente
+    """
+    print("\n[4/6] Importando Snapshot Parquet para o PostgreSQL...")
+    try:
+        import polars as pl
+    except ImportError:
+        print("Erro: o snapshot Parquet precisa do Polars (pip install polars).")
+        sys.exit(1)
+
+    pasta = Path(pasta)
+    manifesto_path = pasta / "_snapshot.json"
+    if not manifesto_path.exists():
+        print(f"Erro: {manifesto_path} não encontrado (gere o snapshot com v2/importacao/gerar_snapshot.py).")
+        sys.exit(1)
+    arquivos = json.loads(manifesto_path.read_text(encoding="utf-8"))["arquivos"].values()
+
+    start_time = time.time()
+    divergentes = []
+    conn = get_db_connection(password)
+    cur = conn.cursor()
+
+    print(f"{'TABELA':<20} | {'PARTES':<10} | {'LINHAS PARQUET':<15} | {'LINHAS BANCO':<15} | {'TEMPO':<10} | {'STATUS':<10}")
+    print("-" * 90)
+    for table_info in FILES_TABLES_MAP.values():
+        table_name = table_info["table"]
+        if tables_filter and table_name not in tables_filter:
+            continue
+        partes = [pasta / table_name / parte for a in arquivos if a["tabela"] == table_name for parte in a["partes"]]
+        esperadas = sum(a["linhas"] for a in arquivos if a["tabela"] == table_name)
+        cols_str = ", ".join(table_info["columns"])
+        sql = f"COPY {table_name} ({cols_str}) FROM STDIN WITH (FORMAT csv, DELIMITER ';', NULL '', QUOTE '\"', ENCODING 'UTF8')"
+
+        inicio_tabela = time.time()
+        try:
+            for parte in partes:
+                df = preparar_parquet_postgres(pl.read_parquet(parte), table_info)
+                for fatia in df.iter_slices(n_rows=200_000):
+                    buffer = io.BytesIO()
+                    fatia.write_csv(buffer, separator=';', include_header=False, null_value='', date_format='%Y-%m-%d')
+                    buffer.seek(0)
+                    cur.copy_expert(sql, buffer)
+            conn.commit()
+            cur.execute(f"SELECT COUNT(*) FROM {table_name}")
+            db_count = cur.fetchone()[0]
+        except Exception as e:
+            conn.rollback()
+            print(f"  -> ERRO ao importar {table_name}: {e}")
+            db_count = -1
+
+        status = "OK" if db_count == esperadas else "DIVERGENTE"
+        if status != "OK":
+            divergentes.append(table_name)
+        elapsed = time.time() - inicio_tabela
+        print(f"{table_name:<20} | {len(partes):<10} | {esperadas:<15} | {db_count:<15} | {elapsed:<10.2f} | {status:<10}")
+
+    cur.close()
+    conn.close()
+    print(f"\n  Importação do snapshot concluída em {time.time() - start_time:.2f}s")
+    return divergentes
 
 # =================================================================================
 # VERIFICAÇÃO E PÓS-PROCESSAMENTO
@@ -726,12 +976,14 @@ def verificar_importacao(password):
     conn.close()
     return divergentes
 
-def verificar_e_corrigir_importacao(password, normalize_empty=True):
+def verificar_e_corrigir_importacao(password, normalize_empty=True, nao_ativadas=None):
     """
     Executa a verificação e tenta corrigir divergências automaticamente.
     Usa contagem lógica de registros para evitar falsos positivos com quebras de linha.
+    :param nao_ativadas: Retorno de executar_importacao (tabelas não ativadas e motivo), para o log.
     """
     max_retries = 3
+    nao_ativadas = nao_ativadas or {}
     for attempt in range(max_retries):
         divergentes = verificar_importacao(password)
         
@@ -740,6 +992,9 @@ def verificar_e_corrigir_importacao(password, normalize_empty=True):
             return True
             
         print(f"\n[ALERTA] Divergências detectadas em: {divergentes}")
+        for table in divergentes:
+            if table in nao_ativadas:
+                print(f"  -> {table}: não ativada na tentativa anterior ({nao_ativadas[table]})")
         print(f"Iniciando tentativa de correção automática ({attempt+1}/{max_retries})...")
         
         # Truncar tabelas divergentes
@@ -753,7 +1008,7 @@ def verificar_e_corrigir_importacao(password, normalize_empty=True):
         conn.close()
         
         # Reimportar apenas as divergentes (sempre normalizar para datas)
-        executar_importacao(password, tables_filter=divergentes, normalize_empty=True)
+        nao_ativadas = executar_importacao(password, tables_filter=divergentes, normalize_empty=True)
     
     print("\n[ERRO] Não foi possível corrigir todas as divergências após várias tentativas.")
     return False
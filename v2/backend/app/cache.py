@@ -0,0 +1,244 @@
+"""Cache de resultados de busca compartilhado entre os workers do uvicorn.
+
+O cache fica em um arquivo SQLite em memória compartilhada (/dev/shm), de modo
+que os 4 workers leem e escrevem no mesmo lugar: cada página é aquecida uma vez
+só e ocupa memória uma vez só. As páginas são guardadas como JSON comprimido
+(zlib), com orçamento máximo em bytes e descarte LRU. Toda chave inclui a
+release atual dos dados, e trocar a release apaga as entradas antigas; um
+worker que ainda não viu a troca não consegue gravar entradas da release
+anterior. O total de bytes é mantido por triggers, sem somar a tabela a cada
+gravação. A leitura só escreve (o horário de acesso do LRU) quando o último
+registro da entrada tem mais de SEARCH_CACHE_TOUCH_INTERVAL_SECONDS: uma página
+muito acessada não disputa o lock de escrita do SQLite a cada acerto.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _caminho_padrao() -> str:
+    """Usa /dev/shm quando disponível (memória compartilhada), senão o diretório temporário"""
+    base = Path("/dev/shm")
+    if not base.is_dir() or not os.access(base, os.W_OK):
+        base = Path(tempfile.gettempdir())
+    return str(base / "cnpj_search_cache.sqlite")
+
+
+class SearchCache:
+    """Cache de páginas de busca compartilhado entre processos"""
+
+    def __init__(self, path: str, max_bytes: int, touch_interval: float = 60.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """Abre (uma vez por processo) a conexão com o arquivo do cache"""
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # É só cache: perder entradas num crash não importa
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entradas (
+                    chave TEXT PRIMARY KEY,
+                    release TEXT NOT NULL,
+                    valor BLOB NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    ultimo_acesso REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entradas_acesso ON entradas (ultimo_acesso)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT NOT NULL)")
+            # Total de bytes das entradas, atualizado pelas triggers na mesma transação da escrita
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("CREATE TABLE IF NOT EXISTS total (id INTEGER PRIMARY KEY CHECK (id = 1), bytes INTEGER NOT NULL)")
+                conn.execute("INSERT OR IGNORE INTO total (id, bytes) SELECT 1, COALESCE(SUM(tamanho), 0) FROM entradas")
+                conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS entradas_insert AFTER INSERT ON entradas
+                    BEGIN UPDATE total SET bytes = bytes + new.tamanho; END
+                """)
+                conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS entradas_update AFTER UPDATE OF tamanho ON entradas
+                    BEGIN UPDATE total SET bytes = bytes + new.tamanho - old.tamanho; END
+                """)
+                conn.execute("""
+                    CREATE TRIGGER IF NOT EXISTS entradas_delete AFTER DELETE ON entradas
+                    BEGIN UPDATE total SET bytes = bytes - old.tamanho; END
+                """)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    @staticmethod
+    def build_key(endpoint: str, filters: Dict[str, Any], page: int, page_size: int, release: str) -> str:
+        """Monta a chave a partir dos filtros normalizados + paginação + release"""
+        payload = json.dumps(
+            {
+                "endpoint": endpoint,
+                "filters": {k: v for k, v in filters.items() if v is not None},
+                "page": page,
+                "page_size": page_size,
+                "release": release,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """Retorna a página em cache (ou None)"""
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute("SELECT valor, ultimo_acesso FROM entradas WHERE chave = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                agora = time.time()
+                if agora - row[1] > self.touch_interval:
+                    # Outro worker pode ter atualizado no meio: a condição evita a escrita repetida
+                    conn.execute(
+                        "UPDATE entradas SET ultimo_acesso = ? WHERE chave = ? AND ultimo_acesso < ?",
+                        (agora, key, agora - self.touch_interval),
+                    )
+            return json.loads(zlib.decompress(row[0]))
+        except Exception as e:
+            logger.warning(f"Falha ao ler cache de busca: {e}")
+            return None
+
+    def set(self, key: str, release: str, value: dict) -> None:
+        """
+        Grava a página comprimida e aplica o orçamento de bytes. Só grava se
+        `release` for a release sincronizada (sync_release) por algum worker:
+        um worker atrasado não deixa entradas órfãs da release anterior.
+        """
+        try:
+            blob = zlib.compress(json.dumps(value, separators=(",", ":"), default=str).encode("utf-8"), 6)
+            if len(blob) > self.max_bytes:
+                return
+            with self._lock:
+                conn = self._connection()
+                gravou = conn.execute(
+                    "INSERT INTO entradas (chave, release, valor, tamanho, ultimo_acesso) "
+                    "SELECT ?, ?, ?, ?, ? "
+                    "WHERE ? = COALESCE((SELECT valor FROM meta WHERE chave = 'release'), ?) "
+                    "ON CONFLICT (chave) DO UPDATE SET "
+                    "valor = excluded.valor, tamanho = excluded.tamanho, ultimo_acesso = excluded.ultimo_acesso",
+                    (key, release, blob, len(blob), time.time(), release, release),
+                ).rowcount
+                if gravou:
+                    self._evict(conn)
+        except Exception as e:
+            logger.warning(f"Falha ao gravar cache de busca: {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Remove as entradas menos usadas até caber no orçamento"""
+        total = conn.execute("SELECT bytes FROM total").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Liberar uma folga de 10% para não despejar a cada gravação
+        excesso = total - int(self.max_bytes * 0.9)
+        liberado = 0
+        chaves = []
+        for chave, tamanho in conn.execute("SELECT chave, tamanho FROM entradas ORDER BY ultimo_acesso"):
+            chaves.append((chave,))
+            liberado += tamanho
+            if liberado >= excesso:
+                break
+        conn.executemany("DELETE FROM entradas WHERE chave = ?", chaves)
+
+    def sync_release(self, release: str) -> None:
+        """Invalida as entradas de outras releases quando a release muda"""
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute("SELECT valor FROM meta WHERE chave = 'release'").fetchone()
+                if row is not None and row[0] == release:
+                    return
+                # Troca a release e apaga as entradas antigas na mesma transação: nenhum
+                # set() da release anterior entra entre as duas coisas
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES ('release', ?)", (release,))
+                    conn.execute("DELETE FROM entradas WHERE release != ?", (release,))
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            logger.info(f"Cache de busca invalidado para a release {release}")
+        except Exception as e:
+            logger.warning(f"Falha ao sincronizar release do cache: {e}")
+
+
+_cache: Optional[SearchCache] = None
+_release: Optional[str] = None
+_release_checked_at: float = 0.0
+
+
+def get_search_cache() -> Optional[SearchCache]:
+    """Retorna o cache de buscas (singleton), ou None se desabilitado"""
+    global _cache
+    if not settings.SEARCH_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = SearchCache(
+            settings.SEARCH_CACHE_PATH or _caminho_padrao(),
+            settings.SEARCH_CACHE_MAX_BYTES,
+            settings.SEARCH_CACHE_TOUCH_INTERVAL_SECONDS,
+        )
+    return _cache
+
+
+def get_current_release(client) -> str:
+    """
+    Identifica a release dos dados carregados no ClickHouse.
+    Preferência: a última troca registrada na tabela `releases` pela carga
+    blue/green (release + momento da troca). Sem ela, usa total de linhas +
+    maior bloco inserido das partes ativas das tabelas de produção (as de
+    staging/versões anteriores, com "__" no nome, ficam de fora): muda a cada
+    importação/troca de tabelas, mas não com merges em segundo plano.
+    O valor é consultado no máximo uma vez a cada RELEASE_CHECK_INTERVAL_SECONDS.
+    """
+    global _release, _release_checked_at
+    agora = time.monotonic()
+    if _release is not None and agora - _release_checked_at < settings.RELEASE_CHECK_INTERVAL_SECONDS:
+        return _release
+
+    try:
+        rows = client.execute("SELECT release, toString(ativada_em) FROM releases ORDER BY ativada_em DESC LIMIT 1")
+    except Exception:
+        rows = []
+    if rows:
+        release = f"{rows[0][0]}@{rows[0][1]}"
+    else:
+        rows = client.execute(
+            "SELECT sum(rows), max(max_block_number) FROM system.parts "
+            "WHERE database = currentDatabase() AND active AND position(table, '__') = 0"
+        )
+        release = f"{rows[0][0]}:{rows[0][1]}" if rows else "0:0"
+    _release_checked_at = agora
+    if release != _release:
+        _release = release
+        cache = get_search_cache()
+        if cache is not None:
+            cache.sync_release(release)
+    return release
@@ -1,7 +1,14 @@
 """Cliente ClickHouse reutilizável com pool de conexões"""
 from clickhouse_driver import Client
-from typing import Optional
+from clickhouse_driver.errors import ErrorCodes, ServerException
+from fastapi import HTTPException, Request
+from functools import partial
+from typing import Optional, Set
+import asyncio
 import logging
+import queue
+import threading
+import uuid
 from .config import settings
 
 logger = logging.getLogger(__name__)
@@ -9,37 +16,58 @@ logger = logging.getLogger(__name__)
 # Cliente global (singleton)
 _client: Optional[Client] = None
 
+# Pool para queries executadas em threads (permite cancelar enquanto rodam)
+_pool: "queue.Queue[Client]" = queue.Queue()
+_pool_created = 0
+_pool_lock = threading.Lock()
+
+# Queries canceladas antes de conseguirem uma conexão do pool
+_cancelled: Set[str] = set()
+
+# Códigos de erro do ClickHouse mapeados para respostas HTTP claras
+LIMIT_TIMEOUT_CODES = {ErrorCodes.TIMEOUT_EXCEEDED, ErrorCodes.TOO_SLOW}
+LIMIT_ROWS_CODES = {ErrorCodes.TOO_MANY_ROWS, ErrorCodes.TOO_MANY_BYTES, ErrorCodes.TOO_MANY_ROWS_OR_BYTES}
+
+
+class QueryCancelledError(Exception):
+    """Query cancelada antes de começar a executar"""
+
+
+def _create_client() -> Client:
+    """Cria uma nova conexão com o ClickHouse"""
+    return Client(
+        host=settings.CLICKHOUSE_HOST,
+        port=settings.CLICKHOUSE_PORT,
+        user=settings.CLICKHOUSE_USER,
+        password=settings.CLICKHOUSE_PASSWORD,
+        database=settings.CLICKHOUSE_DATABASE,
+        connect_timeout=10,
+        send_receive_timeout=300,
+        sync_request_timeout=300,
+        compression=True,  # Compressão de rede
+    )
+
 
 def get_clickhouse_client() -> Client:
     """Retorna cliente ClickHouse (singleton)"""
     global _client
-    
+
     if _client is None:
         try:
-            _client = Client(
-                host=settings.CLICKHOUSE_HOST,
-                port=settings.CLICKHOUSE_PORT,
-                user=settings.CLICKHOUSE_USER,
-                password=settings.CLICKHOUSE_PASSWORD,
-                database=settings.CLICKHOUSE_DATABASE,
-                connect_timeout=10,
-                send_receive_timeout=300,
-                sync_request_timeout=300,
-                compression=True,  # Compressão de rede
-            )
+            _client = _create_client()
             # Testar conexão
             _client.execute("SELECT 1")
             logger.info("ClickHouse client conectado com sucesso")
         except Exception as e:
             logger.error(f"Erro ao conectar ao ClickHouse: {e}")
             raise
-    
+
     return _client
 
 
 def close_clickhouse_client():
     """Fecha conexão com ClickHouse"""
-    global _client
+    global _client, _pool_created
     if _client is not None:
         try:
             _client.disconnect()
@@ -47,7 +75,88 @@ def close_clickhouse_client():
             logger.info("Conexão ClickHouse fechada")
         except Exception as e:
             logger.error(f"Erro ao fechar conexão ClickHouse: {e}")
+    while True:
+        try:
+            _pool.get_nowait().disconnect()
+        except queue.Empty:
+            break
+        except Exception:
+            pass
+    _pool_created = 0
+
+
+def _acquire_pooled_client() -> Client:
+    """Pega uma conexão do pool (bloqueia a thread se todas estiverem em uso)"""
+    global _pool_created
+    try:
+        return _pool.get_nowait()
+    except queue.Empty:
+        pass
+    with _pool_lock:
+        if _pool_created < settings.CLICKHOUSE_POOL_SIZE:
+            _pool_created += 1
+            return _create_client()
+    return _pool.get()
+
 
+def _execute_pooled(query: str, params: dict, limits: dict, query_id: str):
+    """Executa a query em uma conexão do pool (roda fora do event loop)"""
+    if query_id in _cancelled:
+        _cancelled.discard(query_id)
+        raise QueryCancelledError(query_id)
+    client = _acquire_pooled_client()
+    try:
+        return client.execute(query, params, settings=limits, query_id=query_id)
+    finally:
+        _pool.put(client)
 
 
+def kill_query(query_id: str) -> None:
+    """Mata uma query em execução no servidor pelo query_id"""
+    _cancelled.add(query_id)
+    try:
+        get_clickhouse_client().execute(
+            "KILL QUERY WHERE query_id = %(query_id)s ASYNC", {"query_id": query_id}
+        )
+        logger.info(f"Query {query_id} cancelada (cliente desconectou)")
+    except Exception as e:
+        logger.warning(f"Não foi possível cancelar a query {query_id}: {e}")
 
+
+async def execute_limited(request: Request, endpoint: str, query: str, params: Optional[dict] = None):
+    """
+    Executa uma query com os limites do endpoint (settings.QUERY_LIMITS).
+    Se o cliente HTTP desconectar enquanto a query roda, ela é morta no servidor
+    pelo query_id. Estouro de limite vira 408 (tempo) ou 422 (linhas/bytes).
+    """
+    query_id = str(uuid.uuid4())
+    limits = settings.QUERY_LIMITS.get(endpoint, {})
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(None, partial(_execute_pooled, query, params or {}, limits, query_id))
+
+    try:
+        while True:
+            done, _ = await asyncio.wait({future}, timeout=settings.DISCONNECT_POLL_INTERVAL_SECONDS)
+            if done:
+                break
+            if await request.is_disconnected():
+                kill_query(query_id)
+                # Quando a thread terminar: limpar a marca de cancelamento e consumir o erro
+                future.add_done_callback(lambda f: (_cancelled.discard(query_id), f.exception()))
+                # Ninguém recebe esta resposta (o cliente já saiu): a exceção só
+                # interrompe a rota, e o 499 (convenção do nginx para "cliente
+                # fechou a conexão") deixa o caso identificável no log de acesso
+                raise HTTPException(status_code=499, detail="Cliente desconectou; consulta cancelada")
+        return future.result()
+    except ServerException as e:
+        if e.code in LIMIT_TIMEOUT_CODES:
+            raise HTTPException(
+                status_code=408,
+                detail="Consulta excedeu o tempo máximo permitido. Refine os filtros da busca.",
+            )
+        if e.code in LIMIT_ROWS_CODES:
+            raise HTTPException(
+                status_code=422,
+                detail="Consulta muito ampla (excede o limite de linhas lidas). Refine os filtros da busca.",
+            )
+        raise
@@ -1,6 +1,6 @@
 """Configurações da aplicação FastAPI"""
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 
 class Settings(BaseSettings):
@@ -10,6 +10,18 @@ class Settings(BaseSettings):
     CLICKHOUSE_USER: str = "default"
     CLICKHOUSE_PASSWORD: str = ""
     CLICKHOUSE_DATABASE: str = "cnpj"
+    CLICKHOUSE_POOL_SIZE: int = 8  # Conexões para queries executadas fora do event loop
+    
+    # Limites de recursos por endpoint (settings do ClickHouse aplicados a cada query).
+    # max_rows_to_read de search/cnae: ~40% de estabelecimentos (~63 milhões de
+    # linhas), o bastante para a maior UF, abaixo de uma varredura completa
+    QUERY_LIMITS: Dict[str, Dict[str, int]] = {
+        "cnpj": {"max_execution_time": 5, "max_rows_to_read": 50_000_000, "max_threads": 2, "priority": 1},
+        "search": {"max_execution_time": 30, "max_rows_to_read": 25_000_000, "max_threads": 8, "priority": 5},
+        "cnae": {"max_execution_time": 30, "max_rows_to_read": 25_000_000, "max_threads": 8, "priority": 5},
+        "changes": {"max_execution_time": 30, "max_rows_to_read": 100_000_000, "max_threads": 4, "priority": 5},
+    }
+    DISCONNECT_POLL_INTERVAL_SECONDS: float = 0.25
     
     # API
     API_TITLE: str = "CNPJ Search API"
@@ -30,6 +42,13 @@ class Settings(BaseSettings):
     # Rate Limiting (opcional)
     RATE_LIMIT_PER_MINUTE: int = 100
     
+    # Cache de buscas compartilhado entre workers
+    SEARCH_CACHE_ENABLED: bool = True
+    SEARCH_CACHE_PATH: str = ""  # Vazio = /dev/shm/cnpj_search_cache.sqlite
+    SEARCH_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # 256 MB (comprimido)
+    SEARCH_CACHE_TOUCH_INTERVAL_SECONDS: float = 60  # Atualização do LRU no máximo 1x por minuto por entrada
+    RELEASE_CHECK_INTERVAL_SECONDS: int = 30
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -1,19 +1,26 @@
 """Endpoints de empresas e estabelecimentos"""
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import Optional
+from clickhouse_driver.errors import ErrorCodes, ServerException
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from typing import Optional, Tuple
 from ..schemas import (
     CompanyDetailResponse,
     Estabelecimento,
+    Mudanca,
+    MudancasResponse,
     SearchRequest,
     SearchResponse,
     Empresa,
     Simples,
     Socio,
 )
-from ..clickhouse_client import get_clickhouse_client
+from ..clickhouse_client import get_clickhouse_client, execute_limited
+from ..cache import get_search_cache, get_current_release
 from ..utils import to_str, format_date, format_capital_social
 from .. import auth
+import base64
+import json
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/companies", tags=["empresas"])
@@ -22,6 +29,7 @@ router = APIRouter(prefix="/companies", tags=["empresas"])
 @router.get("/cnpj/{cnpj}", response_model=CompanyDetailResponse)
 async def buscar_por_cnpj(
     cnpj: str,
+    request: Request,
     current_user: dict = Depends(auth.get_current_user)
 ):
     """
@@ -32,9 +40,7 @@ async def buscar_por_cnpj(
     cnpj_clean = "".join(filter(str.isdigit, cnpj))
     if len(cnpj_clean) != 14:
         raise HTTPException(status_code=400, detail="CNPJ deve ter 14 dígitos")
-    
-    client = get_clickhouse_client()
-    
+
     try:
         # 1. Buscar estabelecimento (query principal - mais rápida, sem JOINs)
         query_est = """
@@ -53,7 +59,7 @@ async def buscar_por_cnpj(
             WHERE cnpj = %(cnpj)s
             LIMIT 1
         """
-        est_rows = client.execute(query_est, {"cnpj": cnpj_clean})
+        est_rows = await execute_limited(request, "cnpj", query_est, {"cnpj": cnpj_clean})
         
         if not est_rows:
             raise HTTPException(status_code=404, detail="CNPJ não encontrado")
@@ -104,7 +110,7 @@ async def buscar_por_cnpj(
             WHERE cnpj_basico = %(cnpj_basico)s
             LIMIT 1
         """
-        emp_rows = client.execute(query_emp, {"cnpj_basico": cnpj_basico})
+        emp_rows = await execute_limited(request, "cnpj", query_emp, {"cnpj_basico": cnpj_basico})
         if emp_rows:
             emp_data = emp_rows[0]
             data['razao_social'] = to_str(emp_data[0])
@@ -127,7 +133,7 @@ async def buscar_por_cnpj(
             WHERE cnpj_basico = %(cnpj_basico)s
             LIMIT 1
         """
-        simp_rows = client.execute(query_simp, {"cnpj_basico": cnpj_basico})
+        simp_rows = await execute_limited(request, "cnpj", query_simp, {"cnpj_basico": cnpj_basico})
         if simp_rows:
             simp_data = simp_rows[0]
             data['opcao_simples'] = to_str(simp_data[0])
@@ -147,7 +153,7 @@ async def buscar_por_cnpj(
             FROM socios
             WHERE cnpj_basico = %(cnpj_basico)s
         """
-        soc_rows = client.execute(query_soc, {"cnpj_basico": cnpj_basico})
+        soc_rows = await execute_limited(request, "cnpj", query_soc, {"cnpj_basico": cnpj_basico})
         
         # 5. Buscar todas as descrições em batch (queries otimizadas, sem JOINs)
         # Coletar códigos únicos para buscar em batch
@@ -194,7 +200,7 @@ async def buscar_por_cnpj(
         # CNAE principal
         if codigos_unicos['cnae']:
             cnae_cod = list(codigos_unicos['cnae'])[0]
-            cnae_row = client.execute("SELECT descricao FROM cnaes WHERE codigo = %(codigo)s", {"codigo": cnae_cod})
+            cnae_row = await execute_limited(request, "cnpj", "SELECT descricao FROM cnaes WHERE codigo = %(codigo)s", {"codigo": cnae_cod})
             if cnae_row:
                 data['cnae_principal_desc'] = to_str(cnae_row[0][0])
         
@@ -206,7 +212,7 @@ async def buscar_por_cnpj(
             if cnae_codes:
                 # Buscar descrições para cada CNAE secundário
                 if len(cnae_codes) == 1:
-                    cnae_rows = client.execute(
+                    cnae_rows = await execute_limited(request, "cnpj",
                         "SELECT codigo, descricao FROM cnaes WHERE codigo = %(codigo)s",
                         {"codigo": cnae_codes[0]}
                     )
@@ -214,7 +220,7 @@ async def buscar_por_cnpj(
                     # Para múltiplos valores, usar OR (mais compatível)
                     conditions = " OR ".join([f"codigo = %(codigo{i})s" for i in range(len(cnae_codes))])
                     params = {f"codigo{i}": cnae_codes[i] for i in range(len(cnae_codes))}
-                    cnae_rows = client.execute(
+                    cnae_rows = await execute_limited(request, "cnpj",
                         f"SELECT codigo, descricao FROM cnaes WHERE {conditions}",
                         params
                     )
@@ -230,35 +236,35 @@ async def buscar_por_cnpj(
         # Município
         if codigos_unicos['municipio']:
             mun_cod = list(codigos_unicos['municipio'])[0]
-            mun_row = client.execute("SELECT descricao FROM municipios WHERE codigo = %(codigo)s", {"codigo": mun_cod})
+            mun_row = await execute_limited(request, "cnpj", "SELECT descricao FROM municipios WHERE codigo = %(codigo)s", {"codigo": mun_cod})
             if mun_row:
                 data['municipio_desc'] = to_str(mun_row[0][0])
         
         # Motivo situação
         if codigos_unicos['motivo']:
             mot_cod = list(codigos_unicos['motivo'])[0]
-            mot_row = client.execute("SELECT descricao FROM motivos WHERE codigo = %(codigo)s", {"codigo": mot_cod})
+            mot_row = await execute_limited(request, "cnpj", "SELECT descricao FROM motivos WHERE codigo = %(codigo)s", {"codigo": mot_cod})
             if mot_row:
                 data['situacao_motivo_desc'] = to_str(mot_row[0][0])
         
         # Natureza jurídica
         if codigos_unicos['natureza']:
             nat_cod = list(codigos_unicos['natureza'])[0]
-            nat_row = client.execute("SELECT descricao FROM naturezas WHERE codigo = %(codigo)s", {"codigo": nat_cod})
+            nat_row = await execute_limited(request, "cnpj", "SELECT descricao FROM naturezas WHERE codigo = %(codigo)s", {"codigo": nat_cod})
             if nat_row:
                 data['natureza_juridica_desc'] = to_str(nat_row[0][0])
         
         # País estabelecimento
         if codigos_unicos['pais_est']:
             pais_est_cod = list(codigos_unicos['pais_est'])[0]
-            pais_est_row = client.execute("SELECT descricao FROM paises WHERE codigo = %(codigo)s", {"codigo": pais_est_cod})
+            pais_est_row = await execute_limited(request, "cnpj", "SELECT descricao FROM paises WHERE codigo = %(codigo)s", {"codigo": pais_est_cod})
             if pais_est_row:
                 data['pais_estabelecimento_desc'] = to_str(pais_est_row[0][0])
         
         # Qualificação responsável empresa
         if codigos_unicos['qual_resp']:
             qual_resp_cod = list(codigos_unicos['qual_resp'])[0]
-            qual_resp_row = client.execute("SELECT descricao FROM qualificacoes WHERE codigo = %(codigo)s", {"codigo": qual_resp_cod})
+            qual_resp_row = await execute_limited(request, "cnpj", "SELECT descricao FROM qualificacoes WHERE codigo = %(codigo)s", {"codigo": qual_resp_cod})
             if qual_resp_row:
                 data['qualif_resp_empresa_desc'] = to_str(qual_resp_row[0][0])
         
@@ -268,7 +274,7 @@ async def buscar_por_cnpj(
             qual_soc_list = list(codigos_unicos['qual_soc'])
             # Construir query com valores diretamente (mais rápido e compatível)
             if len(qual_soc_list) == 1:
-                qual_soc_rows = client.execute(
+                qual_soc_rows = await execute_limited(request, "cnpj",
                     "SELECT codigo, descricao FROM qualificacoes WHERE codigo = %(codigo)s",
                     {"codigo": qual_soc_list[0]}
                 )
@@ -276,7 +282,7 @@ async def buscar_por_cnpj(
                 # Para múltiplos valores, usar OR (mais compatível que IN com tupla)
                 conditions = " OR ".join([f"codigo = %(codigo{i})s" for i in range(len(qual_soc_list))])
                 params = {f"codigo{i}": qual_soc_list[i] for i in range(len(qual_soc_list))}
-                qual_soc_rows = client.execute(
+                qual_soc_rows = await execute_limited(request, "cnpj",
                     f"SELECT codigo, descricao FROM qualificacoes WHERE {conditions}",
                     params
                 )
@@ -286,14 +292,14 @@ async def buscar_por_cnpj(
         if codigos_unicos['pais_soc']:
             pais_soc_list = list(codigos_unicos['pais_soc'])
             if len(pais_soc_list) == 1:
-                pais_soc_rows = client.execute(
+                pais_soc_rows = await execute_limited(request, "cnpj",
                     "SELECT codigo, descricao FROM paises WHERE codigo = %(codigo)s",
                     {"codigo": pais_soc_list[0]}
                 )
             else:
                 conditions = " OR ".join([f"codigo = %(codigo{i})s" for i in range(len(pais_soc_list))])
                 params = {f"codigo{i}": pais_soc_list[i] for i in range(len(pais_soc_list))}
-                pais_soc_rows = client.execute(
+                pais_soc_rows = await execute_limited(request, "cnpj",
                     f"SELECT codigo, descricao FROM paises WHERE {conditions}",
                     params
                 )
@@ -303,14 +309,14 @@ async def buscar_por_cnpj(
         if codigos_unicos['qual_rep']:
             qual_rep_list = list(codigos_unicos['qual_rep'])
             if len(qual_rep_list) == 1:
-                qual_rep_rows = client.execute(
+                qual_rep_rows = await execute_limited(request, "cnpj",
                     "SELECT codigo, descricao FROM qualificacoes WHERE codigo = %(codigo)s",
                     {"codigo": qual_rep_list[0]}
                 )
             else:
                 conditions = " OR ".join([f"codigo = %(codigo{i})s" for i in range(len(qual_rep_list))])
                 params = {f"codigo{i}": qual_rep_list[i] for i in range(len(qual_rep_list))}
-                qual_rep_rows = client.execute(
+                qual_rep_rows = await execute_limited(request, "cnpj",
                     f"SELECT codigo, descricao FROM qualificacoes WHERE {conditions}",
                     params
                 )
@@ -354,26 +360,19 @@ async def buscar_por_cnpj(
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
 
-@router.get("/search", response_model=SearchResponse)
-async def search_companies(
-    q: Optional[str] = Query(None, description="Busca textual"),
-    cnpj: Optional[str] = Query(None, description="CNPJ completo"),
-    uf: Optional[str] = Query(None, description="UF"),
-    municipio: Optional[str] = Query(None, description="Código município"),
-    cnae_fiscal: Optional[str] = Query(None, description="CNAE fiscal"),
-    situacao_cadastral: Optional[str] = Query(None, description="Situação cadastral"),
-    matriz_filial: Optional[str] = Query(None, description="1=Matriz, 2=Filial"),
-    page: int = Query(1, ge=1),
-    page_size: int = Query(100, ge=1, le=1000),
-    current_user: dict = Depends(auth.get_current_user)
-):
+def build_search_filters(
+    q: Optional[str] = None,
+    cnpj: Optional[str] = None,
+    uf: Optional[str] = None,
+    municipio: Optional[str] = None,
+    cnae_fiscal: Optional[str] = None,
+    situacao_cadastral: Optional[str] = None,
+    matriz_filial: Optional[str] = None,
+) -> Tuple[str, dict]:
     """
-    Busca empresas com múltiplos filtros.
-    Todos os filtros são indexados para performance máxima.
+    Monta o WHERE (e os parâmetros normalizados) de /companies/search.
+    Usado também pela suíte de regressão de planos (test_query_plans.py).
     """
-    client = get_clickhouse_client()
-    
-    # Construir WHERE clause
     where_conditions = []
     params = {}
     
@@ -409,13 +408,75 @@ async def search_companies(
         params["q"] = q
     
     where_clause = " AND ".join(where_conditions) if where_conditions else "1"
+    return where_clause, params
+
+
+def build_cnae_filter(cnae_clean: str, cnae_sec: bool) -> Tuple[str, dict]:
+    """Monta o WHERE (e os parâmetros) de /companies/cnae/{cnae}"""
+    params = {"cnae": cnae_clean}
+
+    if cnae_sec:
+        where_clause = """
+            (
+                cnae_fiscal = %(cnae)s
+                OR cnae_fiscal_secundaria = %(cnae)s
+                OR like(cnae_fiscal_secundaria, concat(%(cnae)s, ',%'))
+                OR like(cnae_fiscal_secundaria, concat('%,', %(cnae)s, ',%'))
+                OR like(cnae_fiscal_secundaria, concat('%,', %(cnae)s))
+            )
+        """
+    else:
+        where_clause = "cnae_fiscal = %(cnae)s"
+    return where_clause, params
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search_companies(
+    request: Request,
+    q: Optional[str] = Query(None, description="Busca textual"),
+    cnpj: Optional[str] = Query(None, description="CNPJ completo"),
+    uf: Optional[str] = Query(None, description="UF"),
+    municipio: Optional[str] = Query(None, description="Código município"),
+    cnae_fiscal: Optional[str] = Query(None, description="CNAE fiscal"),
+    situacao_cadastral: Optional[str] = Query(None, description="Situação cadastral"),
+    matriz_filial: Optional[str] = Query(None, description="1=Matriz, 2=Filial"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(100, ge=1, le=1000),
+    current_user: dict = Depends(auth.get_current_user)
+):
+    """
+    Busca empresas com múltiplos filtros.
+    Todos os filtros são indexados para performance máxima.
+    """
+    client = get_clickhouse_client()
+
+    # Construir WHERE clause
+    where_clause, params = build_search_filters(
+        q=q,
+        cnpj=cnpj,
+        uf=uf,
+        municipio=municipio,
+        cnae_fiscal=cnae_fiscal,
+        situacao_cadastral=situacao_cadastral,
+        matriz_filial=matriz_filial,
+    )
     
+    # Cache compartilhado entre workers (filtros normalizados + paginação + release)
+    cache = get_search_cache()
+    cache_key = None
+    if cache is not None:
+        release = get_current_release(client)
+        cache_key = cache.build_key("search", params, page, page_size, release)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
     # Calcular offset
     offset = (page - 1) * page_size
     
     # Query de contagem
     count_query = f"SELECT count() FROM estabelecimentos WHERE {where_clause}"
-    total = client.execute(count_query, params)[0][0]
+    total = (await execute_limited(request, "search", count_query, params))[0][0]
     
     # Query de dados
     data_query = f"""
@@ -435,7 +496,7 @@ async def search_companies(
     params["limit"] = page_size
     params["offset"] = offset
     
-    rows = client.execute(data_query, params)
+    rows = await execute_limited(request, "search", data_query, params)
     
     results = []
     for row in rows:
@@ -475,18 +536,22 @@ async def search_companies(
     
     total_pages = (total + page_size - 1) // page_size
     
-    return SearchResponse(
+    response = SearchResponse(
         total=total,
         page=page,
         page_size=page_size,
         total_pages=total_pages,
         results=results
     )
+    if cache_key is not None:
+        cache.set(cache_key, release, response.model_dump())
+    return response
 
 
 @router.get("/cnae/{cnae}", response_model=SearchResponse)
 async def search_by_cnae(
     cnae: str,
+    request: Request,
     cnae_sec: bool = Query(
         False,
         description="Se true, busca também em CNAEs secundários (cnae_fiscal_secundaria)",
@@ -509,27 +574,24 @@ async def search_by_cnae(
     client = get_clickhouse_client()
 
     try:
-        params = {"cnae": cnae_clean}
-
-        if cnae_sec:
-            where_clause = """
-                (
-                    cnae_fiscal = %(cnae)s
-                    OR cnae_fiscal_secundaria = %(cnae)s
-                    OR like(cnae_fiscal_secundaria, concat(%(cnae)s, ',%'))
-                    OR like(cnae_fiscal_secundaria, concat('%,', %(cnae)s, ',%'))
-                    OR like(cnae_fiscal_secundaria, concat('%,', %(cnae)s))
-                )
-            """
-        else:
-            where_clause = "cnae_fiscal = %(cnae)s"
+        where_clause, params = build_cnae_filter(cnae_clean, cnae_sec)
+
+        # Cache compartilhado entre workers (filtros normalizados + paginação + release)
+        cache = get_search_cache()
+        cache_key = None
+        if cache is not None:
+            release = get_current_release(client)
+            cache_key = cache.build_key("cnae", {"cnae": cnae_clean, "cnae_sec": cnae_sec}, page, page_size, release)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
 
         # Paginação
         offset = (page - 1) * page_size
 
         # Contagem total (número de estabelecimentos / empresas para esse CNAE)
         count_query = f"SELECT count() FROM estabelecimentos WHERE {where_clause}"
-        total = client.execute(count_query, params)[0][0]
+        total = (await execute_limited(request, "cnae", count_query, params))[0][0]
 
         # Dados paginados (mesma seleção de campos do /companies/search)
         data_query = f"""
@@ -549,7 +611,7 @@ async def search_by_cnae(
         params["limit"] = page_size
         params["offset"] = offset
 
-        rows = client.execute(data_query, params)
+        rows = await execute_limited(request, "cnae", data_query, params)
 
         results = []
         for row in rows:
@@ -591,13 +653,16 @@ async def search_by_cnae(
 
         total_pages = (total + page_size - 1) // page_size
 
-        return SearchResponse(
+        response = SearchResponse(
             total=total,
             page=page,
             page_size=page_size,
             total_pages=total_pages,
             results=results,
         )
+        if cache_key is not None:
+            cache.set(cache_key, release, response.model_dump())
+        return response
 
     except HTTPException:
         raise
@@ -605,3 +670,100 @@ async def search_by_cnae(
         logger.error(f"Erro ao buscar empresas por CNAE {cnae_clean}: {e}")
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
+
+TABELAS_MUDANCAS = ("empresas", "estabelecimentos", "socios", "simples")
+TIPOS_MUDANCA = ("insercao", "alteracao", "remocao")
+
+
+def encode_changes_cursor(release: str, tabela: str, chave: str) -> str:
+    """Cursor opaco de /companies/changes: posição (release, tabela, chave) do último item"""
+    return base64.urlsafe_b64encode(json.dumps([release, tabela, chave]).encode()).decode().rstrip("=")
+
+
+def decode_changes_cursor(cursor: str) -> Tuple[str, str, str]:
+    try:
+        release, tabela, chave = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(release), str(tabela), str(chave)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+@router.get("/changes", response_model=MudancasResponse)
+async def list_changes(
+    request: Request,
+    since: str = Query(..., description="Última release já sincronizada (AAAA_MM); retorna as mudanças das releases seguintes"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    tabela: Optional[str] = Query(None, description="empresas, estabelecimentos, socios ou simples"),
+    tipo: Optional[str] = Query(None, description="insercao, alteracao ou remocao"),
+    page_size: int = Query(1000, ge=1, le=10000),
+    current_user: dict = Depends(auth.get_current_user),
+):
+    """
+    Feed de mudanças entre releases (diff linha a linha calculado na importação).
+
+    Retorna inserções, alterações e remoções por chave (CNPJ, CNPJ básico ou
+    sócio) das releases ativadas depois de `since`, em ordem de
+    (release, tabela, chave). Paginação por cursor: repita a chamada com o
+    `next_cursor` recebido até ele vir nulo.
+    """
+    if not re.fullmatch(r"\d{4}_\d{2}", since):
+        raise HTTPException(status_code=400, detail="since deve estar no formato AAAA_MM (ex.: 2026_09)")
+    if tabela is not None and tabela not in TABELAS_MUDANCAS:
+        raise HTTPException(status_code=400, detail=f"tabela deve ser uma de: {', '.join(TABELAS_MUDANCAS)}")
+    if tipo is not None and tipo not in TIPOS_MUDANCA:
+        raise HTTPException(status_code=400, detail=f"tipo deve ser um de: {', '.join(TIPOS_MUDANCA)}")
+
+    # Só releases já ativadas (uma carga abortada antes da troca não aparece)
+    where_conditions = ["release > %(since)s", "release IN (SELECT release FROM releases)"]
+    params = {"since": since, "limit": page_size + 1}
+    if tabela:
+        where_conditions.append("tabela = %(tabela)s")
+        params["tabela"] = tabela
+    if tipo:
+        where_conditions.append("tipo = %(tipo)s")
+        params["tipo"] = tipo
+    if cursor:
+        # Keyset na ordem da chave primária: (release, tabela, chave) > cursor
+        params["c_release"], params["c_tabela"], params["c_chave"] = decode_changes_cursor(cursor)
+        where_conditions.append(
+            "(release > %(c_release)s OR (release = %(c_release)s AND "
+            "(tabela > %(c_tabela)s OR (tabela = %(c_tabela)s AND chave > %(c_chave)s))))"
+        )
+
+    query = f"""
+        SELECT release, tabela, chave, cnpj_basico, toString(tipo)
+        FROM changes
+        WHERE {" AND ".join(where_conditions)}
+        ORDER BY release, tabela, chave
+        LIMIT %(limit)s
+    """
+    try:
+        rows = await execute_limited(request, "changes", query, params)
+    except HTTPException:
+        raise
+    except ServerException as e:
+        if e.code != ErrorCodes.UNKNOWN_TABLE:
+            logger.error(f"Erro ao listar mudanças desde {since}: {e}")
+            raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+        # Nenhuma release comparada ainda (tabela changes/releases não criada)
+        rows = []
+    except Exception as e:
+        logger.error(f"Erro ao listar mudanças desde {since}: {e}")
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+    results = [
+        Mudanca(
+            release=to_str(row[0]),
+            tabela=to_str(row[1]),
+            chave=to_str(row[2]),
+            cnpj_basico=to_str(row[3]),
+            tipo=to_str(row[4]),
+        )
+        for row in rows[:page_size]
+    ]
+    next_cursor = None
+    if len(rows) > page_size:
+        ultimo = results[-1]
+        next_cursor = encode_changes_cursor(ultimo.release, ultimo.tabela, ultimo.chave)
+
+    return MudancasResponse(since=since, page_size=page_size, next_cursor=next_cursor, results=results)
@@ -308,6 +308,24 @@ class SearchResponse(BaseModel):
     results: List[Estabelecimento]
 
 
+# =================================================================================
+# Schemas do Feed de Mudanças
+# =================================================================================
+class Mudanca(BaseModel):
+    release: str
+    tabela: str  # empresas, estabelecimentos, socios ou simples
+    chave: str  # cnpj, cnpj_basico ou cnpj_basico|identificador|documento|nome (sócios)
+    cnpj_basico: str
+    tipo: str  # insercao, alteracao ou remocao
+
+
+class MudancasResponse(BaseModel):
+    since: str
+    page_size: int
+    next_cursor: Optional[str] = None  # None = não há mais mudanças
+    results: List[Mudanca]
+
+
 # =================================================================================
 # Schemas de Tabelas de Domínio
 # =================================================================================
@@ -0,0 +1,318 @@
+"""
+Benchmark de carga HTTP da API v2 (reprodutível entre commits).
+
+Sobe a API (uvicorn, mesmos workers de produção) apontando para um banco
+ClickHouse local com dados sintéticos (sintetico.py) e dispara cargas com
+concorrência fixa. Cada carga tem aquecimento descartado e sequência de
+requisições determinística (semente fixa), e o resultado sai em JSON com
+p50/p95/p99, vazão e erros, junto com o commit e a configuração usada, para
+comparar execuções de commits diferentes.
+
+Uso (na pasta v2/backend, com o ClickHouse local rodando):
+    python benchmark_api.py                          # todas as cargas
+    python benchmark_api.py -w cnpj -w search -c 32 -n 5000
+    python benchmark_api.py -o resultado.json --compare base.json
+
+Cargas disponíveis: cnpj, search, deep_pages, cnae_sec
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from sintetico import carregar_dados_sinteticos, conectar, total_estabelecimentos
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# Cada carga devolve (caminho, parâmetros) a partir das amostras e de um gerador aleatório
+Requisicao = Tuple[str, Dict[str, object]]
+
+
+def carga_cnpj(rng: random.Random, amostras: List[Dict]) -> Requisicao:
+    """Consulta completa por CNPJ (estabelecimento + empresa + sócios + simples)"""
+    return f"/companies/cnpj/{rng.choice(amostras)['cnpj']}", {}
+
+
+def carga_search(rng: random.Random, amostras: List[Dict]) -> Requisicao:
+    """Busca com filtros variados (primeira página)"""
+    amostra = rng.choice(amostras)
+    filtros = rng.choice([
+        ("uf",),
+        ("uf", "municipio"),
+        ("municipio",),
+        ("uf", "cnae_fiscal"),
+        ("uf", "situacao_cadastral"),
+        ("uf", "municipio", "matriz_filial"),
+    ])
+    return "/companies/search", {f: amostra[f] for f in filtros}
+
+
+def carga_deep_pages(rng: random.Random, amostras: List[Dict]) -> Requisicao:
+    """Paginação profunda (OFFSET alto) em uma busca por UF"""
+    return "/companies/search", {"uf": rng.choice(amostras)["uf"], "page": rng.randint(50, 500), "page_size": 100}
+
+
+def carga_cnae_sec(rng: random.Random, amostras: List[Dict]) -> Requisicao:
+    """Busca por CNAE incluindo CNAEs secundários"""
+    return f"/companies/cnae/{rng.choice(amostras)['cnae_fiscal']}", {"cnae_sec": "true"}
+
+
+CARGAS: Dict[str, Callable[[random.Random, List[Dict]], Requisicao]] = {
+    "cnpj": carga_cnpj,
+    "search": carga_search,
+    "deep_pages": carga_deep_pages,
+    "cnae_sec": carga_cnae_sec,
+}
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por posição (nearest-rank) sobre a lista ordenada"""
+    if not valores:
+        return 0.0
+    indice = max(0, min(len(valores) - 1, math.ceil(p / 100 * len(valores)) - 1))
+    return valores[indice]
+
+
+def carregar_amostras(client, quantidade: int = 2000) -> List[Dict]:
+    """Valores reais de filtro (ordem determinística) para montar as requisições"""
+    linhas = client.execute(
+        "SELECT cnpj, uf, municipio, cnae_fiscal, situacao_cadastral, matriz_filial "
+        "FROM estabelecimentos ORDER BY cityHash64(cnpj) LIMIT %(quantidade)s",
+        {"quantidade": quantidade},
+    )
+    colunas = ["cnpj", "uf", "municipio", "cnae_fiscal", "situacao_cadastral", "matriz_filial"]
+    return [dict(zip(colunas, linha)) for linha in linhas]
+
+
+def versao_git() -> Dict[str, object]:
+    """Commit atual e se há alterações não commitadas"""
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BASE_DIR, text=True).strip()
+        sujo = bool(subprocess.check_output(["git", "status", "--porcelain"], cwd=BASE_DIR, text=True).strip())
+        return {"commit": commit, "dirty": sujo}
+    except Exception:
+        return {"commit": None, "dirty": None}
+
+
+def iniciar_api(database: str, porta: int, workers: int, cache: bool) -> subprocess.Popen:
+    """Sobe o uvicorn em subprocesso apontando para o banco de benchmark"""
+    env = dict(os.environ)
+    env["CLICKHOUSE_DATABASE"] = database
+    env["SEARCH_CACHE_ENABLED"] = "true" if cache else "false"
+    comando = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(porta),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(comando, cwd=BASE_DIR, env=env)
+
+
+def aguardar_api(base_url: str, timeout: float = 60) -> None:
+    """Espera o /health responder 200"""
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            if httpx.get(f"{base_url}/health", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"API não respondeu em {timeout:.0f}s ({base_url}/health)")
+
+
+def obter_token(base_url: str, usuario: str, senha: str) -> str:
+    """Token JWT via /auth/token (HTTP Basic)"""
+    resposta = httpx.post(f"{base_url}/auth/token", auth=(usuario, senha), timeout=10)
+    resposta.raise_for_status()
+    return resposta.json()["access_token"]
+
+
+async def executar_carga(
+    base_url: str,
+    token: str,
+    requisicoes: List[Requisicao],
+    concorrencia: int,
+    timeout: float,
+) -> Dict[str, object]:
+    """Dispara as requisições com `concorrencia` clientes simultâneos e mede cada uma"""
+    latencias: List[float] = []
+    erros: Dict[str, int] = {}
+    proxima = iter(requisicoes)
+
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={"Authorization": f"Bearer {token}"},
+        limits=limites,
+        timeout=timeout,
+    ) as client:
+
+        async def trabalhador():
+            for caminho, params in proxima:
+                inicio = time.perf_counter()
+                try:
+                    resposta = await client.get(caminho, params=params)
+                    if resposta.status_code != 200:
+                        chave = str(resposta.status_code)
+                        erros[chave] = erros.get(chave, 0) + 1
+                except httpx.HTTPError as e:
+                    chave = type(e).__name__
+                    erros[chave] = erros.get(chave, 0) + 1
+                latencias.append((time.perf_counter() - inicio) * 1000)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+        duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    total_erros = sum(erros.values())
+    return {
+        "requests": len(latencias),
+        "errors": total_erros,
+        "errors_by_type": erros,
+        "duration_s": round(duracao, 3),
+        "throughput_rps": round(len(latencias) / duracao, 2) if duracao else 0.0,
+        "latency_ms": {
+            "p50": round(percentil(latencias, 50), 2),
+            "p95": round(percentil(latencias, 95), 2),
+            "p99": round(percentil(latencias, 99), 2),
+            "mean": round(sum(latencias) / len(latencias), 2) if latencias else 0.0,
+            "max": round(latencias[-1], 2) if latencias else 0.0,
+        },
+    }
+
+
+def gerar_requisicoes(nome: str, quantidade: int, semente: int, amostras: List[Dict]) -> List[Requisicao]:
+    """Sequência determinística de requisições (mesma semente = mesmas requisições)"""
+    rng = random.Random(f"{semente}:{nome}")
+    return [CARGAS[nome](rng, amostras) for _ in range(quantidade)]
+
+
+def comparar(atual: Dict, base: Dict) -> None:
+    """Mostra a variação de latência e vazão em relação a um resultado anterior"""
+    print(f"\nComparação com {base.get('git', {}).get('commit') or 'resultado anterior'}:", file=sys.stderr)
+    for nome, resultado in atual["workloads"].items():
+        anterior = base.get("workloads", {}).get(nome)
+        if not anterior:
+            continue
+        partes = []
+        for p in ("p50", "p95", "p99"):
+            antes, depois = anterior["latency_ms"][p], resultado["latency_ms"][p]
+            variacao = (depois - antes) / antes * 100 if antes else 0.0
+            partes.append(f"{p} {antes:.1f}→{depois:.1f}ms ({variacao:+.1f}%)")
+        antes, depois = anterior["throughput_rps"], resultado["throughput_rps"]
+        variacao = (depois - antes) / antes * 100 if antes else 0.0
+        partes.append(f"vazão {antes:.0f}→{depois:.0f} req/s ({variacao:+.1f}%)")
+        print(f"  {nome}: " + ", ".join(partes), file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de carga HTTP da API v2")
+    parser.add_argument("-w", "--workload", action="append", choices=sorted(CARGAS),
+                        help="carga a executar (repetível; padrão: todas)")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="clientes simultâneos (padrão: 16)")
+    parser.add_argument("-n", "--requests", type=int, default=2000, help="requisições medidas por carga (padrão: 2000)")
+    parser.add_argument("--warmup", type=int, default=200, help="requisições de aquecimento descartadas (padrão: 200)")
+    parser.add_argument("--seed", type=int, default=42, help="semente das sequências de requisições")
+    parser.add_argument("--timeout", type=float, default=60.0, help="timeout por requisição em segundos")
+    parser.add_argument("--database", default=os.getenv("BENCHMARK_DATABASE", "cnpj_benchmark"),
+                        help="banco ClickHouse com os dados sintéticos")
+    parser.add_argument("--rows", type=int, default=2_000_000, help="estabelecimentos sintéticos (padrão: 2000000)")
+    parser.add_argument("--reload", action="store_true", help="recarregar os dados sintéticos")
+    parser.add_argument("--port", type=int, default=8099, help="porta da API iniciada pelo benchmark")
+    parser.add_argument("--workers", type=int, default=4, help="workers do uvicorn (padrão: 4, como em produção)")
+    parser.add_argument("--cache", action="store_true", help="manter o cache de buscas ligado (padrão: desligado)")
+    parser.add_argument("--base-url", help="usar uma API já em execução em vez de iniciar uma")
+    parser.add_argument("--user", default="admin")
+    parser.add_argument("--password", default="secret")
+    parser.add_argument("-o", "--output", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args(argv)
+
+    cargas = args.workload or list(CARGAS)
+
+    client = conectar(args.database)
+    if args.reload or total_estabelecimentos(client) != args.rows:
+        print(f"Carregando {args.rows:,} estabelecimentos sintéticos em {args.database}...", file=sys.stderr)
+        carregar_dados_sinteticos(client, args.rows)
+    amostras = carregar_amostras(client)
+    versao_clickhouse = client.execute("SELECT version()")[0][0]
+    client.disconnect()
+
+    processo = None
+    base_url = args.base_url
+    if base_url is None:
+        base_url = f"http://127.0.0.1:{args.port}"
+        processo = iniciar_api(args.database, args.port, args.workers, args.cache)
+
+    try:
+        aguardar_api(base_url)
+        token = obter_token(base_url, args.user, args.password)
+
+        resultados = {}
+        for nome in cargas:
+            print(f"Executando carga '{nome}' ({args.requests} req, concorrência {args.concurrency})...", file=sys.stderr)
+            if args.warmup:
+                aquecimento = gerar_requisicoes(f"{nome}:warmup", args.warmup, args.seed, amostras)
+                asyncio.run(executar_carga(base_url, token, aquecimento, args.concurrency, args.timeout))
+            requisicoes = gerar_requisicoes(nome, args.requests, args.seed, amostras)
+            resultados[nome] = asyncio.run(
+                executar_carga(base_url, token, requisicoes, args.concurrency, args.timeout)
+            )
+    finally:
+        if processo is not None:
+            processo.terminate()
+            try:
+                processo.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                processo.kill()
+
+    relatorio = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git": versao_git(),
+        "config": {
+            "workloads": cargas,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "rows": args.rows,
+            "workers": args.workers,
+            "cache": args.cache,
+            "base_url": args.base_url,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "clickhouse": versao_clickhouse,
+        },
+        "workloads": resultados,
+    }
+
+    saida = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(saida + "\n", encoding="utf-8")
+        print(f"Resultado salvo em {args.output}", file=sys.stderr)
+    else:
+        print(saida)
+
+    if args.compare:
+        comparar(relatorio, json.loads(Path(args.compare).read_text(encoding="utf-8")))
+
+    return 1 if any(r["errors"] for r in resultados.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Carga de dados sintéticos no ClickHouse para testes de plano e benchmarks da API.
+
+Cria as tabelas a partir de clickhouse/schema.sql em um banco separado e gera
+os estabelecimentos direto no servidor (INSERT ... SELECT FROM numbers()), com
+distribuição parecida com a real: UF/município correlacionados, algumas
+centenas de CNAEs, CNAEs secundários em lista separada por vírgula e
+data_inicio espalhada por 12 meses (12 partições).
+"""
+import os
+import re
+from pathlib import Path
+from typing import List
+
+from clickhouse_driver import Client
+
+SCHEMA_FILE = Path(__file__).resolve().parents[1] / "clickhouse" / "schema.sql"
+
+UFS = [
+    "AC", "AL", "AM", "AP", "BA", "CE", "DF", "ES", "GO", "MA", "MG", "MS", "MT", "PA",
+    "PB", "PE", "PI", "PR", "RJ", "RN", "RO", "RR", "RS", "SC", "SE", "SP", "TO",
+]
+NUM_CNAES = 1300
+
+
+def conectar(database: str) -> Client:
+    """Conecta ao ClickHouse local (variáveis CLICKHOUSE_*) criando o banco de teste"""
+    kwargs = {
+        "host": os.getenv("CLICKHOUSE_HOST", "localhost"),
+        "port": int(os.getenv("CLICKHOUSE_PORT", "9000")),
+        "user": os.getenv("CLICKHOUSE_USER", "default"),
+        "password": os.getenv("CLICKHOUSE_PASSWORD", ""),
+        "connect_timeout": 10,
+    }
+    Client(**kwargs).execute(f"CREATE DATABASE IF NOT EXISTS {database}")
+    return Client(database=database, **kwargs)
+
+
+def statements_schema(schema_file: Path = SCHEMA_FILE) -> List[str]:
+    """Lê o schema.sql e devolve os statements (sem comentários, CREATE DATABASE e USE)"""
+    sql = re.sub(r"--[^\n]*", "", schema_file.read_text(encoding="utf-8"))
+    statements = []
+    for statement in sql.split(";"):
+        statement = statement.strip()
+        if not statement:
+            continue
+        if re.match(r"(CREATE\s+DATABASE|USE)\b", statement, re.IGNORECASE):
+            continue
+        statements.append(statement)
+    return statements
+
+
+def recriar_tabelas(client: Client, schema_file: Path = SCHEMA_FILE) -> None:
+    """Remove e recria as tabelas do schema no banco conectado"""
+    for statement in statements_schema(schema_file):
+        match = re.match(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", statement, re.IGNORECASE)
+        if match:
+            client.execute(f"DROP TABLE IF EXISTS {match.group(1)}")
+        client.execute(statement)
+
+
+def total_estabelecimentos(client: Client) -> int:
+    """Quantidade de estabelecimentos carregados (0 se a tabela não existe)"""
+    try:
+        return client.execute("SELECT count() FROM estabelecimentos")[0][0]
+    except Exception:
+        return 0
+
+
+def carregar_dados_sinteticos(client: Client, linhas: int = 2_000_000) -> None:
+    """
+    Recria o schema e carrega `linhas` estabelecimentos sintéticos, com a empresa,
+    os sócios e o simples de cada CNPJ básico e as tabelas de domínio usadas na API.
+    """
+    recriar_tabelas(client)
+
+    ufs = "[" + ", ".join(f"'{uf}'" for uf in UFS) + "]"
+    # cityHash64(number, k): semente k diferente por coluna, mesma carga em toda execução
+    cnae_expr = f"leftPad(toString(1111111 + (cityHash64(number, 3) % {NUM_CNAES}) * 6000), 7, '0')"
+    cnae_sec_expr = (
+        "arrayStringConcat(arrayMap(i -> leftPad(toString(1111111 + "
+        f"(cityHash64(number, 10 + i) % {NUM_CNAES}) * 6000), 7, '0'), range(cityHash64(number, 4) % 4)), ',')"
+    )
+
+    client.execute(f"""
+        INSERT INTO estabelecimentos
+        SELECT
+            leftPad(toString(number), 8, '0') AS cnpj_basico,
+            '0001' AS cnpj_ordem,
+            leftPad(toString(number % 97), 2, '0') AS cnpj_dv,
+            concat(cnpj_basico, cnpj_ordem, cnpj_dv) AS cnpj,
+            if(cityHash64(number, 5) % 10 < 8, '1', '2') AS matriz_filial,
+            concat('EMPRESA ', ['ALFA', 'BETA', 'GAMA', 'DELTA', 'SOLUCOES', 'COMERCIO'][1 + cityHash64(number, 6) % 6],
+                   ' ', toString(number)) AS nome_fantasia,
+            ['01', '02', '03', '04', '08'][1 + cityHash64(number, 7) % 5] AS situacao_cadastral,
+            toDate('2020-01-01') + cityHash64(number, 8) % 1500 AS data_situacao,
+            '00' AS motivo_situacao,
+            '' AS cidade_exterior,
+            '105' AS pais,
+            toDate('2023-01-01') + cityHash64(number, 9) % 365 AS data_inicio,
+            {cnae_expr} AS cnae_fiscal,
+            {cnae_sec_expr} AS cnae_fiscal_secundaria,
+            'RUA' AS tipo_logradouro,
+            concat('LOGRADOURO ', toString(number % 5000)) AS logradouro,
+            toString(number % 2000) AS numero,
+            '' AS complemento,
+            'CENTRO' AS bairro,
+            leftPad(toString(number % 99999999), 8, '0') AS cep,
+            {ufs}[1 + cityHash64(number, 1) % {len(UFS)}] AS uf,
+            leftPad(toString((cityHash64(number, 1) % {len(UFS)}) * 200 + cityHash64(number, 2) % 200), 4, '0') AS municipio,
+            '11' AS ddd_1,
+            toString(30000000 + number % 60000000) AS telefone_1,
+            '' AS ddd_2, '' AS telefone_2, '' AS ddd_fax, '' AS fax,
+            concat('contato', toString(number), '@exemplo.com.br') AS email,
+            '' AS situacao_especial,
+            toDate('1970-01-01') AS data_situacao_especial
+        FROM numbers({int(linhas)})
+    """, settings={"max_partitions_per_insert_block": 1000})
+
+    # Empresa, sócios e simples para cada CNPJ básico (consulta completa por CNPJ)
+    client.execute(f"""
+        INSERT INTO empresas
+        SELECT
+            leftPad(toString(number), 8, '0'),
+            concat('EMPRESA SINTETICA ', toString(number), ' LTDA'),
+            ['2062', '2135', '2305', '2240'][1 + cityHash64(number, 20) % 4],
+            '49',
+            (cityHash64(number, 21) % 1000000) * 100,
+            ['01', '03', '05'][1 + cityHash64(number, 22) % 3],
+            ''
+        FROM numbers({int(linhas)})
+    """)
+    client.execute(f"""
+        INSERT INTO socios
+        SELECT
+            leftPad(toString(intDiv(number, 3)), 8, '0'),
+            '2',
+            concat('SOCIO ', toString(number)),
+            concat('***', leftPad(toString(number % 1000000), 6, '0'), '**'),
+            '49',
+            toDate('2015-01-01') + cityHash64(number, 23) % 3000,
+            '105',
+            '', '', '00',
+            toString(1 + cityHash64(number, 24) % 9)
+        FROM numbers({int(linhas)} * 3)
+        WHERE cityHash64(number, 25) % 3 = 0
+    """)
+    client.execute(f"""
+        INSERT INTO simples
+        SELECT
+            leftPad(toString(number), 8, '0'),
+            'S', toDate('2018-01-01') + cityHash64(number, 26) % 1500, toDate('1970-01-01'),
+            if(cityHash64(number, 27) % 2 = 0, 'S', 'N'), toDate('2019-01-01'), toDate('1970-01-01')
+        FROM numbers({int(linhas)})
+        WHERE cityHash64(number, 28) % 10 < 3
+    """)
+
+    client.execute(f"""
+        INSERT INTO municipios
+        SELECT leftPad(toString(number), 4, '0'), concat('MUNICIPIO ', toString(number))
+        FROM numbers({len(UFS) * 200})
+    """)
+
+    client.execute(f"""
+        INSERT INTO cnaes
+        SELECT leftPad(toString(1111111 + number * 6000), 7, '0'), concat('ATIVIDADE ', toString(number))
+        FROM numbers({NUM_CNAES})
+    """)
+
+    # Uma parte por partição, como em produção depois do OPTIMIZE
+    client.execute("OPTIMIZE TABLE estabelecimentos FINAL")
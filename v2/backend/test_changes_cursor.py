@@ -0,0 +1,169 @@
+"""
+Testes da paginação por cursor de /companies/changes.
+
+Confere que o cursor opaco volta exatamente a (release, tabela, chave), que
+um cursor inválido vira 400 e que percorrer o feed página a página com o
+next_cursor devolve todas as mudanças das releases ativadas, na ordem e sem
+repetir nem pular nenhuma. A query da rota roda sobre uma tabela `changes`
+pequena no chdb (se instalado) ou no ClickHouse local (variáveis CLICKHOUSE_*).
+
+Uso (na pasta v2/backend):
+    python test_changes_cursor.py
+"""
+import asyncio
+import json
+import re
+import sys
+import tempfile
+
+from fastapi import HTTPException
+
+from app.routes import companies
+from app.routes.companies import decode_changes_cursor, encode_changes_cursor, list_changes
+
+DATABASE = "cnpj_teste_cursor"
+
+# Releases ativadas (em `releases`) e uma carga abortada antes da troca
+ATIVADAS = ["2026_08", "2026_09", "2026_10"]
+ABORTADA = "2026_11"
+
+
+def _literal(valor) -> str:
+    if isinstance(valor, int):
+        return str(valor)
+    return "'" + str(valor).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def _executor(pasta: str):
+    """Função que roda SQL (com parâmetros %(nome)s) e devolve linhas: chdb ou ClickHouse local"""
+    try:
+        from chdb import session
+
+        sessao = session.Session(pasta)
+        sessao.query(f"CREATE DATABASE IF NOT EXISTS {DATABASE} ENGINE = Atomic")
+        sessao.query(f"USE {DATABASE}")
+
+        def executar(sql: str, params=None):
+            if params:
+                sql = re.sub(r"%\((\w+)\)s", lambda m: _literal(params[m.group(1)]), sql)
+            resultado = sessao.query(sql, "JSONCompact")
+            texto = resultado.data() if resultado is not None else ""
+            return [tuple(linha) for linha in json.loads(texto)["data"]] if texto.strip() else []
+
+        return executar, "chdb"
+    except ImportError:
+        from sintetico import conectar
+
+        client = conectar(DATABASE)
+        return (lambda sql, params=None: client.execute(sql, params or {})), "clickhouse"
+
+
+def _carregar(executar) -> list:
+    """Preenche `changes` e `releases`; devolve as mudanças visíveis desde 2026_08, em ordem"""
+    for tabela in ("changes", "releases"):
+        executar(f"DROP TABLE IF EXISTS {tabela}")
+    executar(
+        "CREATE TABLE changes ("
+        "release String, anterior String, tabela LowCardinality(String), chave String, "
+        "cnpj_basico FixedString(8), tipo Enum8('insercao' = 1, 'alteracao' = 2, 'remocao' = 3)"
+        ") ENGINE = MergeTree PARTITION BY release ORDER BY (release, tabela, chave)"
+    )
+    executar("CREATE TABLE releases (release String, ativada_em DateTime, anterior String, linhas UInt64) "
+             "ENGINE = MergeTree ORDER BY ativada_em")
+    executar("INSERT INTO releases VALUES " + ", ".join(
+        f"('{release}', now(), 'x', 0)" for release in ATIVADAS
+    ))
+
+    tipos = ["insercao", "alteracao", "remocao"]
+    linhas = []
+    for release in ATIVADAS[1:] + [ABORTADA]:
+        for tabela in ("empresas", "estabelecimentos", "socios"):
+            for i in range(9):
+                basico = f"{i * 7919 % 100000:08d}"
+                if tabela == "estabelecimentos":
+                    chave = f"{basico}0001{i:02d}"
+                elif tabela == "socios":
+                    chave = f"{basico}|2|***{i:06d}**|SOCIO {i}"
+                else:
+                    chave = basico
+                linhas.append((release, tabela, chave, basico, tipos[i % 3]))
+    executar("INSERT INTO changes (release, anterior, tabela, chave, cnpj_basico, tipo) VALUES " + ", ".join(
+        "(" + ", ".join(_literal(v) for v in (release, "x", tabela, chave, basico, tipo)) + ")"
+        for release, tabela, chave, basico, tipo in linhas
+    ))
+    return sorted(linha for linha in linhas if linha[0] != ABORTADA)
+
+
+def _pagina(since: str, cursor, page_size: int):
+    return asyncio.run(list_changes(
+        request=None, since=since, cursor=cursor, tabela=None, tipo=None,
+        page_size=page_size, current_user={},
+    ))
+
+
+def test_cursor_ida_e_volta():
+    for posicao in [
+        ("2026_10", "socios", "00012345|2|***123456**|JOSÉ D'ÁVILA"),
+        ("2026_10", "estabelecimentos", "12345678000195"),
+        ("2026_09", "empresas", ""),
+    ]:
+        cursor = encode_changes_cursor(*posicao)
+        assert "=" not in cursor and "/" not in cursor and "+" not in cursor, cursor
+        assert decode_changes_cursor(cursor) == posicao, (decode_changes_cursor(cursor), posicao)
+
+    for invalido in ["", "nao-e-base64!", encode_changes_cursor("a", "b", "c")[:-3], "WyJhIiwgImIiXQ"]:
+        try:
+            decode_changes_cursor(invalido)
+            raise AssertionError(f"cursor inválido aceito: {invalido!r}")
+        except HTTPException as e:
+            assert e.status_code == 400, e.status_code
+
+
+def test_paginacao_por_cursor():
+    with tempfile.TemporaryDirectory() as tmp:
+        executar, motor = _executor(tmp)
+        print(f"  (motor SQL: {motor})")
+        esperado = _carregar(executar)
+
+        async def execute_limited(request, endpoint, query, params=None):
+            return executar(query, params)
+
+        original = companies.execute_limited
+        companies.execute_limited = execute_limited
+        try:
+            obtido, cursor, paginas = [], None, 0
+            while True:
+                resposta = _pagina("2026_08", cursor, page_size=7)
+                paginas += 1
+                assert len(resposta.results) <= 7
+                obtido += [(m.release, m.tabela, m.chave, m.cnpj_basico, m.tipo) for m in resposta.results]
+                cursor = resposta.next_cursor
+                if cursor is None:
+                    break
+                assert paginas <= len(esperado), "next_cursor não avança"
+
+            assert obtido == esperado, f"{len(obtido)} mudanças paginadas, {len(esperado)} esperadas"
+            assert paginas == -(-len(esperado) // 7), paginas
+
+            # since exclui a própria release e as anteriores
+            resposta = _pagina("2026_09", None, page_size=1000)
+            assert {m.release for m in resposta.results} == {"2026_10"}
+            assert resposta.next_cursor is None
+        finally:
+            companies.execute_limited = original
+
+
+def main() -> int:
+    falhas = 0
+    for teste in [test_cursor_ida_e_volta, test_paginacao_por_cursor]:
+        try:
+            teste()
+            print(f"✓ {teste.__name__}")
+        except AssertionError as e:
+            falhas += 1
+            print(f"✗ {teste.__name__}: {e}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Suíte de regressão de planos de consulta (ClickHouse).
+
+Carrega uma massa sintética (sintetico.py) em um banco separado e roda
+EXPLAIN indexes = 1 para todas as combinações de filtros que /companies/search
+e /companies/cnae/{cnae} conseguem gerar, usando os mesmos montadores de WHERE
+das rotas. A suíte falha se uma mudança de schema ou de query fizer um filtro
+seletivo deixar de usar a chave primária ou o índice de salto esperado, ou
+passar a ler mais grânulos do que o limite (ou seja, virar varredura completa).
+
+Uso (na pasta v2/backend, com o ClickHouse local rodando):
+    python test_query_plans.py
+
+Variáveis de ambiente:
+    PLAN_TEST_DATABASE  banco usado pela suíte (padrão: cnpj_plan_test)
+    PLAN_TEST_ROWS      estabelecimentos sintéticos (padrão: 2000000)
+    PLAN_TEST_RELOAD=1  força recarregar a massa de dados
+"""
+import itertools
+import os
+import re
+import sys
+from typing import Dict, List, Optional
+
+from app.routes.companies import build_cnae_filter, build_search_filters
+from sintetico import carregar_dados_sinteticos, conectar, total_estabelecimentos
+
+DATABASE = os.getenv("PLAN_TEST_DATABASE", "cnpj_plan_test")
+LINHAS = int(os.getenv("PLAN_TEST_ROWS", "2000000"))
+
+# Filtros de /companies/search (todas as 2^7 combinações são testadas)
+FILTROS_BUSCA = ["cnpj", "uf", "municipio", "cnae_fiscal", "situacao_cadastral", "matriz_filial", "q"]
+
+# Filtros sobre colunas do ORDER BY: a condição da chave primária deve citá-los
+COLUNAS_CHAVE_PRIMARIA = {"cnpj", "uf", "municipio", "cnae_fiscal"}
+
+# Filtros que precisam aparecer com um índice de salto (coluna do índice)
+INDICE_SALTO_ESPERADO = {"cnpj": "cnpj", "cnae_fiscal": "cnae_fiscal"}
+
+# Fração máxima de grânulos lidos quando a combinação contém o filtro.
+# Filtros ausentes daqui (situacao_cadastral, matriz_filial, q, e municipio ou
+# cnae_fiscal sem uf, que são a 2ª e a 3ª colunas da chave) são varreduras
+# completas esperadas.
+LIMITE_GRANULOS = {"cnpj": 0.05, "uf": 0.25}
+
+# Nomes das seções de índice no EXPLAIN (variam entre versões do ClickHouse)
+SECOES = {"MinMax": "minmax", "Min-Max": "minmax", "Partition": "partition", "PrimaryKey": "primary_key", "Skip": "skip"}
+
+
+def analisar_plano(linhas: List[str]) -> List[Dict]:
+    """Extrai as seções de índice (tipo, nome, condição, grânulos) da saída do EXPLAIN indexes = 1"""
+    indices = []
+    atual = None
+    dentro = False
+    for linha in linhas:
+        texto = re.sub(r"^[\s│├└─]+", "", linha).strip()
+        if texto == "Indexes:":
+            dentro = True
+            continue
+        if not dentro:
+            continue
+        if texto in SECOES:
+            atual = {"tipo": SECOES[texto], "nome": None, "condicao": None, "granulos": None}
+            indices.append(atual)
+        elif atual is None:
+            continue
+        elif texto.startswith("Name:"):
+            atual["nome"] = texto.split(":", 1)[1].strip()
+        elif texto.startswith("Condition:"):
+            atual["condicao"] = texto.split(":", 1)[1].strip()
+        elif texto.startswith("Granules:"):
+            match = re.match(r"Granules:\s*(\d+)/(\d+)", texto)
+            if match:
+                atual["granulos"] = (int(match.group(1)), int(match.group(2)))
+        elif texto.startswith("Ranges:"):
+            dentro = False
+            atual = None
+    return indices
+
+
+def explicar(client, where_clause: str, params: dict) -> List[Dict]:
+    """Roda o EXPLAIN indexes = 1 do count() que as rotas fazem"""
+    linhas = client.execute(
+        f"EXPLAIN indexes = 1 SELECT count() FROM estabelecimentos WHERE {where_clause}", params
+    )
+    return analisar_plano([linha[0] for linha in linhas])
+
+
+def granulos_lidos(indices: List[Dict]) -> tuple:
+    """(grânulos selecionados após todos os índices, total de grânulos)"""
+    com_granulos = [i["granulos"] for i in indices if i["granulos"]]
+    if not com_granulos:
+        return 0, 0
+    return com_granulos[-1][0], com_granulos[0][1]
+
+
+def indices_de_salto(client) -> Dict[str, str]:
+    """Coluna -> nome do índice de salto em estabelecimentos"""
+    linhas = client.execute(
+        "SELECT expr, name FROM system.data_skipping_indices "
+        "WHERE database = currentDatabase() AND table = 'estabelecimentos'"
+    )
+    return {expr.strip("`"): nome for expr, nome in linhas}
+
+
+def verificar_plano(indices: List[Dict], filtros: List[str], skip_por_coluna: Dict[str, str]) -> List[str]:
+    """Compara o plano com o esperado para os filtros e devolve a lista de problemas"""
+    problemas = []
+    tipos = {i["tipo"] for i in indices}
+    if not filtros and not indices:
+        return problemas  # WHERE 1: o ClickHouse nem faz análise de índices
+
+    if "minmax" not in tipos or "partition" not in tipos:
+        problemas.append("índice de partição ausente do plano (tabela sem PARTITION BY?)")
+    if "primary_key" not in tipos:
+        problemas.append("chave primária ausente do plano")
+
+    condicao_pk = next((i["condicao"] or "" for i in indices if i["tipo"] == "primary_key"), "")
+    for coluna in COLUNAS_CHAVE_PRIMARIA.intersection(filtros):
+        if not re.search(rf"\b{coluna}\b", condicao_pk):
+            problemas.append(f"chave primária não usa {coluna} (condição: {condicao_pk or 'true'})")
+
+    nomes_skip = {i["nome"] for i in indices if i["tipo"] == "skip"}
+    for filtro, coluna in INDICE_SALTO_ESPERADO.items():
+        if filtro not in filtros:
+            continue
+        nome = skip_por_coluna.get(coluna)
+        if nome is None:
+            problemas.append(f"schema sem índice de salto para {coluna}")
+        elif nome not in nomes_skip:
+            problemas.append(f"índice de salto {nome} não usado")
+
+    limites = [LIMITE_GRANULOS[f] for f in filtros if f in LIMITE_GRANULOS]
+    if limites:
+        lidos, total = granulos_lidos(indices)
+        if total == 0:
+            problemas.append("plano sem contagem de grânulos")
+        elif lidos > total * min(limites):
+            problemas.append(f"leu {lidos}/{total} grânulos (limite {min(limites):.0%})")
+    return problemas
+
+
+def valores_de_exemplo(client) -> Dict[str, str]:
+    """Valores reais de filtro tirados de um estabelecimento da massa sintética"""
+    linha = client.execute(
+        "SELECT cnpj, uf, municipio, cnae_fiscal, situacao_cadastral, matriz_filial, nome_fantasia "
+        "FROM estabelecimentos WHERE cnae_fiscal_secundaria != '' LIMIT 1"
+    )[0]
+    return dict(zip(FILTROS_BUSCA, linha))
+
+
+def descrever(filtros) -> str:
+    return "+".join(filtros) if filtros else "(sem filtros)"
+
+
+def verificar_search_combinacoes(client, valores: Dict[str, str], skip_por_coluna: Dict[str, str]) -> List[str]:
+    """Todas as combinações de filtros de /companies/search"""
+    falhas = []
+    for n in range(len(FILTROS_BUSCA) + 1):
+        for filtros in itertools.combinations(FILTROS_BUSCA, n):
+            where_clause, params = build_search_filters(**{f: valores[f] for f in filtros})
+            indices = explicar(client, where_clause, params)
+            problemas = verificar_plano(indices, list(filtros), skip_por_coluna)
+            lidos, total = granulos_lidos(indices)
+            esperado_varredura = not any(f in LIMITE_GRANULOS for f in filtros)
+            nome = f"search {descrever(filtros)}"
+            if problemas:
+                falhas.append(f"{nome}: {'; '.join(problemas)}")
+                print(f"✗ {nome}: {'; '.join(problemas)}")
+            elif esperado_varredura:
+                print(f"~ {nome}: grânulos {lidos}/{total} (varredura completa esperada)")
+            else:
+                print(f"✓ {nome}: grânulos {lidos}/{total}")
+    return falhas
+
+
+def verificar_cnae(client, valores: Dict[str, str], skip_por_coluna: Dict[str, str]) -> List[str]:
+    """/companies/cnae/{cnae} com e sem CNAEs secundários"""
+    falhas = []
+
+    where_clause, params = build_cnae_filter(valores["cnae_fiscal"], cnae_sec=False)
+    indices = explicar(client, where_clause, params)
+    problemas = verificar_plano(indices, ["cnae_fiscal"], skip_por_coluna)
+    lidos, total = granulos_lidos(indices)
+    if problemas:
+        falhas.append(f"cnae: {'; '.join(problemas)}")
+        print(f"✗ cnae: {'; '.join(problemas)}")
+    else:
+        print(f"✓ cnae: grânulos {lidos}/{total}")
+
+    # OR entre cnae_fiscal e os LIKEs da lista secundária: só é podado se as
+    # duas colunas tiverem índice de salto (senão o OR vira varredura sempre)
+    where_clause, params = build_cnae_filter(valores["cnae_fiscal"], cnae_sec=True)
+    indices = explicar(client, where_clause, params)
+    problemas = verificar_plano(indices, [], skip_por_coluna)
+    nomes_skip = {i["nome"] for i in indices if i["tipo"] == "skip"}
+    for coluna in ("cnae_fiscal", "cnae_fiscal_secundaria"):
+        nome = skip_por_coluna.get(coluna)
+        if nome is None:
+            problemas.append(f"schema sem índice de salto para {coluna}")
+        elif nome not in nomes_skip:
+            problemas.append(f"índice de salto {nome} não usado")
+    lidos, total = granulos_lidos(indices)
+    if problemas:
+        falhas.append(f"cnae_sec: {'; '.join(problemas)}")
+        print(f"✗ cnae_sec: {'; '.join(problemas)}")
+    else:
+        print(f"✓ cnae_sec: grânulos {lidos}/{total}")
+    return falhas
+
+
+def preparar_dados(client) -> None:
+    """Carrega a massa sintética se ainda não estiver no banco de teste"""
+    if os.getenv("PLAN_TEST_RELOAD") == "1" or total_estabelecimentos(client) != LINHAS:
+        print(f"Carregando {LINHAS:,} estabelecimentos sintéticos em {DATABASE}...")
+        carregar_dados_sinteticos(client, LINHAS)
+
+
+def main(client: Optional[object] = None) -> int:
+    print("=" * 60)
+    print("REGRESSÃO DE PLANOS DE CONSULTA (EXPLAIN indexes = 1)")
+    print("=" * 60)
+
+    client = client or conectar(DATABASE)
+    preparar_dados(client)
+    valores = valores_de_exemplo(client)
+    skip_por_coluna = indices_de_salto(client)
+
+    falhas = []
+    falhas += verificar_search_combinacoes(client, valores, skip_por_coluna)
+    falhas += verificar_cnae(client, valores, skip_por_coluna)
+
+    print("=" * 60)
+    if falhas:
+        print(f"✗ {len(falhas)} plano(s) fora do esperado")
+        return 1
+    print("✓ Todos os planos usam os índices esperados")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+-- =================================================================================
+-- Schema ClickHouse - Dados CNPJ (Receita Federal)
+-- =================================================================================
+-- Tipos: FixedString(N) para códigos de tamanho fixo, LowCardinality para campos
+-- com poucos valores distintos, UInt64 (centavos) para capital social.
+-- Compressão ZSTD(3) nas colunas de texto e index_granularity = 8192.
+
+CREATE DATABASE IF NOT EXISTS cnpj;
+
+USE cnpj;
+
+-- ---------------------------------------------------------------------------------
+-- Empresas
+-- ---------------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS empresas
+(
+    cnpj_basico FixedString(8),
+    razao_social String CODEC(ZSTD(3)),
+    natureza_juridica FixedString(4),
+    qualificacao_do_responsavel FixedString(2),
+    capital_social UInt64,
+    porte LowCardinality(String),
+    ente_federativo LowCardinality(String)
+)
+ENGINE = MergeTree
+ORDER BY cnpj_basico
+SETTINGS index_granularity = 8192;
+
+-- ---------------------------------------------------------------------------------
+-- Estabelecimentos
+-- ---------------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS estabelecimentos
+(
+    cnpj_basico FixedString(8),
+    cnpj_ordem FixedString(4),
+    cnpj_dv FixedString(2),
+    cnpj FixedString(14),
+    matriz_filial LowCardinality(FixedString(1)),
+    nome_fantasia String CODEC(ZSTD(3)),
+    situacao_cadastral LowCardinality(FixedString(2)),
+    data_situacao Date,
+    motivo_situacao FixedString(2),
+    cidade_exterior String CODEC(ZSTD(3)),
+    pais FixedString(3),
+    data_inicio Date,
+    cnae_fiscal FixedString(7),
+    cnae_fiscal_secundaria String CODEC(ZSTD(3)),
+    tipo_logradouro LowCardinality(String),
+    logradouro String CODEC(ZSTD(3)),
+    numero String CODEC(ZSTD(3)),
+    complemento String CODEC(ZSTD(3)),
+    bairro String CODEC(ZSTD(3)),
+    cep FixedString(8),
+    uf LowCardinality(FixedString(2)),
+    municipio FixedString(4),
+    ddd_1 FixedString(2),
+    telefone_1 String CODEC(ZSTD(3)),
+    ddd_2 FixedString(2),
+    telefone_2 String CODEC(ZSTD(3)),
+    ddd_fax FixedString(2),
+    fax String CODEC(ZSTD(3)),
+    email String CODEC(ZSTD(3)),
+    situacao_especial String CODEC(ZSTD(3)),
+    data_situacao_especial Date,
+
+    -- Índices de salto (skip indexes) para filtros fora do prefixo do ORDER BY
+    INDEX idx_cnpj cnpj TYPE bloom_filter(0.01) GRANULARITY 1,
+    INDEX idx_cnae_fiscal cnae_fiscal TYPE bloom_filter(0.01) GRANULARITY 4,
+    INDEX idx_cnae_secundaria cnae_fiscal_secundaria TYPE tokenbf_v1(32768, 3, 0) GRANULARITY 4
+)
+ENGINE = MergeTree
+PARTITION BY toYYYYMM(data_inicio)
+ORDER BY (uf, municipio, cnae_fiscal, cnpj)
+SETTINGS index_granularity = 8192;
+
+-- ---------------------------------------------------------------------------------
+-- Sócios
+-- ---------------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS socios
+(
+    cnpj_basico FixedString(8),
+    identificador_socio FixedString(1),
+    nome_socio String CODEC(ZSTD(3)),
+    cnpj_cpf_socio String CODEC(ZSTD(3)),
+    qualificacao_socio FixedString(2),
+    data_entrada_sociedade Date,
+    pais FixedString(3),
+    representante_legal FixedString(1),
+    nome_representante String CODEC(ZSTD(3)),
+    qualificacao_representante FixedString(2),
+    faixa_etaria FixedString(1)
+)
+ENGINE = MergeTree
+ORDER BY cnpj_basico
+SETTINGS index_granularity = 8192;
+
+-- ---------------------------------------------------------------------------------
+-- Simples Nacional / MEI
+-- ---------------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS simples
+(
+    cnpj_basico FixedString(8),
+    opcao_simples FixedString(1),
+    data_opcao_simples Date,
+    data_exclusao_simples Date,
+    opcao_mei FixedString(1),
+    data_opcao_mei Date,
+    data_exclusao_mei Date
+)
+ENGINE = MergeTree
+ORDER BY cnpj_basico
+SETTINGS index_granularity = 8192;
+
+-- ---------------------------------------------------------------------------------
+-- Tabelas de domínio
+-- ---------------------------------------------------------------------------------
+CREATE TABLE IF NOT EXISTS cnaes
+(
+    codigo FixedString(7),
+    descricao String
+)
+ENGINE = MergeTree
+ORDER BY codigo;
+
+CREATE TABLE IF NOT EXISTS motivos
+(
+    codigo FixedString(2),
+    descricao String
+)
+ENGINE = MergeTree
+ORDER BY codigo;
+
+CREATE TABLE IF NOT EXISTS municipios
+(
+    codigo FixedString(4),
+    descricao String
+)
+ENGINE = MergeTree
+ORDER BY codigo;
+
+CREATE TABLE IF NOT EXISTS naturezas
+(
+    codigo FixedString(4),
+    descricao String
+)
+ENGINE = MergeTree
+ORDER BY codigo;
+
+CREATE TABLE IF NOT EXISTS paises
+(
+    codigo FixedString(3),
+    descricao String
+)
+ENGINE = MergeTree
+ORDER BY codigo;
+
+CREATE TABLE IF NOT EXISTS qualificacoes
+(
+    codigo FixedString(2),
+    descricao String
+)
+ENGINE = MergeTree
+ORDER BY codigo;
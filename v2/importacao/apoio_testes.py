@@ -0,0 +1,40 @@
+"""
+Apoio comum dos testes da importação (test_*.py): a captura que substitui a
+inserção no ClickHouse e o executor usado pelo main() de cada arquivo.
+
+Os testes rodam como script (python test_x.py) ou com pytest; nos dois
+casos a pasta do arquivo de teste (v2/importacao) entra no sys.path, então
+não é preciso ajustá-lo em cada arquivo.
+"""
+from pathlib import Path
+from typing import Callable, List
+
+import polars as pl
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+class Captura:
+    """Substitui a inserção: guarda os DataFrames que iriam para o ClickHouse"""
+
+    def __init__(self):
+        self.dfs = []
+
+    def serializar(self, tabela: str, df: pl.DataFrame) -> pl.DataFrame:
+        return df
+
+    def enviar(self, df: pl.DataFrame, token=None) -> None:
+        self.dfs.append(df)
+
+
+def executar_testes(testes: List[Callable[[], None]]) -> int:
+    """Roda os testes em ordem, imprime ✓/✗ de cada um e devolve o número de falhas"""
+    falhas = 0
+    for teste in testes:
+        try:
+            teste()
+            print(f"✓ {teste.__name__}")
+        except AssertionError as e:
+            falhas += 1
+            print(f"✗ {teste.__name__}: {e}")
+    return falhas
@@ -0,0 +1,449 @@
+"""
+Benchmark de importação (offline) com a release sintética.
+
+Gera (ou reaproveita) uma release sintética com gerar_dados_sinteticos.py e
+roda as etapas de importação das duas versões contra ela:
+
+- clickhouse: as etapas de process.executar (descompactação, preparação do
+  banco, importação por tabela e verificação contra as linhas contadas na
+  própria importação);
+- clickhouse_zip: as mesmas, lendo os CSVs direto dos ZIPs (sem descompactar);
+- postgres: as etapas de v1/scripts/page.py (descompactação, recriação das
+  tabelas, COPY por tabela e conversão/indexação).
+
+Cada etapa roda em um subprocesso próprio, para medir o pico de memória (RSS)
+só daquela etapa. O relatório (JSON) traz, por etapa: tempo, linhas, bytes de
+entrada, linhas/s, MB/s e pico de RSS (e, nas importações do ClickHouse, o
+tempo de cada fase: leitura, normalização, serialização e inserção), junto
+com o commit e a configuração.
+
+Uso (na pasta v2/importacao, com ClickHouse e/ou PostgreSQL locais):
+    python benchmark_importacao.py --estabelecimentos 1M --zip
+    python benchmark_importacao.py --alvos clickhouse -o resultado.json
+    python benchmark_importacao.py --alvos clickhouse,clickhouse_zip --zip   # extraído x ZIP
+    python benchmark_importacao.py --alvos clickhouse_completo   # process.executar inteiro
+
+Bancos usados (nunca os de produção): CLICKHOUSE_DATABASE=cnpj_benchmark e
+DB_NAME=cnpj_benchmark (PostgreSQL, senha em PGPASSWORD ou --pg-password).
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent
+V1_SCRIPTS_DIR = BASE_DIR.parents[1] / "v1" / "scripts"
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+TABELAS_GRANDES = {
+    "empresas": "EMPRE",
+    "estabelecimentos": "ESTABELE",
+    "socios": "SOCIO",
+    "simples": "SIMPLES",
+}
+TABELAS_DOMINIO = {
+    "cnaes": "CNAE",
+    "motivos": "MOTI",
+    "municipios": "MUNIC",
+    "naturezas": "NATJU",
+    "paises": "PAIS",
+    "qualificacoes": "QUALS",
+}
+
+
+# =================================================================================
+# Etapas (executadas dentro do subprocesso)
+# =================================================================================
+def _dirs(trabalho: Path):
+    return trabalho / "data", trabalho / "downloads"
+
+
+def _bytes_arquivos(data_dir: Path, padroes: List[str]) -> int:
+    from utilities.utils import encontrar_arquivos_csv
+
+    return sum(a.stat().st_size for p in padroes for a in encontrar_arquivos_csv(data_dir, p))
+
+
+def _bytes_zips(downloads_dir: Path) -> int:
+    return sum(z.stat().st_size for z in downloads_dir.glob("*.zip"))
+
+
+def _cliente_clickhouse():
+    from utilities.clickhouse import carregar_config, conectar_clickhouse
+
+    return conectar_clickhouse(carregar_config())
+
+
+def _contar_clickhouse(tabelas: List[str]) -> int:
+    client = _cliente_clickhouse()
+    return sum(client.execute(f"SELECT count() FROM {t}")[0][0] for t in tabelas)
+
+
+def etapa_ch_descompactacao(trabalho: Path) -> Dict:
+    from utilities.downloader import descompactar_arquivos
+
+    data_dir, downloads_dir = _dirs(trabalho)
+    descompactar_arquivos(downloads_dir, data_dir)
+    return {"bytes": _bytes_zips(downloads_dir)}
+
+
+def etapa_ch_preparacao(trabalho: Path) -> Dict:
+    from process import BASE_DIR as PROCESS_DIR
+    from utilities.clickhouse import configurar_sessao_clickhouse, criar_banco_e_schema, limpar_banco_dados
+
+    client = _cliente_clickhouse()
+    if not limpar_banco_dados(client):
+        raise RuntimeError("falha ao limpar o banco de benchmark")
+    criar_banco_e_schema(client, PROCESS_DIR.parent / "clickhouse" / "schema.sql")
+    configurar_sessao_clickhouse(client)
+    return {}
+
+
+def _bytes_membros_zip(downloads_dir: Path, padroes: List[str]) -> int:
+    from utilities.fontes import encontrar_membros_zip
+
+    return sum(f.tamanho for p in padroes for f in encontrar_membros_zip(downloads_dir, p))
+
+
+def _etapa_ch_importacao(tabela: str, ler_zip: bool = False) -> Callable[[Path], Dict]:
+    def etapa(trabalho: Path) -> Dict:
+        from process import executar_importacoes
+        from utilities.clickhouse import configurar_sessao_clickhouse
+
+        data_dir, downloads_dir = _dirs(trabalho)
+        client = _cliente_clickhouse()
+        configurar_sessao_clickhouse(client)
+        resumo = executar_importacoes(client, downloads_dir if ler_zip else data_dir, [tabela], ler_zip=ler_zip)
+        # Guardar as contagens para a etapa de verificação (roda em outro processo)
+        resumo.salvar(trabalho / f"contagens_{tabela}.json")
+        padroes = list(TABELAS_DOMINIO.values()) if tabela == "dominio" else [TABELAS_GRANDES[tabela]]
+        # bytes = CSV descompactado nos dois modos, para comparar MB/s
+        entrada = _bytes_membros_zip(downloads_dir, padroes) if ler_zip else _bytes_arquivos(data_dir, padroes)
+        tabelas = list(TABELAS_DOMINIO) if tabela == "dominio" else [tabela]
+        # Tempo somado de cada fase nos arquivos (leitura, normalização, serialização, inserção)
+        fases: Dict[str, float] = {}
+        for perfil in resumo.perfis:
+            for fase, segundos in perfil["fases"].items():
+                fases[fase] = round(fases.get(fase, 0.0) + segundos, 3)
+        return {"linhas": _contar_clickhouse(tabelas), "bytes": entrada, "fases": fases}
+
+    return etapa
+
+
+def etapa_ch_verificacao(trabalho: Path) -> Dict:
+    from utilities.clickhouse import verificar_importacao
+
+    # Contagens gravadas por cada etapa de importação
+    contagens = {}
+    for tabela in ORDEM_IMPORTACAO:
+        arquivo = trabalho / f"contagens_{tabela}.json"
+        if arquivo.exists():
+            contagens.update(json.loads(arquivo.read_text(encoding="utf-8"))["contagens"])
+    verificar_importacao(_cliente_clickhouse(), contagens)
+    return {}
+
+
+def etapa_ch_completo(trabalho: Path) -> Dict:
+    import process
+
+    process.executar()
+    _, downloads_dir = _dirs(trabalho)
+    return {
+        "linhas": _contar_clickhouse(list(TABELAS_GRANDES) + list(TABELAS_DOMINIO)),
+        "bytes": _bytes_membros_zip(downloads_dir, list(TABELAS_GRANDES.values()) + list(TABELAS_DOMINIO.values())),
+    }
+
+
+def _page():
+    """Importa v1/scripts/page.py (lê CNPJ_BASE_DIR/DB_* do ambiente)"""
+    if str(V1_SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(V1_SCRIPTS_DIR))
+    import page
+
+    return page
+
+
+def _senha_pg() -> str:
+    return os.environ.get("PGPASSWORD", "")
+
+
+def _contar_postgres(tabelas: List[str]) -> int:
+    page = _page()
+    conn = page.get_db_connection(_senha_pg())
+    try:
+        cur = conn.cursor()
+        total = 0
+        for tabela in tabelas:
+            cur.execute(f"SELECT count(*) FROM {tabela}")
+            total += cur.fetchone()[0]
+        return total
+    finally:
+        conn.close()
+
+
+def etapa_pg_descompactacao(trabalho: Path) -> Dict:
+    page = _page()
+    page.descompactar_arquivos()
+    return {"bytes": _bytes_zips(page.DOWNLOADS_DIR)}
+
+
+def etapa_pg_preparacao(trabalho: Path) -> Dict:
+    page = _page()
+    page.criar_banco_se_nao_existir(_senha_pg())
+    page.recriar_tabelas(_senha_pg())
+    return {}
+
+
+def _etapa_pg_importacao(tabela: str) -> Callable[[Path], Dict]:
+    def etapa(trabalho: Path) -> Dict:
+        page = _page()
+        tabelas = list(TABELAS_DOMINIO) if tabela == "dominio" else [tabela]
+        page.executar_importacao(_senha_pg(), tables_filter=tabelas, normalize_empty=True)
+        padroes = [TABELAS_DOMINIO.get(t) or TABELAS_GRANDES[t] for t in tabelas]
+        return {"linhas": _contar_postgres(tabelas), "bytes": _bytes_arquivos(page.DATA_DIR, padroes)}
+
+    return etapa
+
+
+def etapa_pg_indexacao(trabalho: Path) -> Dict:
+    page = _page()
+    page.converter_e_indexar(_senha_pg())
+    return {"linhas": _contar_postgres(list(TABELAS_GRANDES))}
+
+
+ORDEM_IMPORTACAO = ["dominio", "empresas", "estabelecimentos", "socios", "simples"]
+
+ETAPAS: Dict[str, List[tuple]] = {
+    "clickhouse": [
+        ("descompactacao", etapa_ch_descompactacao),
+        ("preparacao", etapa_ch_preparacao),
+        *[(f"importacao_{t}", _etapa_ch_importacao(t)) for t in ORDEM_IMPORTACAO],
+        ("verificacao", etapa_ch_verificacao),
+    ],
+    # Leitura direta dos ZIPs (sem descompactação)
+    "clickhouse_zip": [
+        ("preparacao", etapa_ch_preparacao),
+        *[(f"importacao_{t}", _etapa_ch_importacao(t, ler_zip=True)) for t in ORDEM_IMPORTACAO],
+        ("verificacao", etapa_ch_verificacao),
+    ],
+    "clickhouse_completo": [
+        ("process.executar", etapa_ch_completo),
+    ],
+    "postgres": [
+        ("descompactacao", etapa_pg_descompactacao),
+        ("preparacao", etapa_pg_preparacao),
+        *[(f"importacao_{t}", _etapa_pg_importacao(t)) for t in ORDEM_IMPORTACAO],
+        ("indexacao", etapa_pg_indexacao),
+    ],
+}
+
+
+def _executar_etapa_local(alvo: str, nome: str, trabalho: Path, resultado: Path) -> None:
+    """Modo subprocesso: roda uma etapa e grava tempo/linhas/bytes em `resultado`"""
+    os.chdir(BASE_DIR)
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+    funcao = dict(ETAPAS[alvo])[nome]
+    inicio = time.perf_counter()
+    dados = funcao(trabalho) or {}
+    dados["segundos"] = time.perf_counter() - inicio
+    resultado.write_text(json.dumps(dados), encoding="utf-8")
+
+
+# =================================================================================
+# Orquestração (processo principal)
+# =================================================================================
+def _ambiente(trabalho: Path, database: str) -> Dict[str, str]:
+    """Variáveis que apontam as duas versões para a release e os bancos de benchmark"""
+    env = dict(os.environ)
+    data_dir, downloads_dir = _dirs(trabalho)
+    env.update({
+        "DATA_DIR": str(data_dir),
+        "DOWNLOADS_DIR": str(downloads_dir),
+        "CLICKHOUSE_DATABASE": database,
+        "CNPJ_BASE_DIR": str(trabalho),
+        "DB_NAME": database,
+        "PYTHONIOENCODING": "utf-8",
+        # Releases sintéticas de tamanhos diferentes não devem barrar a troca blue/green
+        "IMPORT_RELEASE_MIN_PROPORCAO": "0",
+    })
+    return env
+
+
+def medir_etapa(alvo: str, nome: str, trabalho: Path, env: Dict[str, str]) -> Dict:
+    """Roda a etapa em um subprocesso e mede tempo e pico de RSS (os.wait4)"""
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+        resultado = Path(tmp.name)
+    comando = [
+        sys.executable, str(Path(__file__).resolve()),
+        "--executar-etapa", f"{alvo}:{nome}", "--trabalho", str(trabalho), "--resultado", str(resultado),
+    ]
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(comando, cwd=BASE_DIR, env=env)
+    pico_rss_mb: Optional[float] = None
+    if hasattr(os, "wait4"):
+        _, status, uso = os.wait4(processo.pid, 0)
+        codigo = os.waitstatus_to_exitcode(status)
+        # ru_maxrss vem em KB no Linux e em bytes no macOS
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        pico_rss_mb = round(uso.ru_maxrss / divisor, 1)
+    else:
+        codigo = processo.wait()
+    parede = time.perf_counter() - inicio
+
+    try:
+        dados = json.loads(resultado.read_text(encoding="utf-8") or "{}")
+    except (OSError, ValueError):
+        dados = {}
+    finally:
+        resultado.unlink(missing_ok=True)
+
+    segundos = dados.get("segundos", parede)
+    linhas = dados.get("linhas")
+    bytes_entrada = dados.get("bytes")
+    return {
+        "alvo": alvo,
+        "etapa": nome,
+        "codigo_saida": codigo,
+        "segundos": round(segundos, 3),
+        "segundos_processo": round(parede, 3),
+        "linhas": linhas,
+        "bytes_entrada": bytes_entrada,
+        "linhas_por_s": round(linhas / segundos, 1) if linhas and segundos else None,
+        "mb_por_s": round(bytes_entrada / 1024 / 1024 / segundos, 2) if bytes_entrada and segundos else None,
+        "pico_rss_mb": pico_rss_mb,
+        "fases": dados.get("fases"),
+    }
+
+
+def _versao_git() -> Dict[str, object]:
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=BASE_DIR, text=True).strip()
+        sujo = bool(subprocess.check_output(["git", "status", "--porcelain"], cwd=BASE_DIR, text=True).strip())
+        return {"commit": commit, "dirty": sujo}
+    except Exception:
+        return {"commit": None, "dirty": None}
+
+
+def _imprimir_tabela(etapas: List[Dict]) -> None:
+    print(f"\n{'alvo':<20} {'etapa':<30} {'tempo(s)':>9} {'linhas':>12} {'linhas/s':>11} {'MB/s':>8} {'RSS(MB)':>8}",
+          file=sys.stderr)
+    for e in etapas:
+        print(
+            f"{e['alvo']:<20} {e['etapa']:<30} {e['segundos']:>9.2f} {e['linhas'] or '-':>12} "
+            f"{e['linhas_por_s'] or '-':>11} {e['mb_por_s'] or '-':>8} {e['pico_rss_mb'] or '-':>8}"
+            + ("" if e["codigo_saida"] == 0 else f"  ✗ saiu com {e['codigo_saida']}"),
+            file=sys.stderr,
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de importação com a release sintética")
+    parser.add_argument("--alvos", default="clickhouse,postgres",
+                        help="alvos separados por vírgula: clickhouse, clickhouse_zip, clickhouse_completo, postgres")
+    parser.add_argument("--estabelecimentos", default="100k", help="escala da release sintética (ex.: 1k, 1M, 60M)")
+    parser.add_argument("--trabalho", default=str(BASE_DIR.parent / "bench"),
+                        help="diretório da release sintética (data/ e downloads/)")
+    parser.add_argument("--zip", action="store_true", help="gerar ZIPs e medir também a descompactação")
+    parser.add_argument("--regenerar", action="store_true", help="gerar a release mesmo se já existir")
+    parser.add_argument("--taxa-sujeira", type=float, default=0.001)
+    parser.add_argument("--database", default="cnpj_benchmark", help="banco usado no ClickHouse e no PostgreSQL")
+    parser.add_argument("--pg-password", help="senha do PostgreSQL (padrão: PGPASSWORD)")
+    parser.add_argument("-o", "--output", help="arquivo JSON de saída (padrão: stdout)")
+    # Modo interno: execução de uma etapa dentro do subprocesso
+    parser.add_argument("--executar-etapa", help=argparse.SUPPRESS)
+    parser.add_argument("--resultado", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    trabalho = Path(args.trabalho).resolve()
+
+    if args.executar_etapa:
+        alvo, nome = args.executar_etapa.split(":", 1)
+        _executar_etapa_local(alvo, nome, trabalho, Path(args.resultado))
+        return 0
+
+    from gerar_dados_sinteticos import gerar, parse_escala
+
+    alvos = [a.strip() for a in args.alvos.split(",") if a.strip()]
+    for alvo in alvos:
+        if alvo not in ETAPAS:
+            parser.error(f"alvo desconhecido: {alvo}")
+    for alvo in ("clickhouse_completo", "clickhouse_zip"):
+        if alvo in alvos and not args.zip:
+            # Sem ZIPs em downloads/ não há o que ler (process.executar tentaria baixar a release real)
+            parser.error(f"o alvo {alvo} exige --zip")
+
+    estabelecimentos = parse_escala(args.estabelecimentos)
+    marcador = trabalho / "release.json"
+    config_release = {"estabelecimentos": estabelecimentos, "zip": args.zip, "taxa_sujeira": args.taxa_sujeira}
+    atual = json.loads(marcador.read_text(encoding="utf-8")) if marcador.exists() else None
+    if args.regenerar or atual is None or atual.get("config") != config_release:
+        shutil.rmtree(trabalho / "data", ignore_errors=True)
+        shutil.rmtree(trabalho / "downloads", ignore_errors=True)
+        logger.info("Gerando release sintética (%s estabelecimentos) em %s...", f"{estabelecimentos:,}", trabalho)
+        inicio = time.perf_counter()
+        contagens = gerar(trabalho, estabelecimentos, zipado=args.zip, taxa_sujeira=args.taxa_sujeira)
+        trabalho.mkdir(parents=True, exist_ok=True)
+        marcador.write_text(json.dumps({"config": config_release, "linhas": contagens}), encoding="utf-8")
+        logger.info("✓ Release gerada em %.1fs", time.perf_counter() - inicio)
+        atual = {"config": config_release, "linhas": contagens}
+
+    env = _ambiente(trabalho, args.database)
+    if args.pg_password:
+        env["PGPASSWORD"] = args.pg_password
+
+    etapas = []
+    for alvo in alvos:
+        if args.zip and alvo not in ("clickhouse_completo", "clickhouse_zip"):
+            # Cada alvo descompacta do zero para medir a etapa de forma isolada
+            shutil.rmtree(trabalho / "data", ignore_errors=True)
+        for nome, _ in ETAPAS[alvo]:
+            if nome == "descompactacao" and not args.zip:
+                continue
+            logger.info("\n▶ %s: %s", alvo, nome)
+            etapas.append(medir_etapa(alvo, nome, trabalho, env))
+
+    relatorio = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git": _versao_git(),
+        "config": {
+            "alvos": alvos,
+            "estabelecimentos": estabelecimentos,
+            "zip": args.zip,
+            "taxa_sujeira": args.taxa_sujeira,
+            "database": args.database,
+            # Ajustes do importador (IMPORT_BATCH_SIZE, IMPORT_INSERT_MODE, ...)
+            "importacao": {k: v for k, v in sorted(os.environ.items()) if k.startswith("IMPORT_")},
+        },
+        "release": atual["linhas"],
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "etapas": etapas,
+    }
+
+    _imprimir_tabela(etapas)
+    saida = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(saida + "\n", encoding="utf-8")
+        logger.info("Resultado salvo em %s", args.output)
+    else:
+        print(saida)
+    return 0 if all(e["codigo_saida"] == 0 for e in etapas) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
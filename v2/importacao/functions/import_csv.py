@@ -1,51 +1,15 @@
 """Importador CSV otimizado para ClickHouse"""
+import os
 import sys
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, List, Optional
 from datetime import date
 
 import polars as pl
 from clickhouse_driver import Client
 
 
-def ler_csv_com_encoding(arquivo: Path, separator: str = ';', has_header: bool = False, 
-                         infer_schema_length: int = 0, ignore_errors: bool = True):
-    """
-    Lê CSV tentando diferentes encodings para preservar acentos.
-    Tenta UTF-8 primeiro, depois latin-1 (comum em arquivos brasileiros).
-    """
-    # Tentar UTF-8 primeiro (preserva acentos corretamente)
-    try:
-        return pl.read_csv(
-            arquivo,
-            separator=separator,
-            has_header=has_header,
-            infer_schema_length=infer_schema_length,
-            ignore_errors=ignore_errors,
-            encoding="utf-8",
-        )
-    except Exception:
-        # Se UTF-8 falhar, tentar latin-1 (preserva acentos brasileiros)
-        try:
-            return pl.read_csv(
-                arquivo,
-                separator=separator,
-                has_header=has_header,
-                infer_schema_length=infer_schema_length,
-                ignore_errors=ignore_errors,
-                encoding="latin-1",
-            )
-        except Exception:
-            # Último recurso: usar utf8-lossy apenas se ambos falharem
-            return pl.read_csv(
-                arquivo,
-                separator=separator,
-                has_header=has_header,
-                infer_schema_length=infer_schema_length,
-                ignore_errors=ignore_errors,
-                encoding="utf8-lossy",
-            )
-
 # Ajuste de path para suportar execução direta
 BASE_DIR = Path(__file__).resolve().parents[1]
 UTILS_DIR = BASE_DIR / "utilities"
@@ -56,12 +20,19 @@ for path_candidate in (BASE_DIR, UTILS_DIR):
         sys.path.insert(0, path_str)
 
 from utilities.normalizador import (
-    normalizar_cnpj,
-    normalizar_data,
-    normalizar_capital_social,
-    limpar_string,
-    normalizar_codigo,
+    CODIGO_SIZE_DOMINIO,
+    expr_limpar_string,
+    expr_normalizar_capital_social,
+    expr_normalizar_codigo,
 )
+from utilities.agrupamento import AgrupadorLotes
+from utilities.csv_servidor import importar_no_servidor
+from utilities.fontes import FonteCSV
+from utilities.insercao import ClickHouseHTTP, criar_insercao
+from utilities.clickhouse import carregar_config
+from utilities.leitor_csv import CHUNK_BYTES_PADRAO, ler_csv_em_lotes
+from utilities.memoria import FATOR_BLOCO, MB, GovernadorMemoria, orcamento_memoria_mb
+from utilities.perfil import PerfilArquivo
 from utilities.utils import encontrar_arquivos_csv, validar_arquivo
 
 import logging
@@ -70,11 +41,97 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_DATE = date(1970, 1, 1)
+# Faixa do tipo Date do ClickHouse (UInt16 de dias desde 1970-01-01)
+MAX_DATE = date(2149, 6, 6)
+
+
+def parse_date(name: str) -> pl.Expr:
+    """Data YYYY-MM-DD ou YYYYMMDD; inválida, vazia ou fora da faixa do Date vira 1970-01-01"""
+    base = pl.col(name).cast(pl.Utf8).str.strip_chars()
+    d1 = base.str.strptime(pl.Date, "%Y-%m-%d", strict=False)
+    d2 = base.str.strptime(pl.Date, "%Y%m%d", strict=False)
+    data = pl.coalesce(d1, d2)
+    return (
+        pl.when(data.is_between(DEFAULT_DATE, MAX_DATE))
+        .then(data)
+        .otherwise(pl.lit(DEFAULT_DATE))
+        .alias(name)
+    )
+
+
+@dataclass
+class ContagemArquivo:
+    """
+    Linhas de um arquivo contadas na própria importação (sem passada extra).
+    problematicas = linhas com campos a menos (completadas com vazio);
+    None no modo servidor, em que o Python não vê as linhas, e nas partes do
+    snapshot Parquet (contadas na conversão, em _snapshot.json).
+    """
+    linhas: int = 0
+    problematicas: Optional[int] = 0
+
+    @property
+    def validas(self) -> Optional[int]:
+        return None if self.problematicas is None else self.linhas - self.problematicas
+
+
 class ClickHouseImporter:
-    """Importador otimizado para ClickHouse - insere arquivo completo de uma vez"""
+    """
+    Importador otimizado para ClickHouse.
+
+    Lê cada arquivo em blocos de ~chunk_bytes (memória constante, mesmo nos
+    *ESTABELE de vários GB) e insere em lotes, de forma colunar (ver
+    utilities/insercao.py; modo em IMPORT_INSERT_MODE). O tamanho dos lotes
+    vem do governador de memória (utilities/memoria.py: bytes por linha de
+    cada tabela, RSS e orçamento IMPORT_MEMORIA_MB dividido entre `processos`);
+    batch_size / IMPORT_BATCH_SIZE fixa o número de linhas. O bloco lido vem
+    de IMPORT_CHUNK_MB. Antes do INSERT, as linhas são agrupadas por partição
+    e ordenadas pelo ORDER BY da tabela (utilities/agrupamento.py, até
+    IMPORT_AGRUPAR_LINHAS linhas guardadas; padrão: 2 lotes).
+
+    Tabelas em tabelas_servidor (IMPORT_SERVER_CSV, ex.: "estabelecimentos,socios"
+    ou "todas") são normalizadas pelo próprio ClickHouse: o arquivo vai em
+    streaming para INSERT ... SELECT FROM input() (utilities/csv_servidor.py).
+
+    sufixo_tabela direciona os INSERTs para as tabelas de staging de uma
+    release (ex.: "__2026_10" grava em estabelecimentos__2026_10).
+
+    ultima_contagem traz as linhas inseridas e problemáticas do último arquivo;
+    ultimo_perfil, o tempo de cada fase dele (utilities/perfil.py).
+
+    token_arquivo, quando preenchido (process.py, com o manifesto da release),
+    vira o insert_deduplication_token de cada lote ("<token>:<n>"): reimportar
+    o arquivo depois de uma queda não duplica os lotes que já tinham entrado.
+    Nesse caso o tamanho dos lotes é fixado por arquivo (planejar_arquivo) e
+    o governador só o ajusta entre um arquivo e outro.
+    """
     
-    def __init__(self, client: Client):
+    def __init__(self, client: Client, batch_size: Optional[int] = None,
+                 chunk_bytes: Optional[int] = None, insercao=None,
+                 tabelas_servidor: Optional[Iterable[str]] = None,
+                 sufixo_tabela: str = "", processos: int = 1):
         self.client = client
+        self.sufixo_tabela = sufixo_tabela
+        self.ultima_contagem = ContagemArquivo()
+        self.ultimo_perfil: Optional[PerfilArquivo] = None
+        self.token_arquivo: Optional[str] = None
+        self.lote_arquivo: Optional[int] = None
+        self.insercao = insercao or criar_insercao(client)
+        self.tabelas_servidor, self.http = self._configurar_modo_servidor(tabelas_servidor)
+        self.chunk_bytes = chunk_bytes or (
+            int(os.getenv("IMPORT_CHUNK_MB", "0")) * 1024 * 1024 or CHUNK_BYTES_PADRAO
+        )
+        self.batch_size = batch_size or int(os.getenv("IMPORT_BATCH_SIZE", "0"))
+        self.governador: Optional[GovernadorMemoria] = None
+        if not self.batch_size:
+            orcamento = orcamento_memoria_mb(processos)
+            if orcamento:
+                self.governador = GovernadorMemoria(orcamento, FATOR_BLOCO * self.chunk_bytes / MB)
+            self.batch_size = 500_000  # sem como medir a memória da máquina
+        # Linhas guardadas por partição entre blocos (utilities/agrupamento.py); 0 = só ordenar
+        agrupar = os.getenv("IMPORT_AGRUPAR_LINHAS")
+        self.agrupar_linhas: Optional[int] = int(agrupar) if agrupar else None
         # Configurar timeouts aumentados
         try:
             client.execute("SET send_timeout = 3600")  # 1 hora
@@ -110,453 +167,266 @@ class ClickHouseImporter:
                     return date(1970, 1, 1)
         return date(1970, 1, 1)
     
-    def importar_empresas(self, arquivo: Path) -> int:
-        """Importa arquivo completo de empresas de uma vez (Polars vetorizado, sem iter_rows)"""
-        logger.info(f"Importando empresas de {arquivo.name}...")
-        
-        linhas_processadas = 0
-        
+
+    def _configurar_modo_servidor(self, tabelas: Optional[Iterable[str]]):
+        if tabelas is None:
+            valor = os.getenv("IMPORT_SERVER_CSV", "").strip()
+            tabelas = [t.strip() for t in valor.split(",") if t.strip()]
+        tabelas = set(tabelas)
+        if not tabelas:
+            return tabelas, None
+        http = ClickHouseHTTP(carregar_config())
+        if not http.disponivel():
+            logger.warning(f"⚠ Interface HTTP indisponível em {http.url}: modo servidor desativado, usando Polars")
+            return set(), None
+        logger.info(f"✓ Parsing no servidor para: {', '.join(sorted(tabelas))}")
+        return tabelas, http
+
+    def _modo_servidor(self, tabela: str) -> bool:
+        return tabela in self.tabelas_servidor or "todas" in self.tabelas_servidor
+
+    def configuracao_lotes(self, tabela: str) -> str:
+        """
+        Como o arquivo é fatiado em INSERTs; com outra configuração os lotes (e
+        os tokens de deduplicação) de uma retomada não batem com os anteriores
+        """
+        if self._modo_servidor(tabela):
+            return f"servidor:{self.chunk_bytes}"
+        lote = self.lote_arquivo or self.tamanho_lote(tabela)
+        return f"polars:{self.chunk_bytes}:{lote}:{self._agrupar(lote)}"
+
+    def tamanho_lote(self, tabela: str) -> int:
+        """Linhas por INSERT agora: do governador de memória ou o batch_size fixo"""
+        return self.governador.tamanho_lote(tabela) if self.governador else self.batch_size
+
+    def _agrupar(self, lote: int) -> int:
+        return 2 * lote if self.agrupar_linhas is None else self.agrupar_linhas
+
+    def planejar_arquivo(self, tabela: str, configuracao_anterior: Optional[str] = None) -> str:
+        """
+        Fixa o tamanho dos lotes do próximo arquivo (lote_arquivo) e devolve a
+        configuração dele para o manifesto. Retomando um arquivo interrompido,
+        reaproveita o lote da tentativa anterior: os INSERTs saem iguais e os
+        tokens de deduplicação batem, mesmo que a memória livre tenha mudado.
+        """
+        self.lote_arquivo = None
+        if not self._modo_servidor(tabela):
+            anterior = (configuracao_anterior or "").split(":")
+            if len(anterior) == 4 and anterior[0] == "polars" and anterior[1] == str(self.chunk_bytes):
+                self.lote_arquivo = int(anterior[2])
+            else:
+                self.lote_arquivo = self.tamanho_lote(tabela)
+        return self.configuracao_lotes(tabela)
+
+    def _importar_em_lotes(self, arquivo: Path, tabela: str, num_colunas: int,
+                           colunas: List[pl.Expr]) -> int:
+        """
+        Lê o arquivo em blocos (col0..col{n-1}), aplica as expressões de
+        normalização (aliases = nomes das colunas no schema) e insere em lotes
+        de batch_size, coluna a coluna, sem montar listas de linhas.
+        No modo servidor, as mesmas normalizações rodam no ClickHouse.
+        Conta, na mesma passada, as linhas sem o último campo (problemáticas).
+        """
+        contagem = ContagemArquivo()
+        perfil = PerfilArquivo(tabela, arquivo.name)
+        self.ultima_contagem, self.ultimo_perfil = contagem, perfil
+        destino = f"{tabela}{self.sufixo_tabela}"
+        ultima_coluna = f"col{num_colunas - 1}"
+
         try:
-            df = ler_csv_com_encoding(arquivo, separator=';', has_header=False, 
-                                     infer_schema_length=0, ignore_errors=True)
-
-            # Renomear colunas para padrão col0, col1, ...
-            df = df.rename({name: f"col{i}" for i, name in enumerate(df.columns)})
-
-            # Garantir pelo menos 7 colunas
-            for i in range(7):
-                col_name = f"col{i}"
-                if col_name not in df.columns:
-                    df = df.with_columns(pl.lit("").alias(col_name))
-
-            # Helpers vetorizados simples
-            def clean_col(name: str) -> pl.Expr:
-                return (
-                    pl.col(name)
-                    .cast(pl.Utf8)
-                    .fill_null("")
-                    .str.replace("\x00", "")
-                    .str.strip_chars()
-                )
-
-            # Normalizações vetorizadas, reutilizando suas funções Python
-            df = df.with_columns([
-                pl.col("col0")
-                    .map_elements(lambda x: normalizar_codigo(x, 8) or "", return_dtype=pl.Utf8)
-                    .alias("cnpj_basico"),
-                clean_col("col1")
-                    .map_elements(lambda x: limpar_string(x) or "", return_dtype=pl.Utf8)
-                    .alias("razao_social"),
-                pl.col("col2")
-                    .map_elements(lambda x: normalizar_codigo(x, 4) or "", return_dtype=pl.Utf8)
-                    .alias("natureza_juridica"),
-                pl.col("col3")
-                    .map_elements(lambda x: normalizar_codigo(x, 2) or "", return_dtype=pl.Utf8)
-                    .alias("qualificacao_do_responsavel"),
-                pl.col("col4")
-                    .map_elements(lambda x: normalizar_capital_social(x) or 0, return_dtype=pl.Int64)
-                    .alias("capital_social"),
-                pl.col("col5")
-                    .map_elements(lambda x: normalizar_codigo(x, 2) or "", return_dtype=pl.Utf8)
-                    .alias("porte"),
-                clean_col("col6")
-                    .map_elements(lambda x: limpar_string(x) or "", return_dtype=pl.Utf8)
-                    .alias("ente_federativo"),
-            ])
-
-            colunas_ordem = [
-                "cnpj_basico",
-                "razao_social",
-                "natureza_juridica",
-                "qualificacao_do_responsavel",
-                "capital_social",
-                "porte",
-                "ente_federativo",
-            ]
-
-            if df.height > 0:
-                tabela_df = df.select(colunas_ordem)
-                BATCH_SIZE = 500_000
-
-                for offset in range(0, tabela_df.height, BATCH_SIZE):
-                    chunk = tabela_df.slice(offset, BATCH_SIZE)
-                    batch = chunk.to_numpy().tolist()
-                    if not batch:
+            if self._modo_servidor(tabela):
+                with perfil.fase("servidor"):
+                    contagem.linhas = importar_no_servidor(self.http, arquivo, tabela, num_colunas,
+                                                           self.chunk_bytes, destino, self.token_arquivo)
+                contagem.problematicas = None
+                perfil.linhas = contagem.linhas
+                perfil.bytes = arquivo.tamanho if isinstance(arquivo, FonteCSV) else Path(arquivo).stat().st_size
+                logger.info(f"  Inseridas {contagem.linhas:,} linhas de {tabela}")
+                return contagem.linhas
+
+            numero_insert = 0
+
+            def inserir(chunks: List[pl.DataFrame]) -> None:
+                nonlocal numero_insert
+                for chunk in chunks:
+                    if chunk.height == 0:
                         continue
-                    self.client.execute("INSERT INTO empresas VALUES", batch)
-                    linhas_processadas += len(batch)
-                    logger.info(f"  Inseridas {linhas_processadas:,} linhas de empresas até agora...")
+                    token = f"{self.token_arquivo}:{numero_insert}" if self.token_arquivo else None
+                    with perfil.fase("serializacao"):
+                        carga = self.insercao.serializar(destino, chunk)
+                    with perfil.fase("insercao"):
+                        self.insercao.enviar(carga, token)
+                    numero_insert += 1
+                    contagem.linhas += chunk.height
+                    perfil.linhas = contagem.linhas
+                    logger.info(f"  Inseridas {contagem.linhas:,} linhas de {tabela} até agora...")
+
+            # Lote fixado por planejar_arquivo (manifesto) não muda no meio do arquivo
+            fixo = self.lote_arquivo is not None
+            tamanho = self.lote_arquivo or self.tamanho_lote(tabela)
+            # INSERTs por partição e na ordem do ORDER BY: menos partes e menos merges
+            agrupador = AgrupadorLotes(tabela, tamanho, self._agrupar(tamanho))
+            for lote in perfil.cronometrar("leitura", ler_csv_em_lotes(arquivo, num_colunas, self.chunk_bytes)):
+                perfil.bytes += lote.fim - lote.inicio
+                with perfil.fase("normalizacao"):
+                    # Campo ausente vira null; campo vazio entre aspas ("") não
+                    contagem.problematicas += lote.df.get_column(ultima_coluna).null_count()
+                    tabela_df = lote.df.select(colunas)
+                if self.governador is not None:
+                    self.governador.observar(tabela, tabela_df)
+                    if not fixo:
+                        tamanho = self.tamanho_lote(tabela)
+                        agrupador.redimensionar(tamanho, self._agrupar(tamanho))
+                with perfil.fase("ordenacao"):
+                    prontos = agrupador.adicionar(tabela_df)
+                inserir(prontos)
+            with perfil.fase("ordenacao"):
+                prontos = agrupador.finalizar()
+            inserir(prontos)
         
         except Exception as e:
             logger.error(f"Erro ao importar {arquivo.name}: {e}")
             raise
         
-        return linhas_processadas
+        return contagem.linhas
+
+    def importar_empresas(self, arquivo: Path) -> int:
+        """Importa arquivo de empresas em lotes (Polars vetorizado, sem iter_rows)"""
+        logger.info(f"Importando empresas de {arquivo.name}...")
+        return self._importar_em_lotes(arquivo, "empresas", 7, [
+            expr_normalizar_codigo("col0", 8).alias("cnpj_basico"),
+            expr_limpar_string("col1").alias("razao_social"),
+            expr_normalizar_codigo("col2", 4).alias("natureza_juridica"),
+            expr_normalizar_codigo("col3", 2).alias("qualificacao_do_responsavel"),
+            expr_normalizar_capital_social("col4").alias("capital_social"),
+            expr_normalizar_codigo("col5", 2).alias("porte"),
+            expr_limpar_string("col6").alias("ente_federativo"),
+        ])
     
     def importar_estabelecimentos(self, arquivo: Path) -> int:
-        """Importa arquivo completo de estabelecimentos de uma vez"""
+        """Importa arquivo de estabelecimentos em lotes (30 colunas no layout da Receita)"""
         logger.info(f"Importando estabelecimentos de {arquivo.name}...")
-        
-        linhas_processadas = 0
-        dados = []
-        
-        try:
-            df = ler_csv_com_encoding(arquivo, separator=';', has_header=False, 
-                                     infer_schema_length=0, ignore_errors=True)
-
-            # Renomear colunas para um padrão conhecido (col0, col1, ...)
-            df = df.rename({name: f"col{i}" for i, name in enumerate(df.columns)})
-
-            # Garantir que temos ao menos 29 colunas (preencher ausentes com string vazia)
-            for i in range(29):
-                col_name = f"col{i}"
-                if col_name not in df.columns:
-                    df = df.with_columns(pl.lit("").alias(col_name))
-
-            # Helpers vetorizados
-            def zfill_col(name: str, size: int) -> pl.Expr:
-                return (
-                    pl.col(name)
-                    .cast(pl.Utf8)
-                    .fill_null("")
-                    .str.replace("\x00", "")
-                    .str.strip_chars()
-                    .str.zfill(size)
-                    .str.slice(0, size)
-                )
-
-            def clean_col(name: str) -> pl.Expr:
-                return (
-                    pl.col(name)
-                    .cast(pl.Utf8)
-                    .fill_null("")
-                    .str.replace("\x00", "")
-                    .str.strip_chars()
-                )
-
-            default_date = date(1970, 1, 1)
-
-            def parse_date(name: str) -> pl.Expr:
-                base = pl.col(name).cast(pl.Utf8).str.strip_chars()
-                # Tentar primeiro YYYY-MM-DD, depois YYYYMMDD; fallback 1970-01-01
-                d1 = base.str.strptime(pl.Date, "%Y-%m-%d", strict=False)
-                d2 = base.str.strptime(pl.Date, "%Y%m%d", strict=False)
-                return pl.coalesce(d1, d2, pl.lit(default_date))
-
-            # Normalizações vetorizadas
-            df = df.with_columns([
-                zfill_col("col0", 8).alias("cnpj_basico"),
-                zfill_col("col1", 4).alias("cnpj_ordem"),
-                zfill_col("col2", 2).alias("cnpj_dv"),
-            ])
-
-            df = df.with_columns([
-                (pl.col("cnpj_basico") + pl.col("cnpj_ordem") + pl.col("cnpj_dv")).alias("cnpj"),
-                zfill_col("col3", 1).alias("matriz_filial"),
-                clean_col("col4").alias("nome_fantasia"),
-                zfill_col("col5", 2).alias("situacao_cadastral"),
-                parse_date("col6").alias("data_situacao"),
-                zfill_col("col7", 2).alias("motivo_situacao"),
-                clean_col("col8").alias("cidade_exterior"),
-                zfill_col("col9", 3).alias("pais"),
-                parse_date("col10").alias("data_inicio"),
-                zfill_col("col11", 7).alias("cnae_fiscal"),
-                clean_col("col12").alias("cnae_fiscal_secundaria"),
-                clean_col("col13").alias("tipo_logradouro"),
-                clean_col("col14").alias("logradouro"),
-                clean_col("col15").alias("numero"),
-                clean_col("col16").alias("complemento"),
-                clean_col("col17").alias("bairro"),
-                zfill_col("col18", 8).alias("cep"),
-                zfill_col("col19", 2).alias("uf"),
-                zfill_col("col20", 4).alias("municipio"),
-                zfill_col("col21", 2).alias("ddd_1"),
-                clean_col("col22").alias("telefone_1"),
-                zfill_col("col23", 2).alias("ddd_2"),
-                clean_col("col24").alias("telefone_2"),
-                zfill_col("col25", 2).alias("ddd_fax"),
-                clean_col("col26").alias("fax"),
-                clean_col("col27").alias("email"),
-                clean_col("col28").alias("situacao_especial"),
-                parse_date("col28").alias("data_situacao_especial"),
-            ])
-
-            # Extrair na ordem exata do schema do ClickHouse
-            colunas_ordem = [
-                "cnpj_basico",
-                "cnpj_ordem",
-                "cnpj_dv",
-                "cnpj",
-                "matriz_filial",
-                "nome_fantasia",
-                "situacao_cadastral",
-                "data_situacao",
-                "motivo_situacao",
-                "cidade_exterior",
-                "pais",
-                "data_inicio",
-                "cnae_fiscal",
-                "cnae_fiscal_secundaria",
-                "tipo_logradouro",
-                "logradouro",
-                "numero",
-                "complemento",
-                "bairro",
-                "cep",
-                "uf",
-                "municipio",
-                "ddd_1",
-                "telefone_1",
-                "ddd_2",
-                "telefone_2",
-                "ddd_fax",
-                "fax",
-                "email",
-                "situacao_especial",
-                "data_situacao_especial",
-            ]
-
-            if df.height > 0:
-                # Inserir em chunks usando apenas operações vetorizadas (sem iter_rows)
-                tabela_df = df.select(colunas_ordem)
-                BATCH_SIZE = 500_000
-
-                for offset in range(0, tabela_df.height, BATCH_SIZE):
-                    chunk = tabela_df.slice(offset, BATCH_SIZE)
-                    batch = chunk.to_numpy().tolist()
-                    if not batch:
-                        continue
-                    self.client.execute("INSERT INTO estabelecimentos VALUES", batch)
-                    linhas_processadas += len(batch)
-                    logger.info(f"  Inseridas {linhas_processadas:,} linhas de estabelecimentos até agora...")
-        
-        except Exception as e:
-            logger.error(f"Erro ao importar {arquivo.name}: {e}")
-            raise
-        
-        return linhas_processadas
+
+        # Helpers vetorizados
+        def zfill_col(name: str, size: int) -> pl.Expr:
+            return (
+                pl.col(name)
+                .cast(pl.Utf8)
+                .fill_null("")
+                .str.replace("\x00", "")
+                .str.strip_chars()
+                .str.zfill(size)
+                .str.slice(0, size)
+            )
+
+        def clean_col(name: str) -> pl.Expr:
+            return (
+                pl.col(name)
+                .cast(pl.Utf8)
+                .fill_null("")
+                .str.replace("\x00", "")
+                .str.strip_chars()
+            )
+
+        # Na ordem exata do schema do ClickHouse
+        return self._importar_em_lotes(arquivo, "estabelecimentos", 30, [
+            zfill_col("col0", 8).alias("cnpj_basico"),
+            zfill_col("col1", 4).alias("cnpj_ordem"),
+            zfill_col("col2", 2).alias("cnpj_dv"),
+            (zfill_col("col0", 8) + zfill_col("col1", 4) + zfill_col("col2", 2)).alias("cnpj"),
+            zfill_col("col3", 1).alias("matriz_filial"),
+            clean_col("col4").alias("nome_fantasia"),
+            zfill_col("col5", 2).alias("situacao_cadastral"),
+            parse_date("col6").alias("data_situacao"),
+            zfill_col("col7", 2).alias("motivo_situacao"),
+            clean_col("col8").alias("cidade_exterior"),
+            zfill_col("col9", 3).alias("pais"),
+            parse_date("col10").alias("data_inicio"),
+            zfill_col("col11", 7).alias("cnae_fiscal"),
+            clean_col("col12").alias("cnae_fiscal_secundaria"),
+            clean_col("col13").alias("tipo_logradouro"),
+            clean_col("col14").alias("logradouro"),
+            clean_col("col15").alias("numero"),
+            clean_col("col16").alias("complemento"),
+            clean_col("col17").alias("bairro"),
+            zfill_col("col18", 8).alias("cep"),
+            zfill_col("col19", 2).alias("uf"),
+            zfill_col("col20", 4).alias("municipio"),
+            zfill_col("col21", 2).alias("ddd_1"),
+            clean_col("col22").alias("telefone_1"),
+            zfill_col("col23", 2).alias("ddd_2"),
+            clean_col("col24").alias("telefone_2"),
+            zfill_col("col25", 2).alias("ddd_fax"),
+            clean_col("col26").alias("fax"),
+            clean_col("col27").alias("email"),
+            clean_col("col28").alias("situacao_especial"),
+            parse_date("col29").alias("data_situacao_especial"),
+        ])
     
     def importar_socios(self, arquivo: Path) -> int:
-        """Importa arquivo completo de sócios de uma vez (Polars vetorizado, sem iter_rows)"""
+        """Importa arquivo de sócios em lotes (Polars vetorizado, sem iter_rows)"""
         logger.info(f"Importando sócios de {arquivo.name}...")
-        
-        linhas_processadas = 0
-        
-        try:
-            df = ler_csv_com_encoding(arquivo, separator=';', has_header=False, 
-                                     infer_schema_length=0, ignore_errors=True)
-
-            df = df.rename({name: f"col{i}" for i, name in enumerate(df.columns)})
-
-            # Garantir ao menos 11 colunas
-            for i in range(11):
-                col_name = f"col{i}"
-                if col_name not in df.columns:
-                    df = df.with_columns(pl.lit("").alias(col_name))
-
-            def clean_col(name: str) -> pl.Expr:
-                return (
-                    pl.col(name)
-                    .cast(pl.Utf8)
-                    .fill_null("")
-                    .str.replace("\x00", "")
-                    .str.strip_chars()
-                )
-
-            default_date = date(1970, 1, 1)
-
-            def parse_date(name: str) -> pl.Expr:
-                base = pl.col(name).cast(pl.Utf8).str.strip_chars()
-                d1 = base.str.strptime(pl.Date, "%Y-%m-%d", strict=False)
-                d2 = base.str.strptime(pl.Date, "%Y%m%d", strict=False)
-                return pl.coalesce(d1, d2, pl.lit(default_date))
-
-            df = df.with_columns([
-                pl.col("col0")
-                    .map_elements(lambda x: normalizar_codigo(x, 8) or "", return_dtype=pl.Utf8)
-                    .alias("cnpj_basico"),
-                pl.col("col1")
-                    .map_elements(lambda x: normalizar_codigo(x, 1) or "", return_dtype=pl.Utf8)
-                    .alias("identificador_socio"),
-                clean_col("col2")
-                    .map_elements(lambda x: limpar_string(x) or "", return_dtype=pl.Utf8)
-                    .alias("nome_socio"),
-                clean_col("col3")
-                    .map_elements(lambda x: limpar_string(x) or "", return_dtype=pl.Utf8)
-                    .alias("cnpj_cpf_socio"),
-                pl.col("col4")
-                    .map_elements(lambda x: normalizar_codigo(x, 2) or "", return_dtype=pl.Utf8)
-                    .alias("qualificacao_socio"),
-                parse_date("col5").alias("data_entrada_sociedade"),
-                pl.col("col6")
-                    .map_elements(lambda x: normalizar_codigo(x, 3) or "", return_dtype=pl.Utf8)
-                    .alias("pais"),
-                pl.col("col7")
-                    .map_elements(lambda x: normalizar_codigo(x, 1) or "", return_dtype=pl.Utf8)
-                    .alias("representante_legal"),
-                clean_col("col8")
-                    .map_elements(lambda x: limpar_string(x) or "", return_dtype=pl.Utf8)
-                    .alias("nome_representante"),
-                pl.col("col9")
-                    .map_elements(lambda x: normalizar_codigo(x, 2) or "", return_dtype=pl.Utf8)
-                    .alias("qualificacao_representante"),
-                pl.col("col10")
-                    .map_elements(lambda x: normalizar_codigo(x, 1) or "", return_dtype=pl.Utf8)
-                    .alias("faixa_etaria"),
-            ])
-
-            colunas_ordem = [
-                "cnpj_basico",
-                "identificador_socio",
-                "nome_socio",
-                "cnpj_cpf_socio",
-                "qualificacao_socio",
-                "data_entrada_sociedade",
-                "pais",
-                "representante_legal",
-                "nome_representante",
-                "qualificacao_representante",
-                "faixa_etaria",
-            ]
-
-            if df.height > 0:
-                tabela_df = df.select(colunas_ordem)
-                BATCH_SIZE = 500_000
-
-                for offset in range(0, tabela_df.height, BATCH_SIZE):
-                    chunk = tabela_df.slice(offset, BATCH_SIZE)
-                    batch = chunk.to_numpy().tolist()
-                    if not batch:
-                        continue
-                    self.client.execute("INSERT INTO socios VALUES", batch)
-                    linhas_processadas += len(batch)
-                    logger.info(f"  Inseridas {linhas_processadas:,} linhas de sócios até agora...")
-        
-        except Exception as e:
-            logger.error(f"Erro ao importar {arquivo.name}: {e}")
-            raise
-        
-        return linhas_processadas
+        return self._importar_em_lotes(arquivo, "socios", 11, [
+            expr_normalizar_codigo("col0", 8).alias("cnpj_basico"),
+            expr_normalizar_codigo("col1", 1).alias("identificador_socio"),
+            expr_limpar_string("col2").alias("nome_socio"),
+            expr_limpar_string("col3").alias("cnpj_cpf_socio"),
+            expr_normalizar_codigo("col4", 2).alias("qualificacao_socio"),
+            parse_date("col5").alias("data_entrada_sociedade"),
+            expr_normalizar_codigo("col6", 3).alias("pais"),
+            expr_normalizar_codigo("col7", 1).alias("representante_legal"),
+            expr_limpar_string("col8").alias("nome_representante"),
+            expr_normalizar_codigo("col9", 2).alias("qualificacao_representante"),
+            expr_normalizar_codigo("col10", 1).alias("faixa_etaria"),
+        ])
     
     def importar_simples(self, arquivo: Path) -> int:
-        """Importa arquivo completo de simples de uma vez (Polars vetorizado, sem iter_rows)"""
+        """Importa arquivo de simples em lotes (Polars vetorizado, sem iter_rows)"""
         logger.info(f"Importando simples de {arquivo.name}...")
-        
-        linhas_processadas = 0
-        
-        try:
-            df = ler_csv_com_encoding(arquivo, separator=';', has_header=False, 
-                                     infer_schema_length=0, ignore_errors=True)
-
-            # Renomear colunas para padrão col0, col1, ...
-            df = df.rename({name: f"col{i}" for i, name in enumerate(df.columns)})
-
-            # Garantir pelo menos 7 colunas
-            for i in range(7):
-                col_name = f"col{i}"
-                if col_name not in df.columns:
-                    df = df.with_columns(pl.lit("").alias(col_name))
-
-            default_date = date(1970, 1, 1)
-
-            def parse_date(name: str) -> pl.Expr:
-                base = pl.col(name).cast(pl.Utf8).str.strip_chars()
-                d1 = base.str.strptime(pl.Date, "%Y-%m-%d", strict=False)
-                d2 = base.str.strptime(pl.Date, "%Y%m%d", strict=False)
-                return pl.coalesce(d1, d2, pl.lit(default_date))
-
-            # Normalizações vetorizadas
-            df = df.with_columns([
-                pl.col("col0")
-                    .map_elements(lambda x: normalizar_codigo(x, 8) or "", return_dtype=pl.Utf8)
-                    .alias("cnpj_basico"),
-                pl.col("col1")
-                    .map_elements(lambda x: normalizar_codigo(x, 1) or "", return_dtype=pl.Utf8)
-                    .alias("opcao_simples"),
-                parse_date("col2").alias("data_opcao_simples"),
-                parse_date("col3").alias("data_exclusao_simples"),
-                pl.col("col4")
-                    .map_elements(lambda x: normalizar_codigo(x, 1) or "", return_dtype=pl.Utf8)
-                    .alias("opcao_mei"),
-                parse_date("col5").alias("data_opcao_mei"),
-                parse_date("col6").alias("data_exclusao_mei"),
-            ])
-
-            colunas_ordem = [
-                "cnpj_basico",
-                "opcao_simples",
-                "data_opcao_simples",
-                "data_exclusao_simples",
-                "opcao_mei",
-                "data_opcao_mei",
-                "data_exclusao_mei",
-            ]
-
-            if df.height > 0:
-                # Inserir em chunks de 500k linhas usando operações vetorizadas
-                tabela_df = df.select(colunas_ordem)
-                BATCH_SIZE = 500_000
-
-                for offset in range(0, tabela_df.height, BATCH_SIZE):
-                    chunk = tabela_df.slice(offset, BATCH_SIZE)
-                    batch = chunk.to_numpy().tolist()
-                    if not batch:
-                        continue
-                    self.client.execute("INSERT INTO simples VALUES", batch)
-                    linhas_processadas += len(batch)
-                    logger.info(f"  Inseridas {linhas_processadas:,} linhas de simples até agora...")
-        
-        except Exception as e:
-            logger.error(f"Erro ao importar {arquivo.name}: {e}")
-            raise
-        
-        return linhas_processadas
+        return self._importar_em_lotes(arquivo, "simples", 7, [
+            expr_normalizar_codigo("col0", 8).alias("cnpj_basico"),
+            expr_normalizar_codigo("col1", 1).alias("opcao_simples"),
+            parse_date("col2").alias("data_opcao_simples"),
+            parse_date("col3").alias("data_exclusao_simples"),
+            expr_normalizar_codigo("col4", 1).alias("opcao_mei"),
+            parse_date("col5").alias("data_opcao_mei"),
+            parse_date("col6").alias("data_exclusao_mei"),
+        ])
     
     def importar_dominio(self, arquivo: Path, tabela: str) -> int:
-        """Importa tabela de domínio completa de uma vez (cnaes, motivos, municipios, etc)"""
+        """Importa tabela de domínio (cnaes, motivos, municipios, etc)"""
         logger.info(f"Importando {tabela} de {arquivo.name}...")
         
-        linhas_processadas = 0
-        dados = []
-        
-        # Determinar tamanho do código baseado na tabela (conforme schema.sql)
-        codigo_size = {
-            'cnaes': 7,          # FixedString(7)
-            'motivos': 2,         # FixedString(2)
-            'municipios': 4,      # FixedString(4) - código IBGE tem 4 dígitos
-            'naturezas': 4,       # FixedString(4)
-            'paises': 3,          # FixedString(3)
-            'qualificacoes': 2    # FixedString(2)
-        }.get(tabela, 4)
+        codigo_size = CODIGO_SIZE_DOMINIO.get(tabela, 4)
         
+        linhas_processadas = self._importar_em_lotes(arquivo, tabela, 2, [
+            expr_normalizar_codigo("col0", codigo_size).alias("codigo"),
+            expr_limpar_string("col1").alias("descricao"),
+        ])
+        logger.info(f"  ✓ Importados {linhas_processadas:,} registros de {tabela} de {arquivo.name}")
+        return linhas_processadas
+
+    def importar_parquet(self, arquivo: Path, tabela: str) -> int:
+        """
+        Importa uma parte do snapshot Parquet (utilities/snapshot.py): já vem
+        normalizada, tipada e do tamanho de um lote, então vai inteira num
+        INSERT, sem CSV nem normalização
+        """
+        contagem = ContagemArquivo(problematicas=None)
+        perfil = PerfilArquivo(tabela, arquivo.name)
+        self.ultima_contagem, self.ultimo_perfil = contagem, perfil
+        caminho = arquivo.caminho if isinstance(arquivo, FonteCSV) else Path(arquivo)
         try:
-            df = ler_csv_com_encoding(arquivo, separator=';', has_header=False, 
-                                     infer_schema_length=0, ignore_errors=True)
-
-            for linha_num, row in enumerate(df.iter_rows(), start=1):
-                row = list(row)
-
-                if len(row) < 2:
-                    row.extend([''] * (2 - len(row)))
-                
-                dados.append([
-                    normalizar_codigo(row[0], codigo_size) or '',
-                    limpar_string(row[1]) or ''
-                ])
-            
-            # Inserir tudo de uma vez
-            if dados:
-                logger.info(f"  Inserindo {len(dados):,} registros no banco...")
-                try:
-                    self.client.execute(f"INSERT INTO {tabela} VALUES", dados)
-                    linhas_processadas = len(dados)
-                    logger.info(f"  ✓ Importados {linhas_processadas:,} registros de {tabela} de {arquivo.name}")
-                except Exception as e:
-                    logger.error(f"  ✗ Erro ao inserir {tabela}: {e}")
-                    raise
-        
+            with perfil.fase("leitura"):
+                df = pl.read_parquet(caminho)
+            perfil.bytes = caminho.stat().st_size
+            token = f"{self.token_arquivo}:0" if self.token_arquivo else None
+            with perfil.fase("serializacao"):
+                carga = self.insercao.serializar(f"{tabela}{self.sufixo_tabela}", df)
+            with perfil.fase("insercao"):
+                self.insercao.enviar(carga, token)
         except Exception as e:
             logger.error(f"Erro ao importar {arquivo.name}: {e}")
             raise
-        
-        return linhas_processadas
+        contagem.linhas = perfil.linhas = df.height
+        return contagem.linhas
@@ -0,0 +1,337 @@
+"""
+Gerador de dados sintéticos no formato da Receita Federal (dados abertos CNPJ).
+
+Escreve os arquivos com os mesmos nomes, encoding (latin-1), separador (;) e
+aspas da release real (*EMPRECSV, *ESTABELE, *SOCIOCSV, *SIMPLES.CSV* e as
+tabelas de domínio), com a mesma sujeira que aparece nos arquivos oficiais:
+quebras de linha dentro de campos, bytes nulos, aspas internas e datas
+inválidas. A escala vai de milhares a dezenas de milhões de estabelecimentos;
+os arquivos são gerados em streaming (memória constante) e a saída é
+determinística (mesmos parâmetros = mesmos arquivos), para comparar execuções.
+
+Estrutura gerada em <saida>:
+    data/<empresas|estabelecimentos|socios|simples|dominio>/...   (CSV)
+    downloads/Empresas0.zip, Estabelecimentos0.zip, ...           (--zip)
+
+Uso:
+    python gerar_dados_sinteticos.py --estabelecimentos 100k --saida ../bench
+    python gerar_dados_sinteticos.py --estabelecimentos 60M --zip --saida /mnt/bench
+"""
+import argparse
+import logging
+import zipfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+# Prefixo/sufixo dos nomes reais (ex.: K3241.K03200Y0.D41012.ESTABELE)
+PREFIXO = "K3241.K03200Y{parte}.D41012"
+SUFIXO_DOMINIO = "F.K03200$Z.D41012"
+
+# Proporções aproximadas da release real (por estabelecimento)
+PROPORCAO_EMPRESAS = 0.93
+PROPORCAO_SOCIOS = 0.45
+PROPORCAO_SIMPLES = 0.70
+
+LINHAS_POR_ESCRITA = 10_000
+
+UFS = [
+    "AC", "AL", "AM", "AP", "BA", "CE", "DF", "ES", "GO", "MA", "MG", "MS", "MT", "PA",
+    "PB", "PE", "PI", "PR", "RJ", "RN", "RO", "RR", "RS", "SC", "SE", "SP", "TO",
+]
+MUNICIPIOS_POR_UF = 200
+NUM_CNAES = 1300
+
+NOMES = [
+    "PADARIA SÃO JOÃO", "AÇOUGUE BOM PREÇO", "CONFECÇÕES ESTRELA", "MERCADINHO DA ESQUINA",
+    "OFICINA MECÂNICA ÁGUIA", "FARMÁCIA POPULAR", "SALÃO BELEZA PURA", "LANCHONETE CAFÉ & CIA",
+    "ESCRITÓRIO CONTÁBIL ÉTICA", "COMÉRCIO DE PEÇAS IRMÃOS", "DISTRIBUIDORA ATLÂNTICO",
+    "CONSTRUÇÕES E REFORMAS", "TRANSPORTES RÁPIDO SUL", "SOLUÇÕES EM INFORMÁTICA",
+]
+SOBRENOMES = ["SILVA", "SOUZA", "OLIVEIRA", "SANTOS", "PEREIRA", "LIMA", "GONÇALVES", "ARAÚJO", "CONCEIÇÃO"]
+TIPOS_LOGRADOURO = ["RUA", "AVENIDA", "TRAVESSA", "ESTRADA", "RODOVIA", "PRACA", "ALAMEDA"]
+LOGRADOUROS = ["DAS FLORES", "BRASIL", "SÃO PAULO", "TIRADENTES", "DOM PEDRO II", "15 DE NOVEMBRO", "JOSÉ DE ALENCAR"]
+BAIRROS = ["CENTRO", "JARDIM AMÉRICA", "VILA NOVA", "SÃO JOSÉ", "BOA VISTA", "ZONA RURAL", "INDUSTRIAL"]
+COMPLEMENTOS = ["", "", "", "SALA 1", "LOJA 2", "APTO 101", "GALPÃO B", "ANDAR 3 CONJ 31"]
+SITUACOES = ["02", "02", "02", "08", "08", "04", "03", "01"]
+MOTIVOS = ["00", "00", "01", "71", "63"]
+PORTES = ["01", "01", "03", "05", "00"]
+NATUREZAS = ["2062", "2135", "2305", "2240", "2143", "3999", "1244"]
+QUALIFICACOES = ["49", "05", "10", "16", "22"]
+DATAS_INVALIDAS = ["00000000", "20231345", "0", "99999999", "2023-02-30"]
+
+
+def _h(i: int, k: int) -> int:
+    """Hash inteiro barato e determinístico por (linha, coluna)"""
+    x = (i * 0x9E3779B1 + k * 0x85EBCA6B + 0x27D4EB2F) & 0xFFFFFFFF
+    x ^= x >> 15
+    x = (x * 0x2C1B3C6D) & 0xFFFFFFFF
+    x ^= x >> 12
+    return x
+
+
+def _pool_datas(inicio: date, dias: int) -> List[str]:
+    return [(inicio + timedelta(days=d)).strftime("%Y%m%d") for d in range(dias)]
+
+
+DATAS = _pool_datas(date(1966, 1, 1), 365 * 58)
+CNAES = [f"{1111111 + n * 6000:07d}" for n in range(NUM_CNAES)]
+
+
+def _q(valor: str) -> str:
+    """Campo entre aspas, com aspas internas duplicadas (como a Receita publica)"""
+    if '"' in valor:
+        valor = valor.replace('"', '""')
+    return f'"{valor}"'
+
+
+def _linha(campos: List[str]) -> str:
+    return ";".join(_q(c) for c in campos) + "\n"
+
+
+class Sujeira:
+    """Decide (de forma determinística) quais linhas recebem sujeira e de que tipo"""
+
+    def __init__(self, taxa: float):
+        self.limite = int(taxa * 1_000_000)
+
+    def tipo(self, i: int, k: int) -> int:
+        """0 = linha limpa; 1..4 = tipo de sujeira"""
+        if _h(i, k) % 1_000_000 >= self.limite:
+            return 0
+        return 1 + _h(i, k + 1) % 4
+
+    @staticmethod
+    def aplicar(tipo: int, texto: str, data: str):
+        """Devolve (texto, data) com a sujeira aplicada"""
+        if tipo == 1:
+            return texto + "\nFUNDOS", data          # quebra de linha dentro do campo
+        if tipo == 2:
+            return texto + "\x00", data              # byte nulo
+        if tipo == 3:
+            return f'{texto} "FILIAL"', data         # aspas internas
+        if tipo == 4:
+            return texto, DATAS_INVALIDAS[len(texto) % len(DATAS_INVALIDAS)]  # data inválida
+        return texto, data
+
+
+def linha_empresa(i: int, sujeira: Sujeira) -> str:
+    razao = f"{NOMES[_h(i, 1) % len(NOMES)]} {SOBRENOMES[_h(i, 2) % len(SOBRENOMES)]} LTDA"
+    razao, _ = sujeira.aplicar(sujeira.tipo(i, 90), razao, "")
+    capital = _h(i, 3) % 5_000_000
+    return _linha([
+        f"{i:08d}",
+        razao,
+        NATUREZAS[_h(i, 4) % len(NATUREZAS)],
+        QUALIFICACOES[_h(i, 5) % len(QUALIFICACOES)],
+        f"{capital},{_h(i, 6) % 100:02d}",
+        PORTES[_h(i, 7) % len(PORTES)],
+        "",
+    ])
+
+
+def linha_estabelecimento(i: int, empresas: int, sujeira: Sujeira) -> str:
+    basico = i % empresas
+    filial = i >= empresas
+    uf = _h(i, 10) % len(UFS)
+    nome = NOMES[_h(i, 11) % len(NOMES)] if _h(i, 12) % 10 < 6 else ""
+    data_inicio = DATAS[_h(i, 13) % len(DATAS)]
+    tipo = sujeira.tipo(i, 91)
+    nome, data_inicio = sujeira.aplicar(tipo, nome, data_inicio)
+    n_sec = _h(i, 14) % 4
+    cnae_sec = ",".join(CNAES[_h(i, 20 + n) % NUM_CNAES] for n in range(n_sec))
+    com_tel2 = _h(i, 15) % 5 == 0
+    return _linha([
+        f"{basico:08d}",
+        "0002" if filial else "0001",
+        f"{_h(i, 16) % 100:02d}",
+        "2" if filial else "1",
+        nome,
+        SITUACOES[_h(i, 17) % len(SITUACOES)],
+        DATAS[_h(i, 18) % len(DATAS)],
+        MOTIVOS[_h(i, 19) % len(MOTIVOS)],
+        "",
+        "",
+        data_inicio,
+        CNAES[_h(i, 30) % NUM_CNAES],
+        cnae_sec,
+        TIPOS_LOGRADOURO[_h(i, 31) % len(TIPOS_LOGRADOURO)],
+        LOGRADOUROS[_h(i, 32) % len(LOGRADOUROS)],
+        str(_h(i, 33) % 3000) if _h(i, 34) % 10 else "S/N",
+        COMPLEMENTOS[_h(i, 35) % len(COMPLEMENTOS)],
+        BAIRROS[_h(i, 36) % len(BAIRROS)],
+        f"{_h(i, 37) % 100_000_000:08d}",
+        UFS[uf],
+        f"{uf * MUNICIPIOS_POR_UF + _h(i, 38) % MUNICIPIOS_POR_UF:04d}",
+        f"{11 + _h(i, 39) % 89}",
+        f"{30000000 + _h(i, 40) % 70000000}",
+        f"{11 + _h(i, 41) % 89}" if com_tel2 else "",
+        f"{30000000 + _h(i, 42) % 70000000}" if com_tel2 else "",
+        "",
+        "",
+        f"CONTATO{i}@EXEMPLO.COM.BR" if _h(i, 43) % 3 else "",
+        "",
+        "",
+    ])
+
+
+def linha_socio(i: int, empresas: int, sujeira: Sujeira) -> str:
+    nome = f"{SOBRENOMES[_h(i, 50) % len(SOBRENOMES)]} {SOBRENOMES[_h(i, 51) % len(SOBRENOMES)]}"
+    data = DATAS[_h(i, 52) % len(DATAS)]
+    nome, data = sujeira.aplicar(sujeira.tipo(i, 92), nome, data)
+    return _linha([
+        f"{_h(i, 53) % empresas:08d}",
+        "2",
+        nome,
+        f"***{_h(i, 54) % 1_000_000:06d}**",
+        QUALIFICACOES[_h(i, 55) % len(QUALIFICACOES)],
+        data,
+        "",
+        "***000000**",
+        "",
+        "00",
+        str(1 + _h(i, 56) % 9),
+    ])
+
+
+def linha_simples(i: int, empresas: int, sujeira: Sujeira) -> str:
+    basico = (i * 7919) % empresas
+    _, data = sujeira.aplicar(4 if sujeira.tipo(i, 93) else 0, "", DATAS[_h(i, 60) % len(DATAS)])
+    mei = _h(i, 61) % 3 == 0
+    return _linha([
+        f"{basico:08d}",
+        "S" if _h(i, 62) % 5 else "N",
+        data,
+        "00000000",
+        "S" if mei else "N",
+        DATAS[_h(i, 63) % len(DATAS)] if mei else "00000000",
+        "00000000",
+    ])
+
+
+def linhas_dominio() -> Dict[str, List[str]]:
+    """Linhas das tabelas de domínio (coerentes com os códigos usados acima)"""
+    return {
+        "CNAECSV": [_linha([c, f"ATIVIDADE ECONÔMICA {n}"]) for n, c in enumerate(CNAES)],
+        "MOTICSV": [_linha([m, f"MOTIVO {m}"]) for m in sorted(set(MOTIVOS))],
+        "MUNICCSV": [
+            _linha([f"{n:04d}", f"MUNICÍPIO {n} - {UFS[n // MUNICIPIOS_POR_UF]}"])
+            for n in range(len(UFS) * MUNICIPIOS_POR_UF)
+        ],
+        "NATJUCSV": [_linha([n, f"NATUREZA JURÍDICA {n}"]) for n in NATUREZAS],
+        "PAISCSV": [_linha(["105", "BRASIL"]), _linha(["249", "ESTADOS UNIDOS"]), _linha(["607", "PORTUGAL"])],
+        "QUALSCSV": [_linha([q, f"QUALIFICAÇÃO {q}"]) for q in QUALIFICACOES + ["00"]],
+    }
+
+
+@contextmanager
+def _abrir_saida(saida: Path, pasta: str, membro: str, zip_nome: str, zipado: bool) -> Iterator:
+    """Abre o destino binário: CSV em data/<pasta>/ ou membro dentro de downloads/<zip_nome>"""
+    if zipado:
+        destino = saida / "downloads" / zip_nome
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
+            with zf.open(membro, "w", force_zip64=True) as f:
+                yield f
+    else:
+        destino = saida / "data" / pasta / membro
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        with open(destino, "wb", buffering=1024 * 1024) as f:
+            yield f
+
+
+def _escrever(f, gerar_linha: Callable[[int], str], inicio: int, fim: int) -> int:
+    """Escreve as linhas [inicio, fim) em blocos, codificadas em latin-1"""
+    for bloco in range(inicio, fim, LINHAS_POR_ESCRITA):
+        texto = "".join(gerar_linha(i) for i in range(bloco, min(bloco + LINHAS_POR_ESCRITA, fim)))
+        f.write(texto.encode("latin-1"))
+    return fim - inicio
+
+
+def _partes(total: int, partes: int) -> List[tuple]:
+    """Divide [0, total) em `partes` intervalos contíguos"""
+    tamanho = -(-total // partes) if total else 0
+    return [(p, p * tamanho, min(total, (p + 1) * tamanho)) for p in range(partes) if p * tamanho < total]
+
+
+def parse_escala(valor: str) -> int:
+    """Aceita 1000, 1k, 2.5M, 60M..."""
+    valor = valor.strip().upper().replace("_", "")
+    multiplicador = {"K": 1_000, "M": 1_000_000}.get(valor[-1:], 1)
+    if multiplicador > 1:
+        valor = valor[:-1]
+    return int(float(valor) * multiplicador)
+
+
+def gerar(
+    saida: Path,
+    estabelecimentos: int,
+    partes: int = 10,
+    zipado: bool = False,
+    taxa_sujeira: float = 0.001,
+) -> Dict[str, int]:
+    """Gera a release sintética completa e devolve a quantidade de linhas por tabela"""
+    saida = Path(saida)
+    sujeira = Sujeira(taxa_sujeira)
+    empresas = max(1, int(estabelecimentos * PROPORCAO_EMPRESAS))
+    socios = int(estabelecimentos * PROPORCAO_SOCIOS)
+    simples = int(estabelecimentos * PROPORCAO_SIMPLES)
+    contagens = {"empresas": 0, "estabelecimentos": 0, "socios": 0, "simples": 0}
+
+    tabelas = [
+        ("empresas", "Empresas", "EMPRECSV", empresas, lambda i: linha_empresa(i, sujeira)),
+        ("estabelecimentos", "Estabelecimentos", "ESTABELE", estabelecimentos,
+         lambda i: linha_estabelecimento(i, empresas, sujeira)),
+        ("socios", "Socios", "SOCIOCSV", socios, lambda i: linha_socio(i, empresas, sujeira)),
+    ]
+    for pasta, zip_base, sufixo, total, gerar_linha in tabelas:
+        for parte, inicio, fim in _partes(total, partes):
+            membro = f"{PREFIXO.format(parte=parte)}.{sufixo}"
+            with _abrir_saida(saida, pasta, membro, f"{zip_base}{parte}.zip", zipado) as f:
+                contagens[pasta] += _escrever(f, gerar_linha, inicio, fim)
+            logger.info("  ✓ %s (%s linhas)", membro, f"{fim - inicio:,}")
+
+    # Simples vem em um único arquivo na release real
+    membro = "F.K03200$W.SIMPLES.CSV.D41012"
+    with _abrir_saida(saida, "simples", membro, "Simples.zip", zipado) as f:
+        contagens["simples"] = _escrever(f, lambda i: linha_simples(i, empresas, sujeira), 0, simples)
+    logger.info("  ✓ %s (%s linhas)", membro, f"{simples:,}")
+
+    dominio = {
+        "CNAECSV": ("cnaes", "Cnaes.zip"), "MOTICSV": ("motivos", "Motivos.zip"),
+        "MUNICCSV": ("municipios", "Municipios.zip"), "NATJUCSV": ("naturezas", "Naturezas.zip"),
+        "PAISCSV": ("paises", "Paises.zip"), "QUALSCSV": ("qualificacoes", "Qualificacoes.zip"),
+    }
+    for sufixo, linhas in linhas_dominio().items():
+        tabela, zip_nome = dominio[sufixo]
+        membro = f"{SUFIXO_DOMINIO}.{sufixo}"
+        with _abrir_saida(saida, "dominio", membro, zip_nome, zipado) as f:
+            f.write("".join(linhas).encode("latin-1"))
+        contagens[tabela] = len(linhas)
+
+    return contagens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera uma release sintética da Receita Federal (CNPJ)")
+    parser.add_argument("--estabelecimentos", default="10k", help="quantidade de estabelecimentos (ex.: 1k, 500k, 60M)")
+    parser.add_argument("--saida", default="../bench", help="diretório de saída (padrão: ../bench)")
+    parser.add_argument("--partes", type=int, default=10, help="arquivos por tabela grande, como na release (padrão: 10)")
+    parser.add_argument("--zip", action="store_true", help="gerar ZIPs em downloads/ como a release oficial")
+    parser.add_argument("--taxa-sujeira", type=float, default=0.001,
+                        help="fração de linhas com quebra de linha, byte nulo, aspas ou data inválida (padrão: 0.001)")
+    args = parser.parse_args()
+
+    estabelecimentos = parse_escala(args.estabelecimentos)
+    logger.info("Gerando release sintética com %s estabelecimentos em %s...", f"{estabelecimentos:,}", args.saida)
+    contagens = gerar(Path(args.saida), estabelecimentos, args.partes, args.zip, args.taxa_sujeira)
+    for tabela, linhas in contagens.items():
+        logger.info("  %s: %s linhas", tabela, f"{linhas:,}")
+
+
+if __name__ == "__main__":
+    main()
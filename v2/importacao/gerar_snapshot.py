@@ -0,0 +1,5 @@
+"""Converte a release em Parquet (utilities/snapshot.py), sem carregar banco nenhum."""
+from process import executar_snapshot
+
+if __name__ == "__main__":
+    executar_snapshot()
@@ -1,15 +1,20 @@
 """Processo principal de importação - orquestra todas as etapas"""
+import json
+import multiprocessing
+import os
 import sys
+import threading
 import time
 import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
-from functions.import_csv import ClickHouseImporter
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from functions.import_csv import ClickHouseImporter, ContagemArquivo
 
 from dotenv import load_dotenv
 from utilities.output import (
     imprimir_estatisticas_finais,
-    imprimir_resumo_contagens,
     print_header,
     print_step,
 )
@@ -17,20 +22,58 @@ from utilities.clickhouse import (
     carregar_config,
     configurar_sessao_clickhouse,
     conectar_clickhouse,
-    criar_banco_e_schema,
-    limpar_banco_dados,
     verificar_importacao,
 )
-from utilities.csv_stats import contar_linhas_arquivos
-from utilities.utils import encontrar_arquivos_csv, validar_arquivo
+from utilities.finalizacao import finalizar_staging, finalizar_tabelas
+from utilities.fontes import FonteCSV, encontrar_fontes, membros_zip
+from utilities.manifesto_importacao import (
+    estado_arquivo,
+    impressao_digital,
+    registrar_arquivo,
+    retomar_importacao,
+    verificar_retomada,
+)
+from utilities.mudancas import calcular_mudancas, registrar_mudancas
+from utilities.perfil import PerfilExecucao
+from utilities.pipeline import Etapa, Pipeline
+from utilities.snapshot import (
+    EscritaParquet,
+    chave_snapshot,
+    gravar_manifesto_snapshot,
+    ler_manifesto_snapshot,
+    origem_parquet,
+    partes_snapshot,
+    pasta_snapshot,
+)
+from utilities.release import (
+    TABELAS_RELEASE,
+    ativar_release,
+    criar_tabelas_staging,
+    encerrar_deduplicacao,
+    identificar_release,
+    remover_versoes_antigas,
+    sufixo_release,
+    validar_staging,
+)
+from utilities.utils import nome_corresponde_padrao
 from utilities.config import garantir_encoding_windows, resolver_diretorios
-from utilities.downloader import baixar_arquivos_mes_atual, descompactar_arquivos
+from utilities.downloader import (
+    baixar_arquivos_mes_atual,
+    descompactar_arquivos,
+    download_file,
+    downloads_simultaneos,
+    get_target_folder,
+    listar_links_mes_atual,
+)
 
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 logger = logging.getLogger(__name__)
 
 BASE_DIR = Path(__file__).parent
 
+# Contagens por arquivo da importação (lidas por verificar_importacao)
+ARQUIVO_CONTAGENS = "contagens_importacao_{release}.json"
+
 def executar():
 
     inicio = time.time()
@@ -46,62 +89,113 @@ def executar():
     print(f"Diretório de dados: {data_dir}")
     print(f"Diretório de downloads: {downloads_dir}")
 
+    # Tempo por etapa e por fase de cada arquivo, gravado mesmo se a importação parar no meio
+    perfil = PerfilExecucao()
+    try:
+        _executar_etapas(perfil, inicio, data_dir, downloads_dir, schema_file)
+    finally:
+        perfil.salvar(downloads_dir)
+
+
+def _executar_etapas(perfil: PerfilExecucao, inicio: float, data_dir: Path,
+                     downloads_dir: Path, schema_file: Path) -> None:
+    # Padrão: download e importação em pipeline, lendo direto dos ZIPs.
+    # IMPORT_EXTRAIR_ZIP=1: etapas sequenciais com descompactação em data/.
+    # As linhas (válidas e problemáticas) são contadas na própria importação.
+    extrair = extrair_zips() and not origem_parquet()
+    total = 7 if extrair else 5
+
     # Etapa 1: Conectar ao ClickHouse
-    print_step(1, 7, "Conectando ao ClickHouse")
+    print_step(1, total, "Conectando ao ClickHouse")
+    perfil.etapa("conexao")
     config = carregar_config()
     client = conectar_clickhouse(config)
 
-    # Etapa 2: Download de arquivos
-    print_step(2, 7, "Download de Arquivos")
-    garantir_downloads(downloads_dir)
+    # Etapa 2: Tabelas de staging da release (as de produção seguem servindo a API)
+    print_step(2, total, "Preparação das Tabelas de Staging")
+    perfil.etapa("staging")
+    release = identificar_release()
+    perfil.release = release
+    sufixo = sufixo_release(release)
+    remover_versoes_antigas(client, release)
+    # Execução anterior interrompida: mantém a staging e pula os arquivos concluídos
+    if not criar_tabelas_staging(client, schema_file, release, retomar=retomar_importacao()):
+        logger.error("✗ Falha ao criar as tabelas de staging. Abortando importação.")
+        return
+    configurar_sessao_clickhouse(client)
 
-    # Etapa 3: Descompactação de arquivos
-    print_step(3, 7, "Descompactação de Arquivos")
-    garantir_descompactacao(downloads_dir, data_dir)
+    if origem_parquet():
+        # CSVs convertidos uma vez em Parquet (só os que faltam); a carga lê só o Parquet
+        print_step(3, total, "Snapshot Parquet e Importação")
+        perfil.etapa("snapshot")
+        pasta = preparar_snapshot(downloads_dir, data_dir, release)
+        if pasta is None:
+            return
+        perfil.etapa("importacao")
+        resumo = executar_importacoes(client, pasta, sufixo_tabela=sufixo, release=release, parquet=True)
+    elif extrair:
+        print_step(3, total, "Download de Arquivos")
+        perfil.etapa("download")
+        garantir_downloads(downloads_dir)
 
-    # Etapa 4: Contagem de linhas dos arquivos CSV (comentado para testes)
-    print_step(4, 7, "Contagem de Linhas dos Arquivos CSV")
-    contagens_csv = contar_linhas_arquivos(data_dir)
-    imprimir_resumo_contagens(contagens_csv)
+        print_step(4, total, "Descompactação de Arquivos")
+        perfil.etapa("descompactacao")
+        garantir_descompactacao(downloads_dir, data_dir)
 
-    # Etapa 5: Preparação do banco de dados
-    print_step(5, 7, "Preparação do Banco de Dados")
-    logger.info("Removendo completamente todas as tabelas existentes...")
-    if not limpar_banco_dados(client):
-        logger.error("✗ Falha ao limpar banco de dados. Abortando importação.")
-        return
-    
-    # Verificar que o banco está realmente vazio
-    try:
-        tabelas_existentes = client.execute("SHOW TABLES")
-        if tabelas_existentes:
-            logger.warning("⚠ Ainda existem tabelas no banco: %s", [t[0] for t in tabelas_existentes])
-            logger.warning("  Tentando remover novamente...")
-            if not limpar_banco_dados(client):
-                logger.error("✗ Falha ao limpar banco de dados na segunda tentativa. Abortando importação.")
-                return
-    except Exception as exc:
-        # Se der erro ao verificar, pode ser que o banco não exista ainda - isso é OK
-        logger.debug("Banco pode não existir ainda: %s", exc)
-    
-    logger.info("Criando banco de dados e schema do zero...")
-    criar_banco_e_schema(client, schema_file)
-    configurar_sessao_clickhouse(client)
+        print_step(5, total, "Importação de Dados")
+        perfil.etapa("importacao")
+        resumo = executar_importacoes(client, data_dir, sufixo_tabela=sufixo, release=release)
+    else:
+        # Cada ZIP é importado assim que termina de baixar
+        print_step(3, total, "Download e Importação (pipeline)")
+        perfil.etapa("download_e_importacao")
+        resumo = importar_em_pipeline(client, downloads_dir, sufixo_tabela=sufixo, release=release)
+        if not resumo.totais and listar_tarefas(data_dir):
+            logger.info("Nenhum ZIP disponível; importando os CSVs já extraídos em %s", data_dir)
+            resumo = executar_importacoes(client, data_dir, sufixo_tabela=sufixo, release=release)
+    perfil.registrar_arquivos(resumo.perfis)
+    perfil.pipeline = resumo.pipeline
+    resumo.salvar(downloads_dir / ARQUIVO_CONTAGENS.format(release=release))
 
-    # Etapa 6: Importação de dados
-    print_step(6, 7, "Importação de Dados")
-    executar_importacoes(client, data_dir)
+    # Penúltima etapa: validar a staging e trocar pelas tabelas de produção
+    print_step(total - 1, total, "Validação, Otimização e Troca da Release")
+    perfil.etapa("validacao")
+    if resumo.erros:
+        logger.error("✗ %s arquivo(s) com erro: release %s não ativada, produção segue inalterada",
+                     len(resumo.erros), release)
+        return
+    if not validar_staging(client, release):
+        logger.error("✗ Validação falhou: release %s não ativada, produção segue inalterada", release)
+        return
+    # Carga validada: a janela de deduplicação da retomada não vai para a produção
+    encerrar_deduplicacao(client, release)
+    # Merges e índices resolvidos antes da troca, não com a API já lendo a release
+    if finalizar_tabelas():
+        perfil.etapa("finalizacao")
+        finalizar_staging(client, [f"{tabela}{sufixo}" for tabela in TABELAS_RELEASE])
+    # Feed de mudanças (tabela `changes`): staging x produção, antes da troca
+    if calcular_mudancas():
+        perfil.etapa("mudancas")
+        registrar_mudancas(client, release)
+    perfil.etapa("ativacao")
+    ativar_release(client, release)
 
-    # Etapa 7: Verificação final
-    print_step(7, 7, "Verificação Final")
-    verificar_importacao(client, contagens_csv)
+    # Última etapa: Verificação final
+    print_step(total, total, "Verificação Final")
+    perfil.etapa("verificacao")
+    verificar_importacao(client, resumo.contagens())
     imprimir_estatisticas_finais(client, config.database, inicio)
 
 
+def downloads_interrompidos(downloads_dir: Path) -> bool:
+    """Há downloads parciais (.part) de uma execução anterior a retomar"""
+    return any(downloads_dir.glob("*.zip.part"))
+
+
 def garantir_downloads(downloads_dir: Path) -> None:
-    """Garante que os arquivos foram baixados"""
+    """Garante que os arquivos foram baixados (downloads interrompidos são retomados)"""
     zip_files = list(downloads_dir.glob("*.zip"))
-    if zip_files:
+    if zip_files and not downloads_interrompidos(downloads_dir):
         logger.info("✓ Encontrados %s arquivos ZIP já baixados", len(zip_files))
         return
 
@@ -112,6 +206,11 @@ def garantir_downloads(downloads_dir: Path) -> None:
         logger.warning("⚠ Nenhum arquivo foi baixado")
 
 
+def extrair_zips() -> bool:
+    """IMPORT_EXTRAIR_ZIP=1 descompacta em data/ antes de importar (padrão: ler direto dos ZIPs)"""
+    return os.getenv("IMPORT_EXTRAIR_ZIP", "0").lower() in ("1", "true", "sim")
+
+
 def garantir_descompactacao(downloads_dir: Path, data_dir: Path) -> None:
     """Garante que os arquivos foram descompactados"""
     subdirs = ["dominio", "empresas", "estabelecimentos", "socios", "simples"]
@@ -126,58 +225,457 @@ def garantir_descompactacao(downloads_dir: Path, data_dir: Path) -> None:
         logger.warning("⚠ Nenhum arquivo foi descompactado")
 
 
-def executar_importacoes(client, data_dir: Path) -> None:
-    """Executa todas as importações de dados"""
-    importer = ClickHouseImporter(client)
+DOMINIO_TABELAS = {
+    "CNAE": "cnaes",
+    "MOTI": "motivos",
+    "MUNIC": "municipios",
+    "NATJU": "naturezas",
+    "PAIS": "paises",
+    "QUALS": "qualificacoes",
+}
 
-    # Comentado para teste - importação de domínio
-    logger.info("\n📋 Importando tabelas de domínio...")
-    dominio_tabelas = {
-        "CNAE": "cnaes",
-        "MOTI": "motivos",
-        "MUNIC": "municipios",
-        "NATJU": "naturezas",
-        "PAIS": "paises",
-        "QUALS": "qualificacoes",
-    }
-    for padrao, tabela in dominio_tabelas.items():
-        for arquivo in encontrar_arquivos_csv(data_dir, padrao):
-            if validar_arquivo(arquivo):
-                try:
-                    importer.importar_dominio(arquivo, tabela)
-                except Exception as exc:
-                    logger.error("✗ Erro ao importar %s: %s", arquivo.name, exc)
-
-    # Comentado para teste - importação de empresas
-    logger.info("\n🏢 Importando empresas...")
-    importar_lista(importer.importar_empresas, data_dir, "EMPRE")
-
-    logger.info("\n🏪 Importando estabelecimentos...")
-    importar_lista(importer.importar_estabelecimentos, data_dir, "ESTABELE")
-
-    logger.info("\n👥 Importando sócios...")
-    importar_lista(importer.importar_socios, data_dir, "SOCIO")
-
-    logger.info("\n📄 Importando simples...")
-    for arquivo in encontrar_arquivos_csv(data_dir, "SIMPLES"):
-        if validar_arquivo(arquivo):
-            try:
-                importer.importar_simples(arquivo)
-            except Exception as exc:
-                logger.error("✗ Erro ao importar %s: %s", arquivo.name, exc)
-
-
-def importar_lista(func_import, data_dir: Path, padrao: str) -> None:
-    """Importa uma lista de arquivos do mesmo tipo"""
-    arquivos = encontrar_arquivos_csv(data_dir, padrao)
-    total = 0
-    for idx, arquivo in enumerate(arquivos, 1):
-        if not validar_arquivo(arquivo):
-            continue
+# Tabela -> (padrão dos arquivos, método do ClickHouseImporter)
+TABELAS_GRANDES = {
+    "empresas": ("EMPRE", "importar_empresas"),
+    "estabelecimentos": ("ESTABELE", "importar_estabelecimentos"),
+    "socios": ("SOCIO", "importar_socios"),
+    "simples": ("SIMPLES", "importar_simples"),
+}
+
+# Importador do processo worker (uma conexão ClickHouse por worker) e a release
+# cujo manifesto ele atualiza
+_importer_worker: Optional[ClickHouseImporter] = None
+_release_worker: Optional[str] = None
+
+
+def _inicializar_worker(sufixo_tabela: str = "", release: Optional[str] = None, processos: int = 1) -> None:
+    """Initializer do pool: abre a conexão e o importador deste worker"""
+    global _importer_worker, _release_worker
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    client = conectar_clickhouse(carregar_config())
+    configurar_sessao_clickhouse(client)
+    # O orçamento de memória (IMPORT_MEMORIA_MB) é dividido entre os workers
+    _importer_worker = ClickHouseImporter(client, sufixo_tabela=sufixo_tabela, processos=processos)
+    _release_worker = release
+
+
+def _argumentos(metodo: str, arquivo: FonteCSV, tabela: str) -> tuple:
+    # importar_dominio e importar_parquet servem a várias tabelas
+    return (arquivo, tabela) if metodo in ("importar_dominio", "importar_parquet") else (arquivo,)
+
+
+def _importar_com_manifesto(importer: ClickHouseImporter, release: str, tabela: str,
+                            metodo: str, arquivo: FonteCSV) -> ContagemArquivo:
+    """
+    Pula o arquivo se o manifesto da release já o tem como concluído; senão
+    o marca como em andamento e importa com tokens de deduplicação, de modo
+    que uma tentativa anterior interrompida no meio não duplique lotes.
+    """
+    impressao = impressao_digital(arquivo)
+    estado = estado_arquivo(importer.client, release, tabela, arquivo.name)
+    # Tamanho dos lotes fixado para o arquivo (o de antes, se foi interrompido)
+    anterior = estado.configuracao if estado is not None and not estado.concluido else None
+    configuracao = importer.planejar_arquivo(tabela, anterior)
+    verificar_retomada(estado, arquivo.name, impressao, configuracao)
+    if estado is not None and estado.concluido:
+        importer.lote_arquivo = None
+        logger.info("  ↷ %s já importado nesta release (%s linhas), pulando", arquivo.name, f"{estado.linhas:,}")
+        return ContagemArquivo(estado.linhas, estado.problematicas)
+    if estado is not None:
+        logger.info("  ↻ %s interrompido na execução anterior: lotes já inseridos serão descartados", arquivo.name)
+
+    registrar_arquivo(importer.client, release, tabela, arquivo.name, impressao, configuracao, "importando")
+    importer.token_arquivo = f"{tabela}:{arquivo.name}:{impressao}"
+    try:
+        getattr(importer, metodo)(*_argumentos(metodo, arquivo, tabela))
+    finally:
+        importer.token_arquivo = None
+        importer.lote_arquivo = None
+    contagem = importer.ultima_contagem
+    registrar_arquivo(importer.client, release, tabela, arquivo.name, impressao, configuracao,
+                      "concluido", contagem.linhas, contagem.problematicas)
+    return contagem
+
+
+def _importar_arquivo(tabela: str, metodo: str, arquivo: FonteCSV,
+                      importer: Optional[ClickHouseImporter] = None,
+                      release: Optional[str] = None
+                      ) -> Tuple[str, FonteCSV, ContagemArquivo, Optional[str], Optional[dict]]:
+    """
+    Importa um arquivo; erro fica restrito ao arquivo e volta como texto.
+    Com `release` (ou a do worker), registra o arquivo no manifesto da release.
+    O último item é o perfil do arquivo (None se foi pulado ou falhou).
+    """
+    importer = importer or _importer_worker
+    release = release or _release_worker
+    importer.ultimo_perfil = None
+    try:
+        if release:
+            contagem = _importar_com_manifesto(importer, release, tabela, metodo, arquivo)
+        else:
+            getattr(importer, metodo)(*_argumentos(metodo, arquivo, tabela))
+            contagem = importer.ultima_contagem
+        perfil = importer.ultimo_perfil.resumo() if importer.ultimo_perfil else None
+        return tabela, arquivo, contagem, None, perfil
+    except Exception as exc:
+        return tabela, arquivo, ContagemArquivo(), f"{type(exc).__name__}: {exc}", None
+
+
+def _tarefas(fontes_do_padrao: Callable[[str], List[FonteCSV]],
+             tabelas: Optional[List[str]]) -> List[Tuple[str, str, FonteCSV]]:
+    tarefas = []
+    for padrao, tabela in DOMINIO_TABELAS.items():
+        if tabelas is None or tabela in tabelas or "dominio" in tabelas:
+            tarefas += [(tabela, "importar_dominio", f) for f in fontes_do_padrao(padrao)]
+    for tabela, (padrao, metodo) in TABELAS_GRANDES.items():
+        if tabelas is None or tabela in tabelas:
+            tarefas += [(tabela, metodo, f) for f in fontes_do_padrao(padrao)]
+    return tarefas
+
+
+def listar_tarefas(origem: Path, tabelas: Optional[List[str]] = None,
+                   ler_zip: bool = False) -> List[Tuple[str, str, FonteCSV]]:
+    """
+    Arquivos a importar como (tabela, método, fonte), maiores primeiro para
+    equilibrar o pool. tabelas=None importa tudo (domínio incluído).
+    `origem` é data/ (CSVs extraídos) ou, com ler_zip, a pasta dos ZIPs.
+    """
+    tarefas = _tarefas(lambda padrao: encontrar_fontes(origem, padrao, ler_zip), tabelas)
+    return sorted(tarefas, key=lambda t: t[2].tamanho, reverse=True)
+
+
+def tarefas_snapshot(pasta: Path, tabelas: Optional[List[str]] = None) -> List[Tuple[str, str, FonteCSV]]:
+    """Tarefas (tabela, "importar_parquet", parte) do snapshot Parquet, maiores primeiro"""
+    tarefas = [(tabela, "importar_parquet", FonteCSV(parte)) for tabela, parte in partes_snapshot(pasta, tabelas)]
+    return sorted(tarefas, key=lambda t: t[2].tamanho, reverse=True)
+
+
+def tarefas_do_zip(zip_path: Path, tabelas: Optional[List[str]] = None) -> List[Tuple[str, str, FonteCSV]]:
+    """Tarefas (tabela, método, fonte) dos CSVs de um único ZIP"""
+    membros = membros_zip(zip_path)
+    return _tarefas(lambda padrao: [f for f in membros if nome_corresponde_padrao(f.name, padrao)], tabelas)
+
+
+def numero_workers() -> int:
+    """Grau de paralelismo (IMPORT_WORKERS); padrão: até 4, limitado pelos núcleos"""
+    valor = os.getenv("IMPORT_WORKERS")
+    if valor:
+        return max(1, int(valor))
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def _pool_importacao(workers: int, sufixo_tabela: str = "", release: Optional[str] = None) -> ProcessPoolExecutor:
+    # spawn: não herdar o pool de threads do Polars nem a conexão do processo pai
+    contexto = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=contexto,
+                               initializer=_inicializar_worker, initargs=(sufixo_tabela, release, workers))
+
+
+class ResumoImportacao:
+    """
+    Linhas por tabela e por arquivo (contadas na importação) e erros por
+    arquivo, com log de progresso (seguro entre threads)
+    """
+
+    def __init__(self, total: Optional[int] = None):
+        self.total = total
+        self.totais: Dict[str, int] = {}
+        self.arquivos: Dict[str, List[dict]] = {}  # tabela -> [{nome, linhas, problematicas}]
+        self.erros: List[Tuple[str, str]] = []  # (arquivo, erro)
+        self.perfis: List[dict] = []  # tempo por fase de cada arquivo (utilities/perfil.py)
+        self.pipeline: Dict[str, dict] = {}  # etapa do pipeline -> itens e tempo ocupado
+        self.concluidos = 0
+        self._trava = threading.Lock()
+
+    def registrar(self, resultado: Tuple[str, FonteCSV, ContagemArquivo, Optional[str], Optional[dict]]) -> None:
+        tabela, arquivo, contagem, erro, perfil = resultado
+        with self._trava:
+            if perfil:
+                self.perfis.append(perfil)
+            self.concluidos += 1
+            progresso = f"{self.concluidos}/{self.total}" if self.total else f"{self.concluidos}"
+            self.totais[tabela] = self.totais.get(tabela, 0) + contagem.linhas
+            if erro:
+                self.erros.append((arquivo.name, erro))
+                logger.error("  ✗ [%s] %s: %s", progresso, arquivo.name, erro)
+                return
+            self.arquivos.setdefault(tabela, []).append(
+                {"nome": arquivo.name, "linhas": contagem.linhas, "problematicas": contagem.problematicas}
+            )
+            problematicas = f", {contagem.problematicas:,} problemáticas" if contagem.problematicas else ""
+            logger.info(
+                "  ✓ [%s] %s (%s): %s linhas%s, total %s: %s",
+                progresso, arquivo.name, tabela, f"{contagem.linhas:,}", problematicas,
+                tabela, f"{self.totais[tabela]:,}",
+            )
+
+    def contagens(self) -> Dict[str, dict]:
+        """
+        Por tabela: linhas inseridas, problemáticas (campos a menos; None se
+        algum arquivo foi pelo modo servidor) e a lista de arquivos
+        """
+        contagens = {}
+        for tabela, arquivos in self.arquivos.items():
+            problematicas = [a["problematicas"] for a in arquivos]
+            contagens[tabela] = {
+                "linhas": sum(a["linhas"] for a in arquivos),
+                "problematicas": None if None in problematicas else sum(problematicas),
+                "arquivos": arquivos,
+            }
+        return contagens
+
+    def salvar(self, caminho: Path) -> None:
+        """Grava as contagens por arquivo e os erros em JSON"""
+        dados = {"contagens": self.contagens(), "erros": [list(e) for e in self.erros]}
         try:
-            logger.info("  [%s/%s] %s", idx, len(arquivos), arquivo.name)
-            linhas = func_import(arquivo)
-            total += linhas
-            logger.info("  ✓ Total acumulado: %s", f"{total:,}")
-        except Exception as exc:
-            logger.error("  ✗ Erro ao importar %s: %s", arquivo.name, exc)
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            caminho.write_text(json.dumps(dados, indent=1, ensure_ascii=False), encoding="utf-8")
+            logger.info("  Contagens por arquivo gravadas em %s", caminho)
+        except OSError as exc:
+            logger.warning("⚠ Não foi possível gravar as contagens em %s: %s", caminho, exc)
+
+    def imprimir(self) -> None:
+        for tabela, dados in self.contagens().items():
+            problematicas = dados["problematicas"]
+            detalhe = "" if problematicas is None else f" ({problematicas:,} problemáticas)"
+            logger.info("  %s: %s linhas%s", tabela, f"{dados['linhas']:,}", detalhe)
+        if self.erros:
+            logger.error("✗ %s arquivo(s) com erro:", len(self.erros))
+            for arquivo, erro in self.erros:
+                logger.error("    %s: %s", arquivo, erro)
+
+
+def executar_importacoes(client, origem: Path, tabelas: Optional[List[str]] = None,
+                         workers: Optional[int] = None, ler_zip: bool = False,
+                         sufixo_tabela: str = "", release: Optional[str] = None,
+                         parquet: bool = False) -> ResumoImportacao:
+    """
+    Importa todos os arquivos em um pool de processos (IMPORT_WORKERS), cada
+    worker com a própria conexão. Arquivos de tabelas diferentes rodam em
+    paralelo; a falha de um arquivo é registrada e não interrompe os demais.
+    Com 1 worker, importa no próprio processo usando `client`.
+    Com ler_zip, `origem` é a pasta dos ZIPs e cada CSV é lido de dentro do ZIP;
+    com parquet, `origem` é o snapshot da release e cada parte vira um INSERT.
+    sufixo_tabela grava nas tabelas de staging da release (utilities/release.py);
+    com `release`, cada arquivo passa pelo manifesto (utilities/manifesto_importacao.py).
+    Retorna o resumo (linhas por tabela e arquivos com erro).
+    """
+    workers = workers or numero_workers()
+    tarefas = tarefas_snapshot(origem, tabelas) if parquet else listar_tarefas(origem, tabelas, ler_zip)
+    if not tarefas:
+        logger.warning("⚠ Nenhum arquivo encontrado para importar em %s", origem)
+        return ResumoImportacao(0)
+
+    logger.info("\n📦 Importando %s arquivos com %s worker(s)...", len(tarefas), workers)
+    resumo = ResumoImportacao(len(tarefas))
+
+    if workers == 1:
+        importer = ClickHouseImporter(client, sufixo_tabela=sufixo_tabela)
+        for tabela, metodo, arquivo in tarefas:
+            resumo.registrar(_importar_arquivo(tabela, metodo, arquivo, importer, release))
+    else:
+        with _pool_importacao(workers, sufixo_tabela, release) as pool:
+            futuros = [pool.submit(_importar_arquivo, *tarefa) for tarefa in tarefas]
+            for futuro in as_completed(futuros):
+                resumo.registrar(futuro.result())
+
+    resumo.imprimir()
+    return resumo
+
+
+def entradas_pipeline(downloads_dir: Path) -> List[Union[Path, str]]:
+    """
+    ZIPs já baixados (maiores primeiro) ou, se não houver nenhum, as URLs da
+    release com os arquivos de domínio (pequenos) na frente.
+    """
+    zips = list(downloads_dir.glob("*.zip"))
+    if zips and not downloads_interrompidos(downloads_dir):
+        logger.info("✓ Encontrados %s arquivos ZIP já baixados", len(zips))
+        return sorted(zips, key=lambda z: z.stat().st_size, reverse=True)
+    links = listar_links_mes_atual()
+    return sorted(links, key=lambda url: get_target_folder(url.split("/")[-1], Path()).name != "dominio")
+
+
+def importar_em_pipeline(client, downloads_dir: Path, tabelas: Optional[List[str]] = None,
+                         workers: Optional[int] = None,
+                         download_workers: Optional[int] = None,
+                         sufixo_tabela: str = "", release: Optional[str] = None) -> ResumoImportacao:
+    """
+    Download -> listagem do ZIP -> importação em pipeline (utilities/pipeline.py):
+    cada ZIP começa a ser importado assim que termina de baixar, enquanto os
+    demais continuam baixando. A descompactação acontece em streaming dentro
+    da importação (FonteCSV). Concorrência por etapa: IMPORT_DOWNLOAD_WORKERS
+    downloads e IMPORT_WORKERS importações (pool de processos).
+    sufixo_tabela grava nas tabelas de staging da release (utilities/release.py);
+    com `release`, cada arquivo passa pelo manifesto (utilities/manifesto_importacao.py).
+    Retorna o resumo (linhas por tabela e arquivos com erro).
+    """
+    workers = workers or numero_workers()
+    download_workers = download_workers or downloads_simultaneos()
+    entradas = entradas_pipeline(downloads_dir)
+    if not entradas:
+        logger.warning("⚠ Nenhum ZIP encontrado em %s nem na Receita Federal", downloads_dir)
+        return ResumoImportacao()
+
+    resumo = ResumoImportacao()
+
+    def baixar(item: Union[Path, str]) -> List[Path]:
+        if isinstance(item, Path):
+            return [item]
+        downloads_dir.mkdir(parents=True, exist_ok=True)
+        if not download_file(item, downloads_dir, progresso=False):
+            raise RuntimeError(f"falha no download de {item}")
+        return [downloads_dir / item.split("/")[-1]]
+
+    def listar(zip_path: Path) -> List[Tuple[str, str, FonteCSV]]:
+        tarefas = tarefas_do_zip(zip_path, tabelas)
+        if not tarefas:
+            logger.info("  %s: nenhum CSV a importar", zip_path.name)
+        return tarefas
+
+    logger.info(
+        "\n📦 Pipeline com %s ZIPs: %s download(s) e %s importação(ões) simultâneos...",
+        len(entradas), download_workers, workers,
+    )
+    pool = _pool_importacao(workers, sufixo_tabela, release) if workers > 1 else None
+    importer = None if pool else ClickHouseImporter(client, sufixo_tabela=sufixo_tabela)
+
+    def importar(tarefa: Tuple[str, str, FonteCSV]) -> List:
+        if pool:
+            resultado = pool.submit(_importar_arquivo, *tarefa).result()
+        else:
+            resultado = _importar_arquivo(*tarefa, importer, release)
+        resumo.registrar(resultado)
+        return []
+
+    pipeline = Pipeline([
+        Etapa("download", baixar, workers=download_workers),
+        Etapa("listagem", listar),
+        Etapa("importacao", importar, workers=workers),
+    ])
+    try:
+        _, stats = pipeline.executar(entradas)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    resumo.pipeline = {
+        nome: {"workers": stat.workers, "itens": stat.itens, "segundos_ocupado": round(stat.segundos_ocupado, 3)}
+        for nome, stat in stats.items()
+    }
+    # ZIPs que não chegaram à importação (download ou leitura) também contam como erro
+    for item, erro in stats["download"].erros + stats["listagem"].erros:
+        resumo.erros.append((str(item).split("/")[-1], erro))
+    resumo.imprimir()
+    return resumo
+
+
+def _inicializar_worker_snapshot(pasta: Path, processos: int = 1) -> None:
+    """Initializer do pool da conversão: importador que escreve Parquet em vez de inserir (sem conexão)"""
+    global _importer_worker
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    _importer_worker = ClickHouseImporter(None, insercao=EscritaParquet(pasta), tabelas_servidor=[],
+                                          processos=processos)
+
+
+def _converter_arquivo(tabela: str, metodo: str, arquivo: FonteCSV,
+                       importer: Optional[ClickHouseImporter] = None) -> tuple:
+    """
+    Converte um CSV em partes Parquet; como em _importar_arquivo, o erro fica
+    restrito ao arquivo. Além do resultado de _importar_arquivo, devolve os
+    nomes das partes escritas.
+    """
+    importer = importer or _importer_worker
+    escrita = importer.insercao
+    importer.ultimo_perfil = None
+    try:
+        escrita.iniciar(tabela, arquivo.name)
+        getattr(importer, metodo)(*_argumentos(metodo, arquivo, tabela))
+        perfil = importer.ultimo_perfil.resumo() if importer.ultimo_perfil else None
+        return tabela, arquivo, importer.ultima_contagem, None, perfil, [parte.name for parte in escrita.partes]
+    except Exception as exc:
+        return tabela, arquivo, ContagemArquivo(), f"{type(exc).__name__}: {exc}", None, []
+
+
+def gerar_snapshot(origem: Path, pasta: Path, release: str, tabelas: Optional[List[str]] = None,
+                   ler_zip: bool = False, workers: Optional[int] = None) -> ResumoImportacao:
+    """
+    Converte os CSVs de `origem` (pasta dos ZIPs, com ler_zip, ou data/) no
+    snapshot Parquet em `pasta` (utilities/snapshot.py), com um pool de
+    processos como a importação. CSVs já convertidos com a mesma impressão
+    digital são pulados; o manifesto do snapshot é gravado a cada CSV.
+    """
+    workers = workers or numero_workers()
+    manifesto = ler_manifesto_snapshot(pasta)
+    manifesto["release"] = release
+    pendentes = []
+    for tabela, metodo, arquivo in listar_tarefas(origem, tabelas, ler_zip):
+        anterior = manifesto["arquivos"].get(chave_snapshot(tabela, arquivo.name))
+        if anterior is None or anterior["impressao"] != impressao_digital(arquivo):
+            pendentes.append((tabela, metodo, arquivo))
+    logger.info("\n🗜 Snapshot Parquet em %s: %s CSV(s) a converter, %s já convertido(s)",
+                pasta, len(pendentes), len(manifesto["arquivos"]))
+    resumo = ResumoImportacao(len(pendentes))
+
+    def registrar(resultado: tuple) -> None:
+        tabela, arquivo, contagem, erro, _, partes = resultado
+        resumo.registrar(resultado[:5])
+        if erro is None:
+            manifesto["arquivos"][chave_snapshot(tabela, arquivo.name)] = {
+                "tabela": tabela,
+                "csv": arquivo.name,
+                "impressao": impressao_digital(arquivo),
+                "linhas": contagem.linhas,
+                "problematicas": contagem.problematicas,
+                "partes": partes,
+            }
+            gravar_manifesto_snapshot(pasta, manifesto)
+
+    if workers == 1 or len(pendentes) <= 1:
+        importer = ClickHouseImporter(None, insercao=EscritaParquet(pasta), tabelas_servidor=[])
+        for tarefa in pendentes:
+            registrar(_converter_arquivo(*tarefa, importer))
+    else:
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=contexto,
+                                 initializer=_inicializar_worker_snapshot, initargs=(pasta, workers)) as pool:
+            futuros = [pool.submit(_converter_arquivo, *tarefa) for tarefa in pendentes]
+            for futuro in as_completed(futuros):
+                registrar(futuro.result())
+
+    resumo.imprimir()
+    return resumo
+
+
+def preparar_snapshot(downloads_dir: Path, data_dir: Path, release: str) -> Optional[Path]:
+    """
+    Deixa o snapshot da release pronto para carregar: converte o que faltar a
+    partir dos ZIPs em downloads/ (ou dos CSVs extraídos em data/), baixando
+    a release se não houver nenhum dos dois nem snapshot. None se algum CSV
+    não pôde ser convertido.
+    """
+    pasta = pasta_snapshot(downloads_dir, release)
+    ler_zip = any(downloads_dir.glob("*.zip"))
+    if not ler_zip and not listar_tarefas(data_dir) and not partes_snapshot(pasta):
+        garantir_downloads(downloads_dir)
+        ler_zip = True
+    resumo = gerar_snapshot(downloads_dir if ler_zip else data_dir, pasta, release, ler_zip=ler_zip)
+    if resumo.erros:
+        logger.error("✗ %s CSV(s) não convertido(s): snapshot da release %s incompleto", len(resumo.erros), release)
+        return None
+    return pasta
+
+
+def executar_snapshot() -> None:
+    """Só a conversão da release em Parquet (gerar_snapshot.py), sem conectar a banco nenhum"""
+    load_dotenv()
+    garantir_encoding_windows()
+    data_dir, downloads_dir = resolver_diretorios(BASE_DIR)
+    release = identificar_release()
+
+    print_header("SNAPSHOT PARQUET DA RELEASE")
+    print(f"Data/Hora: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"Release: {release}")
+    pasta = preparar_snapshot(downloads_dir, data_dir, release)
+    if pasta:
+        logger.info("✓ Snapshot da release %s em %s", release, pasta)
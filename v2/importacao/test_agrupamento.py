@@ -0,0 +1,121 @@
+"""
+Testes do agrupamento dos lotes por partição e ORDER BY (utilities/agrupamento.py).
+
+Verifica que nenhuma linha se perde ou duplica, que os INSERTs do meio do
+arquivo têm uma partição só e saem ordenados, que o buffer respeita o
+limite de linhas, que as sobras do fim vão em INSERTs com no máximo
+MAX_PARTICOES_POR_INSERT partições e que o resultado é determinístico.
+
+Uso:
+    python test_agrupamento.py
+"""
+import random
+import sys
+from datetime import date, timedelta
+
+import polars as pl
+
+from apoio_testes import executar_testes
+from utilities.agrupamento import MAX_PARTICOES_POR_INSERT, AgrupadorLotes
+
+ORDEM = ["uf", "municipio", "cnae_fiscal", "cnpj"]
+
+
+def _estabelecimentos(linhas: int, semente: int) -> pl.DataFrame:
+    rnd = random.Random(semente)
+    # Meses concentrados nos anos recentes, como na base real
+    datas = [date(2024, 12, 1) - timedelta(days=int(rnd.expovariate(1 / 2000))) for _ in range(linhas)]
+    return pl.DataFrame({
+        "cnpj": [f"{rnd.randrange(10 ** 14):014d}" for _ in range(linhas)],
+        "uf": [rnd.choice(["SP", "RJ", "MG", "BA"]) for _ in range(linhas)],
+        "municipio": [f"{rnd.randrange(50):04d}" for _ in range(linhas)],
+        "cnae_fiscal": [f"{rnd.randrange(300):07d}" for _ in range(linhas)],
+        "data_inicio": datas,
+    })
+
+
+def _blocos(semente: int = 1):
+    return [_estabelecimentos(3_000, semente * 100 + i) for i in range(8)]
+
+
+def _particoes(df: pl.DataFrame) -> set:
+    return set((df["data_inicio"].dt.year() * 100 + df["data_inicio"].dt.month()).to_list())
+
+
+def _agrupar(blocos, tamanho: int = 1_000, limite: int = 4_000):
+    agrupador = AgrupadorLotes("estabelecimentos", tamanho, limite)
+    meio, maior_buffer = [], 0
+    for bloco in blocos:
+        meio += agrupador.adicionar(bloco)
+        maior_buffer = max(maior_buffer, agrupador.linhas_guardadas)
+    return meio, agrupador.finalizar(), maior_buffer
+
+
+def test_sem_perda_nem_duplicacao():
+    blocos = _blocos()
+    meio, fim, _ = _agrupar(blocos)
+    entrada = pl.concat(blocos).sort(pl.all())
+    saida = pl.concat(meio + fim).sort(pl.all())
+    assert saida.columns == blocos[0].columns, saida.columns
+    assert entrada.equals(saida)
+
+
+def test_inserts_por_particao_e_ordenados():
+    meio, fim, _ = _agrupar(_blocos())
+    assert meio, "nenhum INSERT antes do fim do arquivo"
+    for df in meio:
+        assert len(_particoes(df)) == 1, _particoes(df)
+        assert df.height <= 1_000
+        assert df.equals(df.sort(ORDEM, maintain_order=True)), "INSERT fora da ordem do ORDER BY"
+    for df in fim:
+        assert df.height <= 1_000
+        assert len(_particoes(df)) <= MAX_PARTICOES_POR_INSERT
+
+
+def test_buffer_limitado():
+    _, _, maior_buffer = _agrupar(_blocos(), limite=4_000)
+    assert maior_buffer <= 4_000, f"buffer chegou a {maior_buffer} linhas"
+
+
+def test_menos_particoes_por_insert():
+    blocos = _blocos()
+    meio, fim, _ = _agrupar(blocos)
+    agrupados = sum(len(_particoes(df)) for df in meio + fim)
+    # Sem agrupamento: cada fatia de 1.000 linhas do arquivo toca dezenas de partições
+    sem_agrupar = sum(len(_particoes(b.slice(i, 1_000))) for b in blocos for i in range(0, b.height, 1_000))
+    print(f"  partes geradas: {agrupados} agrupando x {sem_agrupar} na ordem do arquivo")
+    assert agrupados < sem_agrupar / 2
+
+
+def test_deterministico():
+    primeira = _agrupar(_blocos(7))
+    segunda = _agrupar(_blocos(7))
+    assert len(primeira[0] + primeira[1]) == len(segunda[0] + segunda[1])
+    for a, b in zip(primeira[0] + primeira[1], segunda[0] + segunda[1]):
+        assert a.equals(b)
+
+
+def test_tabela_sem_particao():
+    agrupador = AgrupadorLotes("socios", 1_000, 4_000)
+    df = pl.DataFrame({"cnpj_basico": [f"{i:08d}" for i in random.Random(3).sample(range(10 ** 6), 2_500)]})
+    saidas = agrupador.adicionar(df)
+    assert [s.height for s in saidas] == [1_000, 1_000, 500]
+    assert pl.concat(saidas)["cnpj_basico"].is_sorted()
+    assert agrupador.finalizar() == []
+
+
+def main() -> int:
+    testes = [
+        test_sem_perda_nem_duplicacao,
+        test_inserts_por_particao_e_ordenados,
+        test_buffer_limitado,
+        test_menos_particoes_por_insert,
+        test_deterministico,
+        test_tabela_sem_particao,
+    ]
+    falhas = executar_testes(testes)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Paridade entre o modo servidor (utilities/csv_servidor.py) e o caminho Polars.
+
+Gera arquivos de cada tabela com casos de borda e dados aleatórios, importa
+pelo caminho Polars (capturando os DataFrames) e roda as mesmas expressões
+SQL do modo servidor sobre os mesmos bytes com o table function format(),
+comparando contagem de linhas e valores célula a célula. Confere também a
+contagem de linhas/linhas problemáticas feita durante a importação.
+
+Executa no chdb se instalado; senão, no ClickHouse configurado (CLICKHOUSE_*).
+
+Uso:
+    python test_csv_servidor.py
+"""
+import json
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+import polars as pl
+
+from apoio_testes import Captura, executar_testes
+from functions.import_csv import ClickHouseImporter
+from utilities.csv_servidor import SETTINGS_CSV, estrutura_input, montar_select
+from utilities.leitor_csv import ler_blocos_utf8
+
+# (método do importador, número de colunas no layout da Receita)
+TABELAS = {
+    "empresas": ("importar_empresas", 7),
+    "estabelecimentos": ("importar_estabelecimentos", 30),
+    "socios": ("importar_socios", 11),
+    "simples": ("importar_simples", 7),
+    "cnaes": ("importar_dominio", 2),
+    "municipios": ("importar_dominio", 2),
+}
+
+VALORES_BORDA = [
+    "", " ", "\x00", " 1\x00", "\x001\x002", "\x1c12\x1f", "\xa0 34 \xa0", "\t5",
+    "1", "12", "123456789", "-1", "+12", "-", "ÁÉ", "ção ", "  ÓLEO  LTDA  ",
+    "1.000,50", "100,00", "0,29", "inf", "nan", "-5", "1e3", ".5", "5.", "1,2,3",
+    "20240101", "2024-01-01", "2024-1-5", "20240230", "18991231", "21490606",
+    "21490607", "2024011", "00000000", "0", " 20240101 ", 'com "aspas"', "a;b",
+    "quebra\nde linha",
+]
+ALFABETO = "0123456789 ,.-+\x00\xa0abcÇã\t"
+
+
+def _campo(valor: str) -> str:
+    return '"' + valor.replace('"', '""') + '"'
+
+
+def escrever_arquivo(caminho: Path, num_colunas: int, linhas: int, semente: int) -> None:
+    """CSV latin-1 como os da Receita, com linhas curtas/longas e campos sem aspas"""
+    rnd = random.Random(semente)
+    with open(caminho, "w", encoding="latin-1", errors="replace", newline="") as f:
+        for i in range(linhas):
+            n = num_colunas + rnd.choice([0, 0, 0, 0, -1, 1])
+            campos = []
+            for _ in range(max(n, 1)):
+                if rnd.random() < 0.5:
+                    valor = rnd.choice(VALORES_BORDA)
+                else:
+                    valor = "".join(rnd.choice(ALFABETO) for _ in range(rnd.randint(0, 10)))
+                campos.append(_campo(valor) if rnd.random() < 0.9 or '"' in valor or ";" in valor
+                              or "\n" in valor else valor)
+            f.write(";".join(campos) + "\n")
+
+
+def _executor():
+    """Função que roda SQL e devolve linhas: chdb (sem servidor) ou ClickHouse configurado"""
+    try:
+        import chdb
+
+        def executar(sql: str):
+            return json.loads(chdb.query(sql, "JSONCompact").data())["data"]
+
+        return executar, "chdb"
+    except ImportError:
+        from utilities.clickhouse import carregar_config, conectar_clickhouse
+
+        client = conectar_clickhouse(carregar_config())
+        return (lambda sql: client.execute(sql)), "clickhouse"
+
+
+def linhas_servidor(executar, arquivo: Path, tabela: str, num_colunas: int) -> list:
+    settings = ", ".join(f"{k} = {v!r}" if isinstance(v, str) else f"{k} = {v}" for k, v in SETTINGS_CSV.items())
+    linhas = []
+    # Blocos pequenos (cortados em fim de registro) para caber em max_query_size
+    for bloco, _, _ in ler_blocos_utf8(arquivo, chunk_bytes=32 * 1024):
+        dados = bloco.decode("utf-8")
+        assert "$$" not in dados
+        origem = f"format(CSV, '{estrutura_input(num_colunas)}', $${dados}$$)"
+        sql = f"{montar_select(tabela, origem)} SETTINGS {settings}"
+        linhas += [[str(v) for v in linha] for linha in executar(sql)]
+    return linhas
+
+
+def linhas_polars(arquivo: Path, tabela: str, metodo: str) -> list:
+    captura = Captura()
+    importer = ClickHouseImporter(None, insercao=captura, tabelas_servidor=[])
+    args = (arquivo, tabela) if metodo == "importar_dominio" else (arquivo,)
+    getattr(importer, metodo)(*args)
+    if not captura.dfs:
+        return []
+    df = pl.concat(captura.dfs)
+    return [[str(v) for v in linha] for linha in df.rows()]
+
+
+def _normalizar_fixedstring(linhas: list) -> list:
+    # FixedString preenche com \0 à direita (o ClickHouse completa o que o Polars manda)
+    return [[v.rstrip("\x00") for v in linha] for linha in linhas]
+
+
+def test_paridade_tabelas():
+    executar, motor = _executor()
+    print(f"  (motor SQL: {motor})")
+    falhas = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for semente, (tabela, (metodo, num_colunas)) in enumerate(TABELAS.items()):
+            arquivo = Path(tmp) / f"{tabela}.csv"
+            escrever_arquivo(arquivo, num_colunas, 3_000, semente)
+            # O importador insere na ordem do ORDER BY (utilities/agrupamento.py), não na do arquivo
+            esperado = sorted(_normalizar_fixedstring(linhas_polars(arquivo, tabela, metodo)))
+            obtido = sorted(_normalizar_fixedstring(linhas_servidor(executar, arquivo, tabela, num_colunas)))
+            if len(esperado) != len(obtido):
+                falhas.append(f"{tabela}: {len(esperado)} linhas (Polars) x {len(obtido)} (servidor)")
+                continue
+            divergentes = [(a, b) for a, b in zip(esperado, obtido) if a != b]
+            for a, b in divergentes[:3]:
+                print(f"  ✗ {tabela}:\n    polars   {a}\n    servidor {b}")
+            if divergentes:
+                falhas.append(f"{tabela}: {len(divergentes)} linhas divergentes")
+            else:
+                print(f"  {tabela}: {len(esperado):,} linhas idênticas")
+    assert not falhas, "; ".join(falhas)
+
+
+def test_contagem_durante_importacao():
+    # 4 linhas completas (uma com último campo vazio entre aspas), 2 curtas
+    linhas = [
+        '"1";"A";"2";"3";"1,00";"01";""',
+        '"2";"B";"2";"3";"1,00";"01";"SP"',
+        '"3";"C";"2";"3"',
+        '"4";"D";"2";"3";"1,00";"01";"RJ"',
+        '"5";"E"',
+        '"6";"F";"2";"3";"1,00";"01";"MG"',
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivo = Path(tmp) / "empresas.csv"
+        arquivo.write_text("\n".join(linhas) + "\n", encoding="latin-1")
+        arquivo_bytes = arquivo.stat().st_size
+        captura = Captura()
+        importer = ClickHouseImporter(None, insercao=captura, tabelas_servidor=[])
+        importer.importar_empresas(arquivo)
+    contagem = importer.ultima_contagem
+    assert contagem.linhas == 6, contagem
+    assert contagem.problematicas == 2, contagem
+    assert contagem.validas == 4, contagem
+    assert sum(df.height for df in captura.dfs) == 6
+    perfil = importer.ultimo_perfil.resumo()
+    assert perfil["linhas"] == 6 and perfil["bytes"] == arquivo_bytes, perfil
+    assert set(perfil["fases"]) == {"leitura", "normalizacao", "ordenacao", "serializacao", "insercao"}, perfil
+    assert perfil["inserts"]["quantidade"] == len(captura.dfs), perfil
+
+
+def main() -> int:
+    falhas = executar_testes([test_paridade_tabelas, test_contagem_durante_importacao])
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
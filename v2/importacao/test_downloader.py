@@ -0,0 +1,220 @@
+"""
+Testes dos downloads (utilities/downloader.py) contra um servidor HTTP local.
+
+O servidor de teste imita o da Receita (HEAD com Content-Length,
+Last-Modified e Accept-Ranges; GET com Range/If-Range) e pode derrubar a
+conexão no meio da resposta, para verificar a retomada com Range, as
+tentativas, a validação de arquivos existentes/truncados e os downloads
+em paralelo.
+
+Uso:
+    python test_downloader.py
+"""
+import io
+import random
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from apoio_testes import executar_testes
+from utilities.downloader import baixar_arquivos, download_file
+
+DATA_REMOTA = 1_700_000_000
+
+
+def _zip(tamanho_csv: int, semente: int) -> bytes:
+    rnd = random.Random(semente)
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zf:
+        zf.writestr("K3241.K03200Y0.D41012.ESTABELE", rnd.randbytes(tamanho_csv))
+    return buffer.getvalue()
+
+
+class ServidorReceita:
+    """Servidor local com arquivos em memória, registro das requisições e falhas injetáveis"""
+
+    def __init__(self, arquivos: dict):
+        self.arquivos = dict(arquivos)
+        self.datas = {nome: DATA_REMOTA for nome in arquivos}
+        self.requisicoes = []
+        self.cortar_apos = {}  # nome -> [bytes enviados antes de derrubar, ...] (uma por GET)
+        self.trava = threading.Lock()
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _cabecalhos(self, status, corpo_tamanho, nome, extras=None):
+                self.send_response(status)
+                self.send_header("Content-Length", str(corpo_tamanho))
+                self.send_header("Last-Modified", formatdate(servidor.datas[nome], usegmt=True))
+                self.send_header("Accept-Ranges", "bytes")
+                for chave, valor in (extras or {}).items():
+                    self.send_header(chave, valor)
+                self.end_headers()
+
+            def do_HEAD(self):
+                nome = self.path.lstrip("/")
+                if nome not in servidor.arquivos:
+                    self.send_error(404)
+                    return
+                self._cabecalhos(200, len(servidor.arquivos[nome]), nome)
+
+            def do_GET(self):
+                nome = self.path.lstrip("/")
+                if nome not in servidor.arquivos:
+                    self.send_error(404)
+                    return
+                dados = servidor.arquivos[nome]
+                faixa = self.headers.get("Range")
+                if_range = self.headers.get("If-Range")
+                with servidor.trava:
+                    servidor.requisicoes.append((nome, faixa))
+                    cortes = servidor.cortar_apos.get(nome) or []
+                    corte = cortes.pop(0) if cortes else None
+                atual = formatdate(servidor.datas[nome], usegmt=True)
+                inicio = 0
+                if faixa and (if_range is None or if_range == atual):
+                    inicio = int(faixa.split("=")[1].split("-")[0])
+                corpo = dados[inicio:]
+                if inicio:
+                    extras = {"Content-Range": f"bytes {inicio}-{len(dados) - 1}/{len(dados)}"}
+                    self._cabecalhos(206, len(corpo), nome, extras)
+                else:
+                    self._cabecalhos(200, len(corpo), nome)
+                if corte is not None:
+                    # Envia só uma parte e derruba a conexão
+                    self.wfile.write(corpo[:corte])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self.wfile.write(corpo)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def fechar(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _baixar(url: str, destino: Path, **kwargs) -> bool:
+    return download_file(url, destino, progresso=False, espera_base=0.01, **kwargs)
+
+
+def test_download_completo():
+    conteudo = _zip(300_000, 1)
+    servidor = ServidorReceita({"Estabelecimentos0.zip": conteudo})
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            assert _baixar(servidor.url + "Estabelecimentos0.zip", Path(tmp))
+            destino = Path(tmp) / "Estabelecimentos0.zip"
+            assert destino.read_bytes() == conteudo
+            assert int(destino.stat().st_mtime) == DATA_REMOTA
+            assert not list(Path(tmp).glob("*.part*"))
+            # Segunda chamada: confere com o servidor e não baixa de novo
+            assert _baixar(servidor.url + "Estabelecimentos0.zip", Path(tmp))
+            assert len(servidor.requisicoes) == 1
+    finally:
+        servidor.fechar()
+
+
+def test_retomada_com_range():
+    conteudo = _zip(2_000_000, 2)
+    servidor = ServidorReceita({"Socios0.zip": conteudo})
+    servidor.cortar_apos["Socios0.zip"] = [700_000, 500_000]
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            assert _baixar(servidor.url + "Socios0.zip", Path(tmp))
+            assert (Path(tmp) / "Socios0.zip").read_bytes() == conteudo
+            faixas = [faixa for _, faixa in servidor.requisicoes]
+            assert len(faixas) == 3 and faixas[0] is None, faixas
+            # Retoma de onde parou (menos o bloco de leitura interrompido)
+            retomadas = [int(f.split("=")[1].rstrip("-")) for f in faixas[1:]]
+            assert 0 < retomadas[0] <= 700_000 < retomadas[1] <= 1_200_000, faixas
+    finally:
+        servidor.fechar()
+
+
+def test_desiste_apos_tentativas():
+    servidor = ServidorReceita({"Empresas0.zip": _zip(100_000, 3)})
+    servidor.cortar_apos["Empresas0.zip"] = [10] * 10
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            assert not _baixar(servidor.url + "Empresas0.zip", Path(tmp), tentativas=3)
+            assert len(servidor.requisicoes) == 3
+            # Nada com o nome final: o parcial fica para a próxima execução retomar
+            assert not (Path(tmp) / "Empresas0.zip").exists()
+            assert (Path(tmp) / "Empresas0.zip.part").exists()
+    finally:
+        servidor.fechar()
+
+
+def test_arquivo_truncado_e_baixado_de_novo():
+    conteudo = _zip(200_000, 4)
+    servidor = ServidorReceita({"Simples.zip": conteudo})
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            truncado = Path(tmp) / "Simples.zip"
+            truncado.write_bytes(conteudo[:50_000])
+            assert _baixar(servidor.url + "Simples.zip", Path(tmp))
+            assert truncado.read_bytes() == conteudo
+    finally:
+        servidor.fechar()
+
+
+def test_parcial_de_versao_antiga_recomeca():
+    antigo, novo = _zip(400_000, 5), _zip(400_000, 6)
+    servidor = ServidorReceita({"Cnaes.zip": antigo})
+    servidor.cortar_apos["Cnaes.zip"] = [300_000]
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            assert not _baixar(servidor.url + "Cnaes.zip", Path(tmp), tentativas=1)
+            assert (Path(tmp) / "Cnaes.zip.part").stat().st_size > 0
+            # Nova release publicada com o mesmo nome (mesmo tamanho, outra data)
+            servidor.arquivos["Cnaes.zip"] = novo
+            servidor.datas["Cnaes.zip"] = DATA_REMOTA + 86_400
+            assert _baixar(servidor.url + "Cnaes.zip", Path(tmp))
+            assert (Path(tmp) / "Cnaes.zip").read_bytes() == novo
+            assert servidor.requisicoes[-1] == ("Cnaes.zip", None)
+    finally:
+        servidor.fechar()
+
+
+def test_downloads_em_paralelo():
+    arquivos = {f"Socios{i}.zip": _zip(100_000, 10 + i) for i in range(8)}
+    servidor = ServidorReceita(arquivos)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            links = [servidor.url + nome for nome in arquivos]
+            inicio = time.perf_counter()
+            assert baixar_arquivos(links, Path(tmp), workers=4) == len(arquivos)
+            print(f"  {len(arquivos)} arquivos em {time.perf_counter() - inicio:.2f}s com 4 downloads simultâneos")
+            for nome, conteudo in arquivos.items():
+                assert (Path(tmp) / nome).read_bytes() == conteudo
+    finally:
+        servidor.fechar()
+
+
+def main() -> int:
+    testes = [
+        test_download_completo,
+        test_retomada_com_range,
+        test_desiste_apos_tentativas,
+        test_arquivo_truncado_e_baixado_de_novo,
+        test_parcial_de_versao_antiga_recomeca,
+        test_downloads_em_paralelo,
+    ]
+    falhas = executar_testes(testes)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Testes do leitor em lotes (utilities/leitor_csv.py).
+
+Verifica que a leitura por blocos devolve exatamente o mesmo conteúdo da
+leitura do arquivo inteiro (inclusive com quebras de linha dentro de aspas
+e blocos minúsculos), o fallback para latin-1, a detecção de encoding por
+amostra com cache em manifesto, a leitura direta de dentro do ZIP e que o
+pico de memória não cresce com o tamanho do arquivo.
+
+Uso:
+    python test_leitor_csv.py
+    LEITOR_TEST_MB=400 python test_leitor_csv.py   # arquivo maior no teste de memória
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+import polars as pl
+
+from apoio_testes import BASE_DIR, executar_testes
+from utilities.encoding import MANIFESTO, detectar_encoding, detectar_encoding_arquivo, encoding_em_cache
+from utilities.fontes import FonteCSV, encontrar_membros_zip
+from utilities.leitor_csv import _ultimo_corte, ler_csv_em_lotes
+
+NUM_COLUNAS = 5
+
+
+def _linha(rnd: random.Random, i: int) -> str:
+    nome = rnd.choice(["ÓLEO LTDA", "SÃO JOÃO", 'DIZ ""OI""', "A;B", "linha\nquebrada", ""])
+    return f'"{i:08d}";"{nome}";"{rnd.randint(0, 99)}";"20240101";"x"\n'
+
+
+def _escrever(caminho: Path, linhas: int, encoding: str = "utf-8", semente: int = 1) -> None:
+    rnd = random.Random(semente)
+    with open(caminho, "w", encoding=encoding, newline="") as f:
+        for i in range(linhas):
+            f.write(_linha(rnd, i))
+
+
+def _ler_tudo(caminho: Path, encoding: str = "utf-8") -> pl.DataFrame:
+    return pl.read_csv(
+        caminho,
+        separator=";",
+        has_header=False,
+        encoding=encoding,
+        schema={f"col{i}": pl.String for i in range(NUM_COLUNAS)},
+    )
+
+
+def _ler_em_lotes(caminho, chunk_bytes: int) -> pl.DataFrame:
+    lotes = list(ler_csv_em_lotes(caminho, NUM_COLUNAS, chunk_bytes))
+    tamanho = caminho.tamanho if isinstance(caminho, FonteCSV) else caminho.stat().st_size
+    # Os lotes cobrem o arquivo inteiro, sem sobreposição
+    assert lotes[0].inicio == 0
+    assert lotes[-1].fim == tamanho
+    for anterior, atual in zip(lotes, lotes[1:]):
+        assert anterior.fim == atual.inicio
+    return pl.concat([lote.df for lote in lotes])
+
+
+def test_ultimo_corte():
+    assert _ultimo_corte(b'"a";"b"\n"c";"d') == 8
+    assert _ultimo_corte(b'"a";"b\nc";"d"\n"e') == 14
+    # Único "\n" está dentro de aspas: nenhum corte seguro
+    assert _ultimo_corte(b'"a";"b\nc') == 0
+    assert _ultimo_corte(b'"a";"b"') == 0
+
+
+def test_paridade_com_leitura_inteira():
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = Path(tmp) / "K3241.K03200Y0.D40101.ESTABELE"
+        _escrever(caminho, 5_000)
+        esperado = _ler_tudo(caminho)
+        for chunk_bytes in (1, 7, 100, 4096, 10 * 1024 * 1024):
+            obtido = _ler_em_lotes(caminho, chunk_bytes)
+            assert obtido.equals(esperado), f"divergência com chunk_bytes={chunk_bytes}"
+
+
+def test_latin1():
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = Path(tmp) / "latin1.csv"
+        _escrever(caminho, 2_000, encoding="latin-1")
+        obtido = _ler_em_lotes(caminho, 4096)
+        assert obtido.equals(_ler_tudo(caminho, encoding="latin-1"))
+        assert "SÃO JOÃO" in obtido["col1"].to_list()
+
+
+def test_deteccao_por_amostra():
+    assert detectar_encoding(b'"1";"OLEO LTDA"\n') == "ascii"
+    assert detectar_encoding('"1";"SÃO JOÃO"\n'.encode("latin-1")) == "latin-1"
+    texto = '"1";"SÃO JOÃO"\n'.encode("utf-8")
+    assert detectar_encoding(texto) == "utf-8"
+    # Amostra cortada no meio de um caractere (início e fim) continua UTF-8
+    assert detectar_encoding(texto[6:-3]) == "utf-8"
+    with tempfile.TemporaryDirectory() as tmp:
+        # Início só ASCII e acento latin-1 no fim: a amostra do fim decide
+        caminho = Path(tmp) / "misto.csv"
+        caminho.write_bytes(b'"1";"a"\n' * 20_000 + '"2";"AÇÃO"\n'.encode("latin-1"))
+        assert detectar_encoding_arquivo(caminho, amostra_bytes=4096) == "latin-1"
+
+
+def test_manifesto_de_encoding():
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = Path(tmp) / "latin1.csv"
+        _escrever(caminho, 2_000, encoding="latin-1")
+        assert encoding_em_cache(caminho) is None
+        _ler_em_lotes(caminho, 4096)
+        assert (Path(tmp) / MANIFESTO).exists()
+        assert encoding_em_cache(caminho) == "latin-1"
+        # Com o encoding em cache a leitura vai direto para latin-1 e dá o mesmo resultado
+        assert _ler_em_lotes(caminho, 4096).equals(_ler_tudo(caminho, encoding="latin-1"))
+        # Arquivo substituído (outro tamanho/mtime): cache não vale mais
+        _escrever(caminho, 1_000, encoding="utf-8")
+        assert encoding_em_cache(caminho) is None
+        assert _ler_em_lotes(caminho, 4096).equals(_ler_tudo(caminho))
+        assert encoding_em_cache(caminho) == "utf-8"
+
+
+def test_latin1_depois_de_blocos_ascii():
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = Path(tmp) / "tardio.csv"
+        with open(caminho, "w", encoding="latin-1", newline="") as f:
+            for i in range(3_000):
+                f.write(f'"{i:08d}";"{"AÇÃO" if i == 2_500 else "ACAO"}";"1";"20240101";"x"\n')
+        # Primeiro bloco (amostra) só ASCII; o acento latin-1 aparece bem depois
+        obtido = _ler_em_lotes(caminho, 4096)
+        assert obtido.equals(_ler_tudo(caminho, encoding="latin-1"))
+        assert obtido["col1"][2_500] == "AÇÃO"
+        assert encoding_em_cache(caminho) == "latin-1"
+
+
+def test_leitura_direta_do_zip():
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = Path(tmp) / "K3241.K03200Y0.D40101.ESTABELE"
+        _escrever(caminho, 5_000, encoding="latin-1")
+        with zipfile.ZipFile(Path(tmp) / "Estabelecimentos0.zip", "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.write(caminho, caminho.name)
+        fontes = encontrar_membros_zip(Path(tmp), "ESTABELE")
+        assert fontes == [FonteCSV(Path(tmp) / "Estabelecimentos0.zip", caminho.name)]
+        assert fontes[0].name == caminho.name
+        esperado = _ler_tudo(caminho, encoding="latin-1")
+        for chunk_bytes in (100, 4096, 10 * 1024 * 1024):
+            assert _ler_em_lotes(fontes[0], chunk_bytes).equals(esperado), f"divergência com chunk_bytes={chunk_bytes}"
+        assert encoding_em_cache(fontes[0]) == "latin-1"
+
+
+def test_linhas_irregulares():
+    with tempfile.TemporaryDirectory() as tmp:
+        caminho = Path(tmp) / "irregular.csv"
+        caminho.write_bytes(b'"1";"a"\n"2";"b";"c";"d";"e";"f";"g"\n"3"')
+        df = _ler_em_lotes(caminho, 5)
+        assert df.height == 3
+        assert df.columns == [f"col{i}" for i in range(NUM_COLUNAS)]
+        assert df["col0"].to_list() == ["1", "2", "3"]
+        assert df["col4"].to_list() == [None, "e", None]
+
+
+def _pico_rss_mb(caminho: Path, chunk_bytes: int) -> float:
+    """Pico de RSS (MB) de um processo filho que lê o arquivo inteiro em lotes"""
+    codigo = (
+        "import sys, resource\n"
+        f"sys.path.insert(0, {str(BASE_DIR)!r})\n"
+        "from utilities.leitor_csv import ler_csv_em_lotes\n"
+        f"total = sum(l.df.height for l in ler_csv_em_lotes({str(caminho)!r}, {NUM_COLUNAS}, {chunk_bytes}))\n"
+        "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+    )
+    saida = subprocess.run([sys.executable, "-c", codigo], check=True, capture_output=True, text=True)
+    return int(saida.stdout.strip()) / 1024
+
+
+def test_memoria_constante():
+    mb_grande = int(os.getenv("LEITOR_TEST_MB", "150"))
+    linhas_por_mb = 1024 * 1024 // 45
+    chunk_bytes = 8 * 1024 * 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        pequeno, grande = Path(tmp) / "pequeno.csv", Path(tmp) / "grande.csv"
+        _escrever(pequeno, linhas_por_mb * 20)
+        _escrever(grande, linhas_por_mb * mb_grande)
+        pico_pequeno = _pico_rss_mb(pequeno, chunk_bytes)
+        pico_grande = _pico_rss_mb(grande, chunk_bytes)
+        tamanho_grande = grande.stat().st_size / 1024 / 1024
+    print(f"  pico RSS: {pico_pequeno:.0f} MB (20 MB) / {pico_grande:.0f} MB ({tamanho_grande:.0f} MB)")
+    assert pico_grande - pico_pequeno < max(50, tamanho_grande * 0.2), "pico de memória cresce com o arquivo"
+
+
+def main() -> int:
+    testes = [
+        test_ultimo_corte,
+        test_paridade_com_leitura_inteira,
+        test_latin1,
+        test_deteccao_por_amostra,
+        test_manifesto_de_encoding,
+        test_latin1_depois_de_blocos_ascii,
+        test_leitura_direta_do_zip,
+        test_linhas_irregulares,
+        test_memoria_constante,
+    ]
+    falhas = executar_testes(testes)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
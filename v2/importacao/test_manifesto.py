@@ -0,0 +1,173 @@
+"""
+Testes da retomada de uma release pelo manifesto (utilities/manifesto_importacao.py
+e _importar_com_manifesto em process.py).
+
+Simula uma queda no meio de um arquivo e confere que a nova execução o lê com
+os mesmos lotes e tokens de deduplicação da anterior (mesmo que o tamanho de
+lote padrão tenha mudado), que os lotes repetidos são os descartados pelo
+servidor (nenhuma linha duplicada), que arquivos concluídos são pulados e que
+um arquivo alterado desde a queda não é retomado.
+
+Sem ClickHouse: o manifesto fica num cliente falso em memória.
+
+Uso:
+    python test_manifesto.py
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+from apoio_testes import Captura, executar_testes
+from functions.import_csv import ClickHouseImporter
+from process import _importar_com_manifesto
+from utilities.manifesto_importacao import estado_arquivo
+
+RELEASE = "2026_10"
+LINHAS = 300
+CHUNK_BYTES = 4 * 1024
+
+
+class ClienteManifesto:
+    """Cliente falso: guarda a última linha de cada arquivo, como o FINAL do ReplacingMergeTree"""
+
+    def __init__(self):
+        self.linhas = {}
+
+    def execute(self, sql: str, params=None):
+        if sql.startswith("INSERT INTO importacao_arquivos"):
+            for release, tabela, arquivo, *resto in params:
+                self.linhas[(release, tabela, arquivo)] = resto
+            return []
+        if "FROM importacao_arquivos" in sql:
+            chave = (params["release"], params["tabela"], params["arquivo"])
+            if chave not in self.linhas:
+                return []
+            impressao, configuracao, status, linhas, problematicas, _ = self.linhas[chave]
+            return [(status, impressao, configuracao, linhas, problematicas)]
+        return []  # SET e CREATE TABLE IF NOT EXISTS
+
+
+class CapturaServidor(Captura):
+    """
+    Captura que descarta lotes com token já visto (a janela de deduplicação
+    da staging) e pode cair depois de `cair_apos` INSERTs aceitos
+    """
+
+    def __init__(self, vistos=None, cair_apos=None):
+        super().__init__()
+        self.tokens = []
+        self.vistos = vistos if vistos is not None else set()
+        self.cair_apos = cair_apos
+
+    def enviar(self, df, token=None):
+        if self.cair_apos is not None and len(self.dfs) >= self.cair_apos:
+            raise ConnectionError("conexão perdida")
+        self.tokens.append(token)
+        if token is not None:
+            if token in self.vistos:
+                return
+            self.vistos.add(token)
+        super().enviar(df, token)
+
+
+def _escrever_empresas(caminho: Path, linhas: int) -> None:
+    with open(caminho, "w", encoding="latin-1", newline="") as f:
+        for i in range(linhas):
+            f.write(f'"{i:08d}";"EMPRESA {i} LTDA";"2062";"49";"1000,00";"03";""\n')
+
+
+def _importer(client, captura, batch_size):
+    return ClickHouseImporter(client, batch_size=batch_size, chunk_bytes=CHUNK_BYTES,
+                              insercao=captura, tabelas_servidor=[])
+
+
+def _importar(importer, arquivo: Path):
+    return _importar_com_manifesto(importer, RELEASE, "empresas", "importar_empresas", arquivo)
+
+
+def test_retomada_mesmos_lotes_e_tokens():
+    client = ClienteManifesto()
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivo = Path(tmp) / "K3241.K03200Y0.D61011.EMPRECSV"
+        _escrever_empresas(arquivo, LINHAS)
+
+        primeira = CapturaServidor(cair_apos=2)
+        try:
+            _importar(_importer(client, primeira, batch_size=40), arquivo)
+            raise AssertionError("a importação deveria ter caído")
+        except ConnectionError:
+            pass
+        estado = estado_arquivo(client, RELEASE, "empresas", arquivo.name)
+        assert estado is not None and estado.status == "importando", estado
+        assert len(primeira.dfs) == 2, len(primeira.dfs)
+
+        # Outro tamanho de lote padrão (ex.: o governador viu outra memória livre)
+        segunda = CapturaServidor(vistos=primeira.vistos)
+        importer = _importer(client, segunda, batch_size=70)
+        contagem = _importar(importer, arquivo)
+
+        # Mesmos INSERTs de uma importação sem queda com o lote da primeira tentativa
+        referencia = CapturaServidor()
+        _importer(None, referencia, batch_size=40).importar_empresas(arquivo)
+        alturas = [df.height for df in referencia.dfs]
+        assert [t.rsplit(":", 1)[1] for t in segunda.tokens] == [str(i) for i in range(len(alturas))]
+        assert segunda.tokens[:2] == primeira.tokens, (segunda.tokens[:2], primeira.tokens)
+        retomada = [df.height for df in primeira.dfs + segunda.dfs]
+        assert retomada == alturas, f"lotes da retomada diferentes dos da tentativa anterior: {retomada} != {alturas}"
+        cnpjs = [c for df in primeira.dfs + segunda.dfs for c in df.get_column("cnpj_basico").to_list()]
+        assert len(cnpjs) == LINHAS and len(set(cnpjs)) == LINHAS, (len(cnpjs), len(set(cnpjs)))
+        assert contagem.linhas == LINHAS, contagem.linhas
+        assert importer.token_arquivo is None and importer.lote_arquivo is None
+
+        estado = estado_arquivo(client, RELEASE, "empresas", arquivo.name)
+        assert estado.concluido and estado.linhas == LINHAS, estado
+        assert estado.configuracao.split(":")[2] == "40", estado.configuracao
+
+
+def test_arquivo_concluido_pulado():
+    client = ClienteManifesto()
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivo = Path(tmp) / "K3241.K03200Y1.D61011.EMPRECSV"
+        _escrever_empresas(arquivo, LINHAS)
+        _importar(_importer(client, CapturaServidor(), batch_size=40), arquivo)
+
+        captura = CapturaServidor()
+        importer = _importer(client, captura, batch_size=40)
+        contagem = _importar(importer, arquivo)
+        assert captura.tokens == [], f"arquivo concluído foi reenviado: {len(captura.tokens)} lote(s)"
+        assert contagem.linhas == LINHAS, contagem.linhas
+        assert importer.lote_arquivo is None
+
+
+def test_arquivo_alterado_nao_retomado():
+    client = ClienteManifesto()
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivo = Path(tmp) / "K3241.K03200Y2.D61011.EMPRECSV"
+        _escrever_empresas(arquivo, LINHAS)
+        try:
+            _importar(_importer(client, CapturaServidor(cair_apos=1), batch_size=40), arquivo)
+        except ConnectionError:
+            pass
+
+        _escrever_empresas(arquivo, LINHAS + 10)
+        captura = CapturaServidor()
+        try:
+            _importar(_importer(client, captura, batch_size=40), arquivo)
+            raise AssertionError("arquivo alterado deveria exigir IMPORT_RETOMAR=0")
+        except ValueError as e:
+            assert "IMPORT_RETOMAR=0" in str(e), e
+        assert captura.tokens == []
+
+
+def main() -> int:
+    testes = [
+        test_retomada_mesmos_lotes_e_tokens,
+        test_arquivo_concluido_pulado,
+        test_arquivo_alterado_nao_retomado,
+    ]
+    falhas = executar_testes(testes)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Testes do governador de memória (utilities/memoria.py).
+
+Verifica que tabelas largas recebem lotes menores que as estreitas, que o lote
+encolhe com o RSS acima do orçamento e cresce aos poucos com folga, que os
+limites são respeitados e que, com o lote fixado para o arquivo (retomada),
+os INSERTs saem iguais aos da tentativa anterior.
+
+Uso:
+    python test_memoria.py
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import polars as pl
+
+from apoio_testes import Captura, executar_testes
+from functions.import_csv import ClickHouseImporter
+from utilities.memoria import LOTE_MAXIMO, LOTE_MINIMO, GovernadorMemoria, orcamento_memoria_mb
+
+
+class RSS:
+    """RSS simulado, em MB"""
+
+    def __init__(self, valor: float):
+        self.valor = valor
+
+    def __call__(self) -> float:
+        return self.valor
+
+
+def _df(colunas: int, largura: int, linhas: int = 1_000) -> pl.DataFrame:
+    return pl.DataFrame({f"c{i}": ["x" * largura] * linhas for i in range(colunas)})
+
+
+def test_tabela_larga_lotes_menores():
+    governador = GovernadorMemoria(500, medir_rss=RSS(100))
+    governador.observar("empresas", _df(7, 20))
+    governador.observar("estabelecimentos", _df(30, 30))
+    estreita = governador.tamanho_lote("empresas")
+    larga = governador.tamanho_lote("estabelecimentos")
+    print(f"  empresas: {estreita:,} linhas, estabelecimentos: {larga:,} linhas")
+    assert larga * 3 < estreita
+
+
+def test_encolhe_sob_pressao_e_cresce_com_folga():
+    rss = RSS(100)
+    governador = GovernadorMemoria(1_000, medir_rss=rss)
+    governador.observar("estabelecimentos", _df(30, 30))
+    normal = governador.tamanho_lote("estabelecimentos")
+    rss.valor = 1_500
+    apertado = governador.tamanho_lote("estabelecimentos")
+    assert apertado < normal * 2 / 3, (normal, apertado)
+    rss.valor = 900  # entre FOLGA e o orçamento: mantém
+    assert governador.tamanho_lote("estabelecimentos") == apertado
+    rss.valor = 200
+    maior = governador.tamanho_lote("estabelecimentos")
+    assert apertado < maior <= 2 * apertado, (apertado, maior)
+    for _ in range(10):
+        maior = governador.tamanho_lote("estabelecimentos")
+    assert maior == normal
+
+
+def test_limites():
+    pequeno = GovernadorMemoria(64, medir_rss=RSS(60))
+    pequeno.observar("estabelecimentos", _df(30, 100))
+    assert pequeno.tamanho_lote("estabelecimentos") == LOTE_MINIMO
+    grande = GovernadorMemoria(1_000_000, medir_rss=RSS(100))
+    grande.observar("cnaes", _df(2, 5))
+    assert grande.tamanho_lote("cnaes") == LOTE_MAXIMO
+
+
+def test_orcamento_dividido_entre_processos():
+    anterior = os.environ.get("IMPORT_MEMORIA_MB")
+    os.environ["IMPORT_MEMORIA_MB"] = "4000"
+    try:
+        assert orcamento_memoria_mb(4) == 1_000
+    finally:
+        if anterior is None:
+            del os.environ["IMPORT_MEMORIA_MB"]
+        else:
+            os.environ["IMPORT_MEMORIA_MB"] = anterior
+
+
+def _importar(arquivo: Path, governador: GovernadorMemoria, configuracao_anterior=None):
+    captura = Captura()
+    importer = ClickHouseImporter(None, insercao=captura, tabelas_servidor=[])
+    importer.governador = governador
+    configuracao = None
+    if configuracao_anterior is not None:
+        configuracao = importer.planejar_arquivo("empresas", configuracao_anterior)
+    importer.importar_empresas(arquivo)
+    return captura.dfs, configuracao
+
+
+def test_lote_fixado_na_retomada():
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivo = Path(tmp) / "empresas.csv"
+        linhas = [f'"{i:08d}";"EMPRESA {i}";"2062";"49";"1000,00";"01";""' for i in range(60_000)]
+        arquivo.write_text("\n".join(linhas) + "\n", encoding="latin-1")
+
+        # Sem lote fixo, o lote segue a medição feita no próprio arquivo
+        folgado, _ = _importar(arquivo, GovernadorMemoria(64, medir_rss=RSS(10)))
+        apertado, _ = _importar(arquivo, GovernadorMemoria(64, medir_rss=RSS(5_000)))
+        assert [df.height for df in folgado] == [60_000], [df.height for df in folgado]
+        assert [df.height for df in apertado] == [LOTE_MINIMO] * 6, [df.height for df in apertado]
+
+        importer = ClickHouseImporter(None, insercao=Captura(), tabelas_servidor=[])
+        anterior = f"polars:{importer.chunk_bytes}:20000:40000"
+        primeira, configuracao = _importar(arquivo, GovernadorMemoria(64, medir_rss=RSS(10)), anterior)
+        segunda, _ = _importar(arquivo, GovernadorMemoria(64, medir_rss=RSS(5_000)), anterior)
+    assert configuracao == anterior, configuracao
+    assert [df.height for df in primeira] == [20_000] * 3
+    assert len(primeira) == len(segunda)
+    for a, b in zip(primeira, segunda):
+        assert a.equals(b)
+
+
+def main() -> int:
+    testes = [
+        test_tabela_larga_lotes_menores,
+        test_encolhe_sob_pressao_e_cresce_com_folga,
+        test_limites,
+        test_orcamento_dividido_entre_processos,
+        test_lote_fixado_na_retomada,
+    ]
+    falhas = executar_testes(testes)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
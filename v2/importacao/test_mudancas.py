@@ -0,0 +1,167 @@
+"""
+Testes do feed de mudanças entre releases (utilities/mudancas.py).
+
+Monta duas versões pequenas de empresas e socios (produção = release
+anterior, staging = release nova) e confere a classificação de cada chave em
+inserção, alteração ou remoção, inclusive sócio repetido na mesma chave,
+FixedString vazia fora da chave e coluna que só existe na versão nova. Confere
+também que recalcular a mesma release substitui a partição em vez de somar.
+
+Executa no chdb se instalado; senão, no ClickHouse configurado (CLICKHOUSE_*),
+no banco cnpj_teste_mudancas.
+
+Uso:
+    python test_mudancas.py
+"""
+import json
+import re
+import sys
+import tempfile
+
+from apoio_testes import executar_testes
+from utilities.mudancas import registrar_mudancas
+from utilities.release import garantir_tabela_releases
+
+ANTERIOR, RELEASE = "2026_09", "2026_10"
+
+EMPRESAS = "cnpj_basico FixedString(8), razao_social String, capital_social Float64"
+SOCIOS = ("cnpj_basico FixedString(8), identificador_socio FixedString(1), "
+          "cnpj_cpf_socio String, nome_socio String, qualificacao_socio String")
+
+
+def _literal(valor) -> str:
+    if isinstance(valor, (int, float)):
+        return str(valor)
+    return "'" + str(valor).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+class ClienteChdb:
+    """Interface mínima do clickhouse_driver.Client (execute com parâmetros e settings) sobre o chdb"""
+
+    def __init__(self, pasta: str):
+        from chdb import session
+
+        self.sessao = session.Session(pasta)
+        self.sessao.query("CREATE DATABASE IF NOT EXISTS cnpj_teste_mudancas ENGINE = Atomic")
+        self.sessao.query("USE cnpj_teste_mudancas")
+
+    def execute(self, sql: str, params=None, settings=None):
+        if params:
+            sql = re.sub(r"%\((\w+)\)s", lambda m: _literal(params[m.group(1)]), sql)
+        if settings:
+            sql += " SETTINGS " + ", ".join(f"{k} = {v}" for k, v in settings.items())
+        resultado = self.sessao.query(sql, "JSONCompact")
+        texto = resultado.data() if resultado is not None else ""
+        return [tuple(linha) for linha in json.loads(texto)["data"]] if texto.strip() else []
+
+
+def _cliente(pasta: str):
+    try:
+        return ClienteChdb(pasta), "chdb"
+    except ImportError:
+        from utilities.clickhouse import carregar_config, conectar_clickhouse
+
+        config = carregar_config()
+        config.database = "cnpj_teste_mudancas"
+        return conectar_clickhouse(config), "clickhouse"
+
+
+def _criar(client, tabela: str, colunas: str, linhas: list) -> None:
+    client.execute(f"DROP TABLE IF EXISTS {tabela}")
+    client.execute(f"CREATE TABLE {tabela} ({colunas}) ENGINE = MergeTree ORDER BY tuple()")
+    if linhas:
+        valores = ", ".join("(" + ", ".join(_literal(v) for v in linha) + ")" for linha in linhas)
+        client.execute(f"INSERT INTO {tabela} VALUES {valores}")
+
+
+def _carregar_releases(client) -> None:
+    sufixo = f"__{RELEASE}"
+    for tabela in ("changes", "releases"):
+        client.execute(f"DROP TABLE IF EXISTS {tabela}")
+    garantir_tabela_releases(client)
+    client.execute(f"INSERT INTO releases VALUES ('{ANTERIOR}', now(), 'inicial', 0)")
+
+    _criar(client, "empresas", EMPRESAS, [
+        ("00000001", "IGUAL LTDA", 1000.0),
+        ("00000002", "ANTIGA LTDA", 1000.0),
+        ("00000003", "REMOVIDA LTDA", 1000.0),
+        ("00000005", "CAPITAL LTDA", 1000.0),
+    ])
+    # Coluna nova só na staging: fica fora do hash, não vira alteração
+    _criar(client, f"empresas{sufixo}", EMPRESAS + ", porte String", [
+        ("00000001", "IGUAL LTDA", 1000.0, "01"),
+        ("00000002", "NOVA LTDA", 1000.0, "01"),
+        ("00000004", "INSERIDA LTDA", 1000.0, "03"),
+        ("00000005", "CAPITAL LTDA", 2500.5, "05"),
+    ])
+    _criar(client, "socios", SOCIOS, [
+        ("00000001", "2", "***123456**", "FULANO", "49"),
+        ("00000002", "", "", "SEM DOCUMENTO", "49"),
+        ("00000003", "2", "***654321**", "CICLANO", "22"),
+    ])
+    _criar(client, f"socios{sufixo}", SOCIOS, [
+        ("00000001", "2", "***123456**", "FULANO", "49"),
+        # Mesma chave duas vezes na nova versão (mesmo hash): contagem diferente é alteração
+        ("00000002", "", "", "SEM DOCUMENTO", "49"),
+        ("00000002", "", "", "SEM DOCUMENTO", "49"),
+        ("00000003", "2", "***654321**", "CICLANO", "05"),
+    ])
+
+
+def _mudancas(client) -> dict:
+    return {
+        (tabela, chave): (cnpj_basico, tipo)
+        for tabela, chave, cnpj_basico, tipo in client.execute(
+            "SELECT tabela, chave, toString(cnpj_basico), toString(tipo) FROM changes "
+            "WHERE release = %(release)s AND anterior = %(anterior)s",
+            {"release": RELEASE, "anterior": ANTERIOR},
+        )
+    }
+
+
+def test_classificacao():
+    with tempfile.TemporaryDirectory() as tmp:
+        client, motor = _cliente(tmp)
+        print(f"  (motor SQL: {motor})")
+        _carregar_releases(client)
+        resumo = registrar_mudancas(client, RELEASE)
+
+        esperado = {
+            ("empresas", "00000002"): ("00000002", "alteracao"),
+            ("empresas", "00000003"): ("00000003", "remocao"),
+            ("empresas", "00000004"): ("00000004", "insercao"),
+            ("empresas", "00000005"): ("00000005", "alteracao"),
+            ("socios", "00000002|||SEM DOCUMENTO"): ("00000002", "alteracao"),
+            ("socios", "00000003|2|***654321**|CICLANO"): ("00000003", "alteracao"),
+        }
+        obtido = _mudancas(client)
+        assert obtido == esperado, f"\n  obtido:   {obtido}\n  esperado: {esperado}"
+        assert resumo == {
+            "empresas": {"insercao": 1, "alteracao": 2, "remocao": 1},
+            "socios": {"insercao": 0, "alteracao": 2, "remocao": 0},
+        }, resumo
+
+
+def test_recalculo_substitui_particao():
+    with tempfile.TemporaryDirectory() as tmp:
+        client, _ = _cliente(tmp)
+        _carregar_releases(client)
+        registrar_mudancas(client, RELEASE)
+        primeira = _mudancas(client)
+        registrar_mudancas(client, RELEASE)
+        total = client.execute("SELECT count() FROM changes WHERE release = %(release)s", {"release": RELEASE})[0][0]
+        assert total == len(primeira), f"recalcular a release somou linhas: {total} != {len(primeira)}"
+        assert _mudancas(client) == primeira
+
+
+def main() -> int:
+    testes = [
+        test_classificacao,
+        test_recalculo_substitui_particao,
+    ]
+    falhas = executar_testes(testes)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
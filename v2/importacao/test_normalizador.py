@@ -0,0 +1,175 @@
+"""
+Paridade e desempenho: normalizadores Python (map_elements) x expressões Polars.
+
+Compara, célula a célula, o caminho antigo do importador (clean_col + map_elements
+com as funções de utilities.normalizador) com as expressões expr_* usadas hoje,
+em casos de borda e em dados aleatórios, e mede linhas/s de cada caminho.
+
+Uso:
+    python test_normalizador.py                 # paridade + benchmark (1M linhas)
+    NORMALIZADOR_BENCH_ROWS=200000 python test_normalizador.py
+    NORMALIZADOR_BENCH_ROWS=0 python test_normalizador.py   # só paridade
+"""
+import os
+import random
+import sys
+import time
+
+import polars as pl
+
+from apoio_testes import executar_testes
+from utilities.normalizador import (
+    expr_limpar_string,
+    expr_normalizar_capital_social,
+    expr_normalizar_codigo,
+    limpar_string,
+    normalizar_capital_social,
+    normalizar_codigo,
+)
+
+CASOS_BORDA = [
+    None, "", " ", "   ", "\x00", " \x00 ", "\x001\x00", "1\x002\x003",
+    "\x1c12\x1f", "\xa0 34 \xa0", "\t5\n", "　x　",
+    "1", "12", "123", "1234567", "12345678", "123456789", "0000000001",
+    "-1", "+1", "-", "+", "-12", "ÁÉ", "ção", "São Paulo ", "  ÓLEO  LTDA  ",
+    "abc", "1a", "1.000,50", "100,00", "1000.50", "0,29", "0,07", "1,005",
+    "inf", "-inf", "nan", "NaN", "-5", "-0", "0", "00", "1e3", "1E-2",
+    ".5", "5.", ",5", "1,2,3", "99999999999999,99", "1" * 16,
+]
+
+COLUNAS_CODIGO = {"cod1": 1, "cod2": 2, "cod3": 3, "cod4": 4, "cod7": 7, "cod8": 8}
+ALFABETO = "0123456789 ,.-+\x00\xa0abcÇã\t"
+
+
+def gerar_valores(n: int, semente: int = 42):
+    """Casos de borda seguidos de strings aleatórias curtas (inclui nulos)"""
+    rnd = random.Random(semente)
+    valores = list(CASOS_BORDA)
+    while len(valores) < n:
+        if rnd.random() < 0.05:
+            valores.append(None)
+            continue
+        tamanho = rnd.randint(0, 12)
+        valores.append("".join(rnd.choice(ALFABETO) for _ in range(tamanho)))
+    return valores[:n]
+
+
+def clean_col(name: str) -> pl.Expr:
+    """Pré-limpeza usada pelo importador antes de map_elements (caminho antigo)"""
+    return (
+        pl.col(name)
+        .cast(pl.Utf8)
+        .fill_null("")
+        .str.replace("\x00", "")
+        .str.strip_chars()
+    )
+
+
+def caminho_antigo(df: pl.DataFrame) -> pl.DataFrame:
+    # map_elements não chama a função para nulos (campo vazio no CSV): o lambda
+    # `or ""`/`or 0` nunca rodava e o None seguia para o INSERT. O fill_null
+    # reproduz a intenção do código antigo, que é o contrato das expr_*.
+    colunas = [
+        pl.col("v")
+            .map_elements(lambda x, t=t: normalizar_codigo(x, t) or "", return_dtype=pl.Utf8)
+            .fill_null("")
+            .alias(nome)
+        for nome, t in COLUNAS_CODIGO.items()
+    ]
+    colunas += [
+        clean_col("v")
+            .map_elements(lambda x: limpar_string(x) or "", return_dtype=pl.Utf8)
+            .alias("texto"),
+        pl.col("v")
+            .map_elements(lambda x: normalizar_capital_social(x) or 0, return_dtype=pl.Int64)
+            .fill_null(0)
+            .alias("capital"),
+    ]
+    return df.select(colunas)
+
+
+def caminho_novo(df: pl.DataFrame) -> pl.DataFrame:
+    colunas = [expr_normalizar_codigo("v", t).alias(nome) for nome, t in COLUNAS_CODIGO.items()]
+    colunas += [
+        expr_limpar_string("v").alias("texto"),
+        expr_normalizar_capital_social("v").alias("capital"),
+    ]
+    return df.select(colunas)
+
+
+def comparar(valores) -> list:
+    """Retorna lista de divergências (coluna, entrada, antigo, novo)"""
+    df = pl.DataFrame({"v": valores}, schema={"v": pl.Utf8})
+    antigo = caminho_antigo(df)
+    novo = caminho_novo(df)
+    divergencias = []
+    for coluna in antigo.columns:
+        for entrada, a, b in zip(valores, antigo[coluna].to_list(), novo[coluna].to_list()):
+            if a != b:
+                divergencias.append((coluna, entrada, a, b))
+    return divergencias
+
+
+def test_paridade_casos_borda():
+    divergencias = comparar(CASOS_BORDA)
+    for coluna, entrada, a, b in divergencias[:20]:
+        print(f"  ✗ {coluna}: {entrada!r} -> antigo={a!r} novo={b!r}")
+    assert not divergencias, f"{len(divergencias)} divergências nos casos de borda"
+
+
+def test_paridade_aleatoria():
+    divergencias = comparar(gerar_valores(50_000, semente=7))
+    for coluna, entrada, a, b in divergencias[:20]:
+        print(f"  ✗ {coluna}: {entrada!r} -> antigo={a!r} novo={b!r}")
+    assert not divergencias, f"{len(divergencias)} divergências em dados aleatórios"
+
+
+def test_tipos_saida():
+    novo = caminho_novo(pl.DataFrame({"v": CASOS_BORDA}, schema={"v": pl.Utf8}))
+    assert novo["capital"].dtype == pl.Int64
+    assert novo["capital"].null_count() == 0
+    for nome in list(COLUNAS_CODIGO) + ["texto"]:
+        assert novo[nome].dtype == pl.Utf8
+        assert novo[nome].null_count() == 0
+
+
+def test_capital_fora_do_int64():
+    # No caminho antigo, map_elements quebrava o lote inteiro (SchemaError ao montar
+    # a Series Int64); a expressão trata como valor inválido e grava 0
+    df = pl.DataFrame({"v": ["1" * 25, "100,00"]})
+    assert df.select(expr_normalizar_capital_social("v"))["v"].to_list() == [0, 10000]
+
+
+def benchmark(n: int):
+    """Linhas/s de cada caminho (mesmas 8 colunas normalizadas por linha)"""
+    df = pl.DataFrame({"v": gerar_valores(n, semente=1)}, schema={"v": pl.Utf8})
+    resultados = {}
+    for nome, funcao in (("map_elements", caminho_antigo), ("expr_*", caminho_novo)):
+        inicio = time.perf_counter()
+        funcao(df)
+        duracao = time.perf_counter() - inicio
+        resultados[nome] = n / duracao if duracao else float("inf")
+        print(f"  {nome:<13} {duracao:8.3f}s  {resultados[nome]:>14,.0f} linhas/s")
+    print(f"  ganho: {resultados['expr_*'] / resultados['map_elements']:.1f}x")
+    return resultados
+
+
+def main() -> int:
+    testes = [
+        test_paridade_casos_borda,
+        test_paridade_aleatoria,
+        test_tipos_saida,
+        test_capital_fora_do_int64,
+    ]
+    falhas = executar_testes(testes)
+
+    linhas = int(os.getenv("NORMALIZADOR_BENCH_ROWS", "1000000"))
+    if linhas > 0:
+        print(f"\nBenchmark ({linhas:,} linhas):")
+        benchmark(linhas)
+
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
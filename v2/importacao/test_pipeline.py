@@ -0,0 +1,103 @@
+"""
+Testes do pipeline em etapas (utilities/pipeline.py).
+
+Verifica que as etapas se sobrepõem (tempo total perto da etapa mais lenta,
+não da soma), que um item pode gerar vários na etapa seguinte, que a falha
+de um item não para os demais e que as filas limitadas seguram a etapa
+rápida quando a seguinte não acompanha.
+
+Uso:
+    python test_pipeline.py
+"""
+import sys
+import threading
+import time
+
+from apoio_testes import executar_testes
+from utilities.pipeline import Etapa, Pipeline
+
+
+def _dormir(segundos: float):
+    def etapa(item):
+        time.sleep(segundos)
+        return [item]
+    return etapa
+
+
+def test_sobreposicao_das_etapas():
+    itens, atraso = 10, 0.05
+    pipeline = Pipeline([
+        Etapa("download", _dormir(atraso), workers=2),
+        Etapa("importacao", _dormir(atraso), workers=2),
+    ])
+    inicio = time.perf_counter()
+    saidas, stats = pipeline.executar(range(itens))
+    parede = time.perf_counter() - inicio
+    assert sorted(saidas) == list(range(itens))
+    # Sequencial: 2 etapas x 10 itens x 0,05s / 2 workers = 0,5s; em pipeline ~0,3s
+    soma = sum(s.segundos_ocupado / s.workers for s in stats.values())
+    print(f"  parede {parede:.2f}s x soma das etapas {soma:.2f}s")
+    assert parede < soma * 0.75, "etapas não se sobrepõem"
+
+
+def test_um_item_gera_varios():
+    pipeline = Pipeline([
+        Etapa("zip", lambda n: [f"{n}-{i}" for i in range(n)]),
+        Etapa("csv", lambda nome: [nome.upper()], workers=3),
+    ])
+    saidas, stats = pipeline.executar([1, 2, 3])
+    assert sorted(saidas) == ["1-0", "2-0", "2-1", "3-0", "3-1", "3-2"]
+    assert stats["zip"].itens == 3 and stats["csv"].itens == 6
+
+
+def test_falha_isolada():
+    def importar(item):
+        if item == 3:
+            raise RuntimeError("arquivo corrompido")
+        return [item]
+
+    saidas, stats = Pipeline([Etapa("importacao", importar, workers=2)]).executar(range(6))
+    assert sorted(saidas) == [0, 1, 2, 4, 5]
+    assert [item for item, _ in stats["importacao"].erros] == [3]
+    assert "arquivo corrompido" in stats["importacao"].erros[0][1]
+
+
+def test_fila_limitada():
+    produzidos, consumidos = [], []
+    trava = threading.Lock()
+    maior_adiantamento = [0]
+
+    def produzir(item):
+        with trava:
+            produzidos.append(item)
+            maior_adiantamento[0] = max(maior_adiantamento[0], len(produzidos) - len(consumidos))
+        return [item]
+
+    def consumir(item):
+        time.sleep(0.01)
+        with trava:
+            consumidos.append(item)
+        return []
+
+    Pipeline([
+        Etapa("rapida", produzir),
+        Etapa("lenta", consumir, capacidade=2),
+    ]).executar(range(30))
+    assert len(consumidos) == 30
+    # Fila de 2 + 1 em processamento + 1 aguardando vaga na produtora (+ folga de agendamento)
+    assert maior_adiantamento[0] <= 5, f"etapa rápida se adiantou {maior_adiantamento[0]} itens"
+
+
+def main() -> int:
+    testes = [
+        test_sobreposicao_das_etapas,
+        test_um_item_gera_varios,
+        test_falha_isolada,
+        test_fila_limitada,
+    ]
+    falhas = executar_testes(testes)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Testes do snapshot Parquet da release (utilities/snapshot.py).
+
+Converte CSVs pequenos com process.gerar_snapshot e verifica que as partes
+têm exatamente os lotes que o importador mandaria para o INSERT (mesmos
+tipos e valores), que o manifesto registra linhas e problemáticas, que uma
+segunda conversão pula os CSVs já convertidos e que importar_parquet manda
+cada parte inteira num INSERT.
+
+Uso:
+    python test_snapshot.py
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+import polars as pl
+
+from apoio_testes import Captura, executar_testes
+import process
+from functions.import_csv import ClickHouseImporter
+from utilities.snapshot import ler_manifesto_snapshot, partes_snapshot
+
+EMPRESAS = "K3241.K03200Y0.D41012.EMPRECSV"
+CNAES = "F.K03200$Z.D41012.CNAECSV"
+
+
+def _escrever_csvs(data_dir: Path) -> None:
+    linhas = [f'"{i:08d}";"EMPRESA {i}";"2062";"49";"1000,50";"01";""' for i in range(2_500)]
+    linhas += ['"99999999";"CURTA"']
+    (data_dir / EMPRESAS).write_text("\n".join(linhas) + "\n", encoding="latin-1")
+    (data_dir / CNAES).write_text('"0111301";"Cultivo de arroz"\n"0111302";"Cultivo de milho"\n', encoding="latin-1")
+
+
+def _importer(insercao) -> ClickHouseImporter:
+    return ClickHouseImporter(None, batch_size=1_000, insercao=insercao, tabelas_servidor=[])
+
+
+def _converter(data_dir: Path, pasta: Path):
+    original = process.ClickHouseImporter
+    # Lotes pequenos para o arquivo virar várias partes
+    process.ClickHouseImporter = lambda client, **kw: original(client, batch_size=1_000, **kw)
+    try:
+        return process.gerar_snapshot(data_dir, pasta, "2026_10", workers=1)
+    finally:
+        process.ClickHouseImporter = original
+
+
+def test_snapshot_igual_aos_lotes_do_importador():
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir, pasta = Path(tmp) / "data", Path(tmp) / "parquet" / "2026_10"
+        data_dir.mkdir()
+        _escrever_csvs(data_dir)
+        resumo = _converter(data_dir, pasta)
+        assert not resumo.erros, resumo.erros
+
+        captura = Captura()
+        _importer(captura).importar_empresas(data_dir / EMPRESAS)
+        partes = [parte for tabela, parte in partes_snapshot(pasta, ["empresas"])]
+        assert len(partes) == len(captura.dfs) == 3, (len(partes), len(captura.dfs))
+        for parte, esperado in zip(sorted(partes), captura.dfs):
+            lido = pl.read_parquet(parte)
+            assert lido.schema == esperado.schema, (lido.schema, esperado.schema)
+            assert lido.equals(esperado)
+
+        manifesto = ler_manifesto_snapshot(pasta)
+        empresas = manifesto["arquivos"][f"empresas/{EMPRESAS}"]
+        assert (empresas["linhas"], empresas["problematicas"]) == (2_501, 1), empresas
+        assert manifesto["arquivos"][f"cnaes/{CNAES}"]["linhas"] == 2
+
+
+def test_segunda_conversao_pula_convertidos():
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir, pasta = Path(tmp) / "data", Path(tmp) / "parquet" / "2026_10"
+        data_dir.mkdir()
+        _escrever_csvs(data_dir)
+        _converter(data_dir, pasta)
+        assert _converter(data_dir, pasta).total == 0
+        # CSV alterado é convertido de novo, sem sobrar partes da versão anterior
+        (data_dir / EMPRESAS).write_text('"00000001";"OUTRA";"2062";"49";"1,00";"01";""\n', encoding="latin-1")
+        assert _converter(data_dir, pasta).total == 1
+        assert len(list((pasta / "empresas").glob("*.parquet"))) == 1
+        assert ler_manifesto_snapshot(pasta)["arquivos"][f"empresas/{EMPRESAS}"]["linhas"] == 1
+
+
+def test_importar_parquet_uma_parte_por_insert():
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir, pasta = Path(tmp) / "data", Path(tmp) / "parquet" / "2026_10"
+        data_dir.mkdir()
+        _escrever_csvs(data_dir)
+        _converter(data_dir, pasta)
+        tarefas = process.tarefas_snapshot(pasta)
+        assert {t[0] for t in tarefas} == {"empresas", "cnaes"}
+        captura = Captura()
+        importer = _importer(captura)
+        for tabela, metodo, parte in tarefas:
+            getattr(importer, metodo)(parte, tabela)
+            assert importer.ultima_contagem.linhas == captura.dfs[-1].height
+            assert importer.ultima_contagem.problematicas is None
+    assert len(captura.dfs) == len(tarefas)
+    assert sum(df.height for df in captura.dfs) == 2_503
+
+
+def main() -> int:
+    testes = [
+        test_snapshot_igual_aos_lotes_do_importador,
+        test_segunda_conversao_pula_convertidos,
+        test_importar_parquet_uma_parte_por_insert,
+    ]
+    falhas = executar_testes(testes)
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Lotes agrupados pela chave da tabela de destino antes do INSERT.
+
+Na ordem do arquivo, cada lote de estabelecimentos espalha suas linhas por
+centenas de partições (uma por mês de início de atividade): cada INSERT vira
+centenas de partes pequenas, que o ClickHouse depois precisa juntar.
+
+AgrupadorLotes guarda as linhas por partição entre os blocos lidos e só manda
+uma partição quando ela junta um INSERT inteiro (ou quando o total guardado
+passa de `limite_linhas`, a partição maior vai primeiro): os INSERTs saem
+com uma partição cada, ordenados pelo ORDER BY, e viram partes grandes. No
+fim do arquivo, as sobras vão em INSERTs de no máximo MAX_PARTICOES_POR_INSERT
+partições. Tabelas sem PARTITION BY só têm cada bloco ordenado pelo ORDER BY.
+
+O agrupamento é determinístico (mesma entrada e configuração -> mesmos
+INSERTs), o que os tokens de deduplicação da retomada exigem.
+"""
+from typing import Dict, List, Optional
+
+import polars as pl
+
+# Espelham PARTITION BY / ORDER BY do clickhouse/schema.sql
+PARTICOES_TABELAS = {
+    "estabelecimentos": pl.col("data_inicio").dt.year() * 100 + pl.col("data_inicio").dt.month(),
+}
+ORDEM_TABELAS = {
+    "empresas": ["cnpj_basico"],
+    "estabelecimentos": ["uf", "municipio", "cnae_fiscal", "cnpj"],
+    "socios": ["cnpj_basico"],
+    "simples": ["cnpj_basico"],
+    "cnaes": ["codigo"],
+    "motivos": ["codigo"],
+    "municipios": ["codigo"],
+    "naturezas": ["codigo"],
+    "paises": ["codigo"],
+    "qualificacoes": ["codigo"],
+}
+
+# Padrão do max_partitions_per_insert_block do ClickHouse
+MAX_PARTICOES_POR_INSERT = 100
+
+_PARTICAO = "__particao"
+
+
+class AgrupadorLotes:
+    """
+    Recebe os blocos normalizados de um arquivo (adicionar) e devolve os
+    DataFrames prontos para INSERT, com até `tamanho_insert` linhas cada;
+    finalizar devolve o que sobrou. Guarda no máximo ~`limite_linhas` linhas
+    (0 desliga o agrupamento entre blocos: cada bloco só é ordenado).
+    """
+
+    def __init__(self, tabela: str, tamanho_insert: int, limite_linhas: int):
+        self.ordem = ORDEM_TABELAS.get(tabela, [])
+        self.particao: Optional[pl.Expr] = PARTICOES_TABELAS.get(tabela) if limite_linhas > 0 else None
+        self.tamanho_insert = tamanho_insert
+        self.limite_linhas = max(limite_linhas, tamanho_insert)
+        self._buffers: Dict[int, List[pl.DataFrame]] = {}
+        self._linhas: Dict[int, int] = {}
+
+    def redimensionar(self, tamanho_insert: int, limite_linhas: int) -> None:
+        """Novo tamanho dos INSERTs (governador de memória); vale a partir do próximo bloco"""
+        self.tamanho_insert = tamanho_insert
+        self.limite_linhas = max(limite_linhas, tamanho_insert)
+
+    @property
+    def linhas_guardadas(self) -> int:
+        return sum(self._linhas.values())
+
+    def _ordenar(self, df: pl.DataFrame) -> pl.DataFrame:
+        return df.sort(self.ordem, maintain_order=True) if self.ordem else df
+
+    def _fatiar(self, df: pl.DataFrame) -> List[pl.DataFrame]:
+        return [df.slice(inicio, self.tamanho_insert) for inicio in range(0, df.height, self.tamanho_insert)]
+
+    def _retirar(self, particao: int, inteiros: bool) -> List[pl.DataFrame]:
+        """Tira a partição do buffer, ordenada e fatiada; com `inteiros`, a sobra fica guardada"""
+        df = self._ordenar(pl.concat(self._buffers.pop(particao), rechunk=False))
+        del self._linhas[particao]
+        fatias = self._fatiar(df)
+        if inteiros and fatias[-1].height < self.tamanho_insert:
+            sobra = fatias.pop()
+            self._buffers[particao], self._linhas[particao] = [sobra], sobra.height
+        return [fatia.drop(_PARTICAO) for fatia in fatias]
+
+    def adicionar(self, df: pl.DataFrame) -> List[pl.DataFrame]:
+        if self.particao is None:
+            return self._fatiar(self._ordenar(df))
+
+        grupos = df.with_columns(self.particao.alias(_PARTICAO)).partition_by(_PARTICAO, as_dict=True)
+        prontos = []
+        for (particao,), grupo in grupos.items():
+            self._buffers.setdefault(particao, []).append(grupo)
+            self._linhas[particao] = self._linhas.get(particao, 0) + grupo.height
+            if self._linhas[particao] >= self.tamanho_insert:
+                prontos += self._retirar(particao, inteiros=True)
+        while self.linhas_guardadas > self.limite_linhas:
+            maior = max(self._linhas, key=lambda p: (self._linhas[p], p))
+            prontos += self._retirar(maior, inteiros=False)
+        return prontos
+
+    def finalizar(self) -> List[pl.DataFrame]:
+        """Sobras de todas as partições, em ordem de partição, juntadas em INSERTs"""
+        prontos: List[pl.DataFrame] = []
+        atual: List[pl.DataFrame] = []
+        linhas_atual = 0
+        for particao in sorted(self._buffers):
+            for fatia in self._retirar(particao, inteiros=False):
+                if atual and (linhas_atual + fatia.height > self.tamanho_insert
+                              or len(atual) >= MAX_PARTICOES_POR_INSERT):
+                    prontos.append(pl.concat(atual))
+                    atual, linhas_atual = [], 0
+                atual.append(fatia)
+                linhas_atual += fatia.height
+        if atual:
+            prontos.append(pl.concat(atual))
+        return prontos
+
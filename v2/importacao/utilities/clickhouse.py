@@ -1,6 +1,7 @@
 """Funções para gerenciamento do ClickHouse"""
 import logging
 import os
+import re
 import sys
 import time
 from dataclasses import dataclass
@@ -17,6 +18,7 @@ logger = logging.getLogger(__name__)
 class ClickHouseConfig:
     host: str = "localhost"
     port: int = 9000
+    http_port: int = 8123
     user: str = "default"
     password: str = ""
     database: str = "cnpj"
@@ -30,6 +32,7 @@ def carregar_config() -> ClickHouseConfig:
     return ClickHouseConfig(
         host=os.getenv("CLICKHOUSE_HOST", "localhost"),
         port=int(os.getenv("CLICKHOUSE_PORT", "9000")),
+        http_port=int(os.getenv("CLICKHOUSE_HTTP_PORT", "8123")),
         user=os.getenv("CLICKHOUSE_USER", "default"),
         password=os.getenv("CLICKHOUSE_PASSWORD", "") or "",
         database=os.getenv("CLICKHOUSE_DATABASE", "cnpj"),
@@ -78,8 +81,11 @@ def conectar_clickhouse(config: ClickHouseConfig) -> Client:
     raise RuntimeError("Não foi possível conectar ao ClickHouse")
 
 
-def criar_banco_e_schema(client: Client, schema_file: Path) -> bool:
-    """Cria banco de dados e schema no ClickHouse"""
+def criar_banco_e_schema(client: Client, schema_file: Path, sufixo_tabela: str = "") -> bool:
+    """
+    Cria banco de dados e schema no ClickHouse.
+    Com sufixo_tabela, cria as tabelas com o sufixo (staging de uma release).
+    """
     if not schema_file.exists():
         logger.error("Arquivo de schema não encontrado: %s", schema_file)
         return False
@@ -125,6 +131,11 @@ def criar_banco_e_schema(client: Client, schema_file: Path) -> bool:
             if statement.strip().upper().startswith("USE "):
                 logger.debug("Pulando comando USE (já conectado ao banco)")
                 continue
+            if sufixo_tabela:
+                statement = re.sub(
+                    r"^(CREATE TABLE (?:IF NOT EXISTS )?)(\w+)", rf"\g<1>\g<2>{sufixo_tabela}", statement,
+                    flags=re.IGNORECASE,
+                )
             try:
                 client.execute(statement)
                 # Verificar se é um CREATE TABLE
@@ -330,14 +341,17 @@ def configurar_sessao_clickhouse(client: Client) -> None:
         logger.warning("⚠ Erro ao configurar sessão: %s", exc)
 
 
-def verificar_importacao(client: Client, contagens_csv: Dict[str, dict]) -> bool:
-    """Verifica se a quantidade de registros no banco bate com os arquivos CSV"""
+def verificar_importacao(client: Client, contagens: Dict[str, dict]) -> bool:
+    """
+    Verifica se a quantidade de registros no banco bate com as linhas contadas
+    na importação (ResumoImportacao.contagens: linhas e problemáticas por tabela)
+    """
     print("\n" + "=" * 80)
     print("VERIFICAÇÃO DE IMPORTAÇÃO")
     print("=" * 80)
 
-    if not contagens_csv:
-        print("⚠ Contagem de linhas não foi realizada. Mostrando apenas contagens do banco:")
+    if not contagens:
+        print("⚠ Nenhuma contagem da importação disponível. Mostrando apenas contagens do banco:")
         tabelas = ["empresas", "estabelecimentos", "socios", "simples", "cnaes", "motivos", "municipios", "naturezas", "paises", "qualificacoes"]
         for tabela in tabelas:
             try:
@@ -349,16 +363,20 @@ def verificar_importacao(client: Client, contagens_csv: Dict[str, dict]) -> bool
         return True
 
     tudo_ok = True
-    for tabela, dados in contagens_csv.items():
-        if dados["validas"] == 0:
+    for tabela, dados in contagens.items():
+        if dados["linhas"] == 0:
             continue
         try:
             count_db = client.execute(f"SELECT count() FROM {tabela}")[0][0]
-            count_csv = dados["validas"]
+            count_csv = dados["linhas"]
             status = "✓" if count_db == count_csv else "✗"
             tudo_ok = tudo_ok and (status == "✓")
             diff = count_db - count_csv
-            print(f"{status} {tabela:20s} | CSV: {count_csv:>15,} | DB: {count_db:>15,} | Diff: {diff:>10,}")
+            problematicas = "n/d" if dados["problematicas"] is None else f"{dados['problematicas']:,}"
+            print(
+                f"{status} {tabela:20s} | CSV: {count_csv:>15,} | DB: {count_db:>15,} | "
+                f"Diff: {diff:>10,} | Problemáticas: {problematicas:>10}"
+            )
         except Exception as exc:
             print(f"✗ {tabela:20s} | Erro ao verificar: {exc}")
             tudo_ok = False
@@ -0,0 +1,209 @@
+"""
+Modo servidor: o ClickHouse faz o parsing e a normalização do CSV.
+
+Os bytes do arquivo (transcodificados para UTF-8) vão em streaming para
+`INSERT INTO t SELECT <normalizações> FROM input('c0 String, ...') FORMAT CSV`;
+zero à esquerda, datas e centavos rodam no parser paralelo do ClickHouse e o
+Python nunca toca nas linhas. As expressões reproduzem as do caminho Polars
+(expr_* em utilities.normalizador e os helpers de functions.import_csv).
+"""
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+from utilities.insercao import ClickHouseHTTP, settings_token
+from utilities.leitor_csv import CHUNK_BYTES_PADRAO, ler_blocos_utf8
+from utilities.normalizador import CODIGO_SIZE_DOMINIO, ESPACOS_PYTHON
+
+logger = logging.getLogger(__name__)
+
+# strip_chars() sem argumento do Polars: espaço Unicode (não inclui \x1c-\x1f)
+ESPACOS_POLARS = "".join(c for c in ESPACOS_PYTHON if c not in "\x1c\x1d\x1e\x1f")
+
+SETTINGS_CSV = {
+    "format_csv_delimiter": ";",
+    "format_csv_allow_single_quotes": 0,
+    "input_format_csv_detect_header": 0,
+    "input_format_csv_trim_whitespaces": 0,
+    # Colunas a mais são ignoradas e as ausentes ficam vazias, como no caminho Polars
+    "input_format_csv_allow_variable_number_of_columns": 1,
+}
+
+
+def _regex_strip(espacos: str) -> str:
+    classe = "".join(f"\\\\x{{{ord(c):x}}}" for c in espacos)
+    return f"'^[{classe}]+|[{classe}]+$'"
+
+
+# Padrões de strip declarados uma vez no WITH do INSERT (mantém a query curta)
+WITH_STRIP = {
+    "espacos_python": _regex_strip(ESPACOS_PYTHON),
+    "espacos_polars": _regex_strip(ESPACOS_POLARS),
+}
+
+
+def _strip(expr: str, espacos: str = "espacos_python") -> str:
+    return f"replaceRegexpAll({expr}, {espacos}, '')"
+
+
+def _zfill(expr: str, tamanho: int) -> str:
+    """str.zfill(tamanho)[:tamanho] do Python (sinal fica à frente dos zeros)"""
+    return (
+        f"substringUTF8(if(match({expr}, '^[+-]'), "
+        f"concat(substringUTF8({expr}, 1, 1), leftPadUTF8(substringUTF8({expr}, 2), {tamanho - 1}, '0')), "
+        f"leftPadUTF8({expr}, {tamanho}, '0')), 1, {tamanho})"
+    )
+
+
+def sql_limpar_string(coluna: str) -> str:
+    """Equivalente a expr_limpar_string"""
+    return _strip(f"replaceAll({coluna}, '\\0', '')")
+
+
+def sql_normalizar_codigo(coluna: str, tamanho: int) -> str:
+    """Equivalente a expr_normalizar_codigo"""
+    valor = _strip(coluna)
+    return f"if({valor} = '', '', {_zfill(valor, tamanho)})"
+
+
+def sql_normalizar_capital_social(coluna: str) -> str:
+    """Equivalente a expr_normalizar_capital_social (float * 100 truncado; inválido/negativo = 0)"""
+    centavos = f"toFloat64OrNull(replaceAll({_strip(coluna)}, ',', '.')) * 100"
+    # Mesmo limite do cast Float64 -> Int64 do Polars (fora da faixa vira nulo -> 0)
+    return (
+        f"ifNull(if(isFinite(ifNull({centavos}, nan)) AND {centavos} >= 0 AND {centavos} < pow(2, 63), "
+        f"toInt64({centavos}), 0), 0)"
+    )
+
+
+def sql_zfill_col(coluna: str, tamanho: int) -> str:
+    """Equivalente ao zfill_col de importar_estabelecimentos (vazio vira zeros)"""
+    return _zfill(_strip(f"replaceOne({coluna}, '\\0', '')", "espacos_polars"), tamanho)
+
+
+def sql_clean_col(coluna: str) -> str:
+    """Equivalente ao clean_col de importar_estabelecimentos"""
+    return _strip(f"replaceOne({coluna}, '\\0', '')", "espacos_polars")
+
+
+def sql_parse_date(coluna: str) -> str:
+    """Equivalente a parse_date: YYYY-MM-DD ou YYYYMMDD; fora de 1970..2149-06-06 vira 1970-01-01"""
+    valor = _strip(coluna, "espacos_polars")
+    data = (
+        f"toDate32(coalesce(parseDateTime64InJodaSyntaxOrNull({valor}, 'yyyy-M-d'), "
+        f"parseDateTime64InJodaSyntaxOrNull({valor}, 'yyyyMMdd')))"
+    )
+    return f"toDate(if(ifNull({data} BETWEEN '1970-01-01' AND '2149-06-06', 0), {data}, toDate32('1970-01-01')))"
+
+
+def colunas_tabela(tabela: str) -> List[str]:
+    """Lista `expressão AS coluna`, na ordem do schema, sobre c0..cN do input()"""
+    if tabela in CODIGO_SIZE_DOMINIO:
+        colunas = [
+            ("codigo", sql_normalizar_codigo("c0", CODIGO_SIZE_DOMINIO[tabela])),
+            ("descricao", sql_limpar_string("c1")),
+        ]
+    elif tabela == "empresas":
+        colunas = [
+            ("cnpj_basico", sql_normalizar_codigo("c0", 8)),
+            ("razao_social", sql_limpar_string("c1")),
+            ("natureza_juridica", sql_normalizar_codigo("c2", 4)),
+            ("qualificacao_do_responsavel", sql_normalizar_codigo("c3", 2)),
+            ("capital_social", sql_normalizar_capital_social("c4")),
+            ("porte", sql_normalizar_codigo("c5", 2)),
+            ("ente_federativo", sql_limpar_string("c6")),
+        ]
+    elif tabela == "estabelecimentos":
+        z, c, d = sql_zfill_col, sql_clean_col, sql_parse_date
+        colunas = [
+            ("cnpj_basico", z("c0", 8)),
+            ("cnpj_ordem", z("c1", 4)),
+            ("cnpj_dv", z("c2", 2)),
+            ("cnpj", "concat(cnpj_basico, cnpj_ordem, cnpj_dv)"),
+            ("matriz_filial", z("c3", 1)),
+            ("nome_fantasia", c("c4")),
+            ("situacao_cadastral", z("c5", 2)),
+            ("data_situacao", d("c6")),
+            ("motivo_situacao", z("c7", 2)),
+            ("cidade_exterior", c("c8")),
+            ("pais", z("c9", 3)),
+            ("data_inicio", d("c10")),
+            ("cnae_fiscal", z("c11", 7)),
+            ("cnae_fiscal_secundaria", c("c12")),
+            ("tipo_logradouro", c("c13")),
+            ("logradouro", c("c14")),
+            ("numero", c("c15")),
+            ("complemento", c("c16")),
+            ("bairro", c("c17")),
+            ("cep", z("c18", 8)),
+            ("uf", z("c19", 2)),
+            ("municipio", z("c20", 4)),
+            ("ddd_1", z("c21", 2)),
+            ("telefone_1", c("c22")),
+            ("ddd_2", z("c23", 2)),
+            ("telefone_2", c("c24")),
+            ("ddd_fax", z("c25", 2)),
+            ("fax", c("c26")),
+            ("email", c("c27")),
+            ("situacao_especial", c("c28")),
+            ("data_situacao_especial", d("c29")),
+        ]
+    elif tabela == "socios":
+        colunas = [
+            ("cnpj_basico", sql_normalizar_codigo("c0", 8)),
+            ("identificador_socio", sql_normalizar_codigo("c1", 1)),
+            ("nome_socio", sql_limpar_string("c2")),
+            ("cnpj_cpf_socio", sql_limpar_string("c3")),
+            ("qualificacao_socio", sql_normalizar_codigo("c4", 2)),
+            ("data_entrada_sociedade", sql_parse_date("c5")),
+            ("pais", sql_normalizar_codigo("c6", 3)),
+            ("representante_legal", sql_normalizar_codigo("c7", 1)),
+            ("nome_representante", sql_limpar_string("c8")),
+            ("qualificacao_representante", sql_normalizar_codigo("c9", 2)),
+            ("faixa_etaria", sql_normalizar_codigo("c10", 1)),
+        ]
+    elif tabela == "simples":
+        colunas = [
+            ("cnpj_basico", sql_normalizar_codigo("c0", 8)),
+            ("opcao_simples", sql_normalizar_codigo("c1", 1)),
+            ("data_opcao_simples", sql_parse_date("c2")),
+            ("data_exclusao_simples", sql_parse_date("c3")),
+            ("opcao_mei", sql_normalizar_codigo("c4", 1)),
+            ("data_opcao_mei", sql_parse_date("c5")),
+            ("data_exclusao_mei", sql_parse_date("c6")),
+        ]
+    else:
+        raise ValueError(f"Tabela sem modo servidor: {tabela}")
+    return [f"{expr} AS {nome}" for nome, expr in colunas]
+
+
+def estrutura_input(num_colunas: int) -> str:
+    return ", ".join(f"c{i} String" for i in range(num_colunas))
+
+
+def montar_select(tabela: str, origem: str) -> str:
+    """WITH + SELECT das normalizações sobre `origem` (input(...) ou format(...) nos testes)"""
+    constantes = ", ".join(f"{valor} AS {nome}" for nome, valor in WITH_STRIP.items())
+    colunas = ",\n    ".join(colunas_tabela(tabela))
+    return f"WITH {constantes}\nSELECT\n    {colunas}\nFROM {origem}"
+
+
+def montar_insert(tabela: str, num_colunas: int, destino: Optional[str] = None) -> str:
+    """INSERT em `destino` (padrão: a própria tabela, ou a de staging da release)"""
+    origem = f"input('{estrutura_input(num_colunas)}')"
+    return f"INSERT INTO {destino or tabela}\n{montar_select(tabela, origem)}\nFORMAT CSV"
+
+
+def importar_no_servidor(http: ClickHouseHTTP, arquivo: Path, tabela: str, num_colunas: int,
+                         chunk_bytes: int = CHUNK_BYTES_PADRAO, destino: Optional[str] = None,
+                         token: Optional[str] = None) -> int:
+    """
+    Envia o arquivo em streaming para o INSERT ... SELECT FROM input(); retorna
+    linhas escritas. Com `token`, o servidor numera os blocos que formar
+    (token_0, token_1, ...) e descarta os já inseridos numa tentativa anterior.
+    """
+    logger.info(f"  {arquivo.name}: parsing e normalização no servidor (FORMAT CSV)")
+    corpo = (bloco for bloco, _, _ in ler_blocos_utf8(arquivo, chunk_bytes))
+    resposta = http.post(montar_insert(tabela, num_colunas, destino), corpo,
+                         **SETTINGS_CSV, **settings_token(token))
+    return ClickHouseHTTP.linhas_escritas(resposta)
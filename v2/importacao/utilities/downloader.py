@@ -1,11 +1,16 @@
 """Módulo para download e descompactação de arquivos da Receita Federal"""
 import os
 import sys
+import json
 import time
+import random
 import zipfile
 import shutil
 import concurrent.futures
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
 from pathlib import Path
+from typing import List, Optional
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
@@ -17,6 +22,11 @@ logger = logging.getLogger(__name__)
 # URL base dos dados da Receita Federal
 CNPJ_BASE_URL = "https://arquivos.receitafederal.gov.br/dados/cnpj/dados_abertos_cnpj/"
 
+# Leitura da rede em blocos de 256 KB (o que já chegou de um bloco interrompido
+# se perde, então blocos menores aproveitam mais na retomada) e escrita com 4 MB
+CHUNK_DOWNLOAD = 256 * 1024
+BUFFER_ESCRITA = 4 * 1024 * 1024
+
 
 def get_target_folder(filename: str, data_dir: Path) -> Path:
     """Determina a pasta de destino baseado no nome do arquivo."""
@@ -32,45 +42,150 @@ def get_target_folder(filename: str, data_dir: Path) -> Path:
     return data_dir / "dominio"
 
 
-def download_file(url: str, dest_folder: Path):
-    """Baixa um arquivo de uma URL para uma pasta de destino com indicador de progresso."""
-    local_filename = dest_folder / url.split('/')[-1]
-    
-    if local_filename.exists():
-        logger.info(f"Arquivo {local_filename.name} já existe. Pulando.")
-        return True
+@dataclass
+class InfoRemota:
+    """Metadados do arquivo no servidor (HEAD): tamanho, Last-Modified e suporte a Range"""
+    tamanho: Optional[int]
+    last_modified: Optional[str]
+    aceita_range: bool
 
-    logger.info(f"Baixando {url}...")
-    try:
-        with requests.get(url, stream=True, timeout=300) as r:
-            r.raise_for_status()
-            total_length = r.headers.get('content-length')
-
-            with open(local_filename, 'wb') as f:
-                if total_length is None: 
-                    f.write(r.content)
-                else:
-                    dl = 0
-                    total_length = int(total_length)
-                    for chunk in r.iter_content(chunk_size=8192):
-                        if chunk: 
-                            dl += len(chunk)
-                            f.write(chunk)
-                            done = int(50 * dl / total_length)
-                            percent = 100 * dl / total_length
-                            sys.stdout.write(f"\r[{'=' * done}{' ' * (50-done)}] {percent:.2f}% | {dl/1024/1024:.2f} MB")
-                            sys.stdout.flush()
-        print()  # Nova linha após a barra de progresso
-        return True
-    except Exception as e:
-        logger.error(f"Erro ao baixar {url}: {e}")
+    @property
+    def timestamp(self) -> Optional[float]:
+        if not self.last_modified:
+            return None
+        try:
+            return parsedate_to_datetime(self.last_modified).timestamp()
+        except (TypeError, ValueError):
+            return None
+
+
+def downloads_simultaneos() -> int:
+    """Downloads em paralelo (IMPORT_DOWNLOAD_WORKERS); padrão: 4"""
+    return max(1, int(os.getenv("IMPORT_DOWNLOAD_WORKERS", "4")))
+
+
+def consultar_remoto(url: str, session: Optional[requests.Session] = None) -> InfoRemota:
+    """HEAD no arquivo: Content-Length, Last-Modified e Accept-Ranges"""
+    r = (session or requests).head(url, allow_redirects=True, timeout=30)
+    if r.status_code in (405, 501):
+        # Servidor sem HEAD: baixa sem validação de tamanho nem retomada
+        return InfoRemota(tamanho=None, last_modified=None, aceita_range=False)
+    r.raise_for_status()
+    tamanho = r.headers.get("content-length")
+    return InfoRemota(
+        tamanho=int(tamanho) if tamanho is not None else None,
+        last_modified=r.headers.get("last-modified"),
+        aceita_range=r.headers.get("accept-ranges", "").lower() == "bytes",
+    )
+
+
+def arquivo_confere(caminho: Path, remoto: Optional[InfoRemota]) -> bool:
+    """
+    Arquivo local completo e atual: mesmo tamanho do servidor e mtime não
+    anterior ao Last-Modified (como o wget -N). Sem dados do servidor, exige
+    ao menos um ZIP íntegro (diretório central legível).
+    """
+    if not caminho.exists():
         return False
+    if remoto is None or remoto.tamanho is None:
+        return zipfile.is_zipfile(caminho) if caminho.suffix.lower() == ".zip" else True
+    if caminho.stat().st_size != remoto.tamanho:
+        return False
+    return remoto.timestamp is None or int(caminho.stat().st_mtime) >= int(remoto.timestamp)
 
 
-def baixar_arquivos_mes_atual(downloads_dir: Path):
-    """Baixa os arquivos do mês atual da Receita Federal. Se não encontrar (404), tenta o mês anterior."""
-    logger.info("Baixando arquivos do mês atual da Receita Federal...")
-    
+def _baixar_para_parcial(url: str, parcial: Path, meta: Path, remoto: InfoRemota,
+                         session: requests.Session, progresso: bool) -> None:
+    """Uma tentativa: continua `parcial` com Range (se o arquivo remoto não mudou) ou recomeça"""
+    inicio = 0
+    if parcial.exists() and meta.exists() and remoto.aceita_range:
+        anterior = json.loads(meta.read_text(encoding="utf-8"))
+        mesmo_arquivo = anterior.get("tamanho") == remoto.tamanho and anterior.get("last_modified") == remoto.last_modified
+        if mesmo_arquivo and parcial.stat().st_size <= (remoto.tamanho or 0):
+            inicio = parcial.stat().st_size
+    meta.write_text(json.dumps({"url": url, "tamanho": remoto.tamanho,
+                                "last_modified": remoto.last_modified}), encoding="utf-8")
+    if inicio and inicio == remoto.tamanho:
+        return
+
+    headers = {}
+    if inicio:
+        headers["Range"] = f"bytes={inicio}-"
+        if remoto.last_modified:
+            # Se o arquivo mudou no servidor, ele responde 200 com o arquivo inteiro
+            headers["If-Range"] = remoto.last_modified
+    with session.get(url, stream=True, timeout=300, headers=headers) as r:
+        r.raise_for_status()
+        if inicio and r.status_code != 206:
+            logger.info(f"  {parcial.name}: servidor ignorou o Range, recomeçando do início")
+            inicio = 0
+        baixado = inicio
+        with open(parcial, "ab" if inicio else "wb", buffering=BUFFER_ESCRITA) as f:
+            for chunk in r.iter_content(chunk_size=CHUNK_DOWNLOAD):
+                f.write(chunk)
+                baixado += len(chunk)
+                if progresso and remoto.tamanho:
+                    done = int(50 * baixado / remoto.tamanho)
+                    percent = 100 * baixado / remoto.tamanho
+                    sys.stdout.write(f"\r[{'=' * done}{' ' * (50-done)}] {percent:.2f}% | {baixado/1024/1024:.2f} MB")
+                    sys.stdout.flush()
+        if progresso:
+            print()  # Nova linha após a barra de progresso
+
+
+def download_file(url: str, dest_folder: Path, progresso: bool = True,
+                  tentativas: Optional[int] = None, espera_base: float = 2.0) -> bool:
+    """Baixa um arquivo de uma URL para uma pasta de destino com indicador de progresso.
+    progresso=False omite a barra (downloads simultâneos, ex.: no pipeline).
+
+    O download vai para `<nome>.part` e só vira `<nome>` depois de conferir o
+    tamanho com o servidor (e, para ZIPs, o diretório central). Conexão caída
+    é retomada de onde parou (HTTP Range), com até `tentativas`
+    (IMPORT_DOWNLOAD_RETRIES) e espera exponencial entre elas. Um arquivo já
+    existente só é reaproveitado se o tamanho e a data baterem com o servidor.
+    """
+    local_filename = dest_folder / url.split('/')[-1]
+    parcial = local_filename.with_name(local_filename.name + ".part")
+    meta = local_filename.with_name(local_filename.name + ".part.json")
+    tentativas = tentativas or int(os.getenv("IMPORT_DOWNLOAD_RETRIES", "5"))
+
+    session = requests.Session()
+    for tentativa in range(1, tentativas + 1):
+        try:
+            remoto = consultar_remoto(url, session)
+            if arquivo_confere(local_filename, remoto):
+                logger.info(f"Arquivo {local_filename.name} já existe e confere com o servidor. Pulando.")
+                return True
+
+            logger.info(f"Baixando {url}..." if tentativa == 1 else f"Retomando {url} (tentativa {tentativa}/{tentativas})...")
+            _baixar_para_parcial(url, parcial, meta, remoto, session, progresso)
+
+            tamanho = parcial.stat().st_size
+            if remoto.tamanho is not None and tamanho != remoto.tamanho:
+                raise IOError(f"tamanho {tamanho:,} diferente do servidor ({remoto.tamanho:,})")
+            if local_filename.suffix.lower() == ".zip" and not zipfile.is_zipfile(parcial):
+                # Conteúdo corrompido: não adianta retomar, recomeçar do zero
+                parcial.unlink()
+                raise IOError("ZIP inválido")
+            os.replace(parcial, local_filename)
+            meta.unlink(missing_ok=True)
+            if remoto.timestamp is not None:
+                os.utime(local_filename, (remoto.timestamp, remoto.timestamp))
+            if not progresso:
+                logger.info(f"✓ {local_filename.name} baixado")
+            return True
+        except (requests.RequestException, IOError) as e:
+            if tentativa == tentativas:
+                logger.error(f"Erro ao baixar {url}: {e}")
+                return False
+            espera = min(espera_base * 2 ** (tentativa - 1), 60) * random.uniform(0.5, 1.0)
+            logger.warning(f"⚠ {local_filename.name}: {e}. Nova tentativa em {espera:.1f}s")
+            time.sleep(espera)
+    return False
+
+
+def listar_links_mes_atual() -> List[str]:
+    """URLs dos ZIPs do mês atual da Receita Federal. Se não encontrar (404), usa o mês anterior."""
     target_date = datetime.now().strftime("%Y-%m")
     target_url = urljoin(CNPJ_BASE_URL, f"{target_date}/")
     
@@ -98,21 +213,25 @@ def baixar_arquivos_mes_atual(downloads_dir: Path):
             except requests.exceptions.RequestException as e2:
                 logger.error(f"Erro ao acessar URL do mês anterior: {e2}")
                 logger.error("Verifique se a data está correta e se a página existe.")
-                return False
+                return []
         else:
             logger.error(f"Erro ao acessar URL: {e}")
             logger.error("Verifique se a data está correta e se a página existe.")
-            return False
+            return []
     except requests.exceptions.RequestException as e:
         logger.error(f"Erro ao acessar URL: {e}")
         logger.error("Verifique se a data está correta e se a página existe.")
-        return False
-
+        return []
 
     soup = BeautifulSoup(response.text, 'html.parser')
-    
-    links = [urljoin(target_url, a['href']) for a in soup.find_all('a', href=True) if a['href'].lower().endswith('.zip')]
-    
+    return [urljoin(target_url, a['href']) for a in soup.find_all('a', href=True) if a['href'].lower().endswith('.zip')]
+
+
+def baixar_arquivos_mes_atual(downloads_dir: Path):
+    """Baixa os arquivos do mês atual da Receita Federal. Se não encontrar (404), tenta o mês anterior."""
+    logger.info("Baixando arquivos do mês atual da Receita Federal...")
+
+    links = listar_links_mes_atual()
     if not links:
         logger.warning("Nenhum arquivo .zip encontrado nesta localização.")
         return False
@@ -123,12 +242,7 @@ def baixar_arquivos_mes_atual(downloads_dir: Path):
     logger.info(f"Salvando arquivos em {downloads_dir}")
 
     start_time = time.time()
-    success_count = 0
-    
-    for idx, link in enumerate(links, start=1):
-        logger.info(f"[{idx}/{len(links)}] Processando...")
-        if download_file(link, downloads_dir):
-            success_count += 1
+    success_count = baixar_arquivos(links, downloads_dir)
 
     elapsed = time.time() - start_time
     logger.info(f"Downloads concluídos em {elapsed:.2f}s. {success_count}/{len(links)} arquivos baixados.")
@@ -136,6 +250,16 @@ def baixar_arquivos_mes_atual(downloads_dir: Path):
     return success_count > 0
 
 
+def baixar_arquivos(links: List[str], downloads_dir: Path, workers: Optional[int] = None) -> int:
+    """Baixa os links em paralelo (até `workers`, padrão IMPORT_DOWNLOAD_WORKERS); retorna os concluídos"""
+    workers = workers or downloads_simultaneos()
+    if workers == 1:
+        return sum(download_file(link, downloads_dir) for link in links)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        # Barra de progresso só faz sentido com um download por vez
+        return sum(executor.map(lambda link: download_file(link, downloads_dir, progresso=False), links))
+
+
 def descompactar_arquivos(downloads_dir: Path, data_dir: Path):
     """Descompacta todos os ZIPs da pasta downloads para a estrutura organizada.
     Baseado na função do v1/scripts/page.py que funcionava bem."""
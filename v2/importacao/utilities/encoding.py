@@ -0,0 +1,132 @@
+"""
+Detecção de encoding dos CSVs da Receita por amostra, com cache em manifesto.
+
+O encoding é decidido uma vez por arquivo a partir de uma amostra limitada
+(AMOSTRA_BYTES) e guardado em um manifesto JSON (MANIFESTO) na pasta do
+arquivo, junto com o tamanho e o mtime: na execução seguinte o arquivo nem
+precisa ser amostrado. Resultados possíveis:
+
+- "latin-1": amostra não é UTF-8 válido (padrão dos arquivos da Receita)
+- "utf-8": amostra com acentos em UTF-8 válido
+- "ascii": amostra só com ASCII; vale como UTF-8, e o leitor ainda passa
+  para latin-1 se algum bloco adiante não for UTF-8 válido
+"""
+import codecs
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from utilities.fontes import FonteCSV
+
+logger = logging.getLogger(__name__)
+
+AMOSTRA_BYTES = 1024 * 1024
+MANIFESTO = ".encodings.json"
+ENCODINGS = ("latin-1", "utf-8", "ascii")
+
+
+def detectar_encoding(amostra: bytes) -> str:
+    """Classifica uma amostra de bytes (pode começar ou terminar no meio de um caractere)"""
+    if amostra.isascii():
+        return "ascii"
+    # Amostras do meio do arquivo podem começar em bytes de continuação UTF-8
+    inicio = 0
+    while inicio < min(3, len(amostra)) and 0x80 <= amostra[inicio] <= 0xBF:
+        inicio += 1
+    try:
+        # final=False: um caractere cortado no fim da amostra não é erro
+        codecs.getincrementaldecoder("utf-8")().decode(amostra[inicio:], final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def combinar_encodings(*encodings: str) -> str:
+    """Encoding do arquivo a partir das amostras: basta uma não UTF-8 para ser latin-1"""
+    if "latin-1" in encodings:
+        return "latin-1"
+    return "utf-8" if "utf-8" in encodings else "ascii"
+
+
+def detectar_encoding_arquivo(arquivo: Union[Path, FonteCSV], amostra_bytes: int = AMOSTRA_BYTES) -> str:
+    """
+    Amostra o arquivo sem lê-lo inteiro: início, meio e fim em arquivos
+    comuns; só o início em membros de ZIP (o stream não tem seek).
+    """
+    if isinstance(arquivo, FonteCSV) and arquivo.membro is not None:
+        with arquivo.open("rb") as f:
+            return detectar_encoding(f.read(amostra_bytes))
+
+    caminho = arquivo.caminho if isinstance(arquivo, FonteCSV) else Path(arquivo)
+    tamanho = caminho.stat().st_size
+    with open(caminho, "rb") as f:
+        if tamanho <= 3 * amostra_bytes:
+            return detectar_encoding(f.read())
+        amostras = []
+        for posicao in (0, tamanho // 2, tamanho - amostra_bytes):
+            f.seek(posicao)
+            amostras.append(detectar_encoding(f.read(amostra_bytes)))
+    return combinar_encodings(*amostras)
+
+
+def _identificacao(arquivo: Union[Path, FonteCSV]) -> Tuple[Path, str, str]:
+    """(manifesto, chave, assinatura) do arquivo; a assinatura muda se o arquivo mudar"""
+    if isinstance(arquivo, FonteCSV):
+        caminho, chave = arquivo.caminho, str(arquivo.caminho.name)
+        if arquivo.membro is not None:
+            chave = f"{chave}:{arquivo.membro}"
+    else:
+        caminho = Path(arquivo)
+        chave = caminho.name
+    stat = caminho.stat()
+    return caminho.parent / MANIFESTO, chave, f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _ler_manifesto(manifesto: Path) -> Dict[str, dict]:
+    try:
+        return json.loads(manifesto.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def encoding_em_cache(arquivo: Union[Path, FonteCSV]) -> Optional[str]:
+    """Encoding registrado no manifesto, se o arquivo não mudou desde então"""
+    try:
+        manifesto, chave, assinatura = _identificacao(arquivo)
+    except OSError:
+        return None
+    entrada = _ler_manifesto(manifesto).get(chave)
+    if entrada and entrada.get("assinatura") == assinatura and entrada.get("encoding") in ENCODINGS:
+        return entrada["encoding"]
+    return None
+
+
+def registrar_encoding(arquivo: Union[Path, FonteCSV], encoding: str) -> None:
+    """
+    Grava o encoding no manifesto. Workers em paralelo podem gravar ao mesmo
+    tempo: relê antes de gravar e troca o arquivo atomicamente; no pior caso
+    uma entrada se perde e o arquivo é amostrado de novo na próxima execução.
+    """
+    try:
+        manifesto, chave, assinatura = _identificacao(arquivo)
+        entradas = _ler_manifesto(manifesto)
+        if entradas.get(chave) == {"assinatura": assinatura, "encoding": encoding}:
+            return
+        entradas[chave] = {"assinatura": assinatura, "encoding": encoding}
+        temporario = manifesto.with_name(f"{MANIFESTO}.{os.getpid()}.tmp")
+        temporario.write_text(json.dumps(entradas, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(temporario, manifesto)
+    except OSError as exc:
+        # Pasta somente leitura: segue sem cache
+        logger.debug("Manifesto de encoding não gravado para %s: %s", arquivo, exc)
+
+
+def encoding_do_arquivo(arquivo: Union[Path, FonteCSV]) -> str:
+    """Encoding do manifesto ou, se ausente/desatualizado, detectado por amostra e registrado"""
+    encoding = encoding_em_cache(arquivo)
+    if encoding is None:
+        encoding = detectar_encoding_arquivo(arquivo)
+        registrar_encoding(arquivo, encoding)
+    return encoding
@@ -0,0 +1,148 @@
+"""
+Finalização da staging antes da troca: deixa as tabelas da release prontas
+para leitura, para a API não pagar os merges nos primeiros dias.
+
+A carga em lotes deixa centenas de partes por partição (estabelecimentos é
+particionada por mês de início de atividade). Antes de ativar a release:
+
+1. OPTIMIZE ... PARTITION ID ... FINAL em cada partição com mais de uma parte,
+   uma de cada vez (o merge de uma partição não disputa disco e memória com
+   outra);
+2. MATERIALIZE INDEX / MATERIALIZE PROJECTION para índices de salto e
+   projeções que ainda não existem nas partes (adicionados depois da carga);
+3. espera os merges e mutações pendentes terminarem (até
+   IMPORT_FINALIZAR_TIMEOUT segundos).
+
+IMPORT_FINALIZAR=0 pula a etapa (os merges ficam para o ClickHouse fazer em
+segundo plano, já com a release no ar).
+"""
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+from clickhouse_driver import Client
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_ESPERA = 5
+
+
+def finalizar_tabelas() -> bool:
+    """IMPORT_FINALIZAR=0 desliga a otimização da staging antes da troca (padrão: ligada)"""
+    return os.getenv("IMPORT_FINALIZAR", "1").lower() not in ("0", "false", "nao", "não")
+
+
+def _partes_por_particao(client: Client, tabela: str) -> Dict[str, int]:
+    return dict(client.execute(
+        "SELECT partition_id, count() FROM system.parts "
+        "WHERE database = currentDatabase() AND table = %(tabela)s AND active GROUP BY partition_id",
+        {"tabela": tabela},
+    ))
+
+
+def otimizar_particoes(client: Client, tabela: str) -> int:
+    """OPTIMIZE FINAL partição a partição (só nas que têm mais de uma parte); retorna quantas"""
+    otimizadas = 0
+    for particao, partes in sorted(_partes_por_particao(client, tabela).items()):
+        if partes <= 1:
+            continue
+        client.execute(f"OPTIMIZE TABLE {tabela} PARTITION ID '{particao}' FINAL")
+        otimizadas += 1
+    return otimizadas
+
+
+def materializar_indices(client: Client, tabela: str) -> List[str]:
+    """Índices de salto sem dados em disco (criados depois das partes) são materializados"""
+    pendentes = [
+        linha[0] for linha in client.execute(
+            "SELECT name FROM system.data_skipping_indices "
+            "WHERE database = currentDatabase() AND table = %(tabela)s AND data_compressed_bytes = 0",
+            {"tabela": tabela},
+        )
+    ]
+    if pendentes and client.execute(f"SELECT count() FROM {tabela}")[0][0] == 0:
+        return []
+    for indice in pendentes:
+        client.execute(f"ALTER TABLE {tabela} MATERIALIZE INDEX {indice}", settings={"mutations_sync": 1})
+    return pendentes
+
+
+def materializar_projecoes(client: Client, tabela: str) -> List[str]:
+    """Projeções que faltam em alguma parte ativa são materializadas"""
+    ddl = client.execute(
+        "SELECT create_table_query FROM system.tables WHERE database = currentDatabase() AND name = %(tabela)s",
+        {"tabela": tabela},
+    )
+    projecoes = re.findall(r"PROJECTION\s+(\w+)", ddl[0][0]) if ddl else []
+    if not projecoes:
+        return []
+    partes = sum(_partes_por_particao(client, tabela).values())
+    pendentes = []
+    for projecao in projecoes:
+        com_projecao = client.execute(
+            "SELECT countDistinct(parent_name) FROM system.projection_parts "
+            "WHERE database = currentDatabase() AND table = %(tabela)s AND name = %(projecao)s AND active",
+            {"tabela": tabela, "projecao": projecao},
+        )[0][0]
+        if com_projecao < partes:
+            client.execute(f"ALTER TABLE {tabela} MATERIALIZE PROJECTION {projecao}", settings={"mutations_sync": 1})
+            pendentes.append(projecao)
+    return pendentes
+
+
+def aguardar_merges(client: Client, tabelas: List[str], timeout: float) -> bool:
+    """Espera não haver merges nem mutações em andamento nas tabelas; False se estourar o timeout"""
+    params = {"tabelas": tuple(tabelas)}
+    limite = time.monotonic() + timeout
+    while True:
+        merges = client.execute(
+            "SELECT count() FROM system.merges WHERE database = currentDatabase() AND table IN %(tabelas)s",
+            params,
+        )[0][0]
+        mutacoes = client.execute(
+            "SELECT count() FROM system.mutations "
+            "WHERE database = currentDatabase() AND table IN %(tabelas)s AND NOT is_done",
+            params,
+        )[0][0]
+        if merges == 0 and mutacoes == 0:
+            return True
+        if time.monotonic() >= limite:
+            logger.warning("  ⚠ Ainda há %s merge(s) e %s mutação(ões) depois de %ss; seguindo com a troca",
+                           merges, mutacoes, int(timeout))
+            return False
+        time.sleep(INTERVALO_ESPERA)
+
+
+def finalizar_staging(client: Client, tabelas: List[str], timeout: Optional[float] = None) -> Dict[str, dict]:
+    """
+    Otimiza as tabelas (de staging) e espera os merges; retorna, por tabela,
+    partes antes/depois, partições otimizadas, índices/projeções materializados
+    e segundos gastos.
+    """
+    if timeout is None:
+        timeout = float(os.getenv("IMPORT_FINALIZAR_TIMEOUT", "3600"))
+    logger.info("Otimizando as tabelas da release (OPTIMIZE FINAL por partição)...")
+    resumo: Dict[str, dict] = {}
+    for tabela in tabelas:
+        inicio = time.perf_counter()
+        partes_antes = sum(_partes_por_particao(client, tabela).values())
+        particoes = otimizar_particoes(client, tabela)
+        materializados = materializar_indices(client, tabela) + materializar_projecoes(client, tabela)
+        resumo[tabela] = {
+            "partes_antes": partes_antes,
+            "partes_depois": sum(_partes_por_particao(client, tabela).values()),
+            "particoes_otimizadas": particoes,
+            "materializados": materializados,
+            "segundos": round(time.perf_counter() - inicio, 1),
+        }
+        logger.info(
+            "  ✓ %-30s | partes: %6s -> %6s | partições otimizadas: %5s | %7.1fs%s",
+            tabela, resumo[tabela]["partes_antes"], resumo[tabela]["partes_depois"], particoes,
+            resumo[tabela]["segundos"], f" | materializados: {', '.join(materializados)}" if materializados else "",
+        )
+    inicio = time.perf_counter()
+    if aguardar_merges(client, tabelas, timeout):
+        logger.info("  ✓ Sem merges pendentes (espera de %.1fs)", time.perf_counter() - inicio)
+    return resumo
@@ -0,0 +1,77 @@
+"""
+Origem dos CSVs da Receita: arquivo já extraído em data/ ou membro de um ZIP
+em downloads/, lido em streaming (descompactado em memória, bloco a bloco).
+"""
+import zipfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterator, List, Optional
+
+from utilities.utils import encontrar_arquivos_csv, nome_corresponde_padrao, validar_arquivo
+
+
+@dataclass(frozen=True)
+class FonteCSV:
+    """
+    Um CSV a importar. `membro` preenchido = arquivo dentro do ZIP `caminho`.
+    Imutável e picklável, para ir como tarefa para os workers do pool.
+    """
+    caminho: Path
+    membro: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        """Nome do CSV (o do membro, para ZIPs), usado nos logs e no casamento de padrões"""
+        return PurePosixPath(self.membro).name if self.membro else self.caminho.name
+
+    @property
+    def tamanho(self) -> int:
+        """Tamanho descompactado em bytes"""
+        if self.membro is None:
+            return self.caminho.stat().st_size
+        with zipfile.ZipFile(self.caminho) as zf:
+            return zf.getinfo(self.membro).file_size
+
+    def open(self, mode: str = "rb") -> BinaryIO:
+        """Abre para leitura binária; para ZIPs, o membro é descompactado em streaming"""
+        if mode != "rb":
+            raise ValueError(f"FonteCSV só abre em modo 'rb' (recebido {mode!r})")
+        if self.membro is None:
+            return self.caminho.open("rb")
+        return _abrir_membro(self.caminho, self.membro)
+
+    def __str__(self) -> str:
+        return f"{self.caminho.name}:{self.membro}" if self.membro else str(self.caminho)
+
+
+@contextmanager
+def _abrir_membro(caminho: Path, membro: str) -> Iterator[BinaryIO]:
+    # Fecha o membro e o ZIP juntos
+    with zipfile.ZipFile(caminho) as zf, zf.open(membro) as f:
+        yield f
+
+
+def membros_zip(zip_path: Path) -> List[FonteCSV]:
+    """Arquivos não vazios dentro do ZIP (ZIP inválido = nenhum)"""
+    try:
+        with zipfile.ZipFile(zip_path) as zf:
+            infos = zf.infolist()
+    except zipfile.BadZipFile:
+        return []
+    return [FonteCSV(zip_path, info.filename) for info in infos if not info.is_dir() and info.file_size > 0]
+
+
+def encontrar_membros_zip(downloads_dir: Path, padrao: str) -> List[FonteCSV]:
+    """CSVs dentro dos ZIPs de downloads_dir que correspondem ao padrão (ignora vazios)"""
+    return [
+        fonte for zip_path in sorted(downloads_dir.glob("*.zip")) for fonte in membros_zip(zip_path)
+        if nome_corresponde_padrao(fonte.name, padrao)
+    ]
+
+
+def encontrar_fontes(diretorio: Path, padrao: str, ler_zip: bool = False) -> List[FonteCSV]:
+    """CSVs do padrão: membros dos ZIPs (ler_zip) ou arquivos extraídos em `diretorio`"""
+    if ler_zip:
+        return encontrar_membros_zip(diretorio, padrao)
+    return [FonteCSV(a) for a in encontrar_arquivos_csv(diretorio, padrao) if validar_arquivo(a)]
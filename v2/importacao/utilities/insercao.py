@@ -0,0 +1,137 @@
+"""Inserção colunar no ClickHouse (sem converter o DataFrame em listas de linhas)"""
+import io
+import json
+import logging
+import os
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import polars as pl
+import requests
+from clickhouse_driver import Client
+
+from utilities.clickhouse import ClickHouseConfig, carregar_config
+
+logger = logging.getLogger(__name__)
+
+# Mesmas configurações de sessão que o importador aplica na conexão nativa
+SETTINGS_INSERT = {
+    "max_partitions_per_insert_block": 10000,
+}
+
+
+def settings_token(token: Optional[str]) -> dict:
+    """
+    insert_deduplication_token do INSERT: reenviar o mesmo lote com o mesmo
+    token não duplica linhas em tabelas com janela de deduplicação
+    (ver utilities/manifesto_importacao.py)
+    """
+    return {"insert_deduplication_token": token} if token else {}
+
+
+class ClickHouseHTTP:
+    """Cliente mínimo da interface HTTP do ClickHouse (POST com corpo em streaming)"""
+
+    def __init__(self, config: ClickHouseConfig, timeout: int = 3600):
+        self.url = f"http://{config.host}:{config.http_port}/"
+        self.database = config.database
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["X-ClickHouse-User"] = config.user
+        if config.password and config.password.strip() and config.password.strip().lower() != "none":
+            self.session.headers["X-ClickHouse-Key"] = config.password.strip()
+
+    def disponivel(self) -> bool:
+        """Verifica se a interface HTTP responde (GET /ping)"""
+        try:
+            return self.session.get(self.url + "ping", timeout=5).status_code == 200
+        except requests.RequestException:
+            return False
+
+    def post(self, query: str, corpo: Union[bytes, Iterable[bytes]], **settings) -> requests.Response:
+        """Executa `query` com `corpo` como dados de entrada; iterável = envio em chunks"""
+        resposta = self.session.post(
+            self.url,
+            params={"database": self.database, "query": query, **SETTINGS_INSERT, **settings},
+            data=corpo,
+            timeout=self.timeout,
+        )
+        if resposta.status_code != 200:
+            raise RuntimeError(f"{query[:80]}... falhou ({resposta.status_code}): {resposta.text[:500]}")
+        return resposta
+
+    @staticmethod
+    def linhas_escritas(resposta: requests.Response) -> int:
+        """written_rows do cabeçalho X-ClickHouse-Summary"""
+        resumo = json.loads(resposta.headers.get("X-ClickHouse-Summary") or "{}")
+        return int(resumo.get("written_rows", 0))
+
+
+class InsercaoArrowHTTP:
+    """
+    INSERT ... FORMAT ArrowStream na interface HTTP: o DataFrame vai para o
+    corpo da requisição direto dos buffers do Polars (colunas casadas por nome).
+
+    serializar/enviar separam a montagem do corpo da ida ao servidor (o
+    importador mede as duas fases); inserir faz as duas.
+    """
+
+    def __init__(self, http: ClickHouseHTTP):
+        self.http = http
+
+    def serializar(self, tabela: str, df: pl.DataFrame) -> Tuple[str, bytes]:
+        buffer = io.BytesIO()
+        # compat_level oldest: string/large_string em vez de string_view (servidores antigos)
+        df.write_ipc_stream(buffer, compat_level=pl.CompatLevel.oldest())
+        return f"INSERT INTO {tabela} FORMAT ArrowStream", buffer.getvalue()
+
+    def enviar(self, carga: Tuple[str, bytes], token: Optional[str] = None) -> None:
+        query, corpo = carga
+        self.http.post(query, corpo, **settings_token(token))
+
+    def inserir(self, tabela: str, df: pl.DataFrame, token: Optional[str] = None) -> None:
+        self.enviar(self.serializar(tabela, df), token)
+
+
+class InsercaoNativaColunar:
+    """
+    INSERT pelo protocolo nativo em modo columnar com use_numpy: cada coluna
+    vai como array NumPy (Series.to_numpy) e números e datas são escritos
+    direto do buffer. serializar só extrai os arrays; a codificação acontece
+    dentro de enviar (clickhouse_driver). Strings ainda viram objetos Python
+    no driver, que não tem escrita vetorizada de String/FixedString: custo
+    aceito por ser só o caminho de reserva do InsercaoArrowHTTP.
+    """
+
+    def __init__(self, client: Client):
+        self.client = client
+
+    def serializar(self, tabela: str, df: pl.DataFrame) -> Tuple[str, List[np.ndarray]]:
+        colunas = ", ".join(df.columns)
+        return f"INSERT INTO {tabela} ({colunas}) VALUES", [serie.to_numpy() for serie in df.get_columns()]
+
+    def enviar(self, carga: Tuple[str, List[np.ndarray]], token: Optional[str] = None) -> None:
+        query, colunas = carga
+        self.client.execute(query, colunas, columnar=True, settings={"use_numpy": True, **settings_token(token)})
+
+    def inserir(self, tabela: str, df: pl.DataFrame, token: Optional[str] = None) -> None:
+        self.enviar(self.serializar(tabela, df), token)
+
+
+def criar_insercao(client: Client, modo: Optional[str] = None,
+                   config: Optional[ClickHouseConfig] = None):
+    """
+    Escolhe o caminho de inserção (IMPORT_INSERT_MODE):
+      - arrow (padrão): ArrowStream via HTTP; cai para nativo se o HTTP não responder
+      - nativo: protocolo nativo em modo columnar
+    """
+    modo = (modo or os.getenv("IMPORT_INSERT_MODE", "arrow")).lower()
+    if modo == "arrow":
+        http = ClickHouseHTTP(config or carregar_config())
+        if http.disponivel():
+            logger.info("✓ Inserção via HTTP ArrowStream (%s)", http.url)
+            return InsercaoArrowHTTP(http)
+        logger.warning("⚠ Interface HTTP indisponível em %s, usando protocolo nativo (columnar)", http.url)
+    elif modo != "nativo":
+        raise ValueError(f"IMPORT_INSERT_MODE inválido: {modo} (use arrow ou nativo)")
+    return InsercaoNativaColunar(client)
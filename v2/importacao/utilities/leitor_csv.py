@@ -0,0 +1,143 @@
+"""Leitura de CSV em lotes com memória limitada (arquivos da Receita com GBs)"""
+import io
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional, Tuple, Union
+
+import polars as pl
+
+from utilities.encoding import AMOSTRA_BYTES, detectar_encoding, encoding_em_cache, registrar_encoding
+from utilities.fontes import FonteCSV
+
+logger = logging.getLogger(__name__)
+
+CHUNK_BYTES_PADRAO = 64 * 1024 * 1024
+
+
+@dataclass
+class Lote:
+    """Bloco de linhas lido do arquivo; inicio/fim são offsets em bytes"""
+    df: pl.DataFrame
+    inicio: int
+    fim: int
+
+
+def _ultimo_corte(dados: bytes) -> int:
+    """
+    Posição logo após o último "\\n" que termina um registro (fora de aspas).
+    Retorna 0 se não houver nenhum corte seguro no bloco.
+    """
+    pos = dados.rfind(b"\n")
+    if pos < 0:
+        return 0
+    aspas = dados.count(b'"', 0, pos)
+    while pos >= 0:
+        # Paridade par = fora de campo entre aspas ("" escapado não altera a paridade)
+        if aspas % 2 == 0:
+            return pos + 1
+        anterior = dados.rfind(b"\n", 0, pos)
+        aspas -= dados.count(b'"', max(anterior, 0), pos)
+        pos = anterior
+    return 0
+
+
+def _para_utf8(dados: bytes, encoding: str) -> tuple:
+    """
+    Converte o bloco para UTF-8; retorna (bloco, encoding do arquivo até aqui).
+    Bloco só ASCII passa direto; "utf-8"/"ascii" validam o bloco e caem para
+    latin-1 (definitivo para o arquivo) se necessário; "latin-1" transcodifica
+    sem tentar UTF-8.
+    """
+    if dados.isascii():
+        return dados, encoding
+    if encoding != "latin-1":
+        try:
+            dados.decode("utf-8")
+            return dados, "utf-8"
+        except UnicodeDecodeError:
+            encoding = "latin-1"
+    return dados.decode("latin-1").encode("utf-8"), encoding
+
+
+def _abrir(arquivo: Union[Path, str, FonteCSV]):
+    return arquivo.open("rb") if isinstance(arquivo, FonteCSV) else open(arquivo, "rb")
+
+
+def ler_blocos_utf8(arquivo: Union[Path, FonteCSV],
+                    chunk_bytes: int = CHUNK_BYTES_PADRAO,
+                    encoding: Optional[str] = None) -> Iterator[Tuple[bytes, int, int]]:
+    """
+    Lê o arquivo em blocos de ~chunk_bytes cortados em fim de registro e
+    devolve (bloco em UTF-8, inicio, fim), com inicio/fim em bytes do original.
+
+    `arquivo` pode ser um membro de ZIP (FonteCSV): os bytes são descompactados
+    em streaming, sem extrair para o disco.
+
+    Encoding (utilities/encoding.py): o informado, o do manifesto ou o
+    detectado numa amostra do primeiro bloco, sem ler o arquivo duas vezes.
+    Latin-1 (padrão da Receita) é transcodificado direto; UTF-8 é validado
+    bloco a bloco e, se um bloco não for UTF-8, o resto do arquivo passa a
+    latin-1. O encoding final vai para o manifesto.
+    """
+    encoding = encoding or encoding_em_cache(arquivo)
+    registrado = encoding
+    pendente = b""
+    inicio = 0
+
+    with _abrir(arquivo) as f:
+        while True:
+            bloco = f.read(chunk_bytes)
+            fim_arquivo = not bloco
+            dados = pendente + bloco if pendente else bloco
+
+            corte = len(dados) if fim_arquivo else _ultimo_corte(dados)
+            if corte == 0 and not fim_arquivo:
+                # Registro maior que o bloco: acumular até achar um fim de linha seguro
+                pendente = dados
+                continue
+
+            parte, pendente = dados[:corte], dados[corte:]
+            if encoding is None:
+                encoding = detectar_encoding(parte[:AMOSTRA_BYTES])
+            if parte.strip():
+                convertido, novo_encoding = _para_utf8(parte, encoding)
+                if novo_encoding == "latin-1" and encoding != "latin-1":
+                    logger.info(f"  {arquivo.name}: usando latin-1 a partir do byte {inicio:,}")
+                encoding = novo_encoding
+                yield convertido, inicio, inicio + corte
+            inicio += corte
+
+            if fim_arquivo:
+                break
+
+    if encoding is not None and encoding != registrado:
+        registrar_encoding(arquivo, encoding)
+
+
+def ler_csv_em_lotes(
+    arquivo: Union[Path, FonteCSV],
+    num_colunas: int,
+    chunk_bytes: int = CHUNK_BYTES_PADRAO,
+    separator: str = ";",
+) -> Iterator[Lote]:
+    """
+    Lê o CSV em blocos (ver ler_blocos_utf8) e devolve cada bloco como
+    DataFrame com colunas col0..col{n-1} (todas String).
+
+    O pico de memória fica limitado ao tamanho do bloco, independente do arquivo.
+    Linhas com colunas a mais são truncadas; colunas ausentes viram null.
+    """
+    schema = {f"col{i}": pl.String for i in range(num_colunas)}
+    for convertido, inicio, fim in ler_blocos_utf8(arquivo, chunk_bytes):
+        df = pl.read_csv(
+            io.BytesIO(convertido),
+            separator=separator,
+            has_header=False,
+            schema=schema,
+            truncate_ragged_lines=True,
+            missing_columns="insert",
+            extra_columns="ignore",
+            ignore_errors=True,
+        )
+        yield Lote(df=df, inicio=inicio, fim=fim)
@@ -0,0 +1,151 @@
+"""
+Manifesto da importação: estado de cada arquivo da release, para retomar uma
+carga interrompida sem começar do zero.
+
+Cada arquivo é registrado na tabela `importacao_arquivos` (no próprio
+ClickHouse, junto das tabelas de staging que descreve) como "importando" ao
+começar e "concluido" ao terminar, com a impressão digital do conteúdo, a
+configuração dos lotes e as contagens. Numa nova execução da mesma release
+(IMPORT_RETOMAR, padrão: ligado) as stagings são mantidas, os arquivos
+concluídos são pulados e os interrompidos são importados de novo.
+
+Reimportar um arquivo interrompido não duplica linhas: cada INSERT leva um
+insert_deduplication_token determinístico (arquivo + número do lote) e as
+stagings guardam os últimos JANELA_DEDUPLICACAO blocos inseridos
+(non_replicated_deduplication_window), então os lotes que já tinham entrado
+são descartados pelo servidor. Por isso o arquivo tem de ser lido com a mesma
+configuração de lotes da tentativa anterior.
+"""
+import logging
+import os
+import re
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from clickhouse_driver import Client
+
+from utilities.fontes import FonteCSV
+
+logger = logging.getLogger(__name__)
+
+TABELA_MANIFESTO = "importacao_arquivos"
+STATUS = ("importando", "concluido")
+
+# Identificador da release (AAAA_MM), também usado como partição do manifesto
+PADRAO_RELEASE = re.compile(r"^\d{4}_\d{2}$")
+
+# Blocos lembrados por tabela de staging. Um lote de estabelecimentos vira um
+# bloco por partição (mês de início de atividade), então a janela precisa
+# cobrir os lotes de todos os arquivos em andamento no momento da queda.
+JANELA_DEDUPLICACAO = int(os.getenv("IMPORT_JANELA_DEDUPLICACAO", "200000"))
+
+
+@dataclass
+class EstadoArquivo:
+    """Última situação registrada de um arquivo da release"""
+    status: str
+    impressao: str
+    configuracao: str
+    linhas: int
+    problematicas: Optional[int]
+
+    @property
+    def concluido(self) -> bool:
+        return self.status == "concluido"
+
+
+def retomar_importacao() -> bool:
+    """IMPORT_RETOMAR=0 descarta a staging e o manifesto e reimporta a release do zero"""
+    return os.getenv("IMPORT_RETOMAR", "1").lower() not in ("0", "false", "nao", "não")
+
+
+def garantir_tabela_manifesto(client: Client) -> None:
+    client.execute(
+        f"CREATE TABLE IF NOT EXISTS {TABELA_MANIFESTO} ("
+        "release String, tabela LowCardinality(String), arquivo String, "
+        "impressao String, configuracao String, "
+        "status Enum8('importando' = 1, 'concluido' = 2), "
+        "linhas UInt64, problematicas Nullable(UInt64), atualizado_em DateTime64(6)"
+        ") ENGINE = ReplacingMergeTree(atualizado_em) PARTITION BY release "
+        "ORDER BY (release, tabela, arquivo)"
+    )
+
+
+def impressao_digital(arquivo: Union[Path, FonteCSV]) -> str:
+    """
+    Identifica o conteúdo do arquivo sem lê-lo: tamanho + CRC32 do diretório
+    central para membros de ZIP (não muda se o ZIP for baixado de novo);
+    tamanho + mtime para CSVs extraídos.
+    """
+    if isinstance(arquivo, FonteCSV) and arquivo.membro is not None:
+        with zipfile.ZipFile(arquivo.caminho) as zf:
+            info = zf.getinfo(arquivo.membro)
+        return f"zip:{info.file_size}:{info.CRC:08x}"
+    caminho = arquivo.caminho if isinstance(arquivo, FonteCSV) else Path(arquivo)
+    stat = caminho.stat()
+    return f"csv:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def estados_release(client: Client, release: str) -> Dict[Tuple[str, str], EstadoArquivo]:
+    """{(tabela, arquivo): estado} da release"""
+    garantir_tabela_manifesto(client)
+    linhas = client.execute(
+        "SELECT tabela, arquivo, toString(status), impressao, configuracao, linhas, problematicas "
+        f"FROM {TABELA_MANIFESTO} FINAL WHERE release = %(release)s",
+        {"release": release},
+    )
+    return {(tabela, arquivo): EstadoArquivo(*resto) for tabela, arquivo, *resto in linhas}
+
+
+def estado_arquivo(client: Client, release: str, tabela: str, arquivo: str) -> Optional[EstadoArquivo]:
+    linhas = client.execute(
+        "SELECT toString(status), impressao, configuracao, linhas, problematicas "
+        f"FROM {TABELA_MANIFESTO} FINAL "
+        "WHERE release = %(release)s AND tabela = %(tabela)s AND arquivo = %(arquivo)s",
+        {"release": release, "tabela": tabela, "arquivo": arquivo},
+    )
+    return EstadoArquivo(*linhas[0]) if linhas else None
+
+
+def registrar_arquivo(client: Client, release: str, tabela: str, arquivo: str, impressao: str,
+                      configuracao: str, status: str, linhas: int = 0,
+                      problematicas: Optional[int] = 0) -> None:
+    if status not in STATUS:
+        raise ValueError(f"Status inválido no manifesto: {status}")
+    client.execute(
+        f"INSERT INTO {TABELA_MANIFESTO} "
+        "(release, tabela, arquivo, impressao, configuracao, status, linhas, problematicas, atualizado_em) VALUES",
+        [(release, tabela, arquivo, impressao, configuracao, status, linhas, problematicas, datetime.now())],
+    )
+
+
+def verificar_retomada(estado: Optional[EstadoArquivo], arquivo: str, impressao: str, configuracao: str) -> None:
+    """
+    Garante que reimportar o arquivo não deixa linhas duplicadas ou misturadas
+    com as de outra versão dele na staging; senão, só reimportando a release
+    do zero (IMPORT_RETOMAR=0).
+    """
+    if estado is None:
+        return
+    if estado.impressao != impressao:
+        raise ValueError(
+            f"{arquivo} mudou desde a execução anterior ({estado.impressao} -> {impressao}); "
+            "reimporte a release do zero com IMPORT_RETOMAR=0"
+        )
+    if not estado.concluido and estado.configuracao != configuracao:
+        raise ValueError(
+            f"{arquivo} foi interrompido com outra configuração de lotes ({estado.configuracao}, "
+            f"agora {configuracao}); mantenha a anterior ou reimporte com IMPORT_RETOMAR=0"
+        )
+
+
+def limpar_manifesto(client: Client, release: str) -> None:
+    """Esquece os arquivos da release (a staging correspondente vai ser recriada)"""
+    # DROP PARTITION não aceita parâmetro: a release vai literal, depois de validada
+    if not PADRAO_RELEASE.match(release):
+        raise ValueError(f"Release inválida: {release} (use AAAA_MM, ex.: 2026_10)")
+    garantir_tabela_manifesto(client)
+    client.execute(f"ALTER TABLE {TABELA_MANIFESTO} DROP PARTITION '{release}'")
@@ -0,0 +1,133 @@
+"""
+Governador de memória: tamanho dos lotes de INSERT pelo orçamento de memória.
+
+Um lote de 500 mil linhas de empresas (7 colunas curtas) ocupa uma fração do
+que ocupa um de estabelecimentos (30 colunas, várias de texto). Em vez de um
+número fixo de linhas, GovernadorMemoria mede os bytes por linha de cada
+tabela (DataFrame normalizado) e o RSS do processo, e dimensiona os lotes para
+caber no orçamento do worker:
+
+- alvo = memória livre para lotes / (bytes por linha * FATOR_LOTE);
+- RSS acima do orçamento: o lote encolhe na proporção do excesso;
+- com folga (RSS abaixo de FOLGA do orçamento), cresce até o alvo, no máximo
+  dobrando de uma vez.
+
+O orçamento vem de IMPORT_MEMORIA_MB (total da importação, dividido entre os
+workers) ou, sem ele, de metade da memória disponível na máquina.
+IMPORT_BATCH_SIZE fixa o tamanho dos lotes e desliga o governador.
+"""
+import logging
+import os
+from typing import Callable, Dict, Optional
+
+import polars as pl
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Cópias de um lote vivas ao mesmo tempo: buffer do agrupamento (até 2 lotes),
+# fatia concatenada e carga serializada para o INSERT
+FATOR_LOTE = 4
+# Cópias de um bloco lido vivas ao mesmo tempo: bytes do CSV, texto convertido
+# para UTF-8, DataFrame lido e DataFrame normalizado
+FATOR_BLOCO = 4
+LOTE_MINIMO = 10_000
+LOTE_MAXIMO = 2_000_000
+FOLGA = 0.75
+
+# Estimativas (para cima) antes do primeiro bloco medido de cada tabela
+BYTES_POR_LINHA_INICIAL = {
+    "estabelecimentos": 1024,
+    "empresas": 256,
+    "socios": 256,
+    "simples": 128,
+}
+BYTES_POR_LINHA_PADRAO = 128
+
+
+def rss_atual_mb() -> Optional[float]:
+    """RSS atual do processo em MB (/proc/self/statm); None fora do Linux"""
+    try:
+        with open("/proc/self/statm") as f:
+            residentes = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return residentes * os.sysconf("SC_PAGE_SIZE") / MB
+
+
+def memoria_disponivel_mb() -> Optional[float]:
+    """MemAvailable de /proc/meminfo (ou a memória física total) em MB"""
+    try:
+        with open("/proc/meminfo") as f:
+            for linha in f:
+                if linha.startswith("MemAvailable:"):
+                    return int(linha.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / MB
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def orcamento_memoria_mb(processos: int = 1) -> Optional[float]:
+    """Orçamento de cada processo importador; None se não dá para saber a memória da máquina"""
+    valor = os.getenv("IMPORT_MEMORIA_MB")
+    total = float(valor) if valor else None
+    if total is None:
+        disponivel = memoria_disponivel_mb()
+        total = disponivel / 2 if disponivel else None
+    return total / max(1, processos) if total else None
+
+
+class GovernadorMemoria:
+    """
+    Decide o tamanho dos lotes por tabela (tamanho_lote) a partir dos bytes
+    por linha medidos nos blocos normalizados (observar) e do RSS atual.
+    `reserva_mb` é a memória dos blocos lidos do CSV, fora dos lotes.
+    """
+
+    def __init__(self, orcamento_mb: float, reserva_mb: float = 0.0,
+                 medir_rss: Callable[[], Optional[float]] = rss_atual_mb):
+        self.orcamento_mb = orcamento_mb
+        self.medir_rss = medir_rss
+        # O que o processo já ocupa antes de importar (interpretador, Polars, conexões)
+        base = medir_rss() or 0.0
+        self.orcamento_lotes_mb = max(orcamento_mb - base - reserva_mb, orcamento_mb / 4)
+        self.bytes_por_linha: Dict[str, float] = {}
+        self._lotes: Dict[str, int] = {}
+
+    def observar(self, tabela: str, df: pl.DataFrame) -> None:
+        """Atualiza os bytes por linha da tabela (média móvel) com um bloco normalizado"""
+        if df.height == 0:
+            return
+        medido = df.estimated_size() / df.height
+        anterior = self.bytes_por_linha.get(tabela)
+        self.bytes_por_linha[tabela] = medido if anterior is None else (anterior + medido) / 2
+
+    def _alvo(self, tabela: str) -> int:
+        por_linha = self.bytes_por_linha.get(tabela, BYTES_POR_LINHA_INICIAL.get(tabela, BYTES_POR_LINHA_PADRAO))
+        return int(self.orcamento_lotes_mb * MB / (por_linha * FATOR_LOTE))
+
+    def tamanho_lote(self, tabela: str) -> int:
+        """Linhas por INSERT para o próximo lote da tabela"""
+        alvo = self._alvo(tabela)
+        atual = self._lotes.get(tabela)
+        rss = self.medir_rss()
+        if rss is not None and rss > self.orcamento_mb:
+            # Sob pressão: encolhe na proporção do excesso (com margem)
+            novo = min(alvo, int((atual or alvo) * 0.8 * self.orcamento_mb / rss))
+        elif atual is None or alvo <= atual:
+            novo = alvo
+        elif rss is None or rss < FOLGA * self.orcamento_mb:
+            novo = min(alvo, 2 * atual)
+        else:
+            novo = atual
+        novo = max(LOTE_MINIMO, min(LOTE_MAXIMO, novo))
+        novo -= novo % 1000
+        if atual is not None and novo != atual:
+            logger.debug("  Lote de %s: %s -> %s linhas (RSS %s MB)", tabela, atual, novo,
+                         f"{rss:.0f}" if rss is not None else "-")
+        self._lotes[tabela] = novo
+        return novo
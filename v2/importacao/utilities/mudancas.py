@@ -0,0 +1,129 @@
+"""
+Feed mensal de mudanças: diff linha a linha entre a release em staging e a
+versão em produção (release anterior), gravado na tabela `changes`.
+
+Cada linha vira um hash do conteúdo (cityHash64 de todas as colunas) por
+chave: cnpj em estabelecimentos, cnpj_basico em empresas/simples e
+cnpj_basico + identificador + documento + nome do sócio em socios. O diff
+é uma única agregação sobre staging UNION ALL produção agrupada pela chave
+(sem JOIN de duas tabelas de 60M de linhas, e com spill para disco acima de
+MEMORIA_GROUP_BY). Chaves só na staging são inserções, só na produção são
+remoções, e hashes diferentes são alterações.
+"""
+import logging
+import os
+from typing import Dict, List
+
+from clickhouse_driver import Client
+
+from utilities.release import PADRAO_RELEASE, release_ativa, sufixo_release, tabelas_existentes
+
+logger = logging.getLogger(__name__)
+
+# Tabela -> expressão da chave de cada registro
+CHAVES_MUDANCAS = {
+    "empresas": "toString(cnpj_basico)",
+    "estabelecimentos": "toString(cnpj)",
+    # FixedString vazia vem com \0: fora da chave, que circula em cursores da API
+    "socios": "replaceAll(concat(cnpj_basico, '|', identificador_socio, '|', cnpj_cpf_socio, '|', nome_socio), '\\0', '')",
+    "simples": "toString(cnpj_basico)",
+}
+
+TIPOS_MUDANCA = ("insercao", "alteracao", "remocao")
+
+# Acima disso a agregação do diff vai para disco em vez de estourar a memória
+MEMORIA_GROUP_BY = 4 * 1024 ** 3
+
+
+def calcular_mudancas() -> bool:
+    """IMPORT_MUDANCAS=0 desliga o diff entre releases (padrão: ligado)"""
+    return os.getenv("IMPORT_MUDANCAS", "1").lower() not in ("0", "false", "nao", "não")
+
+
+def garantir_tabela_mudancas(client: Client) -> None:
+    client.execute(
+        "CREATE TABLE IF NOT EXISTS changes ("
+        "release String, anterior String, tabela LowCardinality(String), chave String, "
+        "cnpj_basico FixedString(8), tipo Enum8('insercao' = 1, 'alteracao' = 2, 'remocao' = 3)"
+        ") ENGINE = MergeTree PARTITION BY release ORDER BY (release, tabela, chave)"
+    )
+
+
+def _colunas(client: Client, tabela: str) -> List[str]:
+    return [
+        linha[0] for linha in client.execute(
+            "SELECT name FROM system.columns WHERE database = currentDatabase() "
+            "AND table = %(tabela)s ORDER BY position",
+            {"tabela": tabela},
+        )
+    ]
+
+
+def _diff_tabela(client: Client, tabela: str, staging: str, release: str, anterior: str) -> None:
+    # Só as colunas presentes nas duas versões (mudança de schema não quebra o diff)
+    colunas_antigas = set(_colunas(client, tabela))
+    colunas = ", ".join(c for c in _colunas(client, staging) if c in colunas_antigas)
+    chave = CHAVES_MUDANCAS[tabela]
+    client.execute(
+        f"""
+        INSERT INTO changes (release, anterior, tabela, chave, cnpj_basico, tipo)
+        SELECT %(release)s, %(anterior)s, %(tabela)s, chave, substring(chave, 1, 8),
+               multiIf(n_antigo = 0, 'insercao', n_novo = 0, 'remocao', 'alteracao')
+        FROM
+        (
+            SELECT chave,
+                   countIf(lado = 1) AS n_novo, countIf(lado = 0) AS n_antigo,
+                   sumIf(h, lado = 1) AS h_novo, sumIf(h, lado = 0) AS h_antigo
+            FROM
+            (
+                SELECT {chave} AS chave, cityHash64({colunas}) AS h, 1 AS lado FROM {staging}
+                UNION ALL
+                SELECT {chave} AS chave, cityHash64({colunas}) AS h, 0 AS lado FROM {tabela}
+            )
+            GROUP BY chave
+            HAVING n_novo != n_antigo OR h_novo != h_antigo
+        )
+        """,
+        {"release": release, "anterior": anterior, "tabela": tabela},
+        settings={"max_bytes_before_external_group_by": MEMORIA_GROUP_BY},
+    )
+
+
+def registrar_mudancas(client: Client, release: str) -> Dict[str, Dict[str, int]]:
+    """
+    Grava em `changes` o diff de cada tabela grande entre a staging da release
+    e a produção. Roda depois da validação e antes de ativar_release; a API só
+    expõe releases já registradas em `releases`. Reexecutar para a mesma
+    release substitui a partição dela. Retorna {tabela: {tipo: quantidade}}.
+    """
+    anterior = release_ativa(client)
+    if anterior is None:
+        logger.info("  Primeira carga: sem release anterior para comparar, feed de mudanças vazio")
+        return {}
+
+    # DROP PARTITION não aceita parâmetro: a release vai literal, depois de validada
+    if not PADRAO_RELEASE.match(release):
+        raise ValueError(f"Release inválida: {release} (use AAAA_MM, ex.: 2026_10)")
+    garantir_tabela_mudancas(client)
+    client.execute(f"ALTER TABLE changes DROP PARTITION '{release}'")
+    sufixo = sufixo_release(release)
+    existentes = set(tabelas_existentes(client))
+    resumo: Dict[str, Dict[str, int]] = {}
+
+    logger.info("Calculando mudanças da release %s em relação a %s...", release, anterior)
+    for tabela in CHAVES_MUDANCAS:
+        staging = f"{tabela}{sufixo}"
+        if tabela not in existentes or staging not in existentes:
+            continue
+        _diff_tabela(client, tabela, staging, release, anterior)
+        contagens = dict(client.execute(
+            "SELECT toString(tipo), count() FROM changes "
+            "WHERE release = %(release)s AND tabela = %(tabela)s GROUP BY tipo",
+            {"release": release, "tabela": tabela},
+        ))
+        resumo[tabela] = {tipo: contagens.get(tipo, 0) for tipo in TIPOS_MUDANCA}
+        logger.info(
+            "  ✓ %-18s | inserções: %12s | alterações: %12s | remoções: %12s",
+            tabela, *(f"{resumo[tabela][tipo]:,}" for tipo in TIPOS_MUDANCA),
+        )
+    return resumo
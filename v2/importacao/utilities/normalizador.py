@@ -2,6 +2,26 @@
 from typing import Optional
 from datetime import datetime
 
+import polars as pl
+
+# Mesmos caracteres que str.strip() do Python remove (inclui \x1c-\x1f, que o
+# strip_chars() padrão do Polars não considera espaço): garante paridade exata
+# entre as funções abaixo e as versões vetorizadas (expr_*)
+ESPACOS_PYTHON = (
+    "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004"
+    "\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000"
+)
+
+# Tamanho do código (FixedString) de cada tabela de domínio, conforme schema.sql
+CODIGO_SIZE_DOMINIO = {
+    "cnaes": 7,
+    "motivos": 2,
+    "municipios": 4,        # código da Receita (TOM), não o IBGE de 7 dígitos
+    "naturezas": 4,
+    "paises": 3,
+    "qualificacoes": 2,
+}
+
 
 def normalizar_cnpj(cnpj_basico: str, cnpj_ordem: str, cnpj_dv: str) -> str:
     """
@@ -132,5 +152,51 @@ def normalizar_codigo(valor: Optional[str], tamanho: int) -> Optional[str]:
     return valor
 
 
+# =================================================================================
+# Versões vetorizadas (expressões Polars) - mesma semântica das funções acima,
+# sem uma chamada Python por célula. Nulos viram "" (códigos/strings) ou 0 (capital),
+# como o importador fazia com `funcao(x) or ""`.
+# =================================================================================
+def expr_limpar_string(coluna: str) -> pl.Expr:
+    """Equivalente a `limpar_string(valor) or ""`"""
+    return (
+        pl.col(coluna)
+        .cast(pl.Utf8)
+        .fill_null("")
+        .str.replace_all("\x00", "", literal=True)
+        .str.strip_chars(ESPACOS_PYTHON)
+    )
+
 
+def expr_normalizar_codigo(coluna: str, tamanho: int) -> pl.Expr:
+    """Equivalente a `normalizar_codigo(valor, tamanho) or ""` (zfill + truncamento)"""
+    valor = pl.col(coluna).cast(pl.Utf8).str.strip_chars(ESPACOS_PYTHON)
+    return (
+        pl.when(valor.is_null() | (valor == ""))
+        .then(pl.lit(""))
+        .otherwise(valor.str.zfill(tamanho).str.slice(0, tamanho))
+        .alias(coluna)
+    )
 
+
+def expr_normalizar_capital_social(coluna: str) -> pl.Expr:
+    """
+    Equivalente a `normalizar_capital_social(valor) or 0`: vírgula decimal,
+    Float64 * 100 truncado para centavos; vazio, inválido ou negativo viram 0.
+    (float() do Python também aceita "1_000"; a Receita não usa esse formato.)
+    """
+    centavos = (
+        pl.col(coluna)
+        .cast(pl.Utf8)
+        .str.strip_chars(ESPACOS_PYTHON)
+        .str.replace_all(",", ".", literal=True)
+        .cast(pl.Float64, strict=False)
+        .mul(100)
+        .cast(pl.Int64, strict=False)
+    )
+    return (
+        pl.when(centavos.is_null() | (centavos < 0))
+        .then(pl.lit(0, dtype=pl.Int64))
+        .otherwise(centavos)
+        .alias(coluna)
+    )
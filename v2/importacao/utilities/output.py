@@ -1,6 +1,6 @@
 """Funções para formatação de saída"""
 import time
-from typing import Dict, List
+from typing import List
 
 from clickhouse_driver import Client
 
@@ -20,17 +20,6 @@ def print_step(current: int, total: int, text: str):
     print("-" * 80)
 
 
-def imprimir_resumo_contagens(contagens_csv: Dict[str, dict]) -> None:
-    """Imprime resumo de contagens de linhas"""
-    print("\nResumo de linhas por tabela:")
-    for tabela, dados in contagens_csv.items():
-        if dados["validas"] > 0:
-            print(
-                f"  {tabela:20s} | Válidas: {dados['validas']:>15,} | "
-                f"Problemáticas: {dados['problematicas']:>10,}"
-            )
-
-
 def imprimir_estatisticas_finais(client: Client, database: str, inicio: float) -> None:
     """Imprime estatísticas finais do processamento"""
     print("\n" + "=" * 80)
@@ -0,0 +1,270 @@
+"""
+Perfil da importação: onde o tempo e a memória vão.
+
+Por arquivo, o importador mede as fases de cada lote (leitura + decodificação
+do CSV, normalização no Polars, agrupamento por partição e ordenação,
+serialização para o formato do INSERT e inserção no ClickHouse), a latência
+de cada INSERT, a vazão (linhas/s e MB/s de CSV) e o pico de RSS do processo.
+process.executar soma a isso o tempo de cada etapa (staging, download/
+importação, validação, troca...) e grava tudo em
+downloads/perfil_importacao_<release>_<data>.json.
+
+Dois relatórios (por exemplo, antes e depois de mudar IMPORT_BATCH_SIZE) são
+comparados com:
+    python -m utilities.perfil antes.json depois.json
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, TypeVar
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage, o pico de RSS fica de fora
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Fases medidas por arquivo; "servidor" = INSERT ... SELECT FROM input() inteiro
+FASES = ("leitura", "normalizacao", "ordenacao", "serializacao", "insercao", "servidor")
+ARQUIVO_PERFIL = "perfil_importacao_{release}_{data}.json"
+
+T = TypeVar("T")
+
+
+def pico_rss_mb(filhos: bool = False) -> Optional[float]:
+    """Pico de RSS do processo (ou do maior filho já encerrado) em MB"""
+    if resource is None:
+        return None
+    uso = resource.getrusage(resource.RUSAGE_CHILDREN if filhos else resource.RUSAGE_SELF)
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(uso.ru_maxrss / divisor, 1)
+
+
+def _percentil(valores: List[float], fracao: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(fracao * len(ordenados)))]
+
+
+def _vazao(quantidade: float, segundos: float, divisor: float = 1) -> Optional[float]:
+    return round(quantidade / divisor / segundos, 1) if quantidade and segundos > 0 else None
+
+
+class PerfilArquivo:
+    """Fases de um arquivo; criado pelo ClickHouseImporter a cada arquivo"""
+
+    def __init__(self, tabela: str, arquivo: str):
+        self.tabela = tabela
+        self.arquivo = arquivo
+        self.linhas = 0
+        self.bytes = 0
+        self.segundos: Dict[str, float] = {}
+        self.latencias_insert: List[float] = []
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def fase(self, nome: str) -> Iterator[None]:
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            decorrido = time.perf_counter() - inicio
+            self.segundos[nome] = self.segundos.get(nome, 0.0) + decorrido
+            if nome in ("insercao", "servidor"):
+                self.latencias_insert.append(decorrido)
+
+    def cronometrar(self, nome: str, iteravel: Iterable[T]) -> Iterator[T]:
+        """Repassa os itens de `iteravel` contando o tempo de produzir cada um na fase `nome`"""
+        iterador = iter(iteravel)
+        while True:
+            with self.fase(nome):
+                try:
+                    item = next(iterador)
+                except StopIteration:
+                    return
+            yield item
+
+    def resumo(self) -> dict:
+        """Dicionário serializável (vai do worker para o processo principal)"""
+        total = time.perf_counter() - self._inicio
+        latencias = self.latencias_insert
+        return {
+            "tabela": self.tabela,
+            "arquivo": self.arquivo,
+            "linhas": self.linhas,
+            "bytes": self.bytes,
+            "segundos": round(total, 3),
+            "fases": {nome: round(self.segundos[nome], 3) for nome in FASES if nome in self.segundos},
+            "linhas_por_s": _vazao(self.linhas, total),
+            "mb_por_s": _vazao(self.bytes, total, 1024 * 1024),
+            "inserts": {
+                "quantidade": len(latencias),
+                "media_ms": round(1000 * sum(latencias) / len(latencias), 1),
+                "p50_ms": round(1000 * _percentil(latencias, 0.5), 1),
+                "p95_ms": round(1000 * _percentil(latencias, 0.95), 1),
+                "max_ms": round(1000 * max(latencias), 1),
+            } if latencias else None,
+            "pico_rss_mb": pico_rss_mb(),
+            "pid": os.getpid(),
+        }
+
+
+class PerfilExecucao:
+    """Etapas de process.executar e perfis dos arquivos importados (seguro entre threads)"""
+
+    def __init__(self, release: Optional[str] = None):
+        self.release = release
+        self.etapas: List[dict] = []
+        self.arquivos: List[dict] = []
+        self.pipeline: Dict[str, dict] = {}
+        self._inicio = time.perf_counter()
+        self._etapa_atual: Optional[dict] = None
+        self._trava = threading.Lock()
+
+    def etapa(self, nome: str) -> None:
+        """Encerra a etapa em andamento e começa a medir `nome`"""
+        self._encerrar_etapa()
+        self._etapa_atual = {"etapa": nome, "inicio": time.perf_counter()}
+
+    def _encerrar_etapa(self) -> None:
+        if self._etapa_atual is None:
+            return
+        atual, self._etapa_atual = self._etapa_atual, None
+        self.etapas.append({
+            "etapa": atual["etapa"],
+            "segundos": round(time.perf_counter() - atual["inicio"], 3),
+            "pico_rss_mb": pico_rss_mb(),
+        })
+
+    def registrar_arquivos(self, perfis: Iterable[Optional[dict]]) -> None:
+        with self._trava:
+            self.arquivos += [p for p in perfis if p]
+
+    def tabelas(self) -> Dict[str, dict]:
+        """Soma dos arquivos por tabela; a vazão usa o tempo somado dos arquivos (não o de parede)"""
+        tabelas: Dict[str, dict] = {}
+        for perfil in self.arquivos:
+            dados = tabelas.setdefault(perfil["tabela"], {
+                "arquivos": 0, "linhas": 0, "bytes": 0, "segundos": 0.0, "fases": {}, "inserts": 0, "p95_ms": 0.0,
+            })
+            dados["arquivos"] += 1
+            dados["linhas"] += perfil["linhas"]
+            dados["bytes"] += perfil["bytes"]
+            dados["segundos"] += perfil["segundos"]
+            for fase, segundos in perfil["fases"].items():
+                dados["fases"][fase] = dados["fases"].get(fase, 0.0) + segundos
+            if perfil["inserts"]:
+                dados["inserts"] += perfil["inserts"]["quantidade"]
+                # Pior p95 entre os arquivos da tabela
+                dados["p95_ms"] = max(dados["p95_ms"], perfil["inserts"]["p95_ms"])
+        for dados in tabelas.values():
+            dados["linhas_por_s"] = _vazao(dados["linhas"], dados["segundos"])
+            dados["mb_por_s"] = _vazao(dados["bytes"], dados["segundos"], 1024 * 1024)
+            dados["segundos"] = round(dados["segundos"], 3)
+            dados["fases"] = {fase: round(s, 3) for fase, s in dados["fases"].items()}
+        return tabelas
+
+    def relatorio(self) -> dict:
+        self._encerrar_etapa()
+        picos_workers = [p["pico_rss_mb"] for p in self.arquivos if p.get("pico_rss_mb")]
+        return {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "release": self.release,
+            "segundos": round(time.perf_counter() - self._inicio, 3),
+            # Ajustes do importador (IMPORT_BATCH_SIZE, IMPORT_WORKERS, ...)
+            "config": {k: v for k, v in sorted(os.environ.items()) if k.startswith("IMPORT_")},
+            "pico_rss_mb": {
+                "principal": pico_rss_mb(),
+                "workers": max(picos_workers) if picos_workers else None,
+            },
+            "etapas": self.etapas,
+            "pipeline": self.pipeline,
+            "tabelas": self.tabelas(),
+            "arquivos": self.arquivos,
+        }
+
+    def salvar(self, pasta: Path) -> Optional[Path]:
+        """Grava o relatório em `pasta` e imprime o resumo; retorna o caminho"""
+        relatorio = self.relatorio()
+        imprimir_perfil(relatorio)
+        caminho = pasta / ARQUIVO_PERFIL.format(
+            release=self.release or "sem_release", data=datetime.now().strftime("%Y%m%d_%H%M%S"),
+        )
+        try:
+            pasta.mkdir(parents=True, exist_ok=True)
+            caminho.write_text(json.dumps(relatorio, indent=1, ensure_ascii=False), encoding="utf-8")
+            logger.info("  Perfil da importação gravado em %s", caminho)
+            return caminho
+        except OSError as exc:
+            logger.warning("⚠ Não foi possível gravar o perfil em %s: %s", caminho, exc)
+            return None
+
+
+def imprimir_perfil(relatorio: dict) -> None:
+    """Tempo por etapa e, por tabela, a divisão do tempo entre as fases"""
+    logger.info("\nPerfil da importação:")
+    for etapa in relatorio["etapas"]:
+        logger.info("  %-32s %9.1fs  RSS %s MB", etapa["etapa"], etapa["segundos"], etapa["pico_rss_mb"] or "-")
+    for tabela, dados in relatorio["tabelas"].items():
+        fases = ", ".join(f"{fase} {segundos:.1f}s" for fase, segundos in dados["fases"].items())
+        logger.info(
+            "  %-18s %12s linhas/s %8s MB/s | %s | INSERT p95 %s ms",
+            tabela, f"{dados['linhas_por_s'] or 0:,.0f}", dados["mb_por_s"] or "-", fases, dados["p95_ms"],
+        )
+    pico = relatorio["pico_rss_mb"]
+    logger.info("  Pico de RSS: principal %s MB, workers %s MB", pico["principal"] or "-", pico["workers"] or "-")
+
+
+def _delta(antes: Optional[float], depois: Optional[float]) -> str:
+    if not antes or depois is None:
+        return "-"
+    return f"{100 * (depois - antes) / antes:+.1f}%"
+
+
+def comparar_perfis(antes: dict, depois: dict) -> List[str]:
+    """Linhas da comparação entre dois relatórios (etapas, tabelas e memória)"""
+    linhas = [f"{'':<34} {'antes':>12} {'depois':>12} {'variação':>10}"]
+
+    def linha(nome: str, a: Optional[float], d: Optional[float]) -> None:
+        linhas.append(f"{nome:<34} {a if a is not None else '-':>12} {d if d is not None else '-':>12} "
+                      f"{_delta(a, d):>10}")
+
+    linha("total (s)", antes["segundos"], depois["segundos"])
+    etapas_antes = {e["etapa"]: e for e in antes["etapas"]}
+    for etapa in depois["etapas"]:
+        linha(f"etapa {etapa['etapa']} (s)", etapas_antes.get(etapa["etapa"], {}).get("segundos"), etapa["segundos"])
+    for tabela, dados in depois["tabelas"].items():
+        anterior = antes["tabelas"].get(tabela, {})
+        linha(f"{tabela} linhas/s", anterior.get("linhas_por_s"), dados["linhas_por_s"])
+        linha(f"{tabela} MB/s", anterior.get("mb_por_s"), dados["mb_por_s"])
+        for fase, segundos in dados["fases"].items():
+            linha(f"{tabela} {fase} (s)", anterior.get("fases", {}).get(fase), segundos)
+        linha(f"{tabela} INSERT p95 (ms)", anterior.get("p95_ms"), dados["p95_ms"])
+    for processo in ("principal", "workers"):
+        linha(f"pico RSS {processo} (MB)", antes["pico_rss_mb"].get(processo), depois["pico_rss_mb"].get(processo))
+    mudancas = {k: (antes["config"].get(k), v) for k, v in depois["config"].items() if antes["config"].get(k) != v}
+    mudancas.update({k: (v, None) for k, v in antes["config"].items() if k not in depois["config"]})
+    for chave, (a, d) in sorted(mudancas.items()):
+        linhas.append(f"config {chave}: {a} -> {d}")
+    return linhas
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("Uso: python -m utilities.perfil antes.json depois.json", file=sys.stderr)
+        return 2
+    antes, depois = (json.loads(Path(a).read_text(encoding="utf-8")) for a in argv)
+    print("\n".join(comparar_perfis(antes, depois)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Dataflow em etapas com filas limitadas entre elas.
+
+Cada item avança para a etapa seguinte assim que a anterior termina com ele
+(não espera o lote inteiro), cada etapa tem sua própria concorrência (threads)
+e as filas limitadas seguram as etapas rápidas quando a seguinte não dá conta.
+O tempo total tende ao da etapa mais lenta, não à soma das etapas.
+"""
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_FIM = object()
+
+
+@dataclass
+class Etapa:
+    """
+    Uma etapa do pipeline: `funcao(item)` devolve os itens da etapa seguinte
+    (zero, um ou vários). `capacidade` limita a fila de entrada (padrão: 2 x workers).
+    """
+    nome: str
+    funcao: Callable[[Any], Iterable[Any]]
+    workers: int = 1
+    capacidade: Optional[int] = None
+
+
+@dataclass
+class EstatisticaEtapa:
+    nome: str
+    workers: int
+    itens: int = 0
+    segundos_ocupado: float = 0.0
+    erros: List[Tuple[Any, str]] = field(default_factory=list)
+
+
+class Pipeline:
+    """Executa as etapas em threads; a falha de um item é registrada e não para os demais"""
+
+    def __init__(self, etapas: List[Etapa]):
+        if not etapas:
+            raise ValueError("Pipeline sem etapas")
+        self.etapas = etapas
+
+    def executar(self, entradas: Iterable[Any]) -> Tuple[List[Any], Dict[str, EstatisticaEtapa]]:
+        """Processa `entradas`; retorna as saídas da última etapa e as estatísticas por etapa"""
+        filas = [queue.Queue(maxsize=e.capacidade or 2 * e.workers) for e in self.etapas]
+        stats = {e.nome: EstatisticaEtapa(e.nome, e.workers) for e in self.etapas}
+        restantes = [e.workers for e in self.etapas]
+        trava = threading.Lock()
+        saidas: List[Any] = []
+
+        def entregar(indice: int, item: Any) -> None:
+            if indice < len(filas):
+                filas[indice].put(item)
+            else:
+                with trava:
+                    saidas.append(item)
+
+        def trabalhar(indice: int) -> None:
+            etapa, stat = self.etapas[indice], stats[self.etapas[indice].nome]
+            while True:
+                item = filas[indice].get()
+                if item is _FIM:
+                    break
+                inicio = time.perf_counter()
+                try:
+                    resultados = list(etapa.funcao(item) or [])
+                except Exception as exc:
+                    resultados = []
+                    with trava:
+                        stat.erros.append((item, f"{type(exc).__name__}: {exc}"))
+                    logger.error("  ✗ [%s] %s: %s", etapa.nome, item, exc)
+                with trava:
+                    stat.itens += 1
+                    stat.segundos_ocupado += time.perf_counter() - inicio
+                # Entrega fora do cronômetro: esperar vaga na fila seguinte não é trabalho da etapa
+                for resultado in resultados:
+                    entregar(indice + 1, resultado)
+            # O último worker a sair encerra a etapa seguinte
+            with trava:
+                restantes[indice] -= 1
+                ultimo = restantes[indice] == 0
+            if ultimo and indice + 1 < len(filas):
+                for _ in range(self.etapas[indice + 1].workers):
+                    filas[indice + 1].put(_FIM)
+
+        threads = [
+            threading.Thread(target=trabalhar, args=(i,), name=f"{etapa.nome}-{n}", daemon=True)
+            for i, etapa in enumerate(self.etapas)
+            for n in range(etapa.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        inicio = time.perf_counter()
+        try:
+            for item in entradas:
+                filas[0].put(item)
+        finally:
+            for _ in range(self.etapas[0].workers):
+                filas[0].put(_FIM)
+            for thread in threads:
+                thread.join()
+
+        parede = time.perf_counter() - inicio
+        for stat in stats.values():
+            ocupacao = stat.segundos_ocupado / stat.workers / parede if parede else 0.0
+            logger.info(
+                "  %s: %s itens, %.1fs de trabalho em %s worker(s) (%.0f%% de ocupação), %s erro(s)",
+                stat.nome, stat.itens, stat.segundos_ocupado, stat.workers, 100 * ocupacao, len(stat.erros),
+            )
+        logger.info("  Tempo total do pipeline: %.1fs", parede)
+        return saidas, stats
@@ -0,0 +1,235 @@
+"""
+Carga blue/green de uma release da Receita no ClickHouse.
+
+A release é importada em tabelas de staging versionadas (ex.:
+estabelecimentos__2026_10) enquanto a API continua lendo as tabelas atuais.
+Depois de validadas, cada staging troca de lugar com a tabela atual via
+EXCHANGE TABLES (atômico por tabela); a versão anterior fica com o sufixo
+da release antiga e só é removida na importação seguinte (janela de rollback).
+A release ativa é registrada na tabela `releases`, lida pela API.
+"""
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+
+from clickhouse_driver import Client
+
+from utilities.clickhouse import criar_banco_e_schema
+from utilities.manifesto_importacao import JANELA_DEDUPLICACAO, PADRAO_RELEASE, estados_release, limpar_manifesto
+
+logger = logging.getLogger(__name__)
+
+TABELAS_RELEASE = [
+    "cnaes",
+    "motivos",
+    "municipios",
+    "naturezas",
+    "paises",
+    "qualificacoes",
+    "empresas",
+    "estabelecimentos",
+    "socios",
+    "simples",
+]
+TABELAS_GRANDES_RELEASE = {"empresas", "estabelecimentos", "socios", "simples"}
+
+
+def identificar_release(data: Optional[datetime] = None) -> str:
+    """Identificador AAAA_MM da release (IMPORT_RELEASE ou o mês atual)"""
+    release = os.getenv("IMPORT_RELEASE") or (data or datetime.now()).strftime("%Y_%m")
+    if not PADRAO_RELEASE.match(release):
+        raise ValueError(f"IMPORT_RELEASE inválida: {release} (use AAAA_MM, ex.: 2026_10)")
+    return release
+
+
+def sufixo_release(release: str) -> str:
+    return f"__{release}"
+
+
+def garantir_tabela_releases(client: Client) -> None:
+    client.execute(
+        "CREATE TABLE IF NOT EXISTS releases ("
+        "release String, ativada_em DateTime, anterior String, linhas UInt64"
+        ") ENGINE = MergeTree ORDER BY ativada_em"
+    )
+
+
+def release_ativa(client: Client) -> Optional[str]:
+    """Release servida pela API no momento (None antes da primeira troca)"""
+    garantir_tabela_releases(client)
+    linhas = client.execute("SELECT release FROM releases ORDER BY ativada_em DESC LIMIT 1")
+    return linhas[0][0] if linhas else None
+
+
+def tabelas_existentes(client: Client) -> List[str]:
+    return [t[0] for t in client.execute("SELECT name FROM system.tables WHERE database = currentDatabase()")]
+
+
+def _contar(client: Client, tabela: str) -> int:
+    return client.execute(f"SELECT count() FROM {tabela}")[0][0]
+
+
+def criar_tabelas_staging(client: Client, schema_file: Path, release: str, retomar: bool = False) -> bool:
+    """
+    Cria (do zero) as tabelas de staging da release a partir do schema.sql.
+    Com `retomar`, se uma execução anterior desta release deixou a staging e
+    o manifesto (utilities/manifesto_importacao.py), mantém os dois para a
+    importação continuar de onde parou.
+    """
+    sufixo = sufixo_release(release)
+    existentes = set(tabelas_existentes(client))
+    if retomar and all(f"{tabela}{sufixo}" in existentes for tabela in TABELAS_RELEASE):
+        estados = estados_release(client, release)
+        if estados:
+            concluidos = sum(1 for estado in estados.values() if estado.concluido)
+            logger.info(
+                "Retomando a importação da release %s: %s arquivo(s) concluído(s), %s interrompido(s)",
+                release, concluidos, len(estados) - concluidos,
+            )
+            _ativar_deduplicacao(client, sufixo)
+            return True
+
+    limpar_manifesto(client, release)
+    for tabela in TABELAS_RELEASE:
+        if f"{tabela}{sufixo}" in existentes:
+            # Sobra de uma importação interrompida desta mesma release
+            logger.info("  Removendo staging antiga %s%s", tabela, sufixo)
+            client.execute(f"DROP TABLE {tabela}{sufixo}")
+    logger.info("Criando tabelas de staging da release %s (sufixo %s)...", release, sufixo)
+    if not criar_banco_e_schema(client, schema_file, sufixo_tabela=sufixo):
+        return False
+    _ativar_deduplicacao(client, sufixo)
+    return True
+
+
+def _ativar_deduplicacao(client: Client, sufixo: str) -> None:
+    """
+    Lotes reenviados depois de uma queda são descartados pelo token de
+    deduplicação. Reaplicado na retomada: encerrar_deduplicacao pode já ter
+    rodado se a execução anterior caiu depois da validação.
+    """
+    for tabela in TABELAS_RELEASE:
+        client.execute(
+            f"ALTER TABLE {tabela}{sufixo} MODIFY SETTING non_replicated_deduplication_window = {JANELA_DEDUPLICACAO}"
+        )
+
+
+def validar_staging(client: Client, release: str, proporcao_minima: Optional[float] = None) -> bool:
+    """
+    Confere a staging antes da troca: nenhuma tabela vazia e as tabelas grandes
+    com pelo menos `proporcao_minima` (IMPORT_RELEASE_MIN_PROPORCAO, padrão 0,9)
+    das linhas da versão em produção, para não publicar uma carga truncada.
+    """
+    if proporcao_minima is None:
+        proporcao_minima = float(os.getenv("IMPORT_RELEASE_MIN_PROPORCAO", "0.9"))
+    sufixo = sufixo_release(release)
+    existentes = set(tabelas_existentes(client))
+    ok = True
+    for tabela in TABELAS_RELEASE:
+        staging = f"{tabela}{sufixo}"
+        if staging not in existentes:
+            logger.error("  ✗ %s: tabela de staging não existe", staging)
+            ok = False
+            continue
+        novas = _contar(client, staging)
+        atuais = _contar(client, tabela) if tabela in existentes else None
+        problema = None
+        if novas == 0:
+            problema = "vazia"
+        elif tabela in TABELAS_GRANDES_RELEASE and atuais and novas < proporcao_minima * atuais:
+            problema = f"menos de {proporcao_minima:.0%} das linhas atuais"
+        comparacao = f"atual: {atuais:>15,}" if atuais is not None else "atual: (não existe)"
+        logger.info("  %s %-18s | nova: %15s | %s", "✗" if problema else "✓", tabela, f"{novas:,}", comparacao)
+        if problema:
+            logger.error("    %s: %s", staging, problema)
+            ok = False
+    return ok
+
+
+def encerrar_deduplicacao(client: Client, release: str) -> None:
+    """
+    Volta a janela de deduplicação da staging ao padrão. Só serve para a
+    retomada da carga; em produção a tabela descartaria em silêncio qualquer
+    inserção posterior que repetisse um bloco já visto. Roda depois da validação
+    e antes de ativar_release.
+    """
+    sufixo = sufixo_release(release)
+    for tabela in TABELAS_RELEASE:
+        client.execute(f"ALTER TABLE {tabela}{sufixo} RESET SETTING non_replicated_deduplication_window")
+
+
+def _trocar(client: Client, tabela: str, staging: str) -> None:
+    """Põe `staging` no lugar de `tabela` e a versão anterior no nome da staging"""
+    try:
+        client.execute(f"EXCHANGE TABLES {staging} AND {tabela}")
+    except Exception as exc:
+        # Bancos Ordinary não têm EXCHANGE: RENAME duplo (não atômico, janela de milissegundos)
+        logger.warning("  ⚠ EXCHANGE indisponível (%s); usando RENAME", str(exc).splitlines()[0][:120])
+        temporaria = f"{tabela}__troca"
+        client.execute(f"RENAME TABLE {tabela} TO {temporaria}, {staging} TO {tabela}, {temporaria} TO {staging}")
+
+
+def ativar_release(client: Client, release: str) -> str:
+    """
+    Troca as tabelas de produção pelas da release e registra a troca.
+    A versão anterior fica em <tabela>__<release anterior>. Retorna esse sufixo.
+    """
+    sufixo = sufixo_release(release)
+    anterior = release_ativa(client) or "inicial"
+    if anterior == release:
+        # Reimportação da mesma release: a versão substituída ganha outro nome
+        anterior = f"{release}_substituida"
+    existentes = set(tabelas_existentes(client))
+    total = 0
+
+    logger.info("Ativando release %s (versão anterior fica com o sufixo __%s)...", release, anterior)
+    for tabela in TABELAS_RELEASE:
+        staging, antiga = f"{tabela}{sufixo}", f"{tabela}__{anterior}"
+        total += _contar(client, staging)
+        if tabela not in existentes:
+            client.execute(f"RENAME TABLE {staging} TO {tabela}")
+            logger.info("  ✓ %s criada a partir de %s", tabela, staging)
+            continue
+        _trocar(client, tabela, staging)
+        client.execute(f"DROP TABLE IF EXISTS {antiga}")
+        client.execute(f"RENAME TABLE {staging} TO {antiga}")
+        logger.info("  ✓ %s trocada (anterior em %s)", tabela, antiga)
+
+    client.execute(
+        "INSERT INTO releases (release, ativada_em, anterior, linhas) VALUES",
+        [(release, datetime.now().replace(microsecond=0), anterior, total)],
+    )
+    logger.info("✓ Release %s ativa (%s linhas)", release, f"{total:,}")
+    return anterior
+
+
+def remover_versoes_antigas(client: Client, release_atual: str, manter: Optional[int] = None) -> List[str]:
+    """
+    Remove as versões anteriores além das `manter` últimas trocas
+    (IMPORT_RELEASES_MANTER, padrão 1: a última troca ainda pode ser revertida)
+    e stagings abandonadas de outras releases. Roda no início da importação
+    seguinte, nunca durante a troca; a staging de `release_atual` é tratada
+    por criar_tabelas_staging.
+    """
+    if manter is None:
+        manter = int(os.getenv("IMPORT_RELEASES_MANTER", "1"))
+    garantir_tabela_releases(client)
+    recentes = {
+        linha[0] for linha in
+        client.execute(f"SELECT anterior FROM releases ORDER BY ativada_em DESC LIMIT {int(manter)}")
+    } if manter > 0 else set()
+
+    removidas = []
+    for nome in tabelas_existentes(client):
+        base, separador, sufixo = nome.partition("__")
+        if not separador or base not in TABELAS_RELEASE:
+            continue
+        if sufixo in recentes or sufixo == release_atual:
+            continue
+        client.execute(f"DROP TABLE IF EXISTS {nome}")
+        removidas.append(nome)
+    if removidas:
+        logger.info("  ✓ Versões antigas removidas: %s", ", ".join(sorted(removidas)))
+    return removidas
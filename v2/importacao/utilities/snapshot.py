@@ -0,0 +1,118 @@
+"""
+Snapshot Parquet da release: os CSVs da Receita convertidos uma vez em
+Parquet tipado, normalizado e comprimido com zstd, uma pasta por tabela.
+
+    downloads/parquet/<release>/<tabela>/<CSV>.<n>.parquet
+    downloads/parquet/<release>/_snapshot.json   (partes, linhas e problemáticas por CSV)
+
+`python gerar_snapshot.py` gera o snapshot com a mesma normalização do
+importador: EscritaParquet entra no lugar da inserção do ClickHouseImporter,
+e cada lote que iria para o INSERT (já agrupado por partição e ordenado) vira
+uma parte. CSVs já convertidos (mesma impressão digital) são pulados, então
+a conversão pode ser retomada.
+
+Quem carrega a partir do snapshot não lê nem normaliza CSV:
+- ClickHouse: IMPORT_ORIGEM=parquet (process.executar_importacoes, uma parte
+  por INSERT);
+- PostgreSQL: CNPJ_PARQUET_DIR no carregador da v1 (v1/scripts/page.py);
+- outros ambientes e experimentos de schema: qualquer leitor de Parquet
+  (DuckDB, ClickHouse file(), Polars...).
+
+IMPORT_PARQUET_ZSTD ajusta o nível do zstd (padrão: 3).
+"""
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import polars as pl
+
+logger = logging.getLogger(__name__)
+
+PASTA_SNAPSHOT = "parquet"
+MANIFESTO_SNAPSHOT = "_snapshot.json"
+
+
+def origem_parquet() -> bool:
+    """IMPORT_ORIGEM=parquet carrega o ClickHouse a partir do snapshot da release (padrão: csv)"""
+    origem = os.getenv("IMPORT_ORIGEM", "csv").lower()
+    if origem not in ("csv", "parquet"):
+        raise ValueError(f"IMPORT_ORIGEM inválida: {origem} (use csv ou parquet)")
+    return origem == "parquet"
+
+
+def nivel_zstd() -> int:
+    return int(os.getenv("IMPORT_PARQUET_ZSTD", "3"))
+
+
+def pasta_snapshot(downloads_dir: Path, release: str) -> Path:
+    return downloads_dir / PASTA_SNAPSHOT / release
+
+
+class EscritaParquet:
+    """
+    Faz as vezes da inserção do ClickHouseImporter (serializar/enviar): cada
+    lote vira um arquivo <pasta>/<tabela>/<CSV>.<n>.parquet. iniciar(tabela,
+    csv) antes de cada CSV; `partes` guarda os arquivos escritos dele.
+    """
+
+    def __init__(self, pasta: Path, nivel: Optional[int] = None):
+        self.pasta = pasta
+        self.nivel = nivel_zstd() if nivel is None else nivel
+        self.csv: Optional[str] = None
+        self.partes: List[Path] = []
+
+    def iniciar(self, tabela: str, csv: str) -> None:
+        """Prepara as partes de `csv`, apagando as de uma conversão interrompida"""
+        self.csv, self.partes = csv, []
+        for antiga in (self.pasta / tabela).glob(f"{csv}.*.parquet*"):
+            antiga.unlink()
+
+    def serializar(self, tabela: str, df: pl.DataFrame) -> Tuple[Path, pl.DataFrame]:
+        caminho = self.pasta / tabela / f"{self.csv}.{len(self.partes):05d}.parquet"
+        self.partes.append(caminho)
+        return caminho, df
+
+    def enviar(self, carga: Tuple[Path, pl.DataFrame], token: Optional[str] = None) -> None:
+        caminho, df = carga
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        # Escreve ao lado e renomeia: uma parte nunca fica pela metade
+        temporario = caminho.with_name(caminho.name + ".part")
+        df.write_parquet(temporario, compression="zstd", compression_level=self.nivel, statistics=True)
+        temporario.replace(caminho)
+
+    def inserir(self, tabela: str, df: pl.DataFrame, token: Optional[str] = None) -> None:
+        self.enviar(self.serializar(tabela, df), token)
+
+
+def ler_manifesto_snapshot(pasta: Path) -> dict:
+    """Conteúdo de _snapshot.json ({"arquivos": {}} se ainda não existe)"""
+    caminho = pasta / MANIFESTO_SNAPSHOT
+    if not caminho.exists():
+        return {"arquivos": {}}
+    return json.loads(caminho.read_text(encoding="utf-8"))
+
+
+def gravar_manifesto_snapshot(pasta: Path, manifesto: dict) -> None:
+    """Grava _snapshot.json de uma vez (a cada CSV convertido)"""
+    manifesto["atualizado_em"] = datetime.now().isoformat(timespec="seconds")
+    pasta.mkdir(parents=True, exist_ok=True)
+    temporario = pasta / (MANIFESTO_SNAPSHOT + ".part")
+    temporario.write_text(json.dumps(manifesto, indent=1, ensure_ascii=False), encoding="utf-8")
+    temporario.replace(pasta / MANIFESTO_SNAPSHOT)
+
+
+def chave_snapshot(tabela: str, csv: str) -> str:
+    return f"{tabela}/{csv}"
+
+
+def partes_snapshot(pasta: Path, tabelas: Optional[List[str]] = None) -> List[Tuple[str, Path]]:
+    """(tabela, parte) dos CSVs concluídos no manifesto; partes de conversões interrompidas ficam de fora"""
+    partes = []
+    for dados in ler_manifesto_snapshot(pasta)["arquivos"].values():
+        if tabelas is None or dados["tabela"] in tabelas:
+            partes += [(dados["tabela"], pasta / dados["tabela"] / parte) for parte in dados["partes"]]
+    return partes
+
@@ -2,12 +2,13 @@
 import sys
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
-import chardet
 
 # Adicionar path
 BASE_DIR = Path(__file__).parent
 sys.path.insert(0, str(BASE_DIR))
 
+from utilities.encoding import AMOSTRA_BYTES, detectar_encoding_arquivo as detectar_encoding_amostra
+
 try:
     import polars as pl
     POLARS_AVAILABLE = True
@@ -30,14 +31,11 @@ CARACTERES_PROBLEMATICOS = ['', '\ufffd', '']
 
 
 def detectar_encoding_arquivo(arquivo: Path) -> Dict[str, any]:
-    """Detecta o encoding de um arquivo usando chardet"""
+    """Detecta o encoding por amostra, com a mesma regra da importação (utilities/encoding.py)"""
     try:
-        with open(arquivo, 'rb') as f:
-            raw_data = f.read(10000)  # Ler primeiros 10KB
-            resultado = chardet.detect(raw_data)
-            return resultado
+        return {'encoding': detectar_encoding_amostra(arquivo), 'amostra_bytes': AMOSTRA_BYTES}
     except Exception as e:
-        return {'encoding': None, 'confidence': 0, 'error': str(e)}
+        return {'encoding': None, 'amostra_bytes': 0, 'error': str(e)}
 
 
 def verificar_acentos_em_string(texto: str) -> Dict[str, any]:
@@ -211,9 +209,9 @@ def main():
         
         # Detectar encoding
         deteccao = detectar_encoding_arquivo(arquivo)
-        print(f"\n📊 Detecção automática (chardet):")
+        print(f"\n📊 Detecção por amostra (mesma regra da importação):")
         print(f"   Encoding: {deteccao.get('encoding', 'N/A')}")
-        print(f"   Confiança: {deteccao.get('confidence', 0):.2%}")
+        print(f"   Amostra: {deteccao.get('amostra_bytes', 0):,} bytes no início, meio e fim do arquivo")
         
         # Testar com Polars
         if POLARS_AVAILABLE:
@@ -282,15 +280,9 @@ def main():
     print("   2. Se os arquivos CSV não têm acentos:")
     print("      → O problema está na origem dos dados (arquivos da Receita Federal).")
     print("   3. Se o encoding detectado não for UTF-8 ou latin-1:")
-    print("      → Ajuste a função ler_csv_com_encoding() para usar o encoding correto.")
+    print("      → Ajuste detectar_encoding() em utilities/encoding.py (ou apague o .encodings.json da pasta) para usar o encoding correto.")
 
 
 if __name__ == "__main__":
-    try:
-        import chardet
-    except ImportError:
-        print("⚠ chardet não está instalado. Instale com: pip install chardet")
-        print("   Continuando sem detecção automática de encoding...")
-    
     main()
 